@@ -0,0 +1,45 @@
+# =============================================================================
+# Cache en memoria con TTL - IPS Santa Helena del Valle
+# Resultados agregados de corta vida (dashboards, estadísticas)
+# =============================================================================
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class CacheTTL:
+    """
+    Cache de proceso con expiración por entrada.
+
+    Pensado para agregados que los dashboards consultan por polling: mientras la
+    entrada esté vigente se sirve desde memoria y no se consulta la BD. Las
+    escrituras del propio proceso pueden invalidar la entrada para no esperar
+    al vencimiento.
+    """
+
+    def __init__(self, ttl_segundos: float):
+        self.ttl_segundos = ttl_segundos
+        self._entradas: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Valor vigente para la clave; si no existe o venció, lo calcula y guarda"""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] > ahora:
+            return entrada[1]
+
+        valor = calcular()
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl_segundos, valor)
+        return valor
+
+    def invalidar(self, clave: Optional[Hashable] = None):
+        """Descartar una entrada o, sin clave, todas"""
+        with self._lock:
+            if clave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(clave, None)
@@ -3,7 +3,12 @@
 # Middleware para manejo unificado de errores y logging estructurado
 # =============================================================================
 
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import traceback
 import uuid
 from datetime import datetime
@@ -19,38 +24,123 @@ from pydantic import ValidationError
 # CONFIGURACIÓN LOGGING ESTRUCTURADO
 # =============================================================================
 
+class _QueueHandlerDiferido(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola el LogRecord sin formatearlo.
+    
+    El QueueHandler estándar formatea mensaje y args en el hilo que loguea para
+    poder serializar el record; aquí el listener vive en el mismo proceso, así
+    que el formateo (incluidos los campos de contexto) se hace en su hilo.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class FormatterTexto(logging.Formatter):
+    """Formato legible por consola: mensaje seguido de `k=v` por campo."""
+    
+    def __init__(self):
+        super().__init__(
+            '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
+        )
+    
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        campos = getattr(record, "campos", None)
+        if campos:
+            record.message = f"{record.message} | " + " | ".join(f"{k}={v}" for k, v in campos.items())
+        return super().formatMessage(record)
+
+class FormatterJSON(logging.Formatter):
+    """Un objeto JSON por línea con los campos de contexto al primer nivel."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage()
+        }
+        campos = getattr(record, "campos", None)
+        if campos:
+            for clave, valor in campos.items():
+                datos.setdefault(clave, valor)
+        if record.exc_info:
+            datos["exception"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
 class StructuredLogger:
-    """Logger estructurado para trazabilidad completa."""
+    """
+    Logger estructurado para trazabilidad completa.
     
-    def __init__(self, name: str = "ips_santa_helena"):
+    Los campos de contexto (kwargs) viajan en el LogRecord y se serializan en el
+    formatter, no al llamar. Con `asincrono` el StreamHandler corre detrás de un
+    QueueHandler/QueueListener: el event loop solo encola y la escritura a
+    consola ocurre en el hilo del listener. Si el nivel está deshabilitado, la
+    llamada retorna antes de construir el record.
+    
+    Variables de entorno: LOG_FORMAT (texto|json), LOG_LEVEL, LOG_ASYNC (true|false).
+    """
+    
+    def __init__(self, name: str = "ips_santa_helena", formato: Optional[str] = None,
+                 nivel: Optional[str] = None, asincrono: Optional[bool] = None):
+        formato = (formato or os.getenv("LOG_FORMAT", "texto")).lower()
+        nivel = (nivel or os.getenv("LOG_LEVEL", "INFO")).upper()
+        if asincrono is None:
+            asincrono = os.getenv("LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+        
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.INFO)
+        self.logger.setLevel(nivel)
+        self.listener: Optional[logging.handlers.QueueListener] = None
         
         # Handler para consola con formato estructurado
         if not self.logger.handlers:
             console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(FormatterJSON() if formato == "json" else FormatterTexto())
             
-            formatter = logging.Formatter(
-                '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
-            )
-            console_handler.setFormatter(formatter)
-            self.logger.addHandler(console_handler)
+            if asincrono:
+                cola = queue.SimpleQueue()  # Sin límite: encolar nunca bloquea
+                self.logger.addHandler(_QueueHandlerDiferido(cola))
+                self.listener = logging.handlers.QueueListener(cola, console_handler)
+                self.listener.start()
+                atexit.register(self.detener)
+                # Con gunicorn --preload el hilo del listener no sobrevive al fork
+                os.register_at_fork(after_in_child=self._reiniciar_listener)
+            else:
+                self.logger.addHandler(console_handler)
+    
+    def _reiniciar_listener(self):
+        if self.listener is not None:
+            self.listener._thread = None
+            self.listener.start()
+    
+    def detener(self):
+        """Vaciar la cola y detener el hilo del listener (idempotente)."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+    
+    def _log(self, level: int, message: str, kwargs: Dict[str, Any]):
+        if not self.logger.isEnabledFor(level):
+            return
+        # stacklevel=3: funcName/lineno del llamador, no de info()/error()
+        self.logger.log(level, message, extra={"campos": kwargs}, stacklevel=3)
+    
+    def debug(self, message: str, **kwargs):
+        """Log de depuración con contexto."""
+        self._log(logging.DEBUG, message, kwargs)
     
     def info(self, message: str, **kwargs):
         """Log de información con contexto."""
-        extra_data = " | ".join([f"{k}={v}" for k, v in kwargs.items()])
-        self.logger.info(f"{message} | {extra_data}" if extra_data else message)
+        self._log(logging.INFO, message, kwargs)
     
     def error(self, message: str, **kwargs):
         """Log de error con contexto."""
-        extra_data = " | ".join([f"{k}={v}" for k, v in kwargs.items()])
-        self.logger.error(f"{message} | {extra_data}" if extra_data else message)
+        self._log(logging.ERROR, message, kwargs)
     
     def warning(self, message: str, **kwargs):
         """Log de warning con contexto."""
-        extra_data = " | ".join([f"{k}={v}" for k, v in kwargs.items()])
-        self.logger.warning(f"{message} | {extra_data}" if extra_data else message)
+        self._log(logging.WARNING, message, kwargs)
 
 # Logger global
 logger = StructuredLogger()
@@ -89,10 +179,14 @@ class ErrorResponse:
 # EXCEPTION HANDLERS PERSONALIZADOS
 # =============================================================================
 
+def _correlation_id(request: Request) -> str:
+    """Correlation ID asignado por el middleware de instrumentación, o uno nuevo."""
+    return getattr(request.state, "correlation_id", None) or str(uuid.uuid4())[:8]
+
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
     """Handler para HTTPException estándar."""
     
-    correlation_id = str(uuid.uuid4())[:8]
+    correlation_id = _correlation_id(request)
     
     # Log del error
     logger.error(
@@ -129,7 +223,7 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
     """Handler para errores de validación Pydantic."""
     
-    correlation_id = str(uuid.uuid4())[:8]
+    correlation_id = _correlation_id(request)
     
     # Procesar errores de validación
     validation_errors = []
@@ -169,7 +263,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """Handler para excepciones generales no capturadas."""
     
-    correlation_id = str(uuid.uuid4())[:8]
+    correlation_id = _correlation_id(request)
     
     # Log completo del error con traceback
     logger.error(
@@ -205,60 +299,6 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
         content=error_response
     )
 
-# =============================================================================
-# MIDDLEWARE PARA REQUEST/RESPONSE LOGGING
-# =============================================================================
-
-async def logging_middleware(request: Request, call_next):
-    """Middleware para logging de requests y responses."""
-    
-    start_time = datetime.now()
-    correlation_id = str(uuid.uuid4())[:8]
-    
-    # Log del request entrante
-    logger.info(
-        f"Request iniciado",
-        method=request.method,
-        path=request.url.path,
-        query_params=str(request.query_params),
-        correlation_id=correlation_id
-    )
-    
-    # Procesar request
-    try:
-        response = await call_next(request)
-        
-        # Calcular tiempo de procesamiento
-        process_time = (datetime.now() - start_time).total_seconds()
-        
-        # Log del response
-        logger.info(
-            f"Request completado",
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
-            process_time_seconds=round(process_time, 4),
-            correlation_id=correlation_id
-        )
-        
-        # Agregar correlation ID al header
-        response.headers["X-Correlation-ID"] = correlation_id
-        
-        return response
-        
-    except Exception as e:
-        process_time = (datetime.now() - start_time).total_seconds()
-        
-        logger.error(
-            f"Request falló",
-            method=request.method,
-            path=request.url.path,
-            process_time_seconds=round(process_time, 4),
-            error=str(e),
-            correlation_id=correlation_id
-        )
-        raise
-
 # =============================================================================
 # CONFIGURACIÓN PARA FastAPI
 # =============================================================================
@@ -272,9 +312,6 @@ def setup_error_handling(app: FastAPI) -> None:
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
     app.add_exception_handler(Exception, general_exception_handler)
     
-    # Registrar middleware de logging
-    app.middleware("http")(logging_middleware)
-    
     logger.info("Error handling centralizado configurado exitosamente")
 
 # =============================================================================
@@ -0,0 +1,85 @@
+# =============================================================================
+# Agregación de métricas entre workers - IPS Santa Helena del Valle
+# Snapshots por worker en un directorio local compartido por el nodo
+# =============================================================================
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from core.error_handling import logger
+
+
+class AlmacenMetricasWorkers:
+    """
+    Directorio donde cada worker (uvicorn/gunicorn) publica su snapshot de métricas.
+
+    Cada proceso escribe solo su propio archivo (worker-<pid>.json) desde una tarea
+    periódica, con escritura atómica (archivo temporal + os.replace), así que no hay
+    locks entre procesos ni trabajo extra en el camino del request. Quien atiende
+    /health/apm/* o /metrics lee los snapshots de los demás workers y los fusiona
+    con su estado en vivo. Snapshots sin actualizar en `vigencia_segundos` (workers
+    muertos o reiniciados) se ignoran.
+    """
+
+    PREFIJO = "worker-"
+
+    def __init__(self, directorio: str, intervalo_segundos: float = 5.0,
+                 vigencia_segundos: float = 60.0):
+        self.directorio = Path(directorio)
+        self.intervalo_segundos = intervalo_segundos
+        self.vigencia_segundos = vigencia_segundos
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def desde_entorno(cls) -> Optional["AlmacenMetricasWorkers"]:
+        """Almacén configurado con APM_METRICS_DIR; None si el modo no está activo."""
+        directorio = os.environ.get("APM_METRICS_DIR")
+        if not directorio:
+            return None
+        return cls(
+            directorio,
+            intervalo_segundos=float(os.environ.get("APM_METRICS_FLUSH_SEGUNDOS", "5")),
+            vigencia_segundos=float(os.environ.get("APM_METRICS_VIGENCIA_SEGUNDOS", "60"))
+        )
+
+    @property
+    def archivo_propio(self) -> Path:
+        # El pid se resuelve en cada llamada: el almacén puede crearse antes del fork
+        return self.directorio / f"{self.PREFIJO}{os.getpid()}.json"
+
+    def volcar(self, datos: Dict[str, Any]):
+        """Publicar el snapshot de este worker reemplazando el anterior."""
+        destino = self.archivo_propio
+        temporal = destino.with_suffix(".tmp")
+        temporal.write_text(json.dumps(datos), encoding="utf-8")
+        os.replace(temporal, destino)
+
+    def leer_otros(self) -> List[Dict[str, Any]]:
+        """Snapshots vigentes de los demás workers del nodo."""
+        propio = self.archivo_propio
+        limite = time.time() - self.vigencia_segundos
+        snapshots = []
+        for archivo in self.directorio.glob(f"{self.PREFIJO}*.json"):
+            if archivo == propio:
+                continue
+            try:
+                if archivo.stat().st_mtime < limite:
+                    continue
+                snapshots.append(json.loads(archivo.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                # El worker pudo terminar entre el glob y la lectura
+                continue
+        return snapshots
+
+    async def volcar_periodicamente(self, exportar: Callable[[], Dict[str, Any]]):
+        """Tarea de fondo: exporta en el event loop y escribe en un hilo."""
+        while True:
+            await asyncio.sleep(self.intervalo_segundos)
+            try:
+                await asyncio.to_thread(self.volcar, exportar())
+            except Exception as e:
+                logger.error(f"Error publicando snapshot de métricas: {str(e)}")
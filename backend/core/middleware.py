@@ -0,0 +1,119 @@
+# =============================================================================
+# Middleware de Instrumentación - IPS Santa Helena del Valle
+# Correlation ID, timing, APM, logging y seguridad en un solo middleware ASGI
+# =============================================================================
+
+import time
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from core.error_handling import ErrorResponse, logger
+from core.monitoring import registrar_request
+from core.security import AccessAuditLogger, auditoria_middleware, evaluar_acceso_request
+
+
+class InstrumentacionMiddleware:
+    """
+    Middleware ASGI puro que reemplaza a los middlewares HTTP de logging, métricas
+    y seguridad.
+
+    Por request genera un único correlation ID (expuesto en request.state y en
+    X-Correlation-ID), toma un solo timer, evalúa el acceso si hay auditoría
+    activa y agrega los headers al mensaje http.response.start. El cuerpo pasa
+    tal cual, mensaje por mensaje, sin envolver ni acumular el stream de la
+    respuesta. La métrica del request se registra al terminar de enviar el
+    cuerpo; X-Response-Time es el tiempo hasta el inicio de la respuesta.
+    """
+
+    def __init__(self, app, auditoria: Optional[AccessAuditLogger] = None):
+        self.app = app
+        self.auditoria = auditoria
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        correlation_id = uuid.uuid4().hex[:8]
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        method = scope["method"]
+        path = scope["path"]
+
+        logger.info(
+            "Request iniciado",
+            method=method,
+            path=path,
+            query_params=scope.get("query_string", b"").decode("latin-1"),
+            correlation_id=correlation_id
+        )
+
+        headers_extra = [(b"x-correlation-id", correlation_id.encode())]
+        destino = self.app
+
+        if self.auditoria is not None:
+            security_event = await evaluar_acceso_request(self.auditoria, scope)
+            headers_extra.append((b"x-security-event-id", security_event.event_id.encode()))
+            headers_extra.append((b"x-risk-level", security_event.risk_level.value.encode()))
+            if security_event.result == "DENIED":
+                # Responder aquí: una excepción en el middleware no llega a los exception handlers
+                destino = JSONResponse(
+                    status_code=403,
+                    content=ErrorResponse.create_error_response(
+                        status_code=403,
+                        error_type="FORBIDDEN",
+                        message=f"Acceso denegado: {security_event.additional_metadata['reason']}",
+                        correlation_id=correlation_id
+                    )
+                )
+
+        status_code = 500
+
+        async def send_instrumentado(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_time = time.perf_counter() - inicio
+                message = dict(message)
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    *headers_extra,
+                    (b"x-response-time", f"{round(response_time * 1000, 2)}ms".encode())
+                ]
+            await send(message)
+
+        try:
+            await destino(scope, receive, send_instrumentado)
+        except Exception as e:
+            process_time = time.perf_counter() - inicio
+            registrar_request(scope, 500, process_time)
+            logger.error(
+                "Request falló",
+                method=method,
+                path=path,
+                process_time_seconds=round(process_time, 4),
+                error=str(e),
+                correlation_id=correlation_id
+            )
+            raise
+
+        process_time = time.perf_counter() - inicio
+        registrar_request(scope, status_code, process_time)
+        logger.info(
+            "Request completado",
+            method=method,
+            path=path,
+            status_code=status_code,
+            process_time_seconds=round(process_time, 4),
+            correlation_id=correlation_id
+        )
+
+
+def setup_middleware(app: FastAPI) -> None:
+    """Registrar el middleware de instrumentación (después de setup_security)."""
+
+    app.add_middleware(InstrumentacionMiddleware, auditoria=auditoria_middleware())
+    logger.info("Middleware de instrumentación configurado exitosamente")
@@ -3,14 +3,20 @@
 # Sistema de monitoreo básico para APIs y base de datos
 # =============================================================================
 
+import asyncio
+import math
 import time
 import psutil
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from supabase import Client
 from database import get_supabase_client
 from core.error_handling import logger
+from core.openmetrics import CONTENT_TYPE_OPENMETRICS, renderizar_openmetrics
+from core.metrics_store import AlmacenMetricasWorkers
 
 # =============================================================================
 # MÉTRICAS DE PERFORMANCE
@@ -47,6 +53,23 @@ class PerformanceMetrics:
                 (self.error_count / max(self.request_count, 1)) * 100, 2
             )
         }
+    
+    def exportar(self) -> Dict[str, Any]:
+        """Estado serializable para agregar con otros workers."""
+        return {
+            "request_count": self.request_count,
+            "total_response_time": self.total_response_time,
+            "error_count": self.error_count,
+            "start_time": self.start_time.isoformat()
+        }
+    
+    def fusionar_exportado(self, datos: Dict[str, Any]):
+        """Sumar el estado exportado por otro worker."""
+        self.request_count += datos.get("request_count", 0)
+        self.total_response_time += datos.get("total_response_time", 0.0)
+        self.error_count += datos.get("error_count", 0)
+        if datos.get("start_time"):
+            self.start_time = min(self.start_time, datetime.fromisoformat(datos["start_time"]))
 
 # Instancia global de métricas
 metrics = PerformanceMetrics()
@@ -226,6 +249,16 @@ class HealthChecker:
 # =============================================================================
 
 monitoring_router = APIRouter(prefix="/health", tags=["Monitoring & Health"])
+metrics_router = APIRouter(tags=["Monitoring & Health"])
+
+@metrics_router.get("/metrics")
+async def openmetrics_exposition():
+    """Métricas en formato OpenMetrics para scraping de Prometheus."""
+    vista_performance, vista_apm = vista_metricas()
+    return StreamingResponse(
+        renderizar_openmetrics(vista_performance, vista_apm),
+        media_type=CONTENT_TYPE_OPENMETRICS
+    )
 
 @monitoring_router.get("/")
 async def health_check_comprehensive(db: Client = Depends(get_supabase_client)):
@@ -261,7 +294,7 @@ async def health_check_comprehensive(db: Client = Depends(get_supabase_client)):
             "system": system_health,
             "endpoints": endpoints_health
         },
-        "metrics": metrics.get_stats()
+        "metrics": vista_metricas()[0].get_stats()
     }
     
     # Log del health check
@@ -290,7 +323,7 @@ async def health_check_quick():
 async def get_metrics():
     """Métricas básicas de performance."""
     system_metrics = HealthChecker.check_system_resources()
-    app_metrics = metrics.get_stats()
+    app_metrics = vista_metricas()[0].get_stats()
     
     return {
         "timestamp": datetime.now().isoformat(),
@@ -310,12 +343,12 @@ async def health_check_database(db: Client = Depends(get_supabase_client)):
 @monitoring_router.get("/apm")
 async def apm_dashboard():
     """Dashboard completo APM con métricas detalladas."""
-    return apm_collector.get_apm_dashboard_data()
+    return vista_metricas()[1].get_apm_dashboard_data()
 
 @monitoring_router.get("/apm/alerts")
 async def apm_alerts_check():
     """Verificar y obtener alertas activas."""
-    alerts = apm_collector.check_alerts_and_notify()
+    alerts = vista_metricas()[1].check_alerts_and_notify()
     return {
         "timestamp": datetime.now().isoformat(),
         "alerts_found": len(alerts),
@@ -323,15 +356,18 @@ async def apm_alerts_check():
     }
 
 @monitoring_router.get("/apm/endpoints")
-async def apm_endpoints_detail():
-    """Detalle de performance por endpoint."""
+async def apm_endpoints_detail(incluir_histogramas: bool = False):
+    """Detalle de performance por endpoint.
+
+    Con incluir_histogramas=true retorna además los buckets de cada histograma
+    (HistogramaLatencia.a_dict) para fusionarlos con los de otros workers/réplicas.
+    """
     endpoints_detail = {}
     
-    for endpoint_key, metric in apm_collector.endpoints_metrics.items():
+    for endpoint_key, metric in vista_metricas()[1].endpoints_metrics.items():
         if metric["total_requests"] > 0:
-            p95_time = None
-            if len(metric["p95_response_times"]) > 5:
-                p95_time = sorted(metric["p95_response_times"])[int(len(metric["p95_response_times"]) * 0.95)]
+            histograma = metric["latency_histogram"]
+            percentiles = histograma.percentiles()
             
             endpoints_detail[endpoint_key] = {
                 "total_requests": metric["total_requests"],
@@ -339,9 +375,13 @@ async def apm_endpoints_detail():
                 "error_count": metric["error_count"],
                 "error_rate": round((metric["error_count"] / metric["total_requests"]) * 100, 2),
                 "avg_response_time": round(metric["total_response_time"] / metric["total_requests"], 4),
-                "p95_response_time": round(p95_time, 3) if p95_time else None,
-                "requests_last_24h": len(metric["last_24h_requests"])
+                "p95_response_time": round(percentiles["p95"], 3) if histograma.total > 5 else None,
+                "latency_percentiles": percentiles,
+                "requests_last_24h": metric["last_24h_requests"].total_requests(),
+                "errors_last_24h": metric["last_24h_requests"].total_errores()
             }
+            if incluir_histogramas:
+                endpoints_detail[endpoint_key]["latency_histogram"] = histograma.a_dict()
     
     return {
         "timestamp": datetime.now().isoformat(),
@@ -349,11 +389,22 @@ async def apm_endpoints_detail():
     }
 
 @monitoring_router.get("/apm/database")
-async def apm_database_detail():
+async def apm_database_detail(incluir_histogramas: bool = False):
     """Detalle de performance de operaciones de base de datos."""
+    database_operations = {}
+    
+    for db_key, metric in vista_metricas()[1].database_metrics.items():
+        detalle = {
+            key: value for key, value in metric.items() if key != "latency_histogram"
+        }
+        detalle["latency_percentiles"] = metric["latency_histogram"].percentiles()
+        if incluir_histogramas:
+            detalle["latency_histogram"] = metric["latency_histogram"].a_dict()
+        database_operations[db_key] = detalle
+    
     return {
         "timestamp": datetime.now().isoformat(),
-        "database_operations": apm_collector.database_metrics
+        "database_operations": database_operations
     }
 
 @monitoring_router.get("/apm/business")
@@ -361,7 +412,7 @@ async def apm_business_metrics():
     """Métricas de negocio específicas de salud."""
     return {
         "timestamp": datetime.now().isoformat(),
-        "business_metrics": apm_collector.business_metrics
+        "business_metrics": vista_metricas()[1].business_metrics
     }
 
 # =============================================================================
@@ -411,57 +462,35 @@ async def security_access_levels():
     }
 
 # =============================================================================
-# MIDDLEWARE PARA CAPTURAR MÉTRICAS
+# REGISTRO DE MÉTRICAS POR REQUEST
 # =============================================================================
 
-async def metrics_middleware(request, call_next):
-    """Middleware para capturar métricas de performance + APM."""
-    start_time = time.time()
-    
-    try:
-        response = await call_next(request)
-        
-        # Registrar métrica básica (compatibilidad)
-        response_time = time.time() - start_time
-        is_error = response.status_code >= 400
-        metrics.record_request(response_time, is_error)
-        
-        # 🚀 NUEVO: Registrar métricas APM detalladas
-        apm_collector.track_endpoint_performance(
-            endpoint=request.url.path,
-            method=request.method,
-            status_code=response.status_code,
-            response_time=response_time
-        )
-        
-        # Agregar headers de performance
-        response.headers["X-Response-Time"] = f"{round(response_time * 1000, 2)}ms"
-        response.headers["X-Correlation-ID"] = getattr(request.state, 'correlation_id', 'unknown')
-        
-        return response
-        
-    except Exception as e:
-        # Registrar métrica de error (básica + APM)
-        response_time = time.time() - start_time
-        metrics.record_request(response_time, is_error=True)
-        
-        apm_collector.track_endpoint_performance(
-            endpoint=request.url.path,
-            method=request.method,
-            status_code=500,  # Exception = 500
-            response_time=response_time
-        )
-        
-        raise
+def ruta_plantilla(scope) -> str:
+    """Plantilla de la ruta (/pacientes/{paciente_id}) para no crear una serie por ID."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope["path"]
+
+def registrar_request(scope, status_code: int, response_time: float):
+    """Registrar un request atendido (métrica básica + APM). Lo llama el middleware de instrumentación."""
+    metrics.record_request(response_time, status_code >= 400)
+    apm_collector.track_endpoint_performance(
+        endpoint=ruta_plantilla(scope),
+        method=scope["method"],
+        status_code=status_code,
+        response_time=response_time
+    )
 
 def setup_monitoring(app):
     """Configurar monitoring en FastAPI."""
     
-    # Registrar router de health checks
+    # Registrar router de health checks y exposición OpenMetrics
     app.include_router(monitoring_router)
+    app.include_router(metrics_router)
     
-    # Registrar middleware de métricas
-    app.middleware("http")(metrics_middleware)
+    # Modo multi-worker: publicar snapshots periódicos para agregarlos en el nodo
+    if almacen_workers is not None:
+        app.add_event_handler("startup", iniciar_publicacion_metricas)
+        app.add_event_handler("shutdown", detener_publicacion_metricas)
     
     logger.info("Performance monitoring configurado exitosamente")
 
@@ -499,8 +528,236 @@ class PerformanceTimer:
 # APM INTERMEDIO - GROWTH TIER IMPLEMENTATION
 # =============================================================================
 
+class VentanaTemporal:
+    """Conteo de requests y errores por minuto en una ventana deslizante fija.
+
+    Cada minuto ocupa una posición de un arreglo circular preasignado; registrar
+    es O(1) y consultar la ventana es O(minutos), sin listas que crezcan con el tráfico.
+    """
+
+    def __init__(self, minutos: int = 24 * 60):
+        self.minutos = minutos
+        self._minuto = [-1] * minutos
+        self._requests = [0] * minutos
+        self._errores = [0] * minutos
+
+    def registrar(self, es_error: bool = False, ahora: Optional[float] = None):
+        """Sumar un request al minuto actual (reinicia la posición si quedó vieja)."""
+        minuto = int((time.time() if ahora is None else ahora) // 60)
+        i = minuto % self.minutos
+        if self._minuto[i] != minuto:
+            self._minuto[i] = minuto
+            self._requests[i] = 0
+            self._errores[i] = 0
+        self._requests[i] += 1
+        if es_error:
+            self._errores[i] += 1
+
+    def _vigentes(self, ahora: Optional[float]):
+        desde = int((time.time() if ahora is None else ahora) // 60) - self.minutos
+        return [i for i, minuto in enumerate(self._minuto) if minuto > desde]
+
+    def total_requests(self, ahora: Optional[float] = None) -> int:
+        """Requests registrados dentro de la ventana."""
+        return sum(self._requests[i] for i in self._vigentes(ahora))
+
+    def total_errores(self, ahora: Optional[float] = None) -> int:
+        """Errores registrados dentro de la ventana."""
+        return sum(self._errores[i] for i in self._vigentes(ahora))
+
+    def a_dict(self, ahora: Optional[float] = None) -> Dict[str, List[int]]:
+        """Conteos vigentes por minuto epoch: {minuto: [requests, errores]}."""
+        return {
+            str(self._minuto[i]): [self._requests[i], self._errores[i]]
+            for i in self._vigentes(ahora)
+        }
+
+    def fusionar_dict(self, datos: Dict[str, List[int]], ahora: Optional[float] = None):
+        """Sumar los conteos por minuto de otra ventana (p. ej. de otro worker)."""
+        desde = int((time.time() if ahora is None else ahora) // 60) - self.minutos
+        for minuto, (requests, errores) in datos.items():
+            minuto = int(minuto)
+            if minuto <= desde:
+                continue
+            i = minuto % self.minutos
+            if self._minuto[i] != minuto:
+                self._minuto[i] = minuto
+                self._requests[i] = 0
+                self._errores[i] = 0
+            self._requests[i] += requests
+            self._errores[i] += errores
+
+
+class HistogramaLatencia:
+    """Histograma de latencias con buckets logarítmicos (estilo HDR).
+
+    Cubre de ~61us (2^-14 s) a 1024s con 8 sub-buckets por potencia de 2, es decir,
+    error relativo máximo de ~4.5% en los percentiles. Registrar es O(1) y consultar
+    un percentil recorre un número fijo de buckets. Dos histogramas se fusionan
+    sumando conteos, lo que permite agregar workers o ventanas de tiempo.
+    """
+
+    MINIMO_SEGUNDOS = 2.0 ** -14
+    SUB_BUCKETS = 8
+    OCTAVAS = 24
+    TOTAL_BUCKETS = SUB_BUCKETS * OCTAVAS + 2  # + underflow (0) y overflow (último)
+
+    __slots__ = ("conteos", "total", "suma", "minimo", "maximo")
+
+    def __init__(self):
+        self.conteos = [0] * self.TOTAL_BUCKETS
+        self.total = 0
+        self.suma = 0.0
+        self.minimo = float("inf")
+        self.maximo = 0.0
+
+    @classmethod
+    def indice(cls, valor: float) -> int:
+        """Bucket de un valor en segundos."""
+        if valor < cls.MINIMO_SEGUNDOS:
+            return 0
+        i = int(math.log2(valor / cls.MINIMO_SEGUNDOS) * cls.SUB_BUCKETS) + 1
+        return i if i < cls.TOTAL_BUCKETS - 1 else cls.TOTAL_BUCKETS - 1
+
+    @classmethod
+    def limite_superior(cls, indice: int) -> float:
+        """Límite superior (exclusivo) del bucket en segundos; inf para overflow."""
+        if indice >= cls.TOTAL_BUCKETS - 1:
+            return float("inf")
+        return cls.MINIMO_SEGUNDOS * 2.0 ** (indice / cls.SUB_BUCKETS)
+
+    def registrar(self, valor: float):
+        """Agregar una observación en segundos."""
+        self.conteos[self.indice(valor)] += 1
+        self.total += 1
+        self.suma += valor
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, q: float) -> Optional[float]:
+        """Valor aproximado del percentil q (0-1); None si no hay observaciones."""
+        if not self.total:
+            return None
+        objetivo = max(1, math.ceil(q * self.total))
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                break
+        if i == 0:
+            return self.minimo
+        if i == self.TOTAL_BUCKETS - 1:
+            return self.maximo
+        # Punto medio geométrico del bucket, acotado por los extremos observados
+        valor = self.MINIMO_SEGUNDOS * 2.0 ** ((i - 0.5) / self.SUB_BUCKETS)
+        return min(max(valor, self.minimo), self.maximo)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """p50/p90/p95/p99/p999 redondeados a milisegundos."""
+        resultado = {}
+        for nombre, q in PERCENTILES_APM.items():
+            valor = self.percentil(q)
+            resultado[nombre] = round(valor, 4) if valor is not None else None
+        return resultado
+
+    def fusionar(self, otro: "HistogramaLatencia") -> "HistogramaLatencia":
+        """Sumar en este histograma las observaciones de otro."""
+        for i, conteo in enumerate(otro.conteos):
+            if conteo:
+                self.conteos[i] += conteo
+        self.total += otro.total
+        self.suma += otro.suma
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        return self
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Representación serializable y fusionable (solo buckets no vacíos)."""
+        return {
+            "total": self.total,
+            "suma": self.suma,
+            "minimo": self.minimo if self.total else None,
+            "maximo": self.maximo,
+            "buckets": {str(i): c for i, c in enumerate(self.conteos) if c}
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "HistogramaLatencia":
+        """Reconstruir un histograma desde a_dict() (p. ej. de otro worker)."""
+        histograma = cls()
+        for i, conteo in datos.get("buckets", {}).items():
+            histograma.conteos[int(i)] = conteo
+        histograma.total = datos.get("total", 0)
+        histograma.suma = datos.get("suma", 0.0)
+        if datos.get("minimo") is not None:
+            histograma.minimo = datos["minimo"]
+        histograma.maximo = datos.get("maximo", 0.0)
+        return histograma
+
+
+# Percentiles publicados por los endpoints APM
+PERCENTILES_APM = {"p50": 0.50, "p90": 0.90, "p95": 0.95, "p99": 0.99, "p999": 0.999}
+
+
+class HistogramaReciente:
+    """Histograma de los últimos 5-10 minutos para alertas.
+
+    Alterna dos histogramas por periodo (actual y anterior) y los fusiona al
+    consultar, así las alertas reflejan el tráfico reciente y no el acumulado.
+    """
+
+    def __init__(self, periodo_segundos: int = 300):
+        self.periodo_segundos = periodo_segundos
+        self._periodo = -1
+        self._actual = HistogramaLatencia()
+        self._anterior = HistogramaLatencia()
+
+    def _rotar(self, ahora: Optional[float]):
+        periodo = int((time.time() if ahora is None else ahora) // self.periodo_segundos)
+        if periodo != self._periodo:
+            self._anterior = self._actual if periodo == self._periodo + 1 else HistogramaLatencia()
+            self._actual = HistogramaLatencia()
+            self._periodo = periodo
+
+    def registrar(self, valor: float, ahora: Optional[float] = None):
+        self._rotar(ahora)
+        self._actual.registrar(valor)
+
+    def combinado(self, ahora: Optional[float] = None) -> HistogramaLatencia:
+        """Histograma del periodo actual más el anterior."""
+        self._rotar(ahora)
+        return HistogramaLatencia().fusionar(self._anterior).fusionar(self._actual)
+
+    def a_dict(self) -> Dict[str, Any]:
+        self._rotar(None)
+        return {
+            "periodo": self._periodo,
+            "actual": self._actual.a_dict(),
+            "anterior": self._anterior.a_dict()
+        }
+
+    def fusionar_dict(self, datos: Dict[str, Any]):
+        """Sumar otro histograma reciente alineando sus periodos con los propios."""
+        self._rotar(None)
+        desfase = self._periodo - datos.get("periodo", self._periodo)
+        if desfase == 0:
+            self._actual.fusionar(HistogramaLatencia.desde_dict(datos["actual"]))
+            self._anterior.fusionar(HistogramaLatencia.desde_dict(datos["anterior"]))
+        elif desfase == 1:
+            self._anterior.fusionar(HistogramaLatencia.desde_dict(datos["actual"]))
+
+
 class APMMetricsCollector:
-    """Collector de métricas APM para Growth tier - Balance simplicidad/visibilidad."""
+    """Collector de métricas APM para Growth tier - Balance simplicidad/visibilidad.
+
+    Todo el estado por request es de tamaño fijo (histogramas, deque con maxlen y
+    VentanaTemporal), así el costo de registrar no depende del tráfico acumulado.
+    Se actualiza desde el event loop sin locks: cada registro son operaciones
+    simples sobre estructuras propias. exportar()/fusionar_exportado() permiten
+    agregar el estado de varios workers (ver core/metrics_store.py).
+    """
     
     def __init__(self):
         self.endpoints_metrics = {}
@@ -514,64 +771,29 @@ class APMMetricsCollector:
         """Track performance de endpoints específicos."""
         key = f"{method}:{endpoint}"
         
-        if key not in self.endpoints_metrics:
-            self.endpoints_metrics[key] = {
-                "total_requests": 0,
-                "total_response_time": 0.0,
-                "error_count": 0,
-                "success_count": 0,
-                "p95_response_times": [],
-                "last_24h_requests": []
-            }
-        
-        metric = self.endpoints_metrics[key]
+        metric = self.endpoints_metrics.get(key) or self._metrica_endpoint(key)
         metric["total_requests"] += 1
         metric["total_response_time"] += response_time
         
-        if status_code >= 400:
+        is_error = status_code >= 400
+        if is_error:
             metric["error_count"] += 1
         else:
             metric["success_count"] += 1
             
-        # Track para P95 (mantener solo últimos 100 requests)
-        metric["p95_response_times"].append(response_time)
-        if len(metric["p95_response_times"]) > 100:
-            metric["p95_response_times"] = metric["p95_response_times"][-100:]
-        
-        # Track requests por hora para alertas
-        current_hour = datetime.now().hour
-        metric["last_24h_requests"].append({
-            "timestamp": datetime.now(),
-            "hour": current_hour,
-            "status_code": status_code,
-            "response_time": response_time
-        })
-        
-        # Mantener solo últimas 24 horas
-        cutoff = datetime.now() - timedelta(hours=24)
-        metric["last_24h_requests"] = [
-            r for r in metric["last_24h_requests"] 
-            if r["timestamp"] > cutoff
-        ]
+        ahora = time.time()
+        metric["latency_histogram"].registrar(response_time)
+        metric["recent_latency"].registrar(response_time, ahora)
+        metric["last_24h_requests"].registrar(is_error, ahora)
     
     def track_database_operation(self, table: str, operation: str, 
                                 response_time: float, record_count: int = 1):
         """Track operaciones específicas de base de datos."""
-        key = f"{table}:{operation}"
-        
-        if key not in self.database_metrics:
-            self.database_metrics[key] = {
-                "total_operations": 0,
-                "total_response_time": 0.0,
-                "total_records_processed": 0,
-                "slow_queries": [],
-                "error_count": 0
-            }
-        
-        metric = self.database_metrics[key]
+        metric = self._metrica_database(f"{table}:{operation}")
         metric["total_operations"] += 1
         metric["total_response_time"] += response_time
         metric["total_records_processed"] += record_count
+        metric["latency_histogram"].registrar(response_time)
         
         # Track slow queries (>1s)
         if response_time > 1.0:
@@ -580,25 +802,11 @@ class APMMetricsCollector:
                 "response_time": response_time,
                 "record_count": record_count
             })
-            
-            # Mantener solo últimos 50 slow queries
-            if len(metric["slow_queries"]) > 50:
-                metric["slow_queries"] = metric["slow_queries"][-50:]
     
     def track_business_metric(self, metric_name: str, value: float, 
                             tags: Dict[str, str] = None):
         """Track métricas de negocio específicas de salud."""
-        if metric_name not in self.business_metrics:
-            self.business_metrics[metric_name] = {
-                "total_events": 0,
-                "sum_value": 0.0,
-                "max_value": 0.0,
-                "min_value": float('inf'),
-                "recent_values": [],
-                "tags_breakdown": {}
-            }
-        
-        metric = self.business_metrics[metric_name]
+        metric = self._metrica_business(metric_name)
         metric["total_events"] += 1
         metric["sum_value"] += value
         metric["max_value"] = max(metric["max_value"], value)
@@ -611,10 +819,6 @@ class APMMetricsCollector:
             "tags": tags or {}
         })
         
-        # Mantener solo últimos 200 valores
-        if len(metric["recent_values"]) > 200:
-            metric["recent_values"] = metric["recent_values"][-200:]
-        
         # Tags breakdown
         if tags:
             for tag_key, tag_value in tags.items():
@@ -626,6 +830,127 @@ class APMMetricsCollector:
                 metric["tags_breakdown"][tag_breakdown_key]["count"] += 1
                 metric["tags_breakdown"][tag_breakdown_key]["sum_value"] += value
     
+    def _metrica_endpoint(self, key: str) -> Dict[str, Any]:
+        if key not in self.endpoints_metrics:
+            self.endpoints_metrics[key] = {
+                "total_requests": 0,
+                "total_response_time": 0.0,
+                "error_count": 0,
+                "success_count": 0,
+                # Histograma acumulado para percentiles y reciente para alertas
+                "latency_histogram": HistogramaLatencia(),
+                "recent_latency": HistogramaReciente(),
+                # Requests/errores por minuto de las últimas 24 horas para alertas
+                "last_24h_requests": VentanaTemporal()
+            }
+        return self.endpoints_metrics[key]
+    
+    def _metrica_database(self, key: str) -> Dict[str, Any]:
+        if key not in self.database_metrics:
+            self.database_metrics[key] = {
+                "total_operations": 0,
+                "total_response_time": 0.0,
+                "total_records_processed": 0,
+                "latency_histogram": HistogramaLatencia(),
+                "slow_queries": deque(maxlen=50),  # Solo últimos 50 slow queries
+                "error_count": 0
+            }
+        return self.database_metrics[key]
+    
+    def _metrica_business(self, metric_name: str) -> Dict[str, Any]:
+        if metric_name not in self.business_metrics:
+            self.business_metrics[metric_name] = {
+                "total_events": 0,
+                "sum_value": 0.0,
+                "max_value": 0.0,
+                "min_value": float('inf'),
+                "recent_values": deque(maxlen=200),  # Solo últimos 200 valores
+                "tags_breakdown": {}
+            }
+        return self.business_metrics[metric_name]
+    
+    def exportar(self) -> Dict[str, Any]:
+        """Estado serializable (JSON) del collector para agregarlo con otros workers."""
+        def _con_fecha(eventos):
+            return [{**evento, "timestamp": evento["timestamp"].isoformat()} for evento in eventos]
+        
+        return {
+            "endpoints": {
+                key: {
+                    "total_requests": metric["total_requests"],
+                    "total_response_time": metric["total_response_time"],
+                    "error_count": metric["error_count"],
+                    "success_count": metric["success_count"],
+                    "latency_histogram": metric["latency_histogram"].a_dict(),
+                    "recent_latency": metric["recent_latency"].a_dict(),
+                    "last_24h_requests": metric["last_24h_requests"].a_dict()
+                }
+                for key, metric in list(self.endpoints_metrics.items())
+            },
+            "database": {
+                key: {
+                    "total_operations": metric["total_operations"],
+                    "total_response_time": metric["total_response_time"],
+                    "total_records_processed": metric["total_records_processed"],
+                    "error_count": metric["error_count"],
+                    "latency_histogram": metric["latency_histogram"].a_dict(),
+                    "slow_queries": _con_fecha(metric["slow_queries"])
+                }
+                for key, metric in list(self.database_metrics.items())
+            },
+            "business": {
+                name: {
+                    "total_events": metric["total_events"],
+                    "sum_value": metric["sum_value"],
+                    "max_value": metric["max_value"],
+                    "min_value": metric["min_value"] if metric["total_events"] else None,
+                    "recent_values": _con_fecha(metric["recent_values"]),
+                    "tags_breakdown": {
+                        tag_key: dict(desglose) for tag_key, desglose in list(metric["tags_breakdown"].items())
+                    }
+                }
+                for name, metric in list(self.business_metrics.items())
+            }
+        }
+    
+    def fusionar_exportado(self, datos: Dict[str, Any]):
+        """Sumar el estado exportado por otro collector (otro worker del nodo)."""
+        def _recientes(propios, exportados):
+            eventos = list(propios) + [
+                {**evento, "timestamp": datetime.fromisoformat(evento["timestamp"])}
+                for evento in exportados
+            ]
+            eventos.sort(key=lambda evento: evento["timestamp"])
+            return deque(eventos, maxlen=propios.maxlen)
+        
+        for key, exportado in datos.get("endpoints", {}).items():
+            metric = self._metrica_endpoint(key)
+            for campo in ("total_requests", "total_response_time", "error_count", "success_count"):
+                metric[campo] += exportado[campo]
+            metric["latency_histogram"].fusionar(HistogramaLatencia.desde_dict(exportado["latency_histogram"]))
+            metric["recent_latency"].fusionar_dict(exportado["recent_latency"])
+            metric["last_24h_requests"].fusionar_dict(exportado["last_24h_requests"])
+        
+        for key, exportado in datos.get("database", {}).items():
+            metric = self._metrica_database(key)
+            for campo in ("total_operations", "total_response_time", "total_records_processed", "error_count"):
+                metric[campo] += exportado[campo]
+            metric["latency_histogram"].fusionar(HistogramaLatencia.desde_dict(exportado["latency_histogram"]))
+            metric["slow_queries"] = _recientes(metric["slow_queries"], exportado["slow_queries"])
+        
+        for name, exportado in datos.get("business", {}).items():
+            metric = self._metrica_business(name)
+            metric["total_events"] += exportado["total_events"]
+            metric["sum_value"] += exportado["sum_value"]
+            if exportado["total_events"]:
+                metric["max_value"] = max(metric["max_value"], exportado["max_value"])
+                metric["min_value"] = min(metric["min_value"], exportado["min_value"])
+            metric["recent_values"] = _recientes(metric["recent_values"], exportado["recent_values"])
+            for tag_key, desglose in exportado["tags_breakdown"].items():
+                propio = metric["tags_breakdown"].setdefault(tag_key, {"count": 0, "sum_value": 0.0})
+                propio["count"] += desglose["count"]
+                propio["sum_value"] += desglose["sum_value"]
+    
     def check_alerts_and_notify(self):
         """Verificar condiciones de alerta y enviar notificaciones."""
         alerts = []
@@ -646,8 +971,9 @@ class APMMetricsCollector:
         
         # Alert 2: Response time alto
         for endpoint_key, metric in self.endpoints_metrics.items():
-            if len(metric["p95_response_times"]) > 10:
-                p95_time = sorted(metric["p95_response_times"])[int(len(metric["p95_response_times"]) * 0.95)]
+            recientes = metric["recent_latency"].combinado()
+            if recientes.total > 10:
+                p95_time = recientes.percentil(0.95)
                 if p95_time > 2.0:  # P95 > 2 seconds
                     alerts.append({
                         "type": "SLOW_RESPONSE_TIME",
@@ -718,8 +1044,8 @@ class APMMetricsCollector:
         # Top slow endpoints
         slow_endpoints = []
         for endpoint_key, metric in self.endpoints_metrics.items():
-            if len(metric["p95_response_times"]) > 5:
-                p95_time = sorted(metric["p95_response_times"])[int(len(metric["p95_response_times"]) * 0.95)]
+            if metric["latency_histogram"].total > 5:
+                p95_time = metric["latency_histogram"].percentil(0.95)
                 slow_endpoints.append((endpoint_key, p95_time))
         
         slow_endpoints = sorted(slow_endpoints, key=lambda x: x[1], reverse=True)[:5]
@@ -732,6 +1058,7 @@ class APMMetricsCollector:
                 "total_operations": metric["total_operations"],
                 "avg_response_time": round(avg_response_time, 4),
                 "slow_queries_count": len(metric["slow_queries"]),
+                "latency_percentiles": metric["latency_histogram"].percentiles(),
                 "records_per_operation": metric["total_records_processed"] / max(metric["total_operations"], 1)
             }
         
@@ -779,6 +1106,46 @@ class APMMetricsCollector:
 # Instancia global de APM collector
 apm_collector = APMMetricsCollector()
 
+# =============================================================================
+# AGREGACIÓN ENTRE WORKERS (APM_METRICS_DIR)
+# =============================================================================
+
+almacen_workers = AlmacenMetricasWorkers.desde_entorno()
+_tarea_publicacion: Optional[asyncio.Task] = None
+
+def exportar_metricas() -> Dict[str, Any]:
+    """Snapshot serializable de las métricas de este worker."""
+    return {"performance": metrics.exportar(), "apm": apm_collector.exportar()}
+
+def vista_metricas() -> Tuple[PerformanceMetrics, APMMetricsCollector]:
+    """Métricas a reportar: las del proceso o, en modo multi-worker, las del nodo.
+
+    La fusión ocurre al consultar (endpoints de monitoreo), nunca al registrar.
+    """
+    if almacen_workers is None:
+        return metrics, apm_collector
+    
+    vista_performance = PerformanceMetrics()
+    vista_apm = APMMetricsCollector()
+    vista_apm.alerts_sent = apm_collector.alerts_sent  # Throttling de alertas del proceso
+    for snapshot in [exportar_metricas(), *almacen_workers.leer_otros()]:
+        vista_performance.fusionar_exportado(snapshot.get("performance", {}))
+        vista_apm.fusionar_exportado(snapshot.get("apm", {}))
+    return vista_performance, vista_apm
+
+async def iniciar_publicacion_metricas():
+    global _tarea_publicacion
+    _tarea_publicacion = asyncio.create_task(
+        almacen_workers.volcar_periodicamente(exportar_metricas)
+    )
+    logger.info(f"Agregación de métricas entre workers activa en {almacen_workers.directorio}")
+
+async def detener_publicacion_metricas():
+    if _tarea_publicacion is not None:
+        _tarea_publicacion.cancel()
+    # Último snapshot: los demás workers lo siguen sumando hasta que venza su vigencia
+    almacen_workers.volcar(exportar_metricas())
+
 # =============================================================================
 # BUSINESS METRICS HELPERS - ESPECÍFICOS PARA SALUD
 # =============================================================================
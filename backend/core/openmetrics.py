@@ -0,0 +1,124 @@
+# =============================================================================
+# Exposición OpenMetrics (Prometheus) - IPS Santa Helena del Valle
+# Serializa PerformanceMetrics y APMMetricsCollector en formato texto
+# =============================================================================
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+CONTENT_TYPE_OPENMETRICS = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Límites "le" publicados: potencias de 2 de ~1ms a 32s. Coinciden con bordes de
+# bucket de HistogramaLatencia (8 sub-buckets por octava desde 2^-14 s), así que
+# los conteos acumulados son exactos y se obtienen en una sola pasada.
+_OCTAVAS_PUBLICADAS = range(-10, 6)
+
+
+def _limites_publicados(histograma) -> List[Tuple[int, str]]:
+    """(último índice de bucket incluido, etiqueta le) para cada límite publicado"""
+    limites = []
+    for exponente in _OCTAVAS_PUBLICADAS:
+        indice = (exponente + 14) * histograma.SUB_BUCKETS
+        limites.append((indice, repr(float(2.0 ** exponente))))
+    return limites
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquetas(**etiquetas: Any) -> str:
+    return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in etiquetas.items()) + "}"
+
+
+def _familia(nombre: str, tipo: str, ayuda: str) -> str:
+    return f"# TYPE {nombre} {tipo}\n# HELP {nombre} {ayuda}\n"
+
+
+def _histograma(nombre: str, etiquetas: Dict[str, Any], histograma, limites) -> str:
+    """Series _bucket/_count/_sum de un HistogramaLatencia con conteos acumulados"""
+    conteos = list(histograma.conteos)  # Copia: el event loop puede seguir registrando
+    lineas = []
+    acumulado, siguiente = 0, 0
+    for indice, le in limites:
+        while siguiente <= indice:
+            acumulado += conteos[siguiente]
+            siguiente += 1
+        lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le=le)} {acumulado}\n")
+    total = sum(conteos)
+    lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le='+Inf')} {total}\n")
+    lineas.append(f"{nombre}_count{_etiquetas(**etiquetas)} {total}\n")
+    lineas.append(f"{nombre}_sum{_etiquetas(**etiquetas)} {histograma.suma}\n")
+    return "".join(lineas)
+
+
+def renderizar_openmetrics(metrics, apm_collector) -> Iterator[str]:
+    """
+    Genera la exposición OpenMetrics por bloques (una familia o serie por bloque).
+
+    Recorre los diccionarios del collector en orden de inserción, sin ordenar ni
+    calcular percentiles: los histogramas se publican como buckets acumulados y
+    Prometheus agrega réplicas y calcula cuantiles del lado del servidor.
+    """
+    yield _familia("ips_requests", "counter", "Requests HTTP atendidos por el proceso")
+    yield f"ips_requests_total {metrics.request_count}\n"
+    yield _familia("ips_request_errors", "counter", "Requests HTTP con status >= 400")
+    yield f"ips_request_errors_total {metrics.error_count}\n"
+    yield _familia("ips_process_start_time_seconds", "gauge", "Inicio del proceso (epoch)")
+    yield f"ips_process_start_time_seconds {metrics.start_time.timestamp()}\n"
+
+    endpoints = list(apm_collector.endpoints_metrics.items())
+    yield _familia("ips_http_requests", "counter", "Requests por endpoint y resultado")
+    for clave, metrica in endpoints:
+        metodo, ruta = clave.split(":", 1)
+        yield (
+            f"ips_http_requests_total{_etiquetas(method=metodo, endpoint=ruta, outcome='success')} "
+            f"{metrica['success_count']}\n"
+            f"ips_http_requests_total{_etiquetas(method=metodo, endpoint=ruta, outcome='error')} "
+            f"{metrica['error_count']}\n"
+        )
+
+    yield _familia("ips_http_request_duration_seconds", "histogram", "Latencia por endpoint")
+    for clave, metrica in endpoints:
+        metodo, ruta = clave.split(":", 1)
+        histograma = metrica["latency_histogram"]
+        yield _histograma(
+            "ips_http_request_duration_seconds", {"method": metodo, "endpoint": ruta},
+            histograma, _limites_publicados(histograma)
+        )
+
+    operaciones = list(apm_collector.database_metrics.items())
+    yield _familia("ips_db_records_processed", "counter", "Registros procesados por tabla y operación")
+    for clave, metrica in operaciones:
+        tabla, operacion = clave.split(":", 1)
+        yield (
+            f"ips_db_records_processed_total{_etiquetas(table=tabla, operation=operacion)} "
+            f"{metrica['total_records_processed']}\n"
+        )
+
+    yield _familia("ips_db_operation_duration_seconds", "histogram", "Latencia por tabla y operación")
+    for clave, metrica in operaciones:
+        tabla, operacion = clave.split(":", 1)
+        histograma = metrica["latency_histogram"]
+        yield _histograma(
+            "ips_db_operation_duration_seconds", {"table": tabla, "operation": operacion},
+            histograma, _limites_publicados(histograma)
+        )
+
+    negocio = list(apm_collector.business_metrics.items())
+    yield _familia("ips_business_events", "counter", "Eventos de negocio (HealthcareBusinessMetrics)")
+    for nombre, metrica in negocio:
+        yield f"ips_business_events_total{_etiquetas(metric=nombre)} {metrica['total_events']}\n"
+    yield _familia("ips_business_value", "counter", "Suma de valores de eventos de negocio")
+    for nombre, metrica in negocio:
+        yield f"ips_business_value_total{_etiquetas(metric=nombre)} {metrica['sum_value']}\n"
+
+    yield _familia("ips_business_events_by_tag", "counter", "Eventos de negocio por tag")
+    for nombre, metrica in negocio:
+        for clave, desglose in list(metrica["tags_breakdown"].items()):
+            tag, valor = clave.split(":", 1)
+            yield (
+                f"ips_business_events_by_tag_total{_etiquetas(metric=nombre, tag=tag, value=valor)} "
+                f"{desglose['count']}\n"
+            )
+
+    yield "# EOF\n"
@@ -0,0 +1,111 @@
+# =============================================================================
+# Paginación por cursor (keyset) - IPS Santa Helena del Valle
+# Listados ordenados por (fecha DESC, id DESC) con predicado de búsqueda
+# =============================================================================
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+# El cuerpo de los listados sigue siendo la lista de siempre; el cursor de la
+# página siguiente viaja en esta cabecera
+CABECERA_SIGUIENTE_CURSOR = "X-Next-Cursor"
+
+# (valor de la columna fecha tal como lo devolvió PostgREST, id). El listado
+# se recorre en dos fases: primero las fechas no nulas y después la cola de
+# fechas nulas; (None, None) es el inicio de esa cola
+PosicionCursor = Tuple[Optional[str], Optional[str]]
+INICIO_FECHAS_NULAS: PosicionCursor = (None, None)
+
+
+def codificar_cursor(fecha: Optional[str], id: Optional[str]) -> str:
+    """Cursor opaco (base64 url-safe sin relleno) para la posición (fecha, id)"""
+    crudo = json.dumps([fecha, None if id is None else str(id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: Optional[str]) -> Optional[PosicionCursor]:
+    """
+    Posición (fecha, id) de un cursor emitido por codificar_cursor.
+
+    Valida ambos valores porque terminan dentro de un filtro PostgREST: un cursor
+    manipulado responde 400 y no altera la consulta.
+    """
+    if cursor is None:
+        return None
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha, id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if (fecha, id) == INICIO_FECHAS_NULAS:
+            return INICIO_FECHAS_NULAS
+        id = str(UUID(id))
+        if fecha is not None:
+            if not isinstance(fecha, str):
+                raise ValueError("fecha no es texto")
+            datetime.fromisoformat(fecha)
+        return fecha, id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+def paginar(
+    query,
+    columna_fecha: str,
+    limite: int,
+    offset: int = 0,
+    posicion: Optional[PosicionCursor] = None
+):
+    """
+    Ordenar por (columna_fecha DESC NULLS LAST, id DESC) y recortar la página.
+
+    Sin posición pagina con offset como siempre. Con posición aplica el predicado
+    de búsqueda "filas después de (fecha, id)" en ese orden. La cota
+    `fecha <= f` es la que el índice compuesto usa como punto de inicio; el OR
+    que queda solo descarta los empates de la fecha del cursor, así la página N
+    cuesta lo mismo que la primera en lugar de leer y descartar offset filas.
+    Las fechas nulas no cumplen `fecha <= f`: se recorren en una fase aparte
+    (fecha IS NULL, por id) a la que lleva siguiente_cursor.
+    """
+    query = query.order(columna_fecha, desc=True, nullsfirst=False).order("id", desc=True)
+
+    if posicion is None:
+        return query.range(offset, offset + limite - 1)
+
+    fecha, id = posicion
+    if fecha is None:
+        # Cola de fechas nulas: solo desempata el id
+        query = query.is_(columna_fecha, "null")
+        if id is not None:
+            query = query.lt("id", id)
+    else:
+        query = query.lte(columna_fecha, fecha).or_(f'{columna_fecha}.lt."{fecha}",id.lt.{id}')
+    return query.limit(limite)
+
+
+def siguiente_cursor(
+    filas: List[Dict[str, Any]],
+    columna_fecha: str,
+    limite: int,
+    posicion: Optional[PosicionCursor] = None,
+    admite_nulos: bool = True
+) -> Optional[str]:
+    """
+    Cursor de la página siguiente; None si no hay más páginas.
+
+    Tras una página llena, la posición de su última fila. Tras una página
+    incompleta de la fase de fechas no nulas (posicion con fecha), el inicio de
+    la cola de fechas nulas, salvo que la columna no admita nulos.
+    """
+    if filas and len(filas) >= limite:
+        ultima = filas[-1]
+        fecha = ultima.get(columna_fecha)
+        if isinstance(fecha, (date, datetime)):
+            fecha = fecha.isoformat()
+        return codificar_cursor(fecha, ultima["id"])
+    if admite_nulos and posicion is not None and posicion[0] is not None:
+        return codificar_cursor(*INICIO_FECHAS_NULAS)
+    return None
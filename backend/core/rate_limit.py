@@ -0,0 +1,136 @@
+# =============================================================================
+# Rate Limiting - IPS Santa Helena del Valle
+# Token bucket por (usuario, IP, tipo de recurso) con backends intercambiables
+# =============================================================================
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Protocol, Tuple
+
+from core.error_handling import logger
+
+
+class RateLimitBackend(Protocol):
+    """Almacén de buckets: consume un token de `clave` si hay disponible."""
+
+    def consumir(self, clave: Tuple[Hashable, ...], capacidad: int, por_segundo: float,
+                 ahora: Optional[float] = None) -> bool:
+        ...
+
+
+class InMemoryRateLimitBackend:
+    """
+    Token buckets en memoria del proceso con estado acotado (LRU).
+
+    Cada clave guarda (tokens, último acceso). Al superar `max_claves` se descarta
+    la clave usada hace más tiempo, que de todas formas tendría su bucket lleno.
+    """
+
+    def __init__(self, max_claves: int = 100_000):
+        self.max_claves = max_claves
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: Tuple[Hashable, ...], capacidad: int, por_segundo: float,
+                 ahora: Optional[float] = None) -> bool:
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            estado = self._buckets.get(clave)
+            if estado is None:
+                tokens = float(capacidad)
+                if len(self._buckets) >= self.max_claves:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens = min(capacidad, estado[0] + (ahora - estado[1]) * por_segundo)
+                self._buckets.move_to_end(clave)
+
+            permitido = tokens >= 1
+            self._buckets[clave] = (tokens - 1 if permitido else tokens, ahora)
+            return permitido
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets en Redis para compartir límites entre workers y réplicas.
+
+    El bucket se actualiza con un script Lua atómico; la clave expira cuando el
+    bucket se habría llenado de nuevo. Si Redis falla se permite el request
+    (fail-open): el rate limit protege la BD, no debe tumbar la API.
+    """
+
+    SCRIPT = """
+    local datos = redis.call('HMGET', KEYS[1], 't', 'u')
+    local capacidad = tonumber(ARGV[1])
+    local por_segundo = tonumber(ARGV[2])
+    local ahora = tonumber(ARGV[3])
+    local tokens = tonumber(datos[1]) or capacidad
+    local ultimo = tonumber(datos[2]) or ahora
+    tokens = math.min(capacidad, tokens + math.max(0, ahora - ultimo) * por_segundo)
+    local permitido = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        permitido = 1
+    end
+    redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(ahora))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / por_segundo) + 1)
+    return permitido
+    """
+
+    def __init__(self, cliente, prefijo: str = "ips:rate:"):
+        self.prefijo = prefijo
+        self._script = cliente.register_script(self.SCRIPT)
+
+    def consumir(self, clave: Tuple[Hashable, ...], capacidad: int, por_segundo: float,
+                 ahora: Optional[float] = None) -> bool:
+        ahora = time.time() if ahora is None else ahora
+        clave_redis = self.prefijo + "|".join(str(getattr(parte, "value", parte)) for parte in clave)
+        try:
+            return bool(self._script(keys=[clave_redis], args=[capacidad, por_segundo, ahora]))
+        except Exception as e:
+            logger.error(f"Rate limit en Redis no disponible, se permite el request: {str(e)}")
+            return True
+
+
+class RateLimiter:
+    """
+    Rate limiter por (user_id, IP, tipo de recurso).
+
+    `limites` asigna a cada tipo de recurso (ráfaga, requests por minuto); los
+    recursos sin entrada usan `limite_defecto`.
+    """
+
+    def __init__(self, limites: Dict[str, Tuple[int, int]],
+                 limite_defecto: Tuple[int, int] = (120, 1200),
+                 backend: Optional[RateLimitBackend] = None):
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.limite_defecto = limite_defecto
+        # Precalcular (capacidad, tokens por segundo) para no dividir por request
+        self._limites = {
+            recurso: (rafaga, por_minuto / 60.0) for recurso, (rafaga, por_minuto) in limites.items()
+        }
+        self._limite_defecto = (limite_defecto[0], limite_defecto[1] / 60.0)
+
+    @classmethod
+    def desde_entorno(cls, limites: Dict[str, Tuple[int, int]]) -> "RateLimiter":
+        """Backend en memoria, o Redis compartido si RATE_LIMIT_REDIS_URL está definido."""
+        url = os.getenv("RATE_LIMIT_REDIS_URL")
+        if not url:
+            return cls(limites)
+        try:
+            import redis
+        except ImportError:
+            logger.warning("RATE_LIMIT_REDIS_URL definido pero el paquete redis no está instalado; "
+                           "se usa rate limit en memoria")
+            return cls(limites)
+        return cls(limites, backend=RedisRateLimitBackend(redis.Redis.from_url(url)))
+
+    def permitir(self, user_id: str, ip_address: Optional[str], resource_type: str,
+                 ahora: Optional[float] = None) -> bool:
+        """Consumir un request del bucket correspondiente; False si está agotado."""
+        capacidad, por_segundo = self._limites.get(resource_type, self._limite_defecto)
+        return self.backend.consumir((user_id, ip_address, resource_type), capacidad, por_segundo, ahora)
@@ -3,16 +3,26 @@
 # Sistema de auditoría, acceso granular y seguridad enterprise-ready
 # =============================================================================
 
+import asyncio
 import hashlib
 import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Union
 from uuid import UUID, uuid4
 from enum import Enum
 import ipaddress
 from dataclasses import dataclass
+from starlette.datastructures import Headers
 from supabase import Client
 from core.error_handling import logger
+from core.rate_limit import RateLimiter
 
 # =============================================================================
 # ENUMS Y TIPOS DE DATOS DE SEGURIDAD
@@ -108,6 +118,36 @@ class SecurityEvent:
 # SISTEMA DE AUTORIZACION GRANULAR
 # =============================================================================
 
+# Bit de cada operación en las máscaras de permisos compiladas
+BITS_OPERACION = {operacion: 1 << indice for indice, operacion in enumerate(OperationType)}
+
+# Nivel de riesgo por puntaje (0-10); desde 6 es CRITICAL
+NIVEL_RIESGO_POR_PUNTAJE = (
+    (RiskLevel.LOW,) * 2 + (RiskLevel.MEDIUM,) * 2 + (RiskLevel.HIGH,) * 2 + (RiskLevel.CRITICAL,) * 5
+)
+
+@lru_cache(maxsize=4096)
+def _ip_valida(ip_address: str) -> bool:
+    """Validación de IP cacheada: ipaddress.ip_address es costoso por request."""
+    try:
+        ipaddress.ip_address(ip_address)
+        return True
+    except ValueError:
+        return False
+
+# Rate limit por (usuario, IP, recurso): (ráfaga, requests por minuto).
+# Más estricto en recursos con datos sensibles; RATE_LIMIT_REDIS_URL comparte los
+# buckets entre workers.
+LIMITES_RATE_POR_RECURSO = {
+    ResourceType.PACIENTE: (60, 600),
+    ResourceType.ATENCIÓN_MÉDICA: (60, 600),
+    ResourceType.HISTORIA_CLÍNICA: (30, 300),
+    ResourceType.DATOS_SENSIBLES: (20, 120),
+    ResourceType.ESTADÍSTICAS: (120, 1200),
+    ResourceType.CONFIGURACIÓN_SISTEMA: (20, 120),
+    ResourceType.USUARIOS: (20, 120)
+}
+
 class GranularAccessController:
     """Controlador de acceso granular para recursos de salud."""
     
@@ -170,6 +210,14 @@ class GranularAccessController:
         # IPs sospechosas o bloqueadas
         self.blocked_ips = set()
         self.suspicious_ips = set()
+        
+        # Matriz y puntajes de riesgo compilados a tablas de lookup
+        self.compilar_permisos()
+        self._fuera_horario = False
+        self._horario_vigente_hasta = 0.0
+        
+        # Token buckets por usuario/IP/recurso
+        self.rate_limiter = RateLimiter.desde_entorno(LIMITES_RATE_POR_RECURSO)
     
     def check_access(self, user_context: UserContext, access_request: AccessRequest) -> tuple[bool, RiskLevel, str]:
         """
@@ -183,15 +231,19 @@ class GranularAccessController:
         if user_context.ip_address and self._is_ip_blocked(user_context.ip_address):
             return False, RiskLevel.CRITICAL, f"IP {user_context.ip_address} está bloqueada"
         
-        # Check 2: Permisos básicos por matriz
-        if not self._check_basic_permissions(user_context.access_level, access_request):
+        # Check 2: Permisos básicos por matriz (regla compilada: permiso, riesgo base, motivo)
+        regla = self._reglas.get((user_context.access_level, access_request.resource_type, access_request.operation))
+        if regla is None:
             return False, RiskLevel.MEDIUM, f"Sin permisos para {access_request.operation} en {access_request.resource_type}"
+        permitido, puntaje_base, motivo_denegado = regla
+        if not permitido:
+            return False, RiskLevel.MEDIUM, motivo_denegado
         
         # Check 3: Análisis de riesgo contextual
-        risk_level = self._assess_risk_level(user_context, access_request)
+        risk_level = self._nivel_riesgo(puntaje_base, user_context)
         
         # Check 4: Verificaciones adicionales de alto riesgo
-        if risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
+        if risk_level is RiskLevel.HIGH or risk_level is RiskLevel.CRITICAL:
             additional_checks_passed, reason = self._perform_additional_security_checks(user_context, access_request)
             if not additional_checks_passed:
                 return False, risk_level, reason
@@ -202,49 +254,87 @@ class GranularAccessController:
         
         return True, risk_level, "Acceso autorizado"
     
-    def _check_basic_permissions(self, access_level: AccessLevel, access_request: AccessRequest) -> bool:
-        """Verificar permisos básicos según matriz."""
-        permitted_resources = self.permissions_matrix.get(access_level, {})
-        permitted_operations = permitted_resources.get(access_request.resource_type, [])
-        return access_request.operation in permitted_operations
+    def compilar_permisos(self):
+        """
+        Compilar permissions_matrix y los factores de riesgo estáticos a tablas.
+        
+        Las máscaras de bits por (AccessLevel, ResourceType) y, por cada
+        (AccessLevel, ResourceType, OperationType), la regla (permitido, puntaje de
+        riesgo base, motivo de denegación) se calculan una vez; check_access queda
+        en un lookup. Llamar de nuevo si se modifica permissions_matrix o
+        sensitive_resources en caliente.
+        """
+        self._mascaras_permisos = {
+            (access_level, resource_type): sum(BITS_OPERACION[operacion] for operacion in set(operaciones))
+            for access_level, recursos in self.permissions_matrix.items()
+            for resource_type, operaciones in recursos.items()
+        }
+        self._reglas = {
+            (access_level, resource_type, operacion): (
+                bool(self._mascaras_permisos.get((access_level, resource_type), 0) & BITS_OPERACION[operacion]),
+                self._puntaje_riesgo_base(access_level, resource_type, operacion),
+                f"Sin permisos para {operacion} en {resource_type}"
+            )
+            for access_level in AccessLevel
+            for resource_type in ResourceType
+            for operacion in OperationType
+        }
     
-    def _assess_risk_level(self, user_context: UserContext, access_request: AccessRequest) -> RiskLevel:
-        """Evaluar nivel de riesgo del acceso."""
+    def _puntaje_riesgo_base(self, access_level: AccessLevel, resource_type: ResourceType,
+                             operation: OperationType) -> int:
+        """Factores de riesgo que solo dependen de nivel, recurso y operación."""
         risk_score = 0
         
         # Factor 1: Tipo de recurso
-        if access_request.resource_type in self.sensitive_resources:
+        if resource_type in self.sensitive_resources:
             risk_score += 2
         
         # Factor 2: Tipo de operación
-        if access_request.operation in [OperationType.DELETE, OperationType.BULK_OPERATION]:
+        if operation in [OperationType.DELETE, OperationType.BULK_OPERATION]:
             risk_score += 3
-        elif access_request.operation in [OperationType.EXPORT, OperationType.UPDATE]:
+        elif operation in [OperationType.EXPORT, OperationType.UPDATE]:
             risk_score += 1
         
+        # Factor 5: Nivel de acceso vs operación
+        if (access_level == AccessLevel.BÁSICO_USUARIO and 
+            operation in [OperationType.CREATE, OperationType.UPDATE, OperationType.DELETE]):
+            risk_score += 2
+        
+        return risk_score
+    
+    def _check_basic_permissions(self, access_level: AccessLevel, access_request: AccessRequest) -> bool:
+        """Verificar permisos básicos según matriz compilada."""
+        mascara = self._mascaras_permisos.get((access_level, access_request.resource_type), 0)
+        return bool(mascara & BITS_OPERACION.get(access_request.operation, 0))
+    
+    def _assess_risk_level(self, user_context: UserContext, access_request: AccessRequest) -> RiskLevel:
+        """Evaluar nivel de riesgo del acceso."""
+        regla = self._reglas.get(
+            (user_context.access_level, access_request.resource_type, access_request.operation)
+        )
+        return self._nivel_riesgo(regla[1] if regla else 0, user_context)
+    
+    def _nivel_riesgo(self, risk_score: int, user_context: UserContext) -> RiskLevel:
+        """Sumar los factores dinámicos al puntaje base (factores 1, 2 y 5) y mapear a nivel."""
         # Factor 3: IP sospechosa
-        if user_context.ip_address and user_context.ip_address in self.suspicious_ips:
+        if self.suspicious_ips and user_context.ip_address in self.suspicious_ips:
             risk_score += 2
         
         # Factor 4: Acceso fuera de horario (simplificado)
-        current_hour = datetime.now().hour
-        if current_hour < 6 or current_hour > 22:  # 6 AM - 10 PM
+        if self._es_fuera_de_horario():
             risk_score += 1
         
-        # Factor 5: Nivel de acceso vs operación
-        if (user_context.access_level == AccessLevel.BÁSICO_USUARIO and 
-            access_request.operation in [OperationType.CREATE, OperationType.UPDATE, OperationType.DELETE]):
-            risk_score += 2
-        
-        # Mapear score a risk level
-        if risk_score <= 1:
-            return RiskLevel.LOW
-        elif risk_score <= 3:
-            return RiskLevel.MEDIUM
-        elif risk_score <= 5:
-            return RiskLevel.HIGH
-        else:
-            return RiskLevel.CRITICAL
+        return NIVEL_RIESGO_POR_PUNTAJE[risk_score]
+    
+    def _es_fuera_de_horario(self) -> bool:
+        """Fuera de 6 AM - 10 PM; se recalcula solo al cambiar la hora."""
+        ahora = time.time()
+        if ahora >= self._horario_vigente_hasta:
+            actual = datetime.now()
+            self._fuera_horario = actual.hour < 6 or actual.hour > 22
+            segundos_en_hora = actual.minute * 60 + actual.second + actual.microsecond / 1e6
+            self._horario_vigente_hasta = ahora + 3600 - segundos_en_hora
+        return self._fuera_horario
     
     def _perform_additional_security_checks(self, user_context: UserContext, access_request: AccessRequest) -> tuple[bool, str]:
         """Verificaciones adicionales para accesos de alto riesgo."""
@@ -268,20 +358,17 @@ class GranularAccessController:
     
     def _is_ip_blocked(self, ip_address: str) -> bool:
         """Verificar si IP está bloqueada."""
-        try:
-            ip = ipaddress.ip_address(ip_address)
-            # Bloquear IPs privadas sospechosas
-            if ip.is_private and ip_address in self.blocked_ips:
-                return True
-            return ip_address in self.blocked_ips
-        except:
+        if not _ip_valida(ip_address):
             return True  # IP inválida = bloqueada
+        return ip_address in self.blocked_ips
     
     def _is_rate_limited(self, user_context: UserContext, access_request: AccessRequest) -> bool:
-        """Rate limiting básico (implementación simplificada)."""
-        # TODO: Implementar rate limiting real con Redis o similar
-        # Por ahora: false (sin limiting)
-        return False
+        """Rate limiting por token bucket de (usuario, IP, tipo de recurso)."""
+        return not self.rate_limiter.permitir(
+            user_context.user_id,
+            user_context.ip_address,
+            access_request.resource_type
+        )
     
     def _is_session_recent(self, session_id: Optional[str]) -> bool:
         """Verificar si la sesión es reciente (implementación simplificada)."""
@@ -289,6 +376,142 @@ class GranularAccessController:
         # Por ahora: true (sesión válida)
         return session_id is not None
 
+# =============================================================================
+# ESCRITURA DE AUDITORÍA POR LOTES
+# =============================================================================
+
+class AuditBatchWriter:
+    """
+    Escritor asíncrono de security_audit_log por lotes.
+
+    El request solo agrega el registro a una cola acotada en memoria; una tarea
+    de fondo inserta lotes cuando se llena `tamano_lote` o cada `intervalo_segundos`.
+    Si la BD falla o la cola está llena, los registros van a un archivo JSONL de
+    respaldo (solo append) que se reenvía al iniciar. Los inserts son upsert por
+    event_id, así reenviar un lote nunca duplica eventos.
+    """
+    
+    def __init__(self, db: Client, tamano_lote: int = 100, intervalo_segundos: float = 2.0,
+                 capacidad: int = 10_000, archivo_respaldo: Optional[str] = None):
+        self.db = db
+        self.tamano_lote = tamano_lote
+        self.intervalo_segundos = intervalo_segundos
+        self.capacidad = capacidad
+        self.archivo_respaldo = Path(
+            archivo_respaldo or os.getenv("AUDIT_SPILL_FILE", "logs/security_audit_spill.jsonl")
+        )
+        self._pendientes = deque()
+        self._tarea: Optional[asyncio.Task] = None
+        self._vaciando = False
+        self._lock_respaldo = threading.Lock()
+    
+    def encolar(self, registro: Dict[str, Any]):
+        """Agregar un registro de auditoría sin esperar a la BD."""
+        if len(self._pendientes) >= self.capacidad:
+            self._respaldar([registro])
+            return
+        self._pendientes.append(registro)
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin event loop: se insertará en el próximo vaciado
+        
+        self._asegurar_tarea(loop)
+        if len(self._pendientes) >= self.tamano_lote and not self._vaciando:
+            loop.create_task(self.vaciar())
+    
+    def _asegurar_tarea(self, loop: asyncio.AbstractEventLoop):
+        if self._tarea is None or self._tarea.done() or self._tarea.get_loop() is not loop:
+            self._tarea = loop.create_task(self._vaciar_periodicamente())
+    
+    async def _vaciar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.intervalo_segundos)
+            await self.vaciar()
+    
+    async def vaciar(self):
+        """Insertar en lotes todo lo pendiente."""
+        if self._vaciando:
+            return
+        self._vaciando = True
+        try:
+            while self._pendientes:
+                cantidad = min(self.tamano_lote, len(self._pendientes))
+                lote = [self._pendientes.popleft() for _ in range(cantidad)]
+                await self._insertar(lote)
+        finally:
+            self._vaciando = False
+    
+    async def _insertar(self, lote: List[Dict[str, Any]]):
+        try:
+            await asyncio.to_thread(self._insertar_sync, lote)
+        except Exception as e:
+            logger.error(
+                f"Error insertando lote de auditoría, se guarda en respaldo: {str(e)}",
+                registros=len(lote),
+                archivo_respaldo=str(self.archivo_respaldo)
+            )
+            await asyncio.to_thread(self._respaldar, lote)
+    
+    def _insertar_sync(self, lote: List[Dict[str, Any]]):
+        self.db.table("security_audit_log")\
+            .upsert(lote, on_conflict="event_id", ignore_duplicates=True)\
+            .execute()
+    
+    def _respaldar(self, registros: List[Dict[str, Any]]):
+        """Append de registros al archivo JSONL de respaldo."""
+        with self._lock_respaldo:
+            self.archivo_respaldo.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.archivo_respaldo, "a", encoding="utf-8") as archivo:
+                for registro in registros:
+                    archivo.write(json.dumps(registro, default=str) + "\n")
+    
+    async def reenviar_respaldo(self) -> int:
+        """
+        Reencolar los registros del archivo de respaldo; retorna cuántos.
+
+        El archivo se renombra a `.reenviando` antes de leerlo y solo se borra
+        cuando cada lote quedó insertado o devuelto al respaldo: si el proceso
+        cae a mitad del reenvío, el próximo arranque lo retoma (el upsert por
+        event_id evita duplicados).
+        """
+        reenviando = self.archivo_respaldo.with_name(self.archivo_respaldo.name + ".reenviando")
+        total = 0
+        # Primero el resto de un reenvío interrumpido (si lo hay), luego el respaldo actual
+        pasadas = 2 if reenviando.exists() else 1
+        for _ in range(pasadas):
+            with self._lock_respaldo:
+                if not reenviando.exists():
+                    if not self.archivo_respaldo.exists():
+                        break
+                    self.archivo_respaldo.replace(reenviando)
+            
+            lineas = reenviando.read_text(encoding="utf-8").splitlines()
+            registros = [json.loads(linea) for linea in lineas if linea.strip()]
+            # Si la BD sigue caída, _insertar los devuelve al archivo de respaldo
+            for inicio in range(0, len(registros), self.tamano_lote):
+                await self._insertar(registros[inicio:inicio + self.tamano_lote])
+            reenviando.unlink()
+            total += len(registros)
+        return total
+    
+    async def iniciar(self):
+        """Arrancar el vaciado periódico y reenviar el respaldo pendiente."""
+        self._asegurar_tarea(asyncio.get_running_loop())
+        reenviados = await self.reenviar_respaldo()
+        if reenviados:
+            logger.info("Respaldo de auditoría reenviado", registros=reenviados)
+    
+    async def detener(self):
+        """Detener la tarea de fondo e insertar (o respaldar) lo pendiente."""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            self._tarea = None
+        while self._vaciando:
+            await asyncio.sleep(0.01)
+        await self.vaciar()
+
 # =============================================================================
 # SISTEMA DE AUDITORIA DE ACCESO
 # =============================================================================
@@ -296,8 +519,9 @@ class GranularAccessController:
 class AccessAuditLogger:
     """Sistema de auditoría de acceso automática."""
     
-    def __init__(self, db: Client):
+    def __init__(self, db: Client, writer: Optional[AuditBatchWriter] = None):
         self.db = db
+        self.writer = writer or AuditBatchWriter(db)
         self.access_controller = GranularAccessController()
         
         # Configuración de auditoría
@@ -342,7 +566,7 @@ class AccessAuditLogger:
         should_log = self._should_log_event(security_event)
         
         if should_log:
-            await self._persist_security_event(security_event)
+            self._persist_security_event(security_event)
         
         # Log en sistema general siempre
         log_level = "warning" if result == "DENIED" else "info"
@@ -385,8 +609,8 @@ class AccessAuditLogger:
         
         return False
     
-    async def _persist_security_event(self, event: SecurityEvent):
-        """Persistir evento de seguridad en base de datos."""
+    def _persist_security_event(self, event: SecurityEvent):
+        """Encolar evento de seguridad para inserción por lotes (sin I/O en el request)."""
         
         try:
             # Preparar datos para inserción
@@ -407,8 +631,8 @@ class AccessAuditLogger:
                 "data_fingerprint": self._create_data_fingerprint(event)
             }
             
-            # Insertar en tabla de auditoría
-            await self.db.table("security_audit_log").insert(audit_record).execute()
+            # Insertar en tabla de auditoría (en lote, desde la tarea de fondo)
+            self.writer.encolar(audit_record)
             
         except Exception as e:
             logger.error(
@@ -520,85 +744,88 @@ class AccessAuditLogger:
         return patterns
 
 # =============================================================================
-# MIDDLEWARE DE SECURITY
+# EVALUACIÓN DE ACCESO POR REQUEST
 # =============================================================================
 
-def create_security_middleware(audit_logger: AccessAuditLogger):
-    """Crear middleware de seguridad para FastAPI."""
-    
-    async def security_middleware(request, call_next):
-        """Middleware que evalúa y audita accesos automáticamente."""
-        
-        # Extraer contexto de usuario (simplificado)
-        user_context = UserContext(
-            user_id=request.headers.get("X-User-ID", "anonymous"),
-            access_level=AccessLevel(request.headers.get("X-Access-Level", AccessLevel.BÁSICO_USUARIO)),
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("User-Agent"),
-            session_id=request.headers.get("X-Session-ID")
-        )
-        
-        # Determinar tipo de recurso y operación basado en la ruta
-        resource_type, operation = _infer_resource_and_operation(request)
-        
-        access_request = AccessRequest(
-            resource_type=resource_type,
-            operation=operation,
-            additional_context={"path": request.url.path, "method": request.method}
-        )
-        
-        # Auditar intento de acceso
-        security_event = await audit_logger.log_access_attempt(user_context, access_request)
-        
-        # Si acceso denegado, retornar error
-        if security_event.result == "DENIED":
-            from fastapi import HTTPException
-            raise HTTPException(
-                status_code=403,
-                detail=f"Acceso denegado: {security_event.additional_metadata['reason']}"
-            )
-        
-        # Continuar con request
-        response = await call_next(request)
-        
-        # Agregar headers de seguridad
-        response.headers["X-Security-Event-ID"] = security_event.event_id
-        response.headers["X-Risk-Level"] = security_event.risk_level
-        
-        return response
+async def evaluar_acceso_request(audit_logger: AccessAuditLogger, scope) -> SecurityEvent:
+    """Evaluar y auditar el acceso de un request HTTP (scope ASGI) antes de enrutarlo."""
+    
+    headers = Headers(scope=scope)
+    client = scope.get("client")
+    
+    # Extraer contexto de usuario (simplificado)
+    user_context = UserContext(
+        user_id=headers.get("x-user-id", "anonymous"),
+        access_level=AccessLevel(headers.get("x-access-level", AccessLevel.BÁSICO_USUARIO)),
+        ip_address=client[0] if client else None,
+        user_agent=headers.get("user-agent"),
+        session_id=headers.get("x-session-id")
+    )
+    
+    # Determinar tipo de recurso y operación basado en la ruta
+    resource_type, operation = clasificador_rutas.clasificar(scope["path"], scope["method"])
+    
+    access_request = AccessRequest(
+        resource_type=resource_type,
+        operation=operation,
+        additional_context={"path": scope["path"], "method": scope["method"]}
+    )
     
-    return security_middleware
+    # Auditar intento de acceso
+    return await audit_logger.log_access_attempt(user_context, access_request)
 
-def _infer_resource_and_operation(request) -> tuple[ResourceType, OperationType]:
-    """Inferir tipo de recurso y operación de la request."""
+# Operación de auditoría por método HTTP
+OPERACION_POR_METODO = {
+    "GET": OperationType.READ,
+    "POST": OperationType.CREATE,
+    "PUT": OperationType.UPDATE,
+    "PATCH": OperationType.UPDATE,
+    "DELETE": OperationType.DELETE
+}
+
+class ClasificadorRutas:
+    """
+    Tipo de recurso de cada request a partir de la tabla de rutas de FastAPI.
     
-    path = request.url.path.lower()
-    method = request.method.upper()
-    
-    # Mapear rutas a tipos de recurso
-    if "/pacientes" in path:
-        resource_type = ResourceType.PACIENTE
-    elif "/atenciones" in path or "/primera-infancia" in path:
-        resource_type = ResourceType.ATENCIÓN_MÉDICA
-    elif "/health" in path or "/metrics" in path:
-        resource_type = ResourceType.ESTADÍSTICAS
-    elif "/users" in path or "/admin" in path:
-        resource_type = ResourceType.USUARIOS
-    else:
-        resource_type = ResourceType.ESTADÍSTICAS  # Default
+    Cada módulo de rutas declara RECURSO_SEGURIDAD; al arrancar se recorre
+    app.routes y se indexa el tipo por primer segmento del path (el prefijo del
+    router). El middleware de seguridad corre antes del enrutamiento, así que
+    por request solo se extrae ese segmento y se resuelve con un lookup.
+    """
+    
+    def __init__(self, recurso_defecto: ResourceType = ResourceType.ESTADÍSTICAS):
+        self.recurso_defecto = recurso_defecto
+        self._recurso_por_segmento: Dict[str, ResourceType] = {}
     
-    # Mapear métodos HTTP a operaciones
-    operation_mapping = {
-        "GET": OperationType.READ,
-        "POST": OperationType.CREATE,
-        "PUT": OperationType.UPDATE,
-        "PATCH": OperationType.UPDATE,
-        "DELETE": OperationType.DELETE
-    }
+    def construir(self, routes) -> "ClasificadorRutas":
+        """Indexar el RECURSO_SEGURIDAD del módulo de cada endpoint por prefijo."""
+        self._recurso_por_segmento = {}
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            modulo = sys.modules.get(getattr(endpoint, "__module__", ""), None)
+            recurso = getattr(modulo, "RECURSO_SEGURIDAD", None)
+            if recurso is None:
+                continue
+            segmento = self._segmento(route.path)
+            anterior = self._recurso_por_segmento.setdefault(segmento, recurso)
+            if anterior != recurso:
+                logger.warning(
+                    f"Prefijo /{segmento} con tipos de recurso distintos; se usa {anterior}",
+                    modulo=endpoint.__module__
+                )
+        return self
     
-    operation = operation_mapping.get(method, OperationType.READ)
+    @staticmethod
+    def _segmento(path: str) -> str:
+        return path.split("/", 2)[1] if path.startswith("/") else path
     
-    return resource_type, operation
+    def clasificar(self, path: str, method: str) -> tuple[ResourceType, OperationType]:
+        recurso = self._recurso_por_segmento.get(self._segmento(path), self.recurso_defecto)
+        return recurso, OPERACION_POR_METODO.get(method, OperationType.READ)
+
+def _infer_resource_and_operation(request) -> tuple[ResourceType, OperationType]:
+    """Inferir tipo de recurso y operación de la request."""
+    return clasificador_rutas.clasificar(request.url.path, request.method.upper())
 
 # =============================================================================
 # INSTANCIAS GLOBALES
@@ -607,6 +834,7 @@ def _infer_resource_and_operation(request) -> tuple[ResourceType, OperationType]
 # Será inicializado en setup
 access_controller = GranularAccessController()
 audit_logger = None  # Se inicializa con DB connection
+clasificador_rutas = ClasificadorRutas()  # Se construye con las rutas de la app
 
 def setup_security(app, db: Client):
     """Configurar sistema de seguridad en FastAPI."""
@@ -614,14 +842,22 @@ def setup_security(app, db: Client):
     global audit_logger
     audit_logger = AccessAuditLogger(db)
     
-    # Solo agregar middleware de seguridad en producción
-    # En testing y desarrollo, usar service_role sin middleware adicional
-    import os
-    environment = os.getenv("ENVIRONMENT", "development")
+    # Clasificación de recursos desde la tabla de rutas (routers ya incluidos)
+    clasificador_rutas.construir(app.routes)
     
-    if environment == "production":
-        security_middleware = create_security_middleware(audit_logger)
-        app.middleware("http")(security_middleware)
+    # Vaciado por lotes de la auditoría: arranca con la app y vacía al apagar
+    app.add_event_handler("startup", audit_logger.writer.iniciar)
+    app.add_event_handler("shutdown", audit_logger.writer.detener)
+    
+    # La evaluación por request la hace el middleware de instrumentación solo en
+    # producción; en testing y desarrollo, usar service_role sin control adicional
+    if auditoria_middleware() is not None:
         logger.info("Sistema de seguridad avanzada configurado para producción")
     else:
-        logger.info("Sistema de seguridad configurado para desarrollo (middleware deshabilitado)")
\ No newline at end of file
+        logger.info("Sistema de seguridad configurado para desarrollo (middleware deshabilitado)")
+
+def auditoria_middleware() -> Optional[AccessAuditLogger]:
+    """Audit logger que debe aplicar el middleware por request; None fuera de producción."""
+    if os.getenv("ENVIRONMENT", "development") == "production":
+        return audit_logger
+    return None
\ No newline at end of file
@@ -1,6 +1,9 @@
+import asyncio
 import os
+from typing import Optional
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, create_async_client, Client, AsyncClient, AsyncClientOptions
 
 # Cargar variables de entorno solo si no estamos en producción
 if os.environ.get("ENV") != "production":
@@ -9,9 +12,82 @@ if os.environ.get("ENV") != "production":
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
+# Límites del pool asíncrono: tiempo máximo por operación HTTP y conexiones simultáneas
+SUPABASE_TIMEOUT_SEGUNDOS = float(os.environ.get("SUPABASE_TIMEOUT_SEGUNDOS", "10"))
+SUPABASE_TIMEOUT_CONEXION_SEGUNDOS = float(os.environ.get("SUPABASE_TIMEOUT_CONEXION_SEGUNDOS", "5"))
+SUPABASE_MAX_CONEXIONES = int(os.environ.get("SUPABASE_MAX_CONEXIONES", "20"))
+SUPABASE_MAX_CONEXIONES_LIBRES = int(os.environ.get("SUPABASE_MAX_CONEXIONES_LIBRES", "10"))
+
 # Crear una única instancia del cliente de Supabase para ser reutilizada
 supabase_client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 def get_supabase_client() -> Client:
     """Función de dependencia que retorna la instancia del cliente de Supabase."""
     return supabase_client
+
+
+class PoolSupabaseAsync:
+    """
+    Cliente Supabase asíncrono sobre un pool HTTP/2 acotado.
+
+    Todas las peticiones a PostgREST comparten un httpx.AsyncClient con un máximo
+    de conexiones y timeouts por petición: una consulta lenta ya no bloquea el
+    event loop y, si el pool está lleno, la espera también tiene límite.
+    El cliente se crea en el primer uso dentro del event loop que lo utiliza.
+    """
+
+    def __init__(self, url: Optional[str], key: Optional[str],
+                 timeout: float = SUPABASE_TIMEOUT_SEGUNDOS,
+                 timeout_conexion: float = SUPABASE_TIMEOUT_CONEXION_SEGUNDOS,
+                 max_conexiones: int = SUPABASE_MAX_CONEXIONES,
+                 max_conexiones_libres: int = SUPABASE_MAX_CONEXIONES_LIBRES):
+        self.url = url
+        self.key = key
+        self.timeout = httpx.Timeout(timeout, connect=timeout_conexion)
+        self.limites = httpx.Limits(
+            max_connections=max_conexiones,
+            max_keepalive_connections=max_conexiones_libres
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+        self._cliente: Optional[AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _crear_http(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=self.timeout,
+            limits=self.limites,
+            follow_redirects=True
+        )
+
+    async def cliente(self) -> AsyncClient:
+        """Cliente del event loop actual; lo crea (una sola vez) si no existe"""
+        loop = asyncio.get_running_loop()
+        if self._cliente is not None and self._loop is loop:
+            return self._cliente
+
+        if self._loop is not loop:
+            # Un pool httpx no puede usarse desde otro event loop (p. ej. TestClient)
+            self._http, self._cliente, self._loop = None, None, loop
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._cliente is None:
+                self._http = self._crear_http()
+                opciones = AsyncClientOptions(httpx_client=self._http, postgrest_client_timeout=self.timeout)
+                self._cliente = await create_async_client(self.url, self.key, options=opciones)
+        return self._cliente
+
+    async def cerrar(self):
+        """Cerrar las conexiones del pool (al apagar la aplicación)"""
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._http, self._cliente, self._loop, self._lock = None, None, None, None
+
+
+pool_supabase_async = PoolSupabaseAsync(SUPABASE_URL, SUPABASE_KEY)
+
+async def get_supabase_async_client() -> AsyncClient:
+    """Función de dependencia asíncrona: cliente Supabase sobre el pool HTTP/2 compartido."""
+    return await pool_supabase_async.cliente()
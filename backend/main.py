@@ -1,12 +1,18 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import pacientes, atenciones, intervenciones_colectivas, atencion_primera_infancia, atencion_infancia, atencion_adolescencia, atencion_adultez, atencion_vejez, atencion_materno_perinatal, tamizaje_oncologico, control_cronicidad, entornos_salud_publica, familia_integral_salud_publica, atencion_integral_transversal_salud, catalogo_ocupaciones_simple #, medicos, codigos_rias
+from routes import pacientes, atenciones, intervenciones_colectivas, atencion_primera_infancia, atencion_infancia, atencion_adolescencia, atencion_adultez, atencion_vejez, atencion_materno_perinatal, tamizaje_oncologico, control_cronicidad, entornos_salud_publica, familia_integral_salud_publica, atencion_integral_transversal_salud, catalogo_ocupaciones_simple, reporteria_pedt #, medicos, codigos_rias
 
 # Importar configuración de error handling, monitoring y security
-from core.error_handling import setup_error_handling
+from core.error_handling import logger, setup_error_handling
 from core.monitoring import setup_monitoring
 from core.security import setup_security
-from database import get_supabase_client
+from core.middleware import setup_middleware
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR
+from database import get_supabase_client, pool_supabase_async
+from services.validador_resolucion_202 import obtener_motor_validacion_202
+from services.indice_ocupaciones import recargar_indice_ocupaciones
 
 # Inicializar la aplicación de FastAPI
 app = FastAPI(
@@ -27,6 +33,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El navegador solo deja leer al frontend las cabeceras expuestas
+    expose_headers=[CABECERA_SIGUIENTE_CURSOR],
 )
 
 
@@ -46,6 +54,7 @@ app.include_router(entornos_salud_publica.router)
 app.include_router(familia_integral_salud_publica.router)
 app.include_router(atencion_integral_transversal_salud.router)
 app.include_router(catalogo_ocupaciones_simple.router)  # Catálogo ocupaciones DANE para PEDT
+app.include_router(reporteria_pedt.router)  # Archivo plano SISPRO Resolución 202
 # app.include_router(medicos.router)
 # app.include_router(codigos_rias.router)
 
@@ -62,6 +71,31 @@ setup_monitoring(app)
 # Configurar sistema de seguridad avanzada
 setup_security(app, get_supabase_client())
 
+# Correlation ID, métricas, logging y seguridad por request en un solo middleware
+setup_middleware(app)
+
+# Compilar las validaciones de la Resolución 202 una sola vez al arrancar
+@app.on_event("startup")
+def cargar_validaciones_202():
+    obtener_motor_validacion_202()
+
+# Precargar en segundo plano el índice de autocompletado de ocupaciones DANE;
+# si falla, la primera búsqueda lo intenta de nuevo
+def _precargar_indice_ocupaciones():
+    try:
+        recargar_indice_ocupaciones(get_supabase_client())
+    except Exception as e:
+        logger.warning(f"No se pudo precargar el índice de ocupaciones: {str(e)}")
+
+@app.on_event("startup")
+async def cargar_indice_ocupaciones():
+    asyncio.get_running_loop().run_in_executor(None, _precargar_indice_ocupaciones)
+
+# Liberar las conexiones del pool asíncrono de Supabase al apagar
+@app.on_event("shutdown")
+async def cerrar_pool_supabase():
+    await pool_supabase_async.cerrar()
+
 # Root endpoint con información básica
 @app.get("/")
 async def root():
@@ -80,6 +114,7 @@ async def root():
             "adultez": "/atencion-adultez/",
             "vejez": "/atencion-vejez/",
             "pacientes": "/pacientes/",
-            "ocupaciones": "/ocupaciones/"
+            "ocupaciones": "/ocupaciones/",
+            "reporteria_pedt": "/reporteria-pedt/"
         }
     }
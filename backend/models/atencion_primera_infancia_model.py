@@ -325,6 +325,9 @@ class AtencionPrimeraInfanciaActualizar(BaseModel):
 class AtencionPrimeraInfanciaResponse(AtencionPrimeraInfancia):
     """Modelo de respuesta API con campos adicionales calculados"""
     
+    # La columna se agregó nullable sobre filas existentes: las antiguas pueden no tenerla
+    fecha_atencion: Optional[date] = None
+    
     # Campos calculados básicos
     desarrollo_apropiado_edad: Optional[bool] = Field(
         None, 
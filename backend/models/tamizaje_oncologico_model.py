@@ -177,20 +177,22 @@ def calcular_nivel_riesgo(tipo_tamizaje: str, datos_tamizaje: dict) -> str:
     except Exception:
         return "No evaluado"
 
+# Intervalos recomendados entre tamizajes (días); también se envían a la RPC de adherencia
+INTERVALOS_TAMIZAJE_DIAS = {
+    "Cuello Uterino": 365,  # 1 año
+    "Mama": 730,            # 2 años
+    "Prostata": 365,        # 1 año
+    "Colon y Recto": 1095   # 3 años
+}
+INTERVALO_TAMIZAJE_DEFECTO_DIAS = 365
+
 def calcular_adherencia_tamizaje(tipo_tamizaje: str, fecha_ultimo_tamizaje: date) -> str:
     """Calcular adherencia según intervalos recomendados por tipo."""
     try:
         from datetime import date
         dias_desde_ultimo = (date.today() - fecha_ultimo_tamizaje).days
         
-        intervalos_recomendados = {
-            "Cuello Uterino": 365,  # 1 año
-            "Mama": 730,            # 2 años
-            "Prostata": 365,        # 1 año
-            "Colon y Recto": 1095   # 3 años
-        }
-        
-        intervalo = intervalos_recomendados.get(tipo_tamizaje, 365)
+        intervalo = INTERVALOS_TAMIZAJE_DIAS.get(tipo_tamizaje, INTERVALO_TAMIZAJE_DEFECTO_DIAS)
         
         if dias_desde_ultimo <= intervalo:
             return "Buena"
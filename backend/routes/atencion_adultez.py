@@ -20,9 +20,12 @@ from models.atencion_adultez_model import (
     TamizajeECNT,
     SaludMentalLaboral
 )
+from core.security import ResourceType
 
 router = APIRouter(prefix="/atencion-adultez", tags=["Atención Adultez"])
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # FUNCIONES HELPER
 # =============================================================================
@@ -9,7 +9,9 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import date, datetime, timedelta
-from database import get_supabase_client
+from supabase import AsyncClient
+from database import get_supabase_async_client
+from services.estadisticas_curso_vida import COLUMNAS_ESTADISTICAS_INFANCIA, estadisticas_infancia
 from models.atencion_infancia_model import (
     AtencionInfanciaCrear,
     AtencionInfanciaActualizar, 
@@ -25,9 +27,12 @@ from models.atencion_infancia_model import (
     calcular_completitud_evaluacion,
     determinar_seguimiento_especializado
 )
+from core.security import ResourceType
 
 router = APIRouter(prefix="/atencion-infancia", tags=["Atención Infancia"])
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # FUNCIÓN HELPER PARA CAMPOS CALCULADOS
 # =============================================================================
@@ -101,12 +106,12 @@ def calcular_campos_automaticos(atencion_data: dict, edad_anos: int = 8) -> dict
 @router.post("/", response_model=AtencionInfanciaResponse, status_code=201)
 async def crear_atencion_infancia(
     atencion_data: AtencionInfanciaCrear,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Crear nueva atención de infancia con patrón polimórfico de 3 pasos"""
     
     # Validar que el paciente existe
-    paciente_response = db.table("pacientes").select("id, fecha_nacimiento").eq("id", str(atencion_data.paciente_id)).execute()
+    paciente_response = await db.table("pacientes").select("id, fecha_nacimiento").eq("id", str(atencion_data.paciente_id)).execute()
     if not paciente_response.data:
         raise HTTPException(status_code=400, detail="El paciente especificado no existe")
     
@@ -130,7 +135,7 @@ async def crear_atencion_infancia(
         if 'factores_riesgo_identificados' in atencion_dict and atencion_dict['factores_riesgo_identificados']:
             atencion_dict['factores_riesgo_identificados'] = [str(factor) for factor in atencion_dict['factores_riesgo_identificados']]
         
-        response_infancia = db.table("atencion_infancia").insert(atencion_dict).execute()
+        response_infancia = await db.table("atencion_infancia").insert(atencion_dict).execute()
         
         if not response_infancia.data:
             raise HTTPException(status_code=500, detail="Error al crear atención de infancia")
@@ -151,26 +156,26 @@ async def crear_atencion_infancia(
             "updated_at": datetime.now().isoformat()
         }
         
-        response_atencion = db.table("atenciones").insert(atencion_general_data).execute()
+        response_atencion = await db.table("atenciones").insert(atencion_general_data).execute()
         
         if not response_atencion.data:
             # Rollback: eliminar atención de infancia creada
-            db.table("atencion_infancia").delete().eq("id", infancia_id).execute()
+            await db.table("atencion_infancia").delete().eq("id", infancia_id).execute()
             raise HTTPException(status_code=500, detail="Error al crear atención general")
         
         atencion_id = response_atencion.data[0]['id']
         
         # PASO 3: Actualizar atención de infancia con atencion_id
-        update_response = db.table("atencion_infancia").update({"atencion_id": atencion_id}).eq("id", infancia_id).execute()
+        update_response = await db.table("atencion_infancia").update({"atencion_id": atencion_id}).eq("id", infancia_id).execute()
         
         if not update_response.data:
             # Rollback: eliminar ambos registros
-            db.table("atenciones").delete().eq("id", atencion_id).execute()
-            db.table("atencion_infancia").delete().eq("id", infancia_id).execute()
+            await db.table("atenciones").delete().eq("id", atencion_id).execute()
+            await db.table("atencion_infancia").delete().eq("id", infancia_id).execute()
             raise HTTPException(status_code=500, detail="Error al vincular atención general con infancia")
         
         # Obtener registro completo para respuesta
-        final_response = db.table("atencion_infancia").select("*").eq("id", infancia_id).execute()
+        final_response = await db.table("atencion_infancia").select("*").eq("id", infancia_id).execute()
         atencion_completa = final_response.data[0]
         
         # Agregar campos calculados
@@ -189,7 +194,7 @@ async def listar_atenciones_infancia(
     estado_nutricional: Optional[EstadoNutricionalInfancia] = Query(None, description="Filtrar por estado nutricional"),
     limit: int = Query(50, ge=1, le=100, description="Límite de resultados"),
     offset: int = Query(0, ge=0, description="Offset para paginación"),
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Listar atenciones de infancia con filtros opcionales"""
     
@@ -208,7 +213,7 @@ async def listar_atenciones_infancia(
         # Aplicar paginación
         query = query.range(offset, offset + limit - 1)
         
-        response = query.execute()
+        response = await query.execute()
         
         atenciones_con_calculos = []
         for atencion in response.data:
@@ -231,12 +236,12 @@ async def listar_atenciones_infancia(
 @router.get("/{atencion_id}", response_model=AtencionInfanciaResponse)
 async def obtener_atencion_infancia(
     atencion_id: UUID,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Obtener atención de infancia por ID"""
     
     try:
-        response = db.table("atencion_infancia").select("*").eq("id", str(atencion_id)).execute()
+        response = await db.table("atencion_infancia").select("*").eq("id", str(atencion_id)).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Atención de infancia no encontrada")
@@ -244,7 +249,7 @@ async def obtener_atencion_infancia(
         atencion = response.data[0]
         
         # Calcular edad del paciente
-        paciente_response = db.table("pacientes").select("fecha_nacimiento").eq("id", atencion['paciente_id']).execute()
+        paciente_response = await db.table("pacientes").select("fecha_nacimiento").eq("id", atencion['paciente_id']).execute()
         if paciente_response.data:
             fecha_nacimiento = datetime.fromisoformat(paciente_response.data[0]['fecha_nacimiento'].replace('Z', '+00:00')).date()
             edad_anos = (date.today() - fecha_nacimiento).days // 365
@@ -266,13 +271,13 @@ async def obtener_atencion_infancia(
 async def actualizar_atencion_infancia(
     atencion_id: UUID,
     atencion_data: AtencionInfanciaActualizar,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Actualizar atención de infancia existente"""
     
     try:
         # Verificar que existe
-        existing_response = db.table("atencion_infancia").select("*").eq("id", str(atencion_id)).execute()
+        existing_response = await db.table("atencion_infancia").select("*").eq("id", str(atencion_id)).execute()
         if not existing_response.data:
             raise HTTPException(status_code=404, detail="Atención de infancia no encontrada")
         
@@ -289,7 +294,7 @@ async def actualizar_atencion_infancia(
         update_data['updated_at'] = datetime.now().isoformat()
         
         # Realizar actualización
-        response = db.table("atencion_infancia").update(update_data).eq("id", str(atencion_id)).execute()
+        response = await db.table("atencion_infancia").update(update_data).eq("id", str(atencion_id)).execute()
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Error al actualizar atención")
@@ -297,7 +302,7 @@ async def actualizar_atencion_infancia(
         atencion_actualizada = response.data[0]
         
         # Calcular edad del paciente
-        paciente_response = db.table("pacientes").select("fecha_nacimiento").eq("id", atencion_actualizada['paciente_id']).execute()
+        paciente_response = await db.table("pacientes").select("fecha_nacimiento").eq("id", atencion_actualizada['paciente_id']).execute()
         if paciente_response.data:
             fecha_nacimiento = datetime.fromisoformat(paciente_response.data[0]['fecha_nacimiento'].replace('Z', '+00:00')).date()
             edad_anos = (date.today() - fecha_nacimiento).days // 365
@@ -318,27 +323,27 @@ async def actualizar_atencion_infancia(
 @router.delete("/{atencion_id}", status_code=204)
 async def eliminar_atencion_infancia(
     atencion_id: UUID,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Eliminar atención de infancia"""
     
     try:
         # Verificar que existe
-        existing_response = db.table("atencion_infancia").select("atencion_id").eq("id", str(atencion_id)).execute()
+        existing_response = await db.table("atencion_infancia").select("atencion_id").eq("id", str(atencion_id)).execute()
         if not existing_response.data:
             raise HTTPException(status_code=404, detail="Atención de infancia no encontrada")
         
         atencion_general_id = existing_response.data[0].get('atencion_id')
         
         # Eliminar atención de infancia
-        delete_response = db.table("atencion_infancia").delete().eq("id", str(atencion_id)).execute()
+        delete_response = await db.table("atencion_infancia").delete().eq("id", str(atencion_id)).execute()
         
         if not delete_response.data:
             raise HTTPException(status_code=500, detail="Error al eliminar atención de infancia")
         
         # Eliminar atención general asociada si existe
         if atencion_general_id:
-            db.table("atenciones").delete().eq("id", atencion_general_id).execute()
+            await db.table("atenciones").delete().eq("id", atencion_general_id).execute()
         
         return None
         
@@ -355,12 +360,12 @@ async def eliminar_atencion_infancia(
 async def listar_por_desempeno_escolar(
     desempeno_escolar: DesempenoEscolar,
     limit: int = Query(50, ge=1, le=100),
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Listar atenciones por desempeño escolar específico"""
     
     try:
-        response = db.table("atencion_infancia") \
+        response = await db.table("atencion_infancia") \
             .select("*") \
             .eq("desempeno_escolar", desempeno_escolar.value) \
             .order("fecha_atencion", desc=True) \
@@ -382,12 +387,12 @@ async def listar_por_desempeno_escolar(
 @router.get("/paciente/{paciente_id}/cronologicas", response_model=List[AtencionInfanciaResponse])
 async def obtener_atenciones_cronologicas_paciente(
     paciente_id: UUID,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Obtener historial cronológico de atenciones de infancia para un paciente"""
     
     try:
-        response = db.table("atencion_infancia") \
+        response = await db.table("atencion_infancia") \
             .select("*") \
             .eq("paciente_id", str(paciente_id)) \
             .order("fecha_atencion", desc=False) \
@@ -397,7 +402,7 @@ async def obtener_atenciones_cronologicas_paciente(
             return []
         
         # Calcular edad del paciente
-        paciente_response = db.table("pacientes").select("fecha_nacimiento").eq("id", str(paciente_id)).execute()
+        paciente_response = await db.table("pacientes").select("fecha_nacimiento").eq("id", str(paciente_id)).execute()
         if paciente_response.data:
             fecha_nacimiento = datetime.fromisoformat(paciente_response.data[0]['fecha_nacimiento'].replace('Z', '+00:00')).date()
             edad_anos = (date.today() - fecha_nacimiento).days // 365
@@ -423,12 +428,13 @@ async def obtener_atenciones_cronologicas_paciente(
 async def obtener_estadisticas_basicas(
     fecha_desde: Optional[date] = Query(None, description="Fecha de inicio del período"),
     fecha_hasta: Optional[date] = Query(None, description="Fecha de fin del período"),
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Obtener estadísticas básicas de atenciones de infancia"""
     
     try:
-        query = db.table("atencion_infancia").select("*")
+        # Solo las columnas que usa el motor de estadísticas
+        query = db.table("atencion_infancia").select(",".join(COLUMNAS_ESTADISTICAS_INFANCIA))
         
         # Aplicar filtros de fecha si se proporcionan
         if fecha_desde:
@@ -436,66 +442,11 @@ async def obtener_estadisticas_basicas(
         if fecha_hasta:
             query = query.lte("fecha_atencion", fecha_hasta.isoformat())
         
-        response = query.execute()
-        atenciones = response.data
-        
-        if not atenciones:
-            return {
-                "resumen_general": {
-                    "total_atenciones": 0,
-                    "promedio_edad": 0,
-                    "porcentaje_desarrollo_apropiado": 0,
-                    "porcentaje_seguimiento_especializado": 0
-                },
-                "por_desempeno_escolar": {},
-                "estado_nutricional": {},
-                "factores_riesgo": {},
-                "fecha_calculo": datetime.now().isoformat()
-            }
-        
-        # Calcular estadísticas
-        total_atenciones = len(atenciones)
-        desarrollo_apropiado_count = 0
-        seguimiento_especializado_count = 0
-        
-        desempeno_stats = {}
-        nutricional_stats = {}
-        factores_riesgo_stats = {}
+        response = await query.execute()
         
-        for atencion in atenciones:
-            edad_anos = 8  # Simplificado
-            campos_calculados = calcular_campos_automaticos(atencion, edad_anos)
-            
-            if campos_calculados['desarrollo_apropiado_edad']:
-                desarrollo_apropiado_count += 1
-            if campos_calculados['requiere_seguimiento_especializado']:
-                seguimiento_especializado_count += 1
-            
-            # Estadísticas por desempeño escolar
-            desempeno = atencion.get('desempeno_escolar', 'NO_ESPECIFICADO')
-            desempeno_stats[desempeno] = desempeno_stats.get(desempeno, 0) + 1
-            
-            # Estadísticas por estado nutricional
-            estado_nut = campos_calculados['estado_nutricional']
-            nutricional_stats[estado_nut] = nutricional_stats.get(estado_nut, 0) + 1
-            
-            # Estadísticas de factores de riesgo
-            factores = atencion.get('factores_riesgo_identificados', [])
-            for factor in factores:
-                factores_riesgo_stats[factor] = factores_riesgo_stats.get(factor, 0) + 1
-        
-        return {
-            "resumen_general": {
-                "total_atenciones": total_atenciones,
-                "promedio_edad": 8.0,  # Simplificado para infancia
-                "porcentaje_desarrollo_apropiado": round((desarrollo_apropiado_count / total_atenciones) * 100, 1),
-                "porcentaje_seguimiento_especializado": round((seguimiento_especializado_count / total_atenciones) * 100, 1)
-            },
-            "por_desempeno_escolar": desempeno_stats,
-            "estado_nutricional": nutricional_stats,
-            "factores_riesgo": factores_riesgo_stats,
-            "fecha_calculo": datetime.now().isoformat()
-        }
+        estadisticas = estadisticas_infancia(response.data)
+        estadisticas["fecha_calculo"] = datetime.now().isoformat()
+        return estadisticas
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al calcular estadísticas: {str(e)}")
@@ -503,7 +454,7 @@ async def obtener_estadisticas_basicas(
 @router.get("/reportes/desarrollo")
 async def reporte_desarrollo_escolar(
     grado_escolar: Optional[str] = Query(None, description="Filtrar por grado escolar"),
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Generar reporte detallado de desarrollo escolar"""
     
@@ -513,7 +464,7 @@ async def reporte_desarrollo_escolar(
         if grado_escolar:
             query = query.eq("grado_escolar", grado_escolar)
         
-        response = query.execute()
+        response = await query.execute()
         atenciones = response.data
         
         reporte = {
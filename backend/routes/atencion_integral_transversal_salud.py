@@ -3,7 +3,7 @@
 # Resolución 3280 de 2018 - Rutas Integrales de Atención en Salud (RIAS)
 # =============================================================================
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Response
 from typing import List, Optional
 from supabase import Client
 from uuid import UUID
@@ -15,6 +15,8 @@ from models.atencion_integral_model import (
     ModeloAtencionIntegralTransversalSaludRespuesta,
     ModeloAtencionIntegralTransversalSaludActualizar
 )
+from core.security import ResourceType
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR, decodificar_cursor, paginar, siguiente_cursor
 
 # =============================================================================
 # CONFIGURACIÓN DEL ROUTER
@@ -26,6 +28,8 @@ router = APIRouter(
     responses={404: {"description": "Atención integral no encontrada"}}
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # ENDPOINTS CRUD - ATENCIÓN INTEGRAL TRANSVERSAL
 # =============================================================================
@@ -70,8 +74,10 @@ def crear_atencion_integral_transversal_salud(
 
 @router.get("/", response_model=List[ModeloAtencionIntegralTransversalSaludRespuesta])
 def listar_atenciones_integral_transversal_salud(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a skip"),
     tipo_abordaje: Optional[str] = None,
     modalidad: Optional[str] = None,
     nivel_complejidad: Optional[str] = None,
@@ -89,7 +95,12 @@ def listar_atenciones_integral_transversal_salud(
     - nivel_complejidad: Nivel de complejidad de la atención
     - estado: Estado de la atención (en_proceso, completada, etc.)
     - fecha_desde/fecha_hasta: Rango de fechas de inicio
+    
+    Paginación: `skip` o, para páginas profundas, `cursor` con el valor de la
+    cabecera X-Next-Cursor de la respuesta anterior (ausente en la última página).
     """
+    posicion = decodificar_cursor(cursor)
+    
     try:
         query = db.table("atencion_integral_transversal_salud").select("*")
         
@@ -108,9 +119,11 @@ def listar_atenciones_integral_transversal_salud(
             query = query.lte("fecha_inicio_atencion_integral", fecha_hasta.isoformat())
             
         # Aplicar paginación y orden
-        query = query.order("fecha_inicio_atencion_integral", desc=True).range(skip, skip + limit - 1)
+        result = paginar(query, "fecha_inicio_atencion_integral", limit, skip, posicion).execute()
         
-        result = query.execute()
+        proximo = siguiente_cursor(result.data, "fecha_inicio_atencion_integral", limit, posicion)
+        if proximo:
+            response.headers[CABECERA_SIGUIENTE_CURSOR] = proximo
         
         if result.data:
             return result.data
@@ -5,12 +5,15 @@ from database import get_supabase_client
 from typing import List
 from uuid import UUID, uuid4
 from datetime import date, datetime
+from core.security import ResourceType
 
 router = APIRouter(
     prefix="/atenciones-materno-perinatal",
     tags=["Atenciones Materno Perinatal"],
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # Crear una nueva atención materno perinatal (con lógica polimórfica)
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=AtencionMaternoPerinatal)
 def create_atencion_materno_perinatal(atencion_detalle: AtencionMaternoPerinatal, db: Client = Depends(get_supabase_client)):
@@ -4,7 +4,7 @@
 # Fecha: 15 septiembre 2025
 # =============================================================================
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from supabase import Client
 from models.atencion_primera_infancia_model import (
     AtencionPrimeraInfancia,
@@ -20,12 +20,16 @@ from uuid import UUID, uuid4
 from datetime import date, datetime
 from core.monitoring import apm_collector, health_metrics, PerformanceTimer
 import time
+from core.security import ResourceType
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR, decodificar_cursor, paginar, siguiente_cursor
 
 router = APIRouter(
     prefix="/atenciones-primera-infancia",
     tags=["Atención Primera Infancia"],
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # CRUD BÁSICO CONSOLIDADO
 # =============================================================================
@@ -133,8 +137,10 @@ def obtener_atencion_primera_infancia(
 
 @router.get("/", response_model=List[AtencionPrimeraInfanciaResponse])
 def listar_atenciones_primera_infancia(
+    response: Response,
     limite: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a offset"),
     paciente_id: Optional[UUID] = None,
     fecha_desde: Optional[date] = None,
     fecha_hasta: Optional[date] = None,
@@ -142,7 +148,12 @@ def listar_atenciones_primera_infancia(
 ):
     """
     Listar atenciones Primera Infancia con filtros básicos.
+    
+    Paginación: `offset` o, para páginas profundas, `cursor` con el valor de la
+    cabecera X-Next-Cursor de la respuesta anterior (ausente en la última página).
     """
+    posicion = decodificar_cursor(cursor)
+    
     try:
         # Construir consulta
         query = db.table("atencion_primera_infancia").select("*")
@@ -156,11 +167,15 @@ def listar_atenciones_primera_infancia(
             query = query.lte("fecha_atencion", fecha_hasta.isoformat())
         
         # Aplicar paginación y ordenamiento
-        response = query.order("fecha_atencion", desc=True).range(offset, offset + limite - 1).execute()
+        resultado = paginar(query, "fecha_atencion", limite, offset, posicion).execute()
+        
+        proximo = siguiente_cursor(resultado.data, "fecha_atencion", limite, posicion)
+        if proximo:
+            response.headers[CABECERA_SIGUIENTE_CURSOR] = proximo
         
         # Procesar respuesta y agregar campos calculados
         atenciones_procesadas = []
-        for atencion_data in response.data:
+        for atencion_data in resultado.data:
             atencion_data["desarrollo_apropiado_edad"] = _calcular_desarrollo_apropiado(atencion_data)
             atencion_data["porcentaje_esquema_vacunacion"] = _calcular_porcentaje_vacunacion(atencion_data)
             atencion_data["proxima_consulta_recomendada_dias"] = _calcular_proxima_consulta(atencion_data)
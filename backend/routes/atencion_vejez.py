@@ -16,16 +16,20 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional, Dict, Any
 from uuid import UUID, uuid4
 from datetime import date, datetime, timedelta
-from database import get_supabase_client
+from supabase import AsyncClient
+from database import get_supabase_async_client
 from models.atencion_vejez_model_fixed import (
     AtencionVejezCrear,
     AtencionVejezActualizar,
     AtencionVejezResponse
 )
 from services.atencion_vejez_service import AtencionVejezService
+from core.security import ResourceType
 
 router = APIRouter(prefix="/atencion-vejez", tags=["Atención Vejez"])
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # ENDPOINTS CRUD BÁSICOS - SPRINT #3: CENTRALIZACIÓN TOTAL
 # Patrón: Delegación completa al service layer, cero lógica en endpoints
@@ -34,7 +38,7 @@ router = APIRouter(prefix="/atencion-vejez", tags=["Atención Vejez"])
 @router.post("/", response_model=AtencionVejezResponse, status_code=201)
 async def crear_atencion_vejez(
     atencion_data: AtencionVejezCrear,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """
     Crear nueva atención vejez - SPRINT PILOTO #1 COMPLETO:
@@ -45,7 +49,7 @@ async def crear_atencion_vejez(
     """
     try:
         # Delegar toda la lógica compleja al servicio centralizado
-        return await AtencionVejezService.crear_atencion_vejez_completa(atencion_data)
+        return await AtencionVejezService.crear_atencion_vejez_completa(db, atencion_data)
 
     except ValueError as e:
         # Errores de validación de negocio
@@ -58,7 +62,7 @@ async def crear_atencion_vejez(
 @router.get("/{atencion_id}", response_model=AtencionVejezResponse)
 async def obtener_atencion_vejez(
     atencion_id: UUID,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """
     Obtener atención vejez por ID - SPRINT #3 CENTRALIZACIÓN TOTAL:
@@ -68,7 +72,7 @@ async def obtener_atencion_vejez(
     """
     try:
         # Delegar toda la lógica al servicio centralizado
-        return await AtencionVejezService.obtener_atencion_vejez_por_id(atencion_id)
+        return await AtencionVejezService.obtener_atencion_vejez_por_id(db, atencion_id)
 
     except ValueError as e:
         # Errores de validación de negocio (ej: no encontrada)
@@ -82,7 +86,7 @@ async def obtener_atencion_vejez(
 async def listar_atenciones_vejez(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """
     Listar atenciones vejez con paginación - SPRINT #3 CENTRALIZACIÓN TOTAL:
@@ -92,7 +96,7 @@ async def listar_atenciones_vejez(
     """
     try:
         # Delegar toda la lógica al servicio centralizado
-        return await AtencionVejezService.listar_atenciones_vejez(skip, limit)
+        return await AtencionVejezService.listar_atenciones_vejez(db, skip, limit)
 
     except ValueError as e:
         # Errores de validación de negocio (ej: parámetros inválidos)
@@ -105,7 +109,7 @@ async def listar_atenciones_vejez(
 @router.get("/paciente/{paciente_id}", response_model=List[AtencionVejezResponse])
 async def listar_atenciones_vejez_por_paciente(
     paciente_id: UUID,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """
     Listar atenciones vejez por paciente - SPRINT #3 CENTRALIZACIÓN TOTAL:
@@ -115,7 +119,7 @@ async def listar_atenciones_vejez_por_paciente(
     """
     try:
         # Delegar toda la lógica al servicio centralizado
-        return await AtencionVejezService.listar_atenciones_vejez_por_paciente(paciente_id)
+        return await AtencionVejezService.listar_atenciones_vejez_por_paciente(db, paciente_id)
 
     except Exception as e:
         print(f"Error en listar_atenciones_vejez_por_paciente: {str(e)}")
@@ -126,7 +130,7 @@ async def listar_atenciones_vejez_por_paciente(
 async def actualizar_atencion_vejez(
     atencion_id: UUID,
     atencion_data: AtencionVejezActualizar,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """
     Actualizar atención vejez - SPRINT #3 CENTRALIZACIÓN TOTAL:
@@ -140,7 +144,7 @@ async def actualizar_atencion_vejez(
         update_data = {k: v for k, v in atencion_data.model_dump(exclude_unset=True).items() if v is not None}
 
         # Delegar toda la lógica al servicio centralizado
-        return await AtencionVejezService.actualizar_atencion_vejez(atencion_id, update_data)
+        return await AtencionVejezService.actualizar_atencion_vejez(db, atencion_id, update_data)
 
     except ValueError as e:
         # Errores de validación de negocio
@@ -156,7 +160,7 @@ async def actualizar_atencion_vejez(
 @router.delete("/{atencion_id}")
 async def eliminar_atencion_vejez(
     atencion_id: UUID,
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """
     Eliminar atención vejez - SPRINT #3 CENTRALIZACIÓN TOTAL:
@@ -167,7 +171,7 @@ async def eliminar_atencion_vejez(
     """
     try:
         # Delegar toda la lógica al servicio centralizado
-        return await AtencionVejezService.eliminar_atencion_vejez(atencion_id)
+        return await AtencionVejezService.eliminar_atencion_vejez(db, atencion_id)
 
     except ValueError as e:
         # Errores de validación de negocio (ej: no encontrada)
@@ -183,12 +187,12 @@ async def eliminar_atencion_vejez(
 
 @router.get("/estadisticas/resumen")
 async def obtener_estadisticas_vejez(
-    db=Depends(get_supabase_client)
+    db: AsyncClient = Depends(get_supabase_async_client)
 ):
     """Obtener estadísticas especializadas de atenciones vejez usando lógica centralizada"""
     try:
         # Delegar cálculos especializados al servicio
-        return await AtencionVejezService.obtener_estadisticas_vejez()
+        return await AtencionVejezService.obtener_estadisticas_vejez(db)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
\ No newline at end of file
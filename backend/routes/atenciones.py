@@ -3,12 +3,15 @@ from supabase import Client
 from models import Atencion
 from database import get_supabase_client
 from uuid import UUID
+from core.security import ResourceType
 
 router = APIRouter(
     prefix="/atenciones",
     tags=["Atenciones"],
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # Crear una nueva atención
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=Atencion)
 def create_atencion(atencion: Atencion, db: Client = Depends(get_supabase_client)):
@@ -22,6 +22,8 @@ from models.catalogo_ocupaciones_model import (
 )
 from database import get_supabase_client
 from supabase import Client
+from services.indice_ocupaciones import buscar_ocupaciones_bd, obtener_resumen_catalogo
+from core.security import ResourceType
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -36,6 +38,8 @@ router = APIRouter(
     }
 )
 
+RECURSO_SEGURIDAD = ResourceType.ESTADÍSTICAS
+
 # ===================================================================
 # ENDPOINTS PRINCIPALES
 # ===================================================================
@@ -68,9 +72,9 @@ async def buscar_ocupaciones_autocompletado(
     **Búsqueda inteligente de ocupaciones para autocompletado**
     
     Funcionalidades:
-    - Búsqueda por nombre (coincidencia parcial)
+    - Búsqueda por nombre (trigramas, sin importar tildes ni errores menores)
     - Búsqueda por código DANE
-    - Ranking de relevancia automático
+    - Ranking por similitud en una sola consulta (RPC buscar_ocupaciones_trgm)
     - Filtrado por categorías
     - Optimizado para <100ms de respuesta
     
@@ -83,56 +87,10 @@ async def buscar_ocupaciones_autocompletado(
     try:
         logger.info(f"Búsqueda ocupaciones: '{q}' (límite: {limit})")
         
-        # Usar función SQL optimizada de la base de datos
-        query = """
-        SELECT * FROM buscar_ocupaciones_inteligente($1, $2)
-        """
-        
-        # Aplicar filtros adicionales si es necesario
-        if categoria or not activos_only:
-            # Query más compleja con filtros
-            base_conditions = ["co.activo = true"] if activos_only else []
-            
-            if categoria:
-                base_conditions.append("co.categoria_ocupacional_nivel_1 = $3")
-            
-            conditions_str = " AND ".join(base_conditions) if base_conditions else "1=1"
-            
-            query = f"""
-            SELECT 
-                co.id,
-                co.codigo_ocupacion_dane,
-                co.nombre_ocupacion_normalizado,
-                co.categoria_ocupacional_nivel_1,
-                CASE 
-                    WHEN co.nombre_ocupacion_normalizado ILIKE $1 || '%' THEN 1.0
-                    WHEN co.codigo_ocupacion_dane ILIKE $1 || '%' THEN 0.8
-                    WHEN co.nombre_ocupacion_normalizado ILIKE '%' || $1 || '%' THEN 0.6
-                    ELSE ts_rank(
-                        to_tsvector('spanish', co.nombre_ocupacion_normalizado), 
-                        to_tsquery('spanish', $1 || ':*')
-                    )
-                END as relevancia
-            FROM catalogo_ocupaciones_dane co
-            WHERE ({conditions_str})
-            AND (
-                co.nombre_ocupacion_normalizado ILIKE '%' || $1 || '%'
-                OR co.codigo_ocupacion_dane ILIKE $1 || '%'
-                OR to_tsvector('spanish', co.nombre_ocupacion_normalizado) 
-                   @@ to_tsquery('spanish', $1 || ':*')
-            )
-            ORDER BY relevancia DESC, co.nombre_ocupacion_normalizado ASC
-            LIMIT $2
-            """
-            
-            params = [q.lower().strip(), limit]
-            if categoria:
-                params.append(categoria)
-                
-            results = await conn.fetch(query, *params)
-        else:
-            # Usar función optimizada por defecto
-            results = await conn.fetch(query, q.lower().strip(), limit)
+        # Nombre (trigramas) y código en una sola llamada rankeada
+        results = buscar_ocupaciones_bd(
+            supabase, q, limit, categoria=categoria, solo_activas=activos_only
+        )
         
         # Convertir resultados
         ocupaciones = []
@@ -254,28 +212,16 @@ async def obtener_estadisticas_catalogo(
     """
     
     try:
-        # Obtener estadísticas en paralelo
-        queries = [
-            "SELECT COUNT(*) as total FROM catalogo_ocupaciones_dane",
-            "SELECT COUNT(*) as activas FROM catalogo_ocupaciones_dane WHERE activo = true",
-            """SELECT COUNT(DISTINCT categoria_ocupacional_nivel_1) as cat1 
-               FROM catalogo_ocupaciones_dane WHERE categoria_ocupacional_nivel_1 IS NOT NULL""",
-            """SELECT COUNT(DISTINCT categoria_ocupacional_nivel_2) as cat2 
-               FROM catalogo_ocupaciones_dane WHERE categoria_ocupacional_nivel_2 IS NOT NULL""",
-            "SELECT MAX(actualizado_en) as ultima_actualizacion FROM catalogo_ocupaciones_dane",
-            """SELECT version_catalogo FROM catalogo_ocupaciones_dane 
-               WHERE version_catalogo IS NOT NULL LIMIT 1"""
-        ]
-        
-        results = await asyncpg.gather(*[conn.fetchval(q) for q in queries])
+        # Resumen precalculado por trigger al modificar el catálogo: una fila
+        resumen = obtener_resumen_catalogo(supabase)
         
         return OcupacionEstadisticasResponse(
-            total_ocupaciones=results[0] or 0,
-            ocupaciones_activas=results[1] or 0,
-            categorias_nivel_1=results[2] or 0,
-            categorias_nivel_2=results[3] or 0,
-            ultima_actualizacion=results[4],
-            version_catalogo=results[5]
+            total_ocupaciones=resumen.get('total_ocupaciones', 0),
+            ocupaciones_activas=resumen.get('ocupaciones_activas', 0),
+            categorias_nivel_1=resumen.get('categorias_nivel_1', 0),
+            categorias_nivel_2=resumen.get('categorias_nivel_2', 0),
+            ultima_actualizacion=resumen.get('ultima_actualizacion'),
+            version_catalogo=resumen.get('version_catalogo')
         )
         
     except Exception as e:
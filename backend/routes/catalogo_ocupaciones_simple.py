@@ -9,7 +9,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
+import asyncio
 import logging
+import time
 from uuid import UUID
 
 # Importaciones locales
@@ -19,6 +21,14 @@ from models.catalogo_ocupaciones_model import (
 )
 from database import get_supabase_client
 from supabase import Client
+from services.indice_ocupaciones import (
+    buscar_ocupaciones_bd,
+    indice_ocupaciones_vigente,
+    obtener_indice_ocupaciones,
+    obtener_resumen_catalogo,
+    recargar_indice_ocupaciones
+)
+from core.security import ResourceType
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -33,6 +43,8 @@ router = APIRouter(
     }
 )
 
+RECURSO_SEGURIDAD = ResourceType.ESTADÍSTICAS
+
 # ===================================================================
 # ENDPOINTS PRINCIPALES
 # ===================================================================
@@ -57,9 +69,9 @@ async def buscar_ocupaciones_autocompletado(
     **Búsqueda inteligente de ocupaciones para autocompletado**
     
     Funcionalidades:
-    - Búsqueda por nombre (coincidencia parcial)
+    - Búsqueda por nombre (palabras que empiezan por el término, sin importar tildes)
     - Búsqueda por código DANE
-    - Optimizado para autocompletado en tiempo real
+    - Servido desde un índice en memoria, sin consultar la BD por tecla
     
     Ejemplos de búsqueda:
     - `enfer` → Encuentra "Enfermera Profesional", "Enfermera Auxiliar", etc.
@@ -68,70 +80,16 @@ async def buscar_ocupaciones_autocompletado(
     """
     
     try:
-        logger.info(f"Búsqueda ocupaciones: '{q}' (límite: {limit})")
-        
-        # Búsqueda usando Supabase client
-        # Búsqueda por nombre (coincidencia parcial)
-        query_nombre = supabase.table("catalogo_ocupaciones_dane") \
-            .select("id, codigo_ocupacion_dane, nombre_ocupacion_normalizado, categoria_ocupacional_nivel_1") \
-            .eq("activo", True) \
-            .ilike("nombre_ocupacion_normalizado", f"%{q}%") \
-            .order("nombre_ocupacion_normalizado") \
-            .limit(limit)
-        
-        response_nombre = query_nombre.execute()
-        ocupaciones = []
-        
-        # Convertir resultados
-        if response_nombre.data:
-            for row in response_nombre.data:
-                # Calcular relevancia básica
-                nombre_lower = row['nombre_ocupacion_normalizado'].lower()
-                q_lower = q.lower()
-                
-                if nombre_lower.startswith(q_lower):
-                    relevancia = 1.0
-                elif q_lower in nombre_lower:
-                    relevancia = 0.8
-                else:
-                    relevancia = 0.5
-                
-                ocupaciones.append(OcupacionAutocompletadoResponse(
-                    id=row['id'],
-                    codigo_ocupacion_dane=row['codigo_ocupacion_dane'],
-                    nombre_ocupacion_normalizado=row['nombre_ocupacion_normalizado'],
-                    categoria_ocupacional_nivel_1=row['categoria_ocupacional_nivel_1'],
-                    relevancia=relevancia
-                ))
-        
-        # Si no hay suficientes resultados, buscar por código
-        if len(ocupaciones) < limit:
-            query_codigo = supabase.table("catalogo_ocupaciones_dane") \
-                .select("id, codigo_ocupacion_dane, nombre_ocupacion_normalizado, categoria_ocupacional_nivel_1") \
-                .eq("activo", True) \
-                .ilike("codigo_ocupacion_dane", f"{q}%") \
-                .order("codigo_ocupacion_dane") \
-                .limit(limit - len(ocupaciones))
-            
-            response_codigo = query_codigo.execute()
-            
-            if response_codigo.data:
-                for row in response_codigo.data:
-                    # Evitar duplicados
-                    if not any(ocp.id == row['id'] for ocp in ocupaciones):
-                        ocupaciones.append(OcupacionAutocompletadoResponse(
-                            id=row['id'],
-                            codigo_ocupacion_dane=row['codigo_ocupacion_dane'],
-                            nombre_ocupacion_normalizado=row['nombre_ocupacion_normalizado'],
-                            categoria_ocupacional_nivel_1=row['categoria_ocupacional_nivel_1'],
-                            relevancia=0.9  # Alta relevancia para código exacto
-                        ))
-        
-        # Ordenar por relevancia
-        ocupaciones.sort(key=lambda x: x.relevancia, reverse=True)
-        
-        logger.info(f"Encontradas {len(ocupaciones)} ocupaciones para '{q}'")
-        return ocupaciones
+        try:
+            indice = indice_ocupaciones_vigente()
+            if indice is None:
+                indice = await asyncio.to_thread(obtener_indice_ocupaciones, supabase)
+            filas = indice.buscar(q, limit)
+        except Exception as e:
+            # Sin índice: una sola consulta rankeada en BD
+            logger.warning(f"Índice de ocupaciones no disponible, búsqueda en BD: {e}")
+            filas = await asyncio.to_thread(buscar_ocupaciones_bd, supabase, q, limit)
+        return [OcupacionAutocompletadoResponse(**fila) for fila in filas]
         
     except Exception as e:
         logger.error(f"Error en búsqueda ocupaciones: {e}")
@@ -141,6 +99,36 @@ async def buscar_ocupaciones_autocompletado(
         )
 
 
+@router.post("/indice/recargar")
+async def recargar_indice_busqueda(
+    supabase: Client = Depends(get_supabase_client)
+):
+    """
+    **Recargar el índice de autocompletado desde la BD**
+    
+    Recarga de inmediato el índice del worker que atiende la petición. Los demás
+    workers detectan la importación por el calculado_en del resumen del catálogo
+    y se recargan en su próxima verificación
+    (OCUPACIONES_INDICE_VERIFICACION_SEGUNDOS, 30 s por defecto).
+    """
+    
+    try:
+        inicio = time.perf_counter()
+        indice = await asyncio.to_thread(recargar_indice_ocupaciones, supabase)
+        return {
+            "ocupaciones_indexadas": len(indice),
+            "tokens": indice.total_tokens,
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1)
+        }
+        
+    except Exception as e:
+        logger.error(f"Error recargando índice de ocupaciones: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error interno recargando índice de ocupaciones"
+        )
+
+
 @router.get("/estadisticas", response_model=OcupacionEstadisticasResponse)
 async def obtener_estadisticas_catalogo(
     supabase: Client = Depends(get_supabase_client)
@@ -155,49 +143,16 @@ async def obtener_estadisticas_catalogo(
     """
     
     try:
-        # Obtener conteo total
-        response_total = supabase.table("catalogo_ocupaciones_dane") \
-            .select("*", count="exact") \
-            .execute()
-        
-        total_ocupaciones = response_total.count or 0
-        
-        # Obtener conteo activas
-        response_activas = supabase.table("catalogo_ocupaciones_dane") \
-            .select("*", count="exact") \
-            .eq("activo", True) \
-            .execute()
-        
-        ocupaciones_activas = response_activas.count or 0
-        
-        # Obtener categorías únicas nivel 1
-        response_cat1 = supabase.table("catalogo_ocupaciones_dane") \
-            .select("categoria_ocupacional_nivel_1") \
-            .not_.is_("categoria_ocupacional_nivel_1", "null") \
-            .execute()
-        
-        categorias_nivel_1 = len(set(row['categoria_ocupacional_nivel_1'] 
-                                   for row in response_cat1.data 
-                                   if row['categoria_ocupacional_nivel_1'])) if response_cat1.data else 0
-        
-        # Obtener última actualización
-        response_ultima = supabase.table("catalogo_ocupaciones_dane") \
-            .select("actualizado_en") \
-            .order("actualizado_en", desc=True) \
-            .limit(1) \
-            .execute()
-        
-        ultima_actualizacion = None
-        if response_ultima.data:
-            ultima_actualizacion = response_ultima.data[0]['actualizado_en']
+        # Resumen precalculado por trigger al modificar el catálogo: una fila
+        resumen = obtener_resumen_catalogo(supabase)
         
         return OcupacionEstadisticasResponse(
-            total_ocupaciones=total_ocupaciones,
-            ocupaciones_activas=ocupaciones_activas,
-            categorias_nivel_1=categorias_nivel_1,
-            categorias_nivel_2=0,  # Simplificado por ahora
-            ultima_actualizacion=ultima_actualizacion,
-            version_catalogo="2025"
+            total_ocupaciones=resumen.get('total_ocupaciones', 0),
+            ocupaciones_activas=resumen.get('ocupaciones_activas', 0),
+            categorias_nivel_1=resumen.get('categorias_nivel_1', 0),
+            categorias_nivel_2=resumen.get('categorias_nivel_2', 0),
+            ultima_actualizacion=resumen.get('ultima_actualizacion'),
+            version_catalogo=resumen.get('version_catalogo') or "2025"
         )
         
     except Exception as e:
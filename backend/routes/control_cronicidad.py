@@ -4,7 +4,7 @@
 # Fecha: 15 septiembre 2025
 # =============================================================================
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from supabase import Client
 from models.control_cronicidad_model import (
     ControlCronicidadCrear,
@@ -24,13 +24,22 @@ from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import date, datetime
 from core.monitoring import apm_collector, health_metrics, PerformanceTimer
+from core.cache import CacheTTL
 import time
+from core.security import ResourceType
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR, decodificar_cursor, paginar, siguiente_cursor
 
 router = APIRouter(
     prefix="/control-cronicidad",
     tags=["Control de Cronicidad"],
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
+# Estadísticas agregadas: el polling del dashboard se sirve desde memoria durante el TTL
+TTL_ESTADISTICAS_SEGUNDOS = 30
+cache_estadisticas = CacheTTL(TTL_ESTADISTICAS_SEGUNDOS)
+
 # =============================================================================
 # CRUD BÁSICO CONSOLIDADO
 # =============================================================================
@@ -53,6 +62,7 @@ async def crear_control_cronicidad(
 
         # Delegar toda la lógica compleja al servicio centralizado
         control_result = await ControlCronicidadService.crear_control_cronicidad_completo(control_data)
+        cache_estadisticas.invalidar()
 
         db_time = time.time() - start_time
         apm_collector.track_database_operation(
@@ -116,8 +126,10 @@ def obtener_control_cronicidad(
 
 @router.get("/", response_model=List[ControlCronicidadResponse])
 def listar_controles_cronicidad(
+    response: Response,
     limite: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a offset"),
     paciente_id: Optional[UUID] = None,
     tipo_cronicidad: Optional[str] = None,
     fecha_desde: Optional[date] = None,
@@ -127,7 +139,12 @@ def listar_controles_cronicidad(
 ):
     """
     Listar controles de cronicidad con filtros avanzados.
+    
+    Paginación: `offset` o, para páginas profundas, `cursor` con el valor de la
+    cabecera X-Next-Cursor de la respuesta anterior (ausente en la última página).
     """
+    posicion = decodificar_cursor(cursor)
+    
     try:
         # Construir consulta
         query = db.table("control_cronicidad").select("*")
@@ -145,11 +162,15 @@ def listar_controles_cronicidad(
             query = query.lte("fecha_control", fecha_hasta.isoformat())
         
         # Aplicar paginación y ordenamiento
-        response = query.order("fecha_control", desc=True).range(offset, offset + limite - 1).execute()
+        resultado = paginar(query, "fecha_control", limite, offset, posicion).execute()
+        
+        proximo = siguiente_cursor(resultado.data, "fecha_control", limite, posicion, admite_nulos=False)
+        if proximo:
+            response.headers[CABECERA_SIGUIENTE_CURSOR] = proximo
         
         # Procesar respuesta y agregar campos calculados
         controles_procesados = []
-        for control_data in response.data:
+        for control_data in resultado.data:
             control_data["control_adecuado"] = _evaluar_control_adecuado_basico(control_data)
             control_data["riesgo_cardiovascular"] = _calcular_riesgo_cardiovascular(control_data)
             control_data["adherencia_score"] = _calcular_adherencia_score(control_data)
@@ -214,6 +235,7 @@ def actualizar_control_cronicidad(
             )
         
         updated_control = response.data[0]
+        cache_estadisticas.invalidar()
         
         # Agregar campos calculados
         updated_control["control_adecuado"] = _evaluar_control_adecuado_basico(updated_control)
@@ -250,6 +272,7 @@ def eliminar_control_cronicidad(
         
         # Eliminar control de cronicidad (esto eliminará la atención asociada por CASCADE)
         response = db.table("control_cronicidad").delete().eq("id", str(control_id)).execute()
+        cache_estadisticas.invalidar()
         
         # Si existe atención asociada y no se eliminó automáticamente, eliminarla manualmente
         if atencion_id:
@@ -354,54 +377,15 @@ def obtener_controles_cronologicos_paciente(
 
 @router.get("/estadisticas/basicas", response_model=dict)
 def obtener_estadisticas_basicas(db: Client = Depends(get_supabase_client)):
-    """Obtener estadísticas básicas de Control de Cronicidad."""
+    """
+    Obtener estadísticas básicas de Control de Cronicidad.
+
+    Los conteos salen de un único agregado en BD (RPC estadisticas_control_cronicidad)
+    y se cachean TTL_ESTADISTICAS_SEGUNDOS; crear, actualizar o eliminar un
+    control invalida el cache.
+    """
     try:
-        # Total de controles
-        total_response = db.table("control_cronicidad").select("id", count="exact").execute()
-        total = total_response.count or 0
-        
-        # Por tipo de cronicidad
-        tipos = ["Hipertension", "Diabetes", "ERC", "Dislipidemia"]
-        estadisticas_por_tipo = {}
-        
-        for tipo in tipos:
-            tipo_response = db.table("control_cronicidad")\
-                .select("id", count="exact")\
-                .eq("tipo_cronicidad", tipo)\
-                .execute()
-            estadisticas_por_tipo[tipo] = tipo_response.count or 0
-        
-        # Controles controlados vs no controlados
-        controlados = db.table("control_cronicidad")\
-            .select("id", count="exact")\
-            .eq("estado_control", "Controlado")\
-            .execute().count or 0
-        
-        no_controlados = db.table("control_cronicidad")\
-            .select("id", count="exact")\
-            .eq("estado_control", "No controlado")\
-            .execute().count or 0
-        
-        # Adherencia al tratamiento
-        buena_adherencia = db.table("control_cronicidad")\
-            .select("id", count="exact")\
-            .eq("adherencia_tratamiento", "Buena")\
-            .execute().count or 0
-        
-        return {
-            "resumen_general": {
-                "total_controles": total,
-                "porcentaje_controlados": round((controlados / total * 100) if total > 0 else 0, 2),
-                "porcentaje_buena_adherencia": round((buena_adherencia / total * 100) if total > 0 else 0, 2)
-            },
-            "por_tipo_cronicidad": estadisticas_por_tipo,
-            "control_metabolico": {
-                "controlados": controlados,
-                "no_controlados": no_controlados,
-                "en_proceso": total - controlados - no_controlados
-            },
-            "fecha_calculo": datetime.now().isoformat()
-        }
+        return cache_estadisticas.obtener("basicas", lambda: _calcular_estadisticas_basicas(db))
         
     except Exception as e:
         raise HTTPException(
@@ -409,6 +393,35 @@ def obtener_estadisticas_basicas(db: Client = Depends(get_supabase_client)):
             detail=f"Error al obtener estadísticas: {e}"
         )
 
+def _calcular_estadisticas_basicas(db: Client) -> dict:
+    """Arma la respuesta de estadísticas a partir de los conteos agrupados de la RPC."""
+    conteos = db.rpc("estadisticas_control_cronicidad", {}).execute().data or {}
+    
+    total = conteos.get("total", 0)
+    controlados = conteos.get("controlados", 0)
+    no_controlados = conteos.get("no_controlados", 0)
+    buena_adherencia = conteos.get("buena_adherencia", 0)
+    
+    # Por tipo de cronicidad
+    tipos = ["Hipertension", "Diabetes", "ERC", "Dislipidemia"]
+    por_tipo = conteos.get("por_tipo") or {}
+    estadisticas_por_tipo = {tipo: por_tipo.get(tipo, 0) for tipo in tipos}
+    
+    return {
+        "resumen_general": {
+            "total_controles": total,
+            "porcentaje_controlados": round((controlados / total * 100) if total > 0 else 0, 2),
+            "porcentaje_buena_adherencia": round((buena_adherencia / total * 100) if total > 0 else 0, 2)
+        },
+        "por_tipo_cronicidad": estadisticas_por_tipo,
+        "control_metabolico": {
+            "controlados": controlados,
+            "no_controlados": no_controlados,
+            "en_proceso": total - controlados - no_controlados
+        },
+        "fecha_calculo": datetime.now().isoformat()
+    }
+
 @router.get("/reportes/adherencia", response_model=dict)
 def reporte_adherencia_tratamiento(
     tipo_cronicidad: Optional[str] = None,
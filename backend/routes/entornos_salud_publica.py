@@ -22,6 +22,7 @@ from models.entorno_model import (
     ModeloFiltrosEntornoSaludPublica,
     ModeloEstadisticasEntornoSaludPublica
 )
+from core.security import ResourceType
 
 # Crear router
 router = APIRouter(
@@ -30,6 +31,8 @@ router = APIRouter(
     responses={404: {"description": "Entorno no encontrado"}}
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # ENDPOINTS CRUD - Entornos de Salud Pública
 # =============================================================================
@@ -3,7 +3,7 @@
 # Resolución 3280 de 2018 - Rutas Integrales de Atención en Salud (RIAS)
 # =============================================================================
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Response
 from typing import List, Optional
 from supabase import Client
 from uuid import UUID
@@ -14,6 +14,8 @@ from models.familia_integral_model import (
     ModeloFamiliaIntegralRespuesta,
     ModeloFamiliaIntegralActualizar
 )
+from core.security import ResourceType
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR, decodificar_cursor, paginar, siguiente_cursor
 
 # =============================================================================
 # CONFIGURACIÓN DEL ROUTER
@@ -25,6 +27,8 @@ router = APIRouter(
     responses={404: {"description": "Familia no encontrada"}}
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # ENDPOINTS CRUD - FAMILIA INTEGRAL
 # =============================================================================
@@ -64,8 +68,10 @@ def crear_familia_integral_salud_publica(
 
 @router.get("/", response_model=List[ModeloFamiliaIntegralRespuesta])
 def listar_familias_integral_salud_publica(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a skip"),
     tipo_estructura: Optional[str] = None,
     ciclo_vital: Optional[str] = None,
     estado_seguimiento: Optional[str] = None,
@@ -78,7 +84,12 @@ def listar_familias_integral_salud_publica(
     - tipo_estructura: Tipo de estructura familiar
     - ciclo_vital: Ciclo vital familiar actual  
     - estado_seguimiento: Estado del seguimiento familiar
+    
+    Paginación: `skip` o, para páginas profundas, `cursor` con el valor de la
+    cabecera X-Next-Cursor de la respuesta anterior (ausente en la última página).
     """
+    posicion = decodificar_cursor(cursor)
+    
     try:
         query = db.table("familia_integral_salud_publica").select("*")
         
@@ -91,9 +102,11 @@ def listar_familias_integral_salud_publica(
             query = query.eq("estado_seguimiento_familia", estado_seguimiento)
             
         # Aplicar paginación y orden
-        query = query.order("creado_en", desc=True).range(skip, skip + limit - 1)
+        result = paginar(query, "creado_en", limit, skip, posicion).execute()
         
-        result = query.execute()
+        proximo = siguiente_cursor(result.data, "creado_en", limit, posicion)
+        if proximo:
+            response.headers[CABECERA_SIGUIENTE_CURSOR] = proximo
         
         if result.data:
             return result.data
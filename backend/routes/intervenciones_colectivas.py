@@ -4,12 +4,15 @@ from models import IntervencionColectiva
 from database import get_supabase_client
 from typing import List, Optional
 from uuid import UUID
+from core.security import ResourceType
 
 router = APIRouter(
     prefix="/intervenciones-colectivas",
     tags=["Intervenciones Colectivas"],
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # Crear una nueva intervención colectiva
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=IntervencionColectiva)
 def create_intervencion_colectiva(intervencion: IntervencionColectiva, db: Client = Depends(get_supabase_client)):
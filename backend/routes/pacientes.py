@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from supabase import Client
+from typing import Dict, Iterator, List, Optional
+import json
 from models import Paciente
 from database import get_supabase_client
 from core.monitoring import apm_collector, health_metrics, PerformanceTimer
+from core.security import ResourceType
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR, decodificar_cursor, paginar, siguiente_cursor
 
 # Crear el router
 router = APIRouter(
@@ -10,11 +15,90 @@ router = APIRouter(
     tags=["Pacientes"],
 )
 
-# Obtener todos los pacientes
+RECURSO_SEGURIDAD = ResourceType.PACIENTE
+
+# Columnas que acepta fields= y llaves del orden de paginación
+CAMPOS_PACIENTE = tuple(Paciente.model_fields)
+COLUMNAS_ORDEN = ("id", "creado_en")
+
+# Filas por consulta al exportar en NDJSON: acota la memoria por respuesta
+TAMANO_PAGINA_NDJSON = 1000
+
+
+def _columnas_solicitadas(fields: Optional[str]) -> Optional[List[str]]:
+    """Columnas pedidas en fields= (None = todas); 400 si alguna no existe"""
+    if fields is None:
+        return None
+    columnas = list(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+    desconocidas = [c for c in columnas if c not in CAMPOS_PACIENTE]
+    if not columnas or desconocidas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"fields inválido; columnas disponibles: {', '.join(CAMPOS_PACIENTE)}"
+        )
+    return columnas
+
+
+def _consulta_pacientes(db: Client, columnas: Optional[List[str]]):
+    # El cursor necesita (creado_en, id) aunque la proyección no los incluya
+    if columnas is None:
+        return db.table("pacientes").select("*")
+    return db.table("pacientes").select(",".join(dict.fromkeys([*columnas, *COLUMNAS_ORDEN])))
+
+
+def _proyectar(filas: List[Dict], columnas: Optional[List[str]]) -> List[Dict]:
+    if columnas is None:
+        return filas
+    return [{c: fila.get(c) for c in columnas} for fila in filas]
+
+
+def _iterar_pacientes_ndjson(db: Client, columnas: Optional[List[str]], posicion) -> Iterator[str]:
+    """Todos los pacientes desde la posición, una página por consulta y un bloque por página"""
+    while True:
+        filas = paginar(_consulta_pacientes(db, columnas), "creado_en", TAMANO_PAGINA_NDJSON,
+                        posicion=posicion).execute().data or []
+        if filas:
+            yield "".join(json.dumps(f, ensure_ascii=False, default=str) + "\n"
+                          for f in _proyectar(filas, columnas))
+        # creado_en es NOT NULL: una página incompleta es el final (sin cola de nulos)
+        if len(filas) < TAMANO_PAGINA_NDJSON:
+            break
+        posicion = (filas[-1]["creado_en"], filas[-1]["id"])
+
+
+# Obtener pacientes (paginado)
 @router.get("/")
-def get_pacientes(db: Client = Depends(get_supabase_client)):
-    response = db.table("pacientes").select("*").execute()
-    return {"data": response.data}
+def get_pacientes(
+    response: Response,
+    limite: int = Query(50, ge=1, le=500, description="Pacientes por página"),
+    offset: int = Query(0, ge=0, description="Desplazamiento (páginas cercanas)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a offset"),
+    fields: Optional[str] = Query(None, description="Columnas separadas por coma, ej: id,primer_nombre,primer_apellido"),
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="ndjson: todos los pacientes desde el cursor, un JSON por línea"),
+    db: Client = Depends(get_supabase_client)
+):
+    """
+    Listar pacientes del más reciente al más antiguo.
+
+    - json (default): una página en {"data": [...]}; si hay más, la cabecera
+      X-Next-Cursor trae el cursor de la siguiente.
+    - ndjson: exportación completa en streaming para consumidores masivos; se
+      consulta por páginas de TAMANO_PAGINA_NDJSON, sin cargar la tabla en memoria.
+    """
+    columnas = _columnas_solicitadas(fields)
+    posicion = decodificar_cursor(cursor)
+
+    if formato == "ndjson":
+        return StreamingResponse(
+            _iterar_pacientes_ndjson(db, columnas, posicion),
+            media_type="application/x-ndjson"
+        )
+
+    resultado = paginar(_consulta_pacientes(db, columnas), "creado_en", limite, offset, posicion).execute()
+    proximo = siguiente_cursor(resultado.data, "creado_en", limite, posicion, admite_nulos=False)
+    if proximo:
+        response.headers[CABECERA_SIGUIENTE_CURSOR] = proximo
+    return {"data": _proyectar(resultado.data, columnas)}
 
 # Obtener un paciente por su ID
 @router.get("/{paciente_id}")
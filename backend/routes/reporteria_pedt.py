@@ -0,0 +1,150 @@
+# =============================================================================
+# Rutas Reportería PEDT - Resolución 202 de 2021
+# Fecha: 18 octubre 2026
+# Objetivo: Exponer la generación del archivo plano SISPRO (RPED) y sus trabajos
+# Base: services/reporteria_pedt.py (GeneradorReportePEDT)
+# =============================================================================
+
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+from supabase import Client
+from typing import Optional
+import os
+from database import get_supabase_client
+from services.reporteria_pedt import GeneradorReportePEDT
+from services.ejecutor_reporte_pedt import ConflictoTrabajoPEDT, iniciar_trabajo, obtener_trabajo
+from services.cache_variables_pedt import obtener_cache_pedt
+from services.validador_resolucion_202 import obtener_motor_validacion_202
+from core.security import ResourceType
+
+router = APIRouter(prefix="/reporteria-pedt", tags=["Reportería PEDT"])
+
+RECURSO_SEGURIDAD = ResourceType.ESTADÍSTICAS
+
+# =============================================================================
+# ARCHIVO PLANO SISPRO
+# =============================================================================
+
+@router.get("/archivo-sispro")
+def descargar_archivo_sispro(
+    periodo: Optional[str] = Query(None, description="Período del reporte AAAA-MM (default: mes actual)"),
+    codigo_entidad: Optional[str] = Query(None, description="Código de habilitación de la entidad que reporta"),
+    usar_cache: bool = Query(True, description="Reutilizar variables de pacientes sin cambios"),
+    db: Client = Depends(get_supabase_client)
+):
+    """
+    Descargar el archivo plano SISPRO de todos los pacientes como stream.
+
+    Los pacientes se procesan por lotes y el detalle se acumula en disco, no en
+    memoria, de modo que el consumo del servidor no crece con la población.
+    Con usar_cache solo se recalculan los pacientes cuyos datos cambiaron.
+    """
+    generador = GeneradorReportePEDT(db)
+    try:
+        nombre_archivo = generador.nombre_archivo_sispro(periodo)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    contenido = generador.iterar_archivo_plano_sispro(
+        generador.iterar_ids_pacientes(),
+        periodo=periodo,
+        codigo_entidad=codigo_entidad,
+        cache=obtener_cache_pedt() if usar_cache else None
+    )
+    return StreamingResponse(
+        contenido,
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}"'}
+    )
+
+# =============================================================================
+# TRABAJOS DE REPORTE PARALELOS Y REANUDABLES
+# =============================================================================
+
+@router.post("/trabajos", status_code=status.HTTP_202_ACCEPTED)
+def iniciar_trabajo_reporte(
+    periodo: Optional[str] = Query(None, description="Período del reporte AAAA-MM (default: mes actual)"),
+    reiniciar: bool = Query(False, description="Descartar checkpoints previos y empezar de cero"),
+    codigo_entidad: Optional[str] = Query(None, description="Código de habilitación de la entidad que reporta"),
+    usar_cache: bool = Query(True, description="Reutilizar variables de pacientes sin cambios"),
+    db: Client = Depends(get_supabase_client)
+):
+    """
+    Iniciar o reanudar en segundo plano el reporte PEDT de todos los pacientes.
+
+    El cálculo se reparte entre procesos y cada fragmento terminado queda en
+    disco: repetir la llamada tras una interrupción reanuda el trabajo. Si el
+    trabajo del período existe con otro codigo_entidad o usar_cache responde 409
+    (reiniciar=true lo regenera con las opciones nuevas).
+    """
+    try:
+        ejecutor = iniciar_trabajo(
+            db, periodo, reiniciar,
+            codigo_entidad=codigo_entidad,
+            cache=obtener_cache_pedt() if usar_cache else None
+        )
+    except ConflictoTrabajoPEDT as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "trabajo_id": ejecutor.trabajo_id,
+        "periodo": ejecutor.periodo,
+        "estado": ejecutor.estado,
+        "progreso_url": f"{router.prefix}/trabajos/{ejecutor.trabajo_id}"
+    }
+
+
+@router.get("/trabajos/{trabajo_id}")
+def obtener_progreso_trabajo(trabajo_id: str, db: Client = Depends(get_supabase_client)):
+    """Progreso del trabajo: pacientes procesados, porcentaje y ETA en segundos."""
+    ejecutor = obtener_trabajo(trabajo_id, db)
+    progreso = ejecutor.progreso() if ejecutor else None
+    if progreso is None:
+        # El manifiesto se crea al arrancar; un trabajo recién lanzado puede no tenerlo aún
+        if ejecutor is not None and ejecutor.estado in ('ejecutando', 'error'):
+            return {"trabajo_id": trabajo_id, "estado": ejecutor.estado, "error": ejecutor.error}
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+    return progreso
+
+
+@router.get("/trabajos/{trabajo_id}/archivo")
+def descargar_archivo_trabajo(trabajo_id: str, db: Client = Depends(get_supabase_client)):
+    """Descargar el archivo plano SISPRO de un trabajo completado."""
+    ejecutor = obtener_trabajo(trabajo_id, db)
+    if ejecutor is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+
+    progreso = ejecutor.progreso()
+    if not progreso or progreso["estado"] != "completado":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El trabajo aún no ha terminado")
+
+    ruta = ejecutor.ruta_archivo()
+    return FileResponse(ruta, media_type="text/plain; charset=utf-8", filename=os.path.basename(ruta))
+
+
+@router.get("/trabajos/{trabajo_id}/validacion")
+def validar_archivo_trabajo(
+    trabajo_id: str,
+    incluir_filas: bool = Query(True, description="Incluir los índices de registro que incumplen cada validación"),
+    db: Client = Depends(get_supabase_client)
+):
+    """
+    Validar el archivo SISPRO de un trabajo contra los controles de la Resolución 202.
+
+    Retorna el histograma de errores por código y, por cada código, los índices
+    (desde 0) de los registros de detalle que lo incumplen.
+    """
+    ejecutor = obtener_trabajo(trabajo_id, db)
+    if ejecutor is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+
+    progreso = ejecutor.progreso()
+    if not progreso or progreso["estado"] != "completado":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El trabajo aún no ha terminado")
+
+    resultado = obtener_motor_validacion_202().validar_archivo_plano(
+        ejecutor.ruta_archivo(), incluir_filas=incluir_filas
+    )
+    return {"trabajo_id": trabajo_id, **resultado.a_dict()}
@@ -4,7 +4,7 @@
 # Fecha: 16 septiembre 2025
 # =============================================================================
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from supabase import Client
 from models.tamizaje_oncologico_model import (
     TamizajeOncologicoCrear,
@@ -14,7 +14,9 @@ from models.tamizaje_oncologico_model import (
     calcular_nivel_riesgo,
     calcular_adherencia_tamizaje,
     calcular_proxima_cita_tamizaje,
-    calcular_completitud_tamizaje
+    calcular_completitud_tamizaje,
+    INTERVALOS_TAMIZAJE_DIAS,
+    INTERVALO_TAMIZAJE_DEFECTO_DIAS
 )
 from database import get_supabase_client
 from typing import List, Optional
@@ -22,12 +24,16 @@ from uuid import UUID, uuid4
 from datetime import date, datetime
 from core.monitoring import apm_collector, health_metrics, PerformanceTimer
 import time
+from core.security import ResourceType
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR, decodificar_cursor, paginar, siguiente_cursor
 
 router = APIRouter(
     prefix="/tamizaje-oncologico",
     tags=["Tamizaje Oncológico"],
 )
 
+RECURSO_SEGURIDAD = ResourceType.ATENCIÓN_MÉDICA
+
 # =============================================================================
 # CRUD BÁSICO CONSOLIDADO
 # =============================================================================
@@ -208,8 +214,10 @@ def obtener_tamizaje_oncologico(
 
 @router.get("/", response_model=List[TamizajeOncologicoResponse])
 def listar_tamizajes_oncologicos(
+    response: Response,
     limite: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a offset"),
     paciente_id: Optional[UUID] = None,
     tipo_tamizaje: Optional[str] = None,
     fecha_desde: Optional[date] = None,
@@ -219,7 +227,12 @@ def listar_tamizajes_oncologicos(
 ):
     """
     Listar tamizajes oncológicos con filtros avanzados.
+    
+    Paginación: `offset` o, para páginas profundas, `cursor` con el valor de la
+    cabecera X-Next-Cursor de la respuesta anterior (ausente en la última página).
     """
+    posicion = decodificar_cursor(cursor)
+    
     try:
         # Construir consulta
         query = db.table("tamizaje_oncologico").select("*")
@@ -237,11 +250,15 @@ def listar_tamizajes_oncologicos(
             query = query.lte("fecha_tamizaje", fecha_hasta.isoformat())
         
         # Aplicar paginación y ordenamiento
-        response = query.order("fecha_tamizaje", desc=True).range(offset, offset + limite - 1).execute()
+        resultado = paginar(query, "fecha_tamizaje", limite, offset, posicion).execute()
+        
+        proximo = siguiente_cursor(resultado.data, "fecha_tamizaje", limite, posicion, admite_nulos=False)
+        if proximo:
+            response.headers[CABECERA_SIGUIENTE_CURSOR] = proximo
         
         # Procesar respuesta y agregar campos calculados
         tamizajes_procesados = []
-        for tamizaje_data in response.data:
+        for tamizaje_data in resultado.data:
             tamizaje_data["nivel_riesgo"] = calcular_nivel_riesgo(tamizaje_data["tipo_tamizaje"], tamizaje_data)
             tamizaje_data["adherencia_tamizaje"] = calcular_adherencia_tamizaje(
                 tamizaje_data["tipo_tamizaje"], 
@@ -474,39 +491,19 @@ def obtener_tamizajes_cronologicos_paciente(
 
 @router.get("/estadisticas/basicas", response_model=dict)
 def obtener_estadisticas_basicas(db: Client = Depends(get_supabase_client)):
-    """Obtener estadísticas básicas de Tamizaje Oncológico."""
+    """Obtener estadísticas básicas de Tamizaje Oncológico (un único agregado en BD)."""
     try:
-        # Total de tamizajes
-        total_response = db.table("tamizaje_oncologico").select("id", count="exact").execute()
-        total = total_response.count or 0
+        conteos = db.rpc("estadisticas_tamizaje_oncologico", {}).execute().data or {}
+        
+        total = conteos.get("total", 0)
+        positivos = conteos.get("positivos", 0)
+        negativos = conteos.get("negativos", 0)
+        seguimiento_especializado = conteos.get("seguimiento_especializado", 0)
         
         # Por tipo de tamizaje
         tipos = ["Cuello Uterino", "Mama", "Prostata", "Colon y Recto"]
-        estadisticas_por_tipo = {}
-        
-        for tipo in tipos:
-            tipo_response = db.table("tamizaje_oncologico")\
-                .select("id", count="exact")\
-                .eq("tipo_tamizaje", tipo)\
-                .execute()
-            estadisticas_por_tipo[tipo] = tipo_response.count or 0
-        
-        # Tamizajes por resultado
-        positivos = db.table("tamizaje_oncologico")\
-            .select("id", count="exact")\
-            .in_("resultado_tamizaje", ["Positivo", "Anormal"])\
-            .execute().count or 0
-        
-        negativos = db.table("tamizaje_oncologico")\
-            .select("id", count="exact")\
-            .eq("resultado_tamizaje", "Negativo")\
-            .execute().count or 0
-        
-        # Tamizajes con seguimiento requerido
-        seguimiento_especializado = db.table("tamizaje_oncologico")\
-            .select("id", count="exact")\
-            .eq("requiere_seguimiento_especializado", True)\
-            .execute().count or 0
+        por_tipo = conteos.get("por_tipo") or {}
+        estadisticas_por_tipo = {tipo: por_tipo.get(tipo, 0) for tipo in tipos}
         
         return {
             "resumen_general": {
@@ -542,17 +539,15 @@ def reporte_adherencia_tamizaje(
 ):
     """Reporte de adherencia a tamizajes oncológicos."""
     try:
-        query = db.table("tamizaje_oncologico").select("*")
-        
-        if tipo_tamizaje:
-            query = query.eq("tipo_tamizaje", tipo_tamizaje)
-        if fecha_desde:
-            query = query.gte("fecha_tamizaje", fecha_desde.isoformat())
-        if fecha_hasta:
-            query = query.lte("fecha_tamizaje", fecha_hasta.isoformat())
-        
-        response = query.execute()
-        tamizajes = response.data
+        # Filtros y clasificación en BD: solo viajan los conteos por adherencia
+        conteos = db.rpc("adherencia_tamizaje_oncologico", {
+            "p_intervalos": INTERVALOS_TAMIZAJE_DIAS,
+            "p_intervalo_defecto": INTERVALO_TAMIZAJE_DEFECTO_DIAS,
+            "p_fecha_referencia": date.today().isoformat(),
+            "p_tipo_tamizaje": tipo_tamizaje,
+            "p_fecha_desde": fecha_desde.isoformat() if fecha_desde else None,
+            "p_fecha_hasta": fecha_hasta.isoformat() if fecha_hasta else None
+        }).execute().data or {}
         
         # Análisis de adherencia
         adherencia_stats = {
@@ -562,16 +557,13 @@ def reporte_adherencia_tamizaje(
             "No evaluada": 0
         }
         
-        for tamizaje in tamizajes:
-            fecha_tamizaje = datetime.fromisoformat(tamizaje["fecha_tamizaje"]).date()
-            adherencia = calcular_adherencia_tamizaje(tamizaje["tipo_tamizaje"], fecha_tamizaje)
-            
+        for adherencia, cantidad in (conteos.get("por_adherencia") or {}).items():
             if adherencia in adherencia_stats:
-                adherencia_stats[adherencia] += 1
+                adherencia_stats[adherencia] += cantidad
             else:
-                adherencia_stats["No evaluada"] += 1
+                adherencia_stats["No evaluada"] += cantidad
         
-        total_tamizajes = len(tamizajes)
+        total_tamizajes = conteos.get("total", 0)
         
         return {
             "parametros_reporte": {
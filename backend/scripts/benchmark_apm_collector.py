@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# ===================================================================
+# SCRIPT: Benchmark costo por request del APM collector
+# ===================================================================
+# Descripción: Mide el costo de track_endpoint_performance con N requests
+#              ya acumulados, frente al registro anterior basado en listas
+#              que se reconstruían en cada request
+# Autor: Backend Team - IPS Santa Helena del Valle
+# Fecha: 18 octubre 2026
+# Uso: cd backend && python scripts/benchmark_apm_collector.py [1000 10000 86400]
+# ===================================================================
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.monitoring import APMMetricsCollector
+
+
+def registro_anterior(metric: dict, status_code: int, response_time: float):
+    """Registro previo: append + slicing del P95 + filtrado de 24h en cada request"""
+    metric["p95_response_times"].append(response_time)
+    if len(metric["p95_response_times"]) > 100:
+        metric["p95_response_times"] = metric["p95_response_times"][-100:]
+    metric["last_24h_requests"].append({
+        "timestamp": datetime.now(),
+        "hour": datetime.now().hour,
+        "status_code": status_code,
+        "response_time": response_time
+    })
+    cutoff = datetime.now() - timedelta(hours=24)
+    metric["last_24h_requests"] = [
+        r for r in metric["last_24h_requests"] if r["timestamp"] > cutoff
+    ]
+
+
+def medir(registrar, muestras: int = 1000) -> float:
+    """Microsegundos promedio por request"""
+    inicio = time.perf_counter()
+    for _ in range(muestras):
+        registrar()
+    return (time.perf_counter() - inicio) / muestras * 1e6
+
+
+def main():
+    acumulados = [int(n) for n in sys.argv[1:]] or [1_000, 10_000, 86_400]
+
+    print(f"{'requests en 24h':>16} {'anterior':>12} {'actual':>10} {'CPU a 1k req/s':>15}")
+    for n in acumulados:
+        # Llenado directo: reconstruir la lista n veces tomaría minutos con n grande
+        ahora = datetime.now()
+        anterior = {
+            "p95_response_times": [0.01] * 100,
+            "last_24h_requests": [
+                {"timestamp": ahora, "hour": ahora.hour, "status_code": 200, "response_time": 0.01}
+                for _ in range(n)
+            ]
+        }
+        t_anterior = medir(lambda: registro_anterior(anterior, 200, 0.01), muestras=200)
+
+        collector = APMMetricsCollector()
+        for _ in range(n):
+            collector.track_endpoint_performance("/pacientes/", "GET", 200, 0.01)
+        t_actual = medir(lambda: collector.track_endpoint_performance("/pacientes/", "GET", 200, 0.01))
+
+        print(f"{n:>16} {t_anterior:>10.1f}us {t_actual:>8.2f}us {t_actual * 1000 / 1e6 * 100:>14.3f}%")
+
+
+if __name__ == "__main__":
+    main()
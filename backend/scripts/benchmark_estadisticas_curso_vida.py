@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# ===================================================================
+# SCRIPT: Benchmark motor de estadísticas por curso de vida
+# ===================================================================
+# Descripción: Compara el cálculo fila a fila (calcular_campos_automaticos)
+#              contra el motor columnar en 10k y 100k atenciones sintéticas
+# Autor: Backend Team - IPS Santa Helena del Valle
+# Fecha: 18 octubre 2026
+# Uso: cd backend && python scripts/benchmark_estadisticas_curso_vida.py [10000 100000]
+# ===================================================================
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.estadisticas_curso_vida import (
+    estadisticas_infancia,
+    estadisticas_adolescencia,
+    reporte_desarrollo_psicosocial
+)
+from tests.test_estadisticas_curso_vida import (
+    generar_atenciones_infancia,
+    generar_atenciones_adolescencia,
+    referencia_estadisticas_infancia,
+    referencia_estadisticas_adolescencia,
+    referencia_reporte_desarrollo_psicosocial,
+    _json
+)
+
+CASOS = [
+    ("infancia /estadisticas/basicas", generar_atenciones_infancia,
+     referencia_estadisticas_infancia, estadisticas_infancia),
+    ("adolescencia /estadisticas/basicas", generar_atenciones_adolescencia,
+     referencia_estadisticas_adolescencia, estadisticas_adolescencia),
+    ("adolescencia /reportes/desarrollo-psicosocial", generar_atenciones_adolescencia,
+     referencia_reporte_desarrollo_psicosocial, reporte_desarrollo_psicosocial),
+]
+
+
+def cronometrar(funcion, datos, repeticiones: int = 3):
+    """Mejor tiempo de `repeticiones` ejecuciones y el último resultado"""
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(datos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    tamanos = [int(n) for n in sys.argv[1:]] or [10_000, 100_000]
+
+    print(f"{'endpoint':<48} {'filas':>8} {'fila a fila':>12} {'columnar':>10} {'speedup':>8}  JSON")
+    for nombre, generar, referencia, motor in CASOS:
+        for n in tamanos:
+            datos = generar(n)
+            t_ref, r_ref = cronometrar(referencia, datos)
+            t_motor, r_motor = cronometrar(motor, datos)
+            if hasattr(r_ref, "model_dump_json"):
+                r_motor = type(r_ref)(**r_motor)
+            identico = "idéntico" if _json(r_ref) == _json(r_motor) else "DIFERENTE"
+            print(f"{nombre:<48} {n:>8} {t_ref * 1000:>10.1f}ms {t_motor * 1000:>8.1f}ms "
+                  f"{t_ref / t_motor:>7.1f}x  {identico}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# ===================================================================
+# SCRIPT: Benchmark del middleware de instrumentación
+# ===================================================================
+# Descripción: Compara el costo por request de InstrumentacionMiddleware
+#              contra el esquema anterior de tres middlewares HTTP
+#              (BaseHTTPMiddleware) apilados, y el throughput de una
+#              respuesta en streaming grande a través de cada uno
+# Autor: Backend Team - IPS Santa Helena del Valle
+# Fecha: 18 octubre 2026
+# Uso: cd backend && python scripts/benchmark_middleware.py [requests]
+# ===================================================================
+
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from core.error_handling import logger
+from core.middleware import InstrumentacionMiddleware
+from core.monitoring import registrar_request
+
+TROZO = b"x" * 65536
+TROZOS_STREAMING = 1024  # 64 MiB
+
+
+def _app_base() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/pacientes/{paciente_id}")
+    async def leer(paciente_id: str):
+        return {"id": paciente_id}
+
+    @app.get("/archivo")
+    async def archivo():
+        async def generar():
+            for _ in range(TROZOS_STREAMING):
+                yield TROZO
+        return StreamingResponse(generar(), media_type="text/plain")
+
+    return app
+
+
+def app_middlewares_apilados() -> FastAPI:
+    """Réplica del esquema anterior: logging, métricas y seguridad como http middlewares"""
+    app = _app_base()
+
+    async def logging_http(request, call_next):
+        correlation_id = str(uuid.uuid4())[:8]
+        inicio = time.time()
+        logger.info("Request iniciado", path=request.url.path, correlation_id=correlation_id)
+        response = await call_next(request)
+        logger.info("Request completado", status_code=response.status_code,
+                    process_time_seconds=round(time.time() - inicio, 4), correlation_id=correlation_id)
+        response.headers["X-Correlation-ID"] = correlation_id
+        return response
+
+    async def metricas_http(request, call_next):
+        inicio = time.time()
+        response = await call_next(request)
+        registrar_request(request.scope, response.status_code, time.time() - inicio)
+        response.headers["X-Response-Time"] = f"{round((time.time() - inicio) * 1000, 2)}ms"
+        return response
+
+    async def seguridad_http(request, call_next):
+        response = await call_next(request)
+        response.headers["X-Security-Event-ID"] = str(uuid.uuid4())
+        return response
+
+    app.middleware("http")(logging_http)
+    app.middleware("http")(metricas_http)
+    app.middleware("http")(seguridad_http)
+    return app
+
+
+def app_instrumentada() -> FastAPI:
+    app = _app_base()
+    app.add_middleware(InstrumentacionMiddleware)
+    return app
+
+
+async def _request(app, path: str) -> int:
+    """Ejecutar un GET directo sobre la app ASGI; retorna bytes de cuerpo recibidos"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+        "server": ("bench", 80)
+    }
+    recibidos = 0
+    pendiente = [{"type": "http.request", "body": b"", "more_body": False}]
+    desconectado = asyncio.Event()
+
+    async def receive():
+        # Como un servidor real: el cuerpo una vez y luego esperar la desconexión
+        if pendiente:
+            return pendiente.pop()
+        await desconectado.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal recibidos
+        if message["type"] == "http.response.body":
+            recibidos += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return recibidos
+
+
+async def medir(nombre: str, app, requests: int):
+    await _request(app, "/pacientes/calentamiento")
+
+    inicio = time.perf_counter()
+    for i in range(requests):
+        await _request(app, f"/pacientes/{i}")
+    por_request = (time.perf_counter() - inicio) / requests
+
+    inicio = time.perf_counter()
+    recibidos = await _request(app, "/archivo")
+    streaming = time.perf_counter() - inicio
+    assert recibidos == len(TROZO) * TROZOS_STREAMING
+
+    print(f"{nombre:<28} {por_request * 1e6:>9.1f}us/request "
+          f"{recibidos / streaming / 2**20:>9.0f} MiB/s streaming")
+    return por_request
+
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    # Medir el costo del middleware, no la escritura a consola
+    logger.logger.setLevel(logging.WARNING)
+
+    sin_middleware = await medir("sin middleware", _app_base(), requests)
+    apilados = await medir("3 middlewares http", app_middlewares_apilados(), requests)
+    instrumentado = await medir("InstrumentacionMiddleware", app_instrumentada(), requests)
+
+    print(f"\nOverhead por request: apilados {(apilados - sin_middleware) * 1e6:.1f}us, "
+          f"instrumentado {(instrumentado - sin_middleware) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
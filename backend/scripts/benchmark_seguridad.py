@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# ===================================================================
+# SCRIPT: Benchmark de los controles de seguridad por request
+# ===================================================================
+# Descripción: Mide el costo por llamada del rate limiter (token bucket en
+#              memoria) con muchas claves activas y el throughput de
+#              GranularAccessController.check_access
+# Autor: Backend Team - IPS Santa Helena del Valle
+# Fecha: 18 octubre 2026
+# Uso: cd backend && python scripts/benchmark_seguridad.py [llamadas]
+# ===================================================================
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rate_limit import RateLimiter
+from core.security import (
+    LIMITES_RATE_POR_RECURSO,
+    AccessLevel,
+    AccessRequest,
+    GranularAccessController,
+    OperationType,
+    ResourceType,
+    UserContext
+)
+
+
+class _SinRateLimit:
+    def permitir(self, *args):
+        return True
+
+
+def medir(nombre: str, funcion, llamadas: int):
+    inicio = time.perf_counter()
+    for i in range(llamadas):
+        funcion(i)
+    total = time.perf_counter() - inicio
+    print(f"{nombre:<48} {total / llamadas * 1e6:>8.2f}us/llamada {llamadas / total:>12,.0f}/s")
+
+
+def main():
+    llamadas = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    recursos = list(ResourceType)
+
+    limiter = RateLimiter(LIMITES_RATE_POR_RECURSO)
+    medir("rate limit: 1 usuario", lambda i: limiter.permitir("u1", "10.0.0.1", ResourceType.PACIENTE),
+          llamadas)
+
+    limiter = RateLimiter(LIMITES_RATE_POR_RECURSO)
+    medir("rate limit: 10k usuarios x 7 recursos",
+          lambda i: limiter.permitir(f"u{i % 10_000}", "10.0.0.1", recursos[i % len(recursos)]),
+          llamadas)
+
+    usuarios = [
+        UserContext(user_id=f"u{i}", access_level=nivel, ip_address=f"10.0.0.{i}", session_id="s")
+        for i, nivel in enumerate(AccessLevel)
+    ]
+    accesos = [
+        AccessRequest(resource_type=recurso, operation=operacion)
+        for recurso in ResourceType for operacion in (OperationType.READ, OperationType.CREATE)
+    ]
+    casos = [(u, a) for u in usuarios for a in accesos]
+
+    controller = GranularAccessController()
+    controller.rate_limiter = _SinRateLimit()
+    medir("check_access: permisos + riesgo", lambda i: controller.check_access(*casos[i % len(casos)]),
+          llamadas)
+
+    controller = GranularAccessController()
+    medir("check_access: completo (con rate limit)",
+          lambda i: controller.check_access(*casos[i % len(casos)]), llamadas)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,18 @@
 # Autor: Backend Team - IPS Santa Helena del Valle
 # Fecha: 14 septiembre 2025
 # Propósito: Completar variables PEDT (60→119) con datos oficiales DANE
+# Actualizado: 18 octubre 2026 - normalización vectorizada con pandas y carga
+#              con COPY binario a tabla staging + upsert en una transacción
 # ===================================================================
 
 import asyncio
 import asyncpg
 import pandas as pd
 import logging
-import uuid
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict, Optional
-import json
+from typing import Dict
 import time
-import os
 from dotenv import load_dotenv
-import re
 
 # Cargar variables de entorno
 load_dotenv()
@@ -32,6 +29,150 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Grandes grupos CIUO-08 por primer dígito del código
+CATEGORIAS_NIVEL_1 = {
+    '0': 'Ocupaciones militares',
+    '1': 'Directores y gerentes',
+    '2': 'Profesionales científicos e intelectuales',
+    '3': 'Técnicos y profesionales de nivel medio',
+    '4': 'Personal de apoyo administrativo',
+    '5': 'Trabajadores de servicios y vendedores',
+    '6': 'Agricultores y trabajadores calificados',
+    '7': 'Artesanos y trabajadores relacionados',
+    '8': 'Operadores de instalaciones y máquinas',
+    '9': 'Ocupaciones elementales'
+}
+
+# Mismos reemplazos que aplicaba limpiar_texto fila a fila
+TABLA_SIN_TILDES = str.maketrans('áéíóúñüÁÉÍÓÚÑÜ', 'aeiounuAEIOUNU')
+
+FUENTE_DATO = 'Resolución 202 de 2021 - DANE CIUO-08'
+VERSION_CATALOGO = '2021'
+
+# Columnas que carga el importador; id, creado_en, actualizado_en y
+# nombre_busqueda (generada) los pone la BD
+COLUMNAS_CATALOGO = [
+    'codigo_ocupacion_dane',
+    'nombre_ocupacion_normalizado',
+    'categoria_ocupacional_nivel_1',
+    'categoria_ocupacional_nivel_2',
+    'categoria_ocupacional_nivel_3',
+    'categoria_ocupacional_nivel_4',
+    'descripcion_detallada',
+    'nivel_educativo_requerido',
+    'activo',
+    'fuente_dato',
+    'version_catalogo',
+    'metadatos_adicionales'
+]
+
+TABLA_STAGING = 'staging_ocupaciones_dane'
+
+# Temporal de la transacción: desaparece en el COMMIT o en el ROLLBACK
+CREAR_STAGING = f"""
+CREATE TEMP TABLE {TABLA_STAGING} (
+    codigo_ocupacion_dane text NOT NULL,
+    nombre_ocupacion_normalizado text NOT NULL,
+    categoria_ocupacional_nivel_1 text,
+    categoria_ocupacional_nivel_2 text,
+    categoria_ocupacional_nivel_3 text,
+    categoria_ocupacional_nivel_4 text,
+    descripcion_detallada text,
+    nivel_educativo_requerido text,
+    activo boolean,
+    fuente_dato text,
+    version_catalogo text,
+    metadatos_adicionales jsonb
+) ON COMMIT DROP
+"""
+
+# Una sola sentencia: el trigger del resumen del catálogo se ejecuta una vez y
+# las filas sin cambios no se reescriben (re-importar el mismo archivo no genera
+# 10k versiones muertas). Upsert y no reemplazo de tabla: pacientes referencia
+# el catálogo por id y esos ids deben conservarse.
+UPSERT_DESDE_STAGING = f"""
+INSERT INTO catalogo_ocupaciones_dane AS c ({', '.join(COLUMNAS_CATALOGO)})
+SELECT {', '.join(COLUMNAS_CATALOGO)} FROM {TABLA_STAGING}
+ON CONFLICT (codigo_ocupacion_dane) DO UPDATE SET
+    nombre_ocupacion_normalizado = EXCLUDED.nombre_ocupacion_normalizado,
+    categoria_ocupacional_nivel_1 = EXCLUDED.categoria_ocupacional_nivel_1,
+    categoria_ocupacional_nivel_2 = EXCLUDED.categoria_ocupacional_nivel_2,
+    categoria_ocupacional_nivel_3 = EXCLUDED.categoria_ocupacional_nivel_3,
+    categoria_ocupacional_nivel_4 = EXCLUDED.categoria_ocupacional_nivel_4,
+    descripcion_detallada = EXCLUDED.descripcion_detallada,
+    metadatos_adicionales = EXCLUDED.metadatos_adicionales,
+    actualizado_en = NOW()
+WHERE (
+    c.nombre_ocupacion_normalizado, c.categoria_ocupacional_nivel_1,
+    c.categoria_ocupacional_nivel_2, c.categoria_ocupacional_nivel_3,
+    c.categoria_ocupacional_nivel_4, c.descripcion_detallada,
+    c.metadatos_adicionales
+) IS DISTINCT FROM (
+    EXCLUDED.nombre_ocupacion_normalizado, EXCLUDED.categoria_ocupacional_nivel_1,
+    EXCLUDED.categoria_ocupacional_nivel_2, EXCLUDED.categoria_ocupacional_nivel_3,
+    EXCLUDED.categoria_ocupacional_nivel_4, EXCLUDED.descripcion_detallada,
+    EXCLUDED.metadatos_adicionales
+)
+"""
+
+
+def normalizar_ocupaciones(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizar el CSV oficial a las columnas del catálogo con operaciones sobre
+    columnas completas (sin recorrer filas)
+
+    El archivo oficial tiene formato: Código CIUO 08 A.C.;Descripción;;;
+    Descarta headers, filas vacías y códigos inválidos; el código se repite
+    para cada denominación de la ocupación (ver deduplicar_por_codigo).
+    """
+    codigo = df.iloc[:, 0].fillna('').astype(str).str.strip().str.translate(TABLA_SIN_TILDES)
+    descripcion = df.iloc[:, 1].fillna('').astype(str).str.strip().str.translate(TABLA_SIN_TILDES)
+
+    # Corregir código si viene como flotante (ej: 110.0 → 0110)
+    codigo = codigo.str.replace(r'^(\d{1,4})\.0+$', r'\1', regex=True)
+    codigo = codigo.where(~codigo.str.fullmatch(r'\d{1,3}'), codigo.str.zfill(4))
+
+    # Headers, filas vacías y códigos que no son CIUO de 4 dígitos
+    validas = codigo.str.fullmatch(r'\d{4}') & (descripcion != '')
+    codigo = codigo[validas]
+    descripcion = descripcion[validas]
+
+    descripcion_detallada = descripcion.where(
+        descripcion.str.len() <= 500,
+        descripcion.str[:497] + '...'
+    )
+
+    ocupaciones = pd.DataFrame({
+        'codigo_ocupacion_dane': codigo,
+        'nombre_ocupacion_normalizado': descripcion.str[:200],  # Truncar si es muy largo
+        'categoria_ocupacional_nivel_1': codigo.str[0].map(CATEGORIAS_NIVEL_1).fillna('Otras ocupaciones'),
+        'categoria_ocupacional_nivel_2': None,
+        'categoria_ocupacional_nivel_3': None,
+        'categoria_ocupacional_nivel_4': codigo.str[:2],  # Submajor group
+        'descripcion_detallada': descripcion_detallada,
+        'nivel_educativo_requerido': None,
+        'activo': True,
+        'fuente_dato': FUENTE_DATO,
+        'version_catalogo': VERSION_CATALOGO,
+        # Códigos de solo dígitos: no requieren escape JSON
+        'metadatos_adicionales': (
+            '{"ciuo_08": "' + codigo + '", '
+            '"fuente": "Lineamientos técnicos Resolución 202 de 2021", '
+            '"fecha_actualizacion": "Abril 2017", "version": "10"}'
+        )
+    }, columns=COLUMNAS_CATALOGO)
+
+    return ocupaciones
+
+
+def deduplicar_por_codigo(ocupaciones: pd.DataFrame) -> pd.DataFrame:
+    """
+    Una fila por código: ON CONFLICT no admite dos filas con el mismo código en
+    una sentencia. Gana la última, como en el upsert fila a fila anterior.
+    """
+    return ocupaciones.drop_duplicates('codigo_ocupacion_dane', keep='last')
+
+
 class ImportadorOcupacionesDaneOficial:
     """
     Importador especializado para archivo oficial DANE de Resolución 202 de 2021
@@ -45,126 +186,16 @@ class ImportadorOcupacionesDaneOficial:
             'user': 'postgres',
             'password': 'postgres'
         }
-        self.lote_tamano = 1000
         self.estadisticas = {
             'total_procesados': 0,
             'exitosos': 0,
             'errores': 0,
+            'codigos_unicos': 0,
+            'insertados_o_actualizados': 0,
             'tiempo_inicio': 0,
             'tiempo_fin': 0
         }
-    
-    def limpiar_texto(self, texto: str) -> str:
-        """
-        Limpiar y normalizar texto de ocupación
-        """
-        if pd.isna(texto) or not texto:
-            return ''
-        
-        # Convertir a string y limpiar
-        texto_limpio = str(texto).strip()
-        
-        # Reemplazar caracteres especiales comunes
-        replacements = {
-            'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-            'ñ': 'n', 'ü': 'u',
-            'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U',
-            'Ñ': 'N', 'Ü': 'U'
-        }
-        
-        for original, replacement in replacements.items():
-            texto_limpio = texto_limpio.replace(original, replacement)
-        
-        return texto_limpio
-    
-    def extraer_categoria_nivel_1(self, codigo: str) -> str:
-        """
-        Extraer categoría ocupacional nivel 1 basado en código CIUO-08
-        """
-        if not codigo or len(codigo) < 1:
-            return 'Sin Clasificar'
-        
-        primer_digito = codigo[0]
-        
-        categorias = {
-            '0': 'Ocupaciones militares',
-            '1': 'Directores y gerentes',
-            '2': 'Profesionales científicos e intelectuales',
-            '3': 'Técnicos y profesionales de nivel medio',
-            '4': 'Personal de apoyo administrativo',
-            '5': 'Trabajadores de servicios y vendedores',
-            '6': 'Agricultores y trabajadores calificados',
-            '7': 'Artesanos y trabajadores relacionados',
-            '8': 'Operadores de instalaciones y máquinas',
-            '9': 'Ocupaciones elementales'
-        }
-        
-        return categorias.get(primer_digito, 'Otras ocupaciones')
-    
-    def procesar_fila_ocupacion(self, fila: pd.Series) -> Optional[Dict]:
-        """
-        Procesar una fila del CSV oficial y convertir a formato esperado
-        """
-        try:
-            # El archivo oficial tiene formato: Código CIUO 08 A.C.;Descripción;;;
-            codigo_raw = str(fila.iloc[0]) if len(fila) > 0 else ''
-            descripcion_raw = str(fila.iloc[1]) if len(fila) > 1 else ''
-            
-            # Limpiar y validar código
-            codigo = self.limpiar_texto(codigo_raw)
-            descripcion = self.limpiar_texto(descripcion_raw)
-            
-            # Corregir código si viene como flotante (ej: 110.0 → 0110)
-            if codigo and codigo != 'nan':
-                try:
-                    # Si es número flotante, convertir a entero y formatear con ceros
-                    codigo_num = int(float(codigo))
-                    codigo = f"{codigo_num:04d}"  # Formatear con 4 dígitos con ceros a la izquierda
-                except (ValueError, TypeError):
-                    pass  # Mantener código original si no es numérico
-            
-            # Debug: log primeras filas para entender formato
-            if self.estadisticas['total_procesados'] < 5:
-                logger.info(f"DEBUG fila {self.estadisticas['total_procesados']}: codigo='{codigo}', descripcion='{descripcion}'")
-            
-            # Saltar filas de header o vacías
-            if not codigo or not descripcion or codigo in ['Código CIUO 08 A.C.', 'C�digo CIUO 08 A.C.', 'nan']:
-                return None
-            
-            # Validar código CIUO (4 dígitos)
-            if not re.match(r'^\d{4}$', codigo):
-                logger.debug(f"Código no válido: {codigo}")
-                return None
-            
-            # Construir ocupación
-            ocupacion = {
-                'id': str(uuid.uuid4()),
-                'codigo_ocupacion_dane': codigo,
-                'nombre_ocupacion_normalizado': descripcion[:200],  # Truncar si es muy largo
-                'categoria_ocupacional_nivel_1': self.extraer_categoria_nivel_1(codigo),
-                'categoria_ocupacional_nivel_2': None,
-                'categoria_ocupacional_nivel_3': None,
-                'categoria_ocupacional_nivel_4': codigo[:2],  # Submajor group
-                'descripcion_detallada': descripcion if len(descripcion) <= 500 else descripcion[:497] + '...',
-                'nivel_educativo_requerido': None,
-                'activo': True,
-                'fuente_dato': 'Resolución 202 de 2021 - DANE CIUO-08',
-                'version_catalogo': '2021',
-                'metadatos_adicionales': json.dumps({
-                    'ciuo_08': codigo,
-                    'fuente': 'Lineamientos técnicos Resolución 202 de 2021',
-                    'fecha_actualizacion': 'Abril 2017',
-                    'version': '10'
-                }),
-                'creado_en': datetime.now(),
-                'actualizado_en': datetime.now()
-            }
-            
-            return ocupacion
-            
-        except Exception as e:
-            logger.debug(f"Error procesando fila: {e}")
-            return None
+        self.tiempos: Dict[str, float] = {}
     
     async def conectar_database(self) -> asyncpg.Connection:
         """
@@ -184,68 +215,59 @@ class ImportadorOcupacionesDaneOficial:
             logger.error(f"❌ Error conectando a database: {e}")
             raise
     
-    async def insertar_lote_ocupaciones(self, conn: asyncpg.Connection, ocupaciones: List[Dict]) -> int:
+    def leer_csv(self, ruta_archivo: str) -> pd.DataFrame:
         """
-        Insertar un lote de ocupaciones de forma optimizada
+        Leer las dos columnas útiles del CSV oficial como texto
         """
-        if not ocupaciones:
-            return 0
+        # Probar diferentes codificaciones
+        encodings = ['latin-1', 'cp1252', 'iso-8859-1', 'utf-8']
         
-        try:
-            # Query de inserción preparada
-            insert_query = """
-            INSERT INTO catalogo_ocupaciones_dane (
-                id, codigo_ocupacion_dane, nombre_ocupacion_normalizado,
-                categoria_ocupacional_nivel_1, categoria_ocupacional_nivel_2,
-                categoria_ocupacional_nivel_3, categoria_ocupacional_nivel_4,
-                descripcion_detallada, nivel_educativo_requerido,
-                activo, fuente_dato, version_catalogo, metadatos_adicionales,
-                creado_en, actualizado_en
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15
-            ) ON CONFLICT (codigo_ocupacion_dane) DO UPDATE SET
-                nombre_ocupacion_normalizado = EXCLUDED.nombre_ocupacion_normalizado,
-                categoria_ocupacional_nivel_1 = EXCLUDED.categoria_ocupacional_nivel_1,
-                categoria_ocupacional_nivel_2 = EXCLUDED.categoria_ocupacional_nivel_2,
-                categoria_ocupacional_nivel_3 = EXCLUDED.categoria_ocupacional_nivel_3,
-                categoria_ocupacional_nivel_4 = EXCLUDED.categoria_ocupacional_nivel_4,
-                descripcion_detallada = EXCLUDED.descripcion_detallada,
-                metadatos_adicionales = EXCLUDED.metadatos_adicionales,
-                actualizado_en = NOW()
-            """
-            
-            # Preparar datos para inserción masiva
-            datos_insercion = []
-            for ocupacion in ocupaciones:
-                datos_insercion.append((
-                    ocupacion['id'],
-                    ocupacion['codigo_ocupacion_dane'],
-                    ocupacion['nombre_ocupacion_normalizado'],
-                    ocupacion['categoria_ocupacional_nivel_1'],
-                    ocupacion['categoria_ocupacional_nivel_2'],
-                    ocupacion['categoria_ocupacional_nivel_3'],
-                    ocupacion['categoria_ocupacional_nivel_4'],
-                    ocupacion['descripcion_detallada'],
-                    ocupacion['nivel_educativo_requerido'],
-                    ocupacion['activo'],
-                    ocupacion['fuente_dato'],
-                    ocupacion['version_catalogo'],
-                    ocupacion['metadatos_adicionales'],
-                    ocupacion['creado_en'],
-                    ocupacion['actualizado_en']
-                ))
-            
-            # Ejecutar inserción en lote
-            await conn.executemany(insert_query, datos_insercion)
+        for encoding in encodings:
+            try:
+                df = pd.read_csv(
+                    ruta_archivo,
+                    sep=';',  # Separador del archivo oficial
+                    encoding=encoding,
+                    header=None,  # No usar headers automáticos
+                    skiprows=6,  # Saltar hasta la línea de datos
+                    usecols=[0, 1],
+                    dtype=str,  # Conserva ceros a la izquierda del código
+                    na_values=['', ' ', 'nan', 'NaN'],
+                    on_bad_lines='skip'  # Saltar líneas problemáticas
+                )
+                logger.info(f"✅ Codificación exitosa: {encoding}")
+                return df
+            except UnicodeDecodeError:
+                logger.debug(f"❌ Codificación {encoding} falló")
+                continue
+        
+        raise ValueError("No se pudo leer el archivo con ninguna codificación")
+    
+    async def cargar_ocupaciones(self, conn: asyncpg.Connection, ocupaciones: pd.DataFrame) -> int:
+        """
+        COPY binario a una tabla staging y upsert al catálogo en una transacción
+        
+        Si algo falla el catálogo queda como estaba.
+        """
+        async with conn.transaction():
+            await conn.execute(CREAR_STAGING)
             
-            logger.info(f"✅ Lote insertado: {len(ocupaciones)} registros")
-            return len(ocupaciones)
+            inicio = time.perf_counter()
+            # Registros nativos de Python para el codec binario de asyncpg
+            registros = ocupaciones.astype(object).where(ocupaciones.notna(), None)
+            await conn.copy_records_to_table(
+                TABLA_STAGING,
+                records=registros.itertuples(index=False, name=None),
+                columns=COLUMNAS_CATALOGO
+            )
+            self.tiempos['copy'] = time.perf_counter() - inicio
             
-        except Exception as e:
-            logger.error(f"❌ Error insertando lote: {e}")
-            if ocupaciones:
-                logger.debug(f"Primer registro del lote: {ocupaciones[0]}")
-            return 0
+            inicio = time.perf_counter()
+            resultado = await conn.execute(UPSERT_DESDE_STAGING)
+            self.tiempos['upsert'] = time.perf_counter() - inicio
+        
+        # Tag de comando: "INSERT 0 <filas>"
+        return int(resultado.split()[-1])
     
     async def importar_desde_csv(self, ruta_archivo: str):
         """
@@ -276,70 +298,31 @@ class ImportadorOcupacionesDaneOficial:
             
             logger.info(f"📊 Leyendo archivo: {ruta_archivo}")
             
-            # Probar diferentes codificaciones
-            encodings = ['latin-1', 'cp1252', 'iso-8859-1', 'utf-8']
-            df = None
+            inicio = time.perf_counter()
+            df = self.leer_csv(ruta_archivo)
+            self.tiempos['lectura'] = time.perf_counter() - inicio
             
-            for encoding in encodings:
-                try:
-                    logger.info(f"🔧 Probando codificación: {encoding}")
-                    df = pd.read_csv(
-                        ruta_archivo,
-                        sep=';',  # Separador del archivo oficial
-                        encoding=encoding,
-                        header=None,  # No usar headers automáticos
-                        skiprows=6,  # Saltar hasta la línea de datos
-                        na_values=['', ' ', 'nan', 'NaN'],
-                        on_bad_lines='skip'  # Saltar líneas problemáticas
-                    )
-                    logger.info(f"✅ Codificación exitosa: {encoding}")
-                    break
-                except UnicodeDecodeError:
-                    logger.debug(f"❌ Codificación {encoding} falló")
-                    continue
+            inicio = time.perf_counter()
+            ocupaciones = normalizar_ocupaciones(df)
+            self.tiempos['normalizacion'] = time.perf_counter() - inicio
             
-            if df is None:
-                logger.error("❌ No se pudo leer el archivo con ninguna codificación")
-                return
+            self.estadisticas['total_procesados'] = len(df)
+            self.estadisticas['exitosos'] = len(ocupaciones)
+            self.estadisticas['errores'] = len(df) - len(ocupaciones)
+            
+            ocupaciones = deduplicar_por_codigo(ocupaciones)
+            self.estadisticas['codigos_unicos'] = len(ocupaciones)
             
             logger.info(f"📋 Estructura del archivo:")
             logger.info(f"   - Filas detectadas: {len(df)}")
-            logger.info(f"   - Columnas: {len(df.columns)}")
+            logger.info(f"   - Filas válidas: {self.estadisticas['exitosos']}")
+            logger.info(f"   - Códigos CIUO únicos: {self.estadisticas['codigos_unicos']}")
             
-            # Procesar en lotes
-            lote_numero = 1
-            total_filas = len(df)
+            if ocupaciones.empty:
+                logger.error("❌ El archivo no tiene ocupaciones válidas")
+                return
             
-            for inicio in range(0, total_filas, self.lote_tamano):
-                fin = min(inicio + self.lote_tamano, total_filas)
-                chunk = df.iloc[inicio:fin]
-                
-                logger.info(f"📦 Procesando lote {lote_numero} (filas {inicio+1}-{fin})...")
-                
-                # Procesar chunk
-                ocupaciones_procesadas = []
-                
-                for index, fila in chunk.iterrows():
-                    ocupacion = self.procesar_fila_ocupacion(fila)
-                    if ocupacion:
-                        ocupaciones_procesadas.append(ocupacion)
-                        self.estadisticas['exitosos'] += 1
-                    else:
-                        self.estadisticas['errores'] += 1
-                    
-                    self.estadisticas['total_procesados'] += 1
-                
-                # Insertar lote
-                if ocupaciones_procesadas:
-                    insertados = await self.insertar_lote_ocupaciones(conn, ocupaciones_procesadas)
-                    logger.info(f"   ✅ {insertados}/{len(ocupaciones_procesadas)} registros insertados")
-                
-                lote_numero += 1
-                
-                # Progress feedback cada 10 lotes
-                if lote_numero % 10 == 0:
-                    progreso = (inicio / total_filas) * 100
-                    logger.info(f"📈 PROGRESO: {progreso:.1f}% - {self.estadisticas['exitosos']} ocupaciones procesadas")
+            self.estadisticas['insertados_o_actualizados'] = await self.cargar_ocupaciones(conn, ocupaciones)
             
             # Verificar resultado final
             await self.verificar_importacion(conn)
@@ -375,11 +358,13 @@ class ImportadorOcupacionesDaneOficial:
             logger.info(f"   - Categorías nivel 1: {categorias_nivel_1}")
             logger.info(f"   - Test búsqueda: {test_busqueda}")
             
-            if total_registros > 5000:  # Esperamos al menos 5k ocupaciones
+            # Una fila por código CIUO (codigo_ocupacion_dane es UNIQUE)
+            esperados = self.estadisticas['codigos_unicos']
+            if total_registros >= esperados:
                 logger.info("✅ IMPORTACIÓN EXITOSA - Catálogo DANE oficial listo")
                 return True
             else:
-                logger.warning(f"⚠️ Solo {total_registros} registros importados, esperábamos >5000")
+                logger.warning(f"⚠️ Solo {total_registros} registros importados, esperábamos {esperados}")
                 return False
                 
         except Exception as e:
@@ -397,8 +382,17 @@ class ImportadorOcupacionesDaneOficial:
         logger.info(f"📊 Total procesados: {self.estadisticas['total_procesados']}")
         logger.info(f"✅ Exitosos: {self.estadisticas['exitosos']}")
         logger.info(f"❌ Errores: {self.estadisticas['errores']}")
+        logger.info(f"🔑 Códigos CIUO únicos: {self.estadisticas['codigos_unicos']}")
+        logger.info(f"💾 Insertados/actualizados: {self.estadisticas['insertados_o_actualizados']}")
+        for fase in ('lectura', 'normalizacion', 'copy', 'upsert'):
+            if fase in self.tiempos:
+                logger.info(f"   - {fase}: {self.tiempos[fase] * 1000:.1f} ms")
         logger.info(f"⚡ Velocidad: {self.estadisticas['total_procesados']/duracion:.2f} registros/segundo")
         
+        carga = self.tiempos.get('copy', 0) + self.tiempos.get('upsert', 0)
+        if carga:
+            logger.info(f"⚡ Velocidad carga (COPY + upsert): {self.estadisticas['codigos_unicos']/carga:.2f} registros/segundo")
+        
         if self.estadisticas['exitosos'] > 5000:
             logger.info("🎉 ¡IMPORTACIÓN COMPLETADA EXITOSAMENTE!")
             logger.info("🚀 Variables PEDT listas: Base sólida para 119/119 variables")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# ===================================================================
+# SCRIPT: Prueba de carga de endpoints (latencia p50/p99 vs concurrencia)
+# ===================================================================
+# Descripción: Lanza rondas de peticiones concurrentes contra la API en
+#              ejecución y reporta p50/p99 por nivel de concurrencia
+# Autor: Backend Team - IPS Santa Helena del Valle
+# Fecha: 18 octubre 2026
+# Propósito: Verificar que las rutas sobre el pool asíncrono mantienen el
+#            p99 estable al crecer la concurrencia
+# Uso: python scripts/prueba_carga_endpoints.py --url http://localhost:8000 \
+#          --ruta /atencion-infancia/ --concurrencias 1,10,50,100
+# ===================================================================
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+
+def percentil(latencias: List[float], p: float) -> float:
+    ordenadas = sorted(latencias)
+    indice = max(0, min(len(ordenadas) - 1, int(round(p / 100 * len(ordenadas))) - 1))
+    return ordenadas[indice]
+
+
+async def ronda(cliente: httpx.AsyncClient, ruta: str, concurrencia: int, peticiones: int):
+    """Ejecuta `peticiones` GET manteniendo `concurrencia` en vuelo"""
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias: List[float] = []
+    errores = 0
+
+    async def una():
+        nonlocal errores
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.get(ruta)
+                if respuesta.status_code >= 500:
+                    errores += 1
+            except httpx.HTTPError:
+                errores += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    await asyncio.gather(*(una() for _ in range(peticiones)))
+    return latencias, errores
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga: p50/p99 por nivel de concurrencia")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--ruta", default="/atencion-infancia/")
+    parser.add_argument("--concurrencias", default="1,10,50,100")
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones por nivel")
+    args = parser.parse_args()
+
+    limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limites) as cliente:
+        print(f"{'concurrencia':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'req/s':>8} {'errores':>8}")
+        for concurrencia in (int(n) for n in args.concurrencias.split(",")):
+            inicio = time.perf_counter()
+            latencias, errores = await ronda(cliente, args.ruta, concurrencia, args.peticiones)
+            duracion = time.perf_counter() - inicio
+            print(f"{concurrencia:>12} {percentil(latencias, 50) * 1000:>10.1f} "
+                  f"{percentil(latencias, 99) * 1000:>10.1f} {len(latencias) / duracion:>8.1f} {errores:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -16,7 +16,7 @@ from typing import Dict, List, Optional, Any
 from datetime import date, datetime
 from uuid import UUID
 from models.atencion_vejez_model_fixed import AtencionVejezCrear, AtencionVejezActualizar, AtencionVejezResponse
-from database import get_supabase_client
+from supabase import AsyncClient
 
 class AtencionVejezService:
     """
@@ -173,11 +173,12 @@ class AtencionVejezService:
         return recomendaciones
 
     @staticmethod
-    async def crear_atencion_vejez_completa(atencion_data: AtencionVejezCrear) -> AtencionVejezResponse:
+    async def crear_atencion_vejez_completa(db: AsyncClient, atencion_data: AtencionVejezCrear) -> AtencionVejezResponse:
         """
         Crear atención vejez completa usando RPC transaccional y lógica de negocio centralizada.
 
         Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
             atencion_data: Datos para crear la atención
 
         Returns:
@@ -197,8 +198,6 @@ class AtencionVejezService:
         recomendaciones = AtencionVejezService.generar_recomendaciones_vejez(atencion_data)
 
         # PASO 4: Preparar datos para RPC
-        db = get_supabase_client()
-
         # Agregar recomendaciones al plan si no existe
         plan_final = atencion_data.plan_promocion_prevencion or ""
         if recomendaciones:
@@ -301,7 +300,7 @@ class AtencionVejezService:
         }
 
         # PASO 5: Ejecutar RPC transaccional
-        response = db.rpc("crear_atencion_vejez_completa", rpc_params).execute()
+        response = await db.rpc("crear_atencion_vejez_completa", rpc_params).execute()
 
         if not response.data or len(response.data) == 0:
             raise Exception("Error ejecutando RPC transaccional para atención vejez")
@@ -310,7 +309,7 @@ class AtencionVejezService:
         rpc_result = response.data[0]
         vejez_id = rpc_result["vejez_id"]
 
-        vejez_complete = db.table("atencion_vejez").select("*").eq("id", vejez_id).execute()
+        vejez_complete = await db.table("atencion_vejez").select("*").eq("id", vejez_id).execute()
 
         if not vejez_complete.data:
             raise Exception("Error obteniendo atención vejez creada")
@@ -318,11 +317,12 @@ class AtencionVejezService:
         return AtencionVejezResponse(**vejez_complete.data[0])
 
     @staticmethod
-    async def obtener_atencion_vejez_por_id(atencion_id: UUID) -> AtencionVejezResponse:
+    async def obtener_atencion_vejez_por_id(db: AsyncClient, atencion_id: UUID) -> AtencionVejezResponse:
         """
         Obtener atención vejez por ID con validaciones de negocio centralizadas.
 
         Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
             atencion_id: ID de la atención a buscar
 
         Returns:
@@ -332,9 +332,7 @@ class AtencionVejezService:
             ValueError: Si la atención no existe
             Exception: Si error en consulta
         """
-        db = get_supabase_client()
-
-        response = db.table("atencion_vejez").select("*").eq("id", str(atencion_id)).execute()
+        response = await db.table("atencion_vejez").select("*").eq("id", str(atencion_id)).execute()
 
         if not response.data:
             raise ValueError("Atención vejez no encontrada")
@@ -342,11 +340,12 @@ class AtencionVejezService:
         return AtencionVejezResponse(**response.data[0])
 
     @staticmethod
-    async def listar_atenciones_vejez(skip: int = 0, limit: int = 100) -> List[AtencionVejezResponse]:
+    async def listar_atenciones_vejez(db: AsyncClient, skip: int = 0, limit: int = 100) -> List[AtencionVejezResponse]:
         """
         Listar atenciones vejez con paginación y validaciones centralizadas.
 
         Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
             skip: Número de registros a omitir
             limit: Límite de registros a retornar
 
@@ -363,18 +362,17 @@ class AtencionVejezService:
         if limit < 1 or limit > 1000:
             raise ValueError("limit debe estar entre 1 y 1000")
 
-        db = get_supabase_client()
-
-        response = db.table("atencion_vejez").select("*").range(skip, skip + limit - 1).execute()
+        response = await db.table("atencion_vejez").select("*").range(skip, skip + limit - 1).execute()
 
         return [AtencionVejezResponse(**item) for item in response.data]
 
     @staticmethod
-    async def listar_atenciones_vejez_por_paciente(paciente_id: UUID) -> List[AtencionVejezResponse]:
+    async def listar_atenciones_vejez_por_paciente(db: AsyncClient, paciente_id: UUID) -> List[AtencionVejezResponse]:
         """
         Listar atenciones vejez por paciente con validaciones centralizadas.
 
         Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
             paciente_id: ID del paciente
 
         Returns:
@@ -383,9 +381,7 @@ class AtencionVejezService:
         Raises:
             Exception: Si error en consulta
         """
-        db = get_supabase_client()
-
-        response = db.table("atencion_vejez").select("*").eq("paciente_id", str(paciente_id)).order("fecha_atencion", desc=True).execute()
+        response = await db.table("atencion_vejez").select("*").eq("paciente_id", str(paciente_id)).order("fecha_atencion", desc=True).execute()
 
         return [AtencionVejezResponse(**item) for item in response.data]
 
@@ -420,11 +416,12 @@ class AtencionVejezService:
             raise ValueError("Puntaje Mini Mental bajo debe ir acompañado de cambios cognitivos reportados")
 
     @staticmethod
-    async def actualizar_atencion_vejez(atencion_id: UUID, atencion_data: dict) -> AtencionVejezResponse:
+    async def actualizar_atencion_vejez(db: AsyncClient, atencion_id: UUID, atencion_data: dict) -> AtencionVejezResponse:
         """
         Actualizar atención vejez con validaciones de negocio centralizadas.
 
         Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
             atencion_id: ID de la atención a actualizar
             atencion_data: Datos de actualización
 
@@ -435,10 +432,8 @@ class AtencionVejezService:
             ValueError: Si validaciones fallan o atención no existe
             Exception: Si error en actualización
         """
-        db = get_supabase_client()
-
         # Verificar que existe
-        existing = db.table("atencion_vejez").select("id").eq("id", str(atencion_id)).execute()
+        existing = await db.table("atencion_vejez").select("id").eq("id", str(atencion_id)).execute()
         if not existing.data:
             raise ValueError("Atención vejez no encontrada")
 
@@ -452,7 +447,7 @@ class AtencionVejezService:
         AtencionVejezService.validar_datos_actualizacion_vejez(update_data)
 
         # Actualizar
-        response = db.table("atencion_vejez").update(update_data).eq("id", str(atencion_id)).execute()
+        response = await db.table("atencion_vejez").update(update_data).eq("id", str(atencion_id)).execute()
 
         if not response.data:
             raise Exception("Error actualizando atención vejez")
@@ -460,11 +455,12 @@ class AtencionVejezService:
         return AtencionVejezResponse(**response.data[0])
 
     @staticmethod
-    async def eliminar_atencion_vejez(atencion_id: UUID) -> Dict[str, str]:
+    async def eliminar_atencion_vejez(db: AsyncClient, atencion_id: UUID) -> Dict[str, str]:
         """
         Eliminar atención vejez y su atención general asociada con lógica centralizada.
 
         Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
             atencion_id: ID de la atención a eliminar
 
         Returns:
@@ -474,10 +470,8 @@ class AtencionVejezService:
             ValueError: Si atención no existe
             Exception: Si error en eliminación
         """
-        db = get_supabase_client()
-
         # Obtener atencion_id general antes de eliminar
-        vejez_record = db.table("atencion_vejez").select("atencion_id").eq("id", str(atencion_id)).execute()
+        vejez_record = await db.table("atencion_vejez").select("atencion_id").eq("id", str(atencion_id)).execute()
 
         if not vejez_record.data:
             raise ValueError("Atención vejez no encontrada")
@@ -485,37 +479,38 @@ class AtencionVejezService:
         atencion_general_id = vejez_record.data[0].get("atencion_id")
 
         # Eliminar de atencion_vejez
-        delete_vejez = db.table("atencion_vejez").delete().eq("id", str(atencion_id)).execute()
+        delete_vejez = await db.table("atencion_vejez").delete().eq("id", str(atencion_id)).execute()
 
         # Eliminar de atenciones si existe referencia
         if atencion_general_id:
-            db.table("atenciones").delete().eq("id", atencion_general_id).execute()
+            await db.table("atenciones").delete().eq("id", atencion_general_id).execute()
 
         return {"message": "Atención vejez eliminada correctamente"}
 
     @staticmethod
-    async def obtener_estadisticas_vejez() -> Dict[str, Any]:
+    async def obtener_estadisticas_vejez(db: AsyncClient) -> Dict[str, Any]:
         """
         Obtener estadísticas especializadas de atenciones vejez.
 
+        Args:
+            db: Cliente Supabase asíncrono de la petición (inyectado por la ruta)
+
         Returns:
             Dict con estadísticas detalladas
         """
-        db = get_supabase_client()
-
         # Estadísticas básicas
-        total_response = db.table("atencion_vejez").select("id", count="exact").execute()
+        total_response = await db.table("atencion_vejez").select("id", count="exact").execute()
         total = total_response.count if total_response.count else 0
 
         # Distribución por deterioro cognitivo
-        deterioro_response = db.table("atencion_vejez").select("deterioro_cognitivo").execute()
+        deterioro_response = await db.table("atencion_vejez").select("deterioro_cognitivo").execute()
         deterioro_dist = {}
         for item in deterioro_response.data:
             deterioro = item.get("deterioro_cognitivo", "NO_REGISTRADO")
             deterioro_dist[deterioro] = deterioro_dist.get(deterioro, 0) + 1
 
         # Distribución por riesgo caídas
-        caidas_response = db.table("atencion_vejez").select("riesgo_caidas").execute()
+        caidas_response = await db.table("atencion_vejez").select("riesgo_caidas").execute()
         caidas_dist = {}
         for item in caidas_response.data:
             riesgo = item.get("riesgo_caidas", "NO_REGISTRADO")
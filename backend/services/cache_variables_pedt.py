@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+CACHE INCREMENTAL DE VARIABLES PEDT - RESOLUCIÓN 202 DE 2021
+=============================================================
+
+Persiste en disco (SQLite) el vector de 119 variables calculado para cada
+paciente junto con su huella: un hash de la versión (id, creado_en, updated_at)
+de cada fila fuente que lee el cálculo, la edad del paciente y la versión de
+la lógica de cálculo.
+
+Entre corridas mensuales la mayoría de pacientes no cambia. El generador
+consulta solo las columnas de versión, compara huellas y recalcula únicamente
+los pacientes cuya huella difiere de la guardada.
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from datetime import datetime
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+RUTA_CACHE_PEDT = os.environ.get(
+    'PEDT_RUTA_CACHE', os.path.join(tempfile.gettempdir(), 'pedt_cache_variables.sqlite3')
+)
+TAMANO_CONSULTA_CACHE = 500  # Parámetros por sentencia (SQLite limita los placeholders)
+
+
+class CacheVariablesPEDT:
+    """
+    Almacén persistente paciente_id -> (huella, variables PEDT)
+
+    Seguro para uso desde varios hilos del mismo proceso.
+    """
+
+    def __init__(self, ruta: Optional[str] = None):
+        self.ruta = ruta or RUTA_CACHE_PEDT
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute(
+            'CREATE TABLE IF NOT EXISTS variables_pedt ('
+            ' paciente_id TEXT PRIMARY KEY,'
+            ' huella TEXT NOT NULL,'
+            ' variables TEXT NOT NULL,'
+            ' calculado_en TEXT NOT NULL)'
+        )
+        self._conexion.commit()
+
+    def obtener_vigentes(self, huellas: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Variables guardadas de los pacientes cuya huella coincide con la actual
+
+        Args:
+            huellas: paciente_id -> huella calculada con los datos actuales
+
+        Returns:
+            paciente_id -> variables PEDT, solo para entradas vigentes
+        """
+        vigentes = {}
+        ids = list(huellas)
+        with self._lock:
+            for inicio in range(0, len(ids), TAMANO_CONSULTA_CACHE):
+                bloque = ids[inicio:inicio + TAMANO_CONSULTA_CACHE]
+                filas = self._conexion.execute(
+                    f'SELECT paciente_id, huella, variables FROM variables_pedt '
+                    f'WHERE paciente_id IN ({",".join("?" * len(bloque))})',
+                    bloque
+                ).fetchall()
+                for paciente_id, huella, variables in filas:
+                    if huella == huellas[paciente_id]:
+                        vigentes[paciente_id] = json.loads(variables)
+        return vigentes
+
+    def guardar(self, entradas: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Guarda (paciente_id, huella, variables) reemplazando entradas previas"""
+        calculado_en = datetime.now().isoformat()
+        filas = [
+            (paciente_id, huella, json.dumps(variables, default=str), calculado_en)
+            for paciente_id, huella, variables in entradas
+        ]
+        with self._lock:
+            self._conexion.executemany(
+                'INSERT OR REPLACE INTO variables_pedt (paciente_id, huella, variables, calculado_en) '
+                'VALUES (?, ?, ?, ?)',
+                filas
+            )
+            self._conexion.commit()
+
+    def invalidar(self, paciente_ids: Optional[List[str]] = None) -> None:
+        """Elimina las entradas de los pacientes dados, o todas si None"""
+        with self._lock:
+            if paciente_ids is None:
+                self._conexion.execute('DELETE FROM variables_pedt')
+            else:
+                self._conexion.executemany(
+                    'DELETE FROM variables_pedt WHERE paciente_id = ?', [(str(pid),) for pid in paciente_ids]
+                )
+            self._conexion.commit()
+
+    def total_entradas(self) -> int:
+        with self._lock:
+            return self._conexion.execute('SELECT COUNT(*) FROM variables_pedt').fetchone()[0]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+
+_cache_compartida: Optional[CacheVariablesPEDT] = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_pedt() -> CacheVariablesPEDT:
+    """Instancia de cache compartida por el proceso (ruta PEDT_RUTA_CACHE)"""
+    global _cache_compartida
+    with _cache_lock:
+        if _cache_compartida is None:
+            _cache_compartida = CacheVariablesPEDT()
+        return _cache_compartida
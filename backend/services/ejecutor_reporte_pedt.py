@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+EJECUTOR PARALELO DE REPORTES PEDT - RESOLUCIÓN 202 DE 2021
+============================================================
+
+Ejecuta el reporte PEDT de toda la población dividiendo los pacientes en
+fragmentos. Los datos fuente de cada fragmento se consultan en el proceso
+principal (I/O) y el cálculo de las 119 variables, que es mapeo puro en Python,
+se reparte entre los núcleos con un ProcessPoolExecutor.
+
+Cada fragmento terminado se guarda en disco (checkpoint). Un trabajo
+interrumpido se reanuda desde los fragmentos pendientes en lugar de reiniciar,
+y su progreso se puede consultar mientras corre.
+
+Estructura en disco (un directorio por trabajo):
+    manifiesto.json          -> período, opciones y pacientes de cada fragmento
+    fragmento_000000.jsonl   -> variables PEDT calculadas, una línea por paciente
+    SGD280RPED<fecha>.txt    -> archivo plano final, al completar
+"""
+
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from uuid import UUID
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from services.reporteria_pedt import GeneradorReportePEDT, FuentesLotePEDT, TAMANO_LOTE_PEDT
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_TRABAJOS = os.environ.get(
+    'PEDT_DIRECTORIO_TRABAJOS', os.path.join(tempfile.gettempdir(), 'pedt_trabajos')
+)
+PATRON_TRABAJO_ID = re.compile(r'^rped-\d{4}-(0[1-9]|1[0-2])$')
+
+# Generador del proceso trabajador: se crea una vez por proceso y solo calcula
+# (recibe los datos precargados, nunca consulta la BD)
+_generador_proceso: Optional[GeneradorReportePEDT] = None
+
+
+class _ClienteSinBD:
+    """Cliente de relleno del proceso trabajador: evita crear un cliente Supabase que no se usa"""
+
+    def table(self, nombre: str):
+        raise RuntimeError(f"El proceso trabajador no consulta la BD (tabla {nombre})")
+
+
+def _calcular_fragmento(pacientes: List[Dict[str, Any]],
+                        fuentes: FuentesLotePEDT) -> List[Tuple[str, Dict[str, Any]]]:
+    """Calcula las variables PEDT de un fragmento. Se ejecuta en un proceso del pool."""
+    global _generador_proceso
+    if _generador_proceso is None:
+        _generador_proceso = GeneradorReportePEDT(_ClienteSinBD())
+
+    return [
+        (str(paciente['id']),
+         _generador_proceso._ensamblar_variables_119(UUID(str(paciente['id'])), paciente, fuentes))
+        for paciente in pacientes
+    ]
+
+
+class ConflictoTrabajoPEDT(ValueError):
+    """El trabajo del período ya existe con otras opciones (codigo_entidad, usar_cache)"""
+
+
+def trabajo_id_para_periodo(periodo: str) -> str:
+    """Identificador estable del trabajo de un período (permite reanudarlo)"""
+    return f"rped-{periodo}"
+
+
+class EjecutorReportePEDT:
+    """
+    Trabajo de reporte PEDT reanudable y paralelo para un período
+
+    Uso:
+        ejecutor = EjecutorReportePEDT(periodo='2025-09')
+        ejecutor.ejecutar()            # reanuda si hay checkpoints previos
+        ejecutor.progreso()            # pacientes procesados, ETA, estado
+    """
+
+    def __init__(self, db_client=None, periodo: Optional[str] = None,
+                 directorio_base: Optional[str] = None, max_workers: Optional[int] = None,
+                 tamano_fragmento: int = TAMANO_LOTE_PEDT, codigo_entidad: Optional[str] = None,
+                 cache=None):
+        self.generador = GeneradorReportePEDT(db_client)
+        self.cache = cache
+        self.usar_cache = cache is not None
+        self.periodo = periodo or datetime.now().strftime('%Y-%m')
+        self.generador.nombre_archivo_sispro(self.periodo)  # Valida el formato del período
+        self.trabajo_id = trabajo_id_para_periodo(self.periodo)
+        self.directorio = os.path.join(directorio_base or DIRECTORIO_TRABAJOS, self.trabajo_id)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.tamano_fragmento = tamano_fragmento
+        self.codigo_entidad = codigo_entidad
+
+        self.estado = 'pendiente'
+        self.error: Optional[str] = None
+        self._iniciado_en: Optional[float] = None
+        self._procesados_al_iniciar = 0
+        self._procesados = 0
+
+    # =====================================================
+    # EJECUCIÓN
+    # =====================================================
+
+    def ejecutar(self, paciente_ids: Optional[Iterable[UUID]] = None,
+                 reiniciar: bool = False) -> Dict[str, Any]:
+        """
+        Ejecuta (o reanuda) el trabajo hasta producir el archivo plano final
+
+        Args:
+            paciente_ids: Pacientes a reportar. Si None, todos los de la tabla pacientes.
+                Solo se usa al crear el trabajo; al reanudar se respeta el manifiesto.
+            reiniciar: Descarta checkpoints previos y empieza de cero
+
+        Returns:
+            Dict de progreso al finalizar
+        """
+        try:
+            self.estado = 'ejecutando'
+            manifiesto = self._preparar(paciente_ids, reiniciar)
+            fragmentos = manifiesto['fragmentos']
+            pendientes = [i for i in range(len(fragmentos)) if not os.path.exists(self._ruta_fragmento(i))]
+
+            self._procesados = manifiesto['total_pacientes'] - sum(len(fragmentos[i]) for i in pendientes)
+            self._procesados_al_iniciar = self._procesados
+            self._iniciado_en = time.monotonic()
+            logger.info(f"Trabajo {self.trabajo_id}: {len(pendientes)}/{len(fragmentos)} fragmentos pendientes")
+
+            if pendientes:
+                self._procesar_fragmentos(fragmentos, pendientes)
+
+            self._ensamblar_archivo(len(fragmentos))
+            self.estado = 'completado'
+            logger.info(f"Trabajo {self.trabajo_id} completado: {self._procesados} pacientes")
+            return self.progreso()
+
+        except Exception as e:
+            self.estado = 'error'
+            self.error = str(e)
+            logger.error(f"Error en trabajo {self.trabajo_id}: {str(e)}")
+            raise
+
+    def _procesar_fragmentos(self, fragmentos: List[List[str]], pendientes: List[int]) -> None:
+        """Precarga cada fragmento en este proceso y reparte el cálculo en el pool"""
+        # Se limita el número de fragmentos en vuelo para acotar la memoria
+        max_en_vuelo = self.max_workers * 2
+        # spawn: el trabajo corre en un hilo del servidor y fork con hilos activos no es seguro
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=contexto) as pool:
+            en_vuelo = {}
+            try:
+                for indice in pendientes:
+                    pacientes, fuentes, calculados = self._precargar_fragmento(fragmentos[indice])
+                    if not pacientes:
+                        # Fragmento resuelto completamente desde cache
+                        self._completar_fragmento(indice, fragmentos, calculados, [])
+                        continue
+                    futuro = pool.submit(_calcular_fragmento, pacientes, fuentes)
+                    en_vuelo[futuro] = (indice, calculados)
+
+                    while len(en_vuelo) >= max_en_vuelo:
+                        self._recoger_terminados(en_vuelo, fragmentos)
+
+                while en_vuelo:
+                    self._recoger_terminados(en_vuelo, fragmentos)
+            finally:
+                # Si el trabajo se interrumpe, lo ya calculado queda en checkpoint igualmente
+                for futuro, (indice, calculados) in list(en_vuelo.items()):
+                    if futuro.exception() is None:
+                        self._completar_fragmento(indice, fragmentos, calculados, futuro.result())
+
+    def _precargar_fragmento(self, paciente_ids: List[str]) -> Tuple[List[Dict[str, Any]], FuentesLotePEDT,
+                                                                     Dict[str, Any]]:
+        """
+        Prepara el trabajo de un fragmento en este proceso
+
+        Returns:
+            (pacientes a calcular, fuentes precargadas, calculados) donde calculados
+            contiene 'vigentes' (variables tomadas de cache) y 'huellas' de los pendientes
+        """
+        huellas, vigentes = self.generador._consultar_cache_lote(paciente_ids, self.cache)
+        pendientes = [pid for pid in paciente_ids if pid not in vigentes]
+        fuentes = self.generador._precargar_fuentes_lote(pendientes) if pendientes else FuentesLotePEDT()
+        pacientes = [fuentes.pacientes[pid] for pid in pendientes if pid in fuentes.pacientes]
+
+        # El trabajador recibe los pacientes aparte; los errores del cliente
+        # pueden no ser serializables, así que viajan como RuntimeError
+        fuentes.pacientes = {}
+        fuentes.errores = {fuente: RuntimeError(str(e)) for fuente, e in fuentes.errores.items()}
+        return pacientes, fuentes, {'vigentes': vigentes, 'huellas': huellas}
+
+    def _recoger_terminados(self, en_vuelo: Dict[Any, Tuple[int, Dict[str, Any]]],
+                            fragmentos: List[List[str]]) -> None:
+        terminados, _ = wait(list(en_vuelo), return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            indice, calculados = en_vuelo.pop(futuro)
+            self._completar_fragmento(indice, fragmentos, calculados, futuro.result())
+
+    def _completar_fragmento(self, indice: int, fragmentos: List[List[str]], calculados: Dict[str, Any],
+                             resultados: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Combina cache y resultados en el orden del manifiesto y guarda el checkpoint"""
+        huellas = calculados['huellas']
+        if self.cache is not None:
+            self.cache.guardar((pid, huellas[pid], variables) for pid, variables in resultados if pid in huellas)
+
+        variables_por_paciente = {**calculados['vigentes'], **dict(resultados)}
+        self._guardar_fragmento(indice, [
+            (pid, variables_por_paciente[pid]) for pid in fragmentos[indice] if pid in variables_por_paciente
+        ])
+        self._procesados += len(fragmentos[indice])
+
+    # =====================================================
+    # CHECKPOINTS EN DISCO
+    # =====================================================
+
+    def _preparar(self, paciente_ids: Optional[Iterable[UUID]], reiniciar: bool) -> Dict[str, Any]:
+        """Carga el manifiesto existente o crea uno nuevo con los fragmentos del trabajo"""
+        if reiniciar and os.path.isdir(self.directorio):
+            shutil.rmtree(self.directorio)
+
+        manifiesto = self._leer_manifiesto()
+        if manifiesto is not None:
+            self._verificar_opciones(manifiesto)
+            return manifiesto
+
+        os.makedirs(self.directorio, exist_ok=True)
+        ids = list(dict.fromkeys(
+            str(pid) for pid in (paciente_ids if paciente_ids is not None else self.generador.iterar_ids_pacientes())
+        ))
+        manifiesto = {
+            'trabajo_id': self.trabajo_id,
+            'periodo': self.periodo,
+            'creado_en': datetime.now().isoformat(),
+            'opciones': self.opciones(),
+            'total_pacientes': len(ids),
+            'fragmentos': [ids[i:i + self.tamano_fragmento] for i in range(0, len(ids), self.tamano_fragmento)]
+        }
+        self._escribir_atomico(self._ruta_manifiesto(), json.dumps(manifiesto))
+        return manifiesto
+
+    def opciones(self) -> Dict[str, Any]:
+        """Opciones que determinan el contenido del archivo y forman parte del manifiesto"""
+        return {'codigo_entidad': self.codigo_entidad, 'usar_cache': self.usar_cache}
+
+    def verificar_opciones(self) -> None:
+        """
+        Comprueba que reanudar el trabajo en disco no mezcle opciones distintas
+
+        Raises:
+            ConflictoTrabajoPEDT: si el manifiesto existente se creó con otras opciones
+        """
+        manifiesto = self._leer_manifiesto()
+        if manifiesto is not None:
+            self._verificar_opciones(manifiesto)
+
+    def _verificar_opciones(self, manifiesto: Dict[str, Any]) -> None:
+        # Manifiestos anteriores no registraban opciones: se reanudan como antes
+        previas = manifiesto.get('opciones')
+        if previas is not None and previas != self.opciones():
+            raise ConflictoTrabajoPEDT(
+                f"El trabajo {self.trabajo_id} existe con opciones {previas}; "
+                f"use reiniciar=true para generarlo con {self.opciones()}"
+            )
+
+    def _guardar_fragmento(self, indice: int, resultados: List[Tuple[str, Dict[str, Any]]]) -> None:
+        contenido = ''.join(
+            json.dumps({'paciente_id': pid, 'variables': variables}, default=str) + '\n'
+            for pid, variables in resultados
+        )
+        self._escribir_atomico(self._ruta_fragmento(indice), contenido)
+
+    def _iterar_variables_guardadas(self, total_fragmentos: int) -> Iterator[Dict[str, Any]]:
+        for indice in range(total_fragmentos):
+            with open(self._ruta_fragmento(indice), encoding='utf-8') as fragmento:
+                for linea in fragmento:
+                    yield json.loads(linea)['variables']
+
+    def _ensamblar_archivo(self, total_fragmentos: int) -> None:
+        self.generador.escribir_variables_sispro(
+            self._iterar_variables_guardadas(total_fragmentos),
+            self.ruta_archivo(), self.periodo, self.codigo_entidad
+        )
+
+    def _leer_manifiesto(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ruta_manifiesto(), encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except FileNotFoundError:
+            return None
+
+    def _escribir_atomico(self, ruta: str, contenido: str) -> None:
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.directorio,
+                                         suffix='.tmp', delete=False) as temporal:
+            temporal.write(contenido)
+        os.replace(temporal.name, ruta)
+
+    def _ruta_manifiesto(self) -> str:
+        return os.path.join(self.directorio, 'manifiesto.json')
+
+    def _ruta_fragmento(self, indice: int) -> str:
+        return os.path.join(self.directorio, f'fragmento_{indice:06d}.jsonl')
+
+    def ruta_archivo(self) -> str:
+        """Ruta del archivo plano final del trabajo"""
+        return os.path.join(self.directorio, self.generador.nombre_archivo_sispro(self.periodo))
+
+    # =====================================================
+    # PROGRESO
+    # =====================================================
+
+    def progreso(self) -> Optional[Dict[str, Any]]:
+        """
+        Progreso del trabajo combinando checkpoints en disco y la ejecución en curso
+
+        Returns:
+            Dict con pacientes procesados, porcentaje y ETA, o None si el trabajo no existe
+        """
+        manifiesto = self._leer_manifiesto()
+        if manifiesto is None:
+            return None
+
+        fragmentos = manifiesto['fragmentos']
+        completados = [i for i in range(len(fragmentos)) if os.path.exists(self._ruta_fragmento(i))]
+        procesados = sum(len(fragmentos[i]) for i in completados)
+        total = manifiesto['total_pacientes']
+
+        estado = self.estado
+        if estado == 'pendiente':
+            estado = 'completado' if os.path.exists(self.ruta_archivo()) else 'interrumpido'
+
+        eta_segundos = None
+        if estado == 'ejecutando' and self._iniciado_en is not None:
+            avance = procesados - self._procesados_al_iniciar
+            transcurrido = time.monotonic() - self._iniciado_en
+            if avance > 0:
+                eta_segundos = round(transcurrido / avance * (total - procesados), 1)
+
+        return {
+            'trabajo_id': self.trabajo_id,
+            'periodo': self.periodo,
+            'opciones': manifiesto.get('opciones'),
+            'estado': estado,
+            'error': self.error,
+            'total_pacientes': total,
+            'pacientes_procesados': procesados,
+            'porcentaje': round(procesados / total * 100, 2) if total else 100.0,
+            'fragmentos_totales': len(fragmentos),
+            'fragmentos_completados': len(completados),
+            'eta_segundos': eta_segundos,
+            'archivo': self.ruta_archivo() if estado == 'completado' else None
+        }
+
+
+# =============================================================================
+# REGISTRO DE TRABAJOS EN SEGUNDO PLANO
+# =============================================================================
+
+_trabajos: Dict[str, EjecutorReportePEDT] = {}
+_trabajos_lock = threading.Lock()
+
+
+def iniciar_trabajo(db_client, periodo: Optional[str] = None, reiniciar: bool = False,
+                    **opciones) -> EjecutorReportePEDT:
+    """
+    Inicia (o reanuda) el trabajo del período en un hilo de fondo
+
+    Si el trabajo ya está ejecutándose en este proceso, retorna el existente.
+
+    Raises:
+        ConflictoTrabajoPEDT: si el trabajo del período (en ejecución o en disco)
+            tiene otras opciones y no se pidió reiniciar
+    """
+    with _trabajos_lock:
+        ejecutor = EjecutorReportePEDT(db_client, periodo, **opciones)
+        existente = _trabajos.get(ejecutor.trabajo_id)
+        if existente is not None and existente.estado == 'ejecutando':
+            if existente.opciones() != ejecutor.opciones():
+                raise ConflictoTrabajoPEDT(
+                    f"El trabajo {ejecutor.trabajo_id} se está ejecutando con opciones {existente.opciones()}"
+                )
+            return existente
+
+        if not reiniciar:
+            ejecutor.verificar_opciones()
+
+        ejecutor.estado = 'ejecutando'
+        _trabajos[ejecutor.trabajo_id] = ejecutor
+
+    def _ejecutar():
+        try:
+            ejecutor.ejecutar(reiniciar=reiniciar)
+        except Exception:
+            pass  # El error queda registrado en ejecutor.estado / ejecutor.error
+
+    threading.Thread(target=_ejecutar, name=f"pedt-{ejecutor.trabajo_id}", daemon=True).start()
+    return ejecutor
+
+
+def obtener_trabajo(trabajo_id: str, db_client=None, **opciones) -> Optional[EjecutorReportePEDT]:
+    """
+    Retorna el trabajo activo o, si no está en memoria (p. ej. tras un reinicio),
+    uno reconstruido desde sus checkpoints en disco. None si no existe.
+    """
+    if not PATRON_TRABAJO_ID.match(trabajo_id):
+        return None
+
+    with _trabajos_lock:
+        if trabajo_id in _trabajos:
+            return _trabajos[trabajo_id]
+
+    try:
+        ejecutor = EjecutorReportePEDT(db_client, trabajo_id[len('rped-'):], **opciones)
+    except ValueError:
+        return None  # Período imposible: el trabajo no existe
+    return ejecutor if ejecutor.progreso() is not None else None
@@ -0,0 +1,375 @@
+# =============================================================================
+# Motor de Estadísticas por Curso de Vida - Infancia y Adolescencia
+# Fecha: 18 octubre 2026
+# Objetivo: Calcular estadísticas y reportes sobre columnas (NumPy/pandas) en
+#           lugar de recorrer atención por atención
+# Base: models/atencion_infancia_model.py, models/atencion_adolescencia_model.py
+# =============================================================================
+
+"""
+Cada endpoint de estadísticas consulta solo las columnas que necesita
+(COLUMNAS_*), las carga en un DataFrame y calcula IMC, estado nutricional,
+bandas de riesgo y distribuciones de forma vectorizada.
+
+Las reglas replican exactamente las funciones fila a fila de los modelos
+(calcular_estado_nutricional, calcular_imc_edad, calcular_nivel_riesgo_integral,
+etc.) y las distribuciones conservan el orden de primera aparición de las
+versiones originales, de modo que el JSON resultante es idéntico.
+"""
+
+from typing import Any, Dict, List, Sequence
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# COLUMNAS CONSULTADAS
+# =============================================================================
+
+COLUMNAS_ESTADISTICAS_INFANCIA = [
+    "peso_kg", "talla_cm", "desempeno_escolar", "tamizaje_visual", "tamizaje_auditivo",
+    "tamizaje_salud_bucal", "dificultades_aprendizaje", "numero_caries", "factores_riesgo_identificados"
+]
+
+COLUMNAS_ESTADISTICAS_ADOLESCENCIA = [
+    "edad_anos", "peso_kg", "talla_cm", "presion_sistolica", "presion_diastolica",
+    "antecedentes_familiares_cardiovasculares", "fumador", "sedentarismo",
+    "autoestima", "habilidades_sociales", "proyecto_vida", "problemas_conductuales",
+    "consumo_sustancias", "familia_funcional", "rendimiento_academico",
+    "actividad_fisica_regular", "red_apoyo_social", "salud_mental", "trastorno_alimentario"
+]
+
+# Orden en que identificar_factores_protectores agrega cada factor
+FACTORES_PROTECTORES = [
+    "FAMILIA_FUNCIONAL", "BUEN_RENDIMIENTO_ACADEMICO", "ACTIVIDAD_FISICA_REGULAR",
+    "HABILIDADES_SOCIALES", "PROYECTO_VIDA_CLARO", "RED_APOYO_SOCIAL", "AUTOESTIMA_ADECUADA"
+]
+
+# Ponderaciones de calcular_nivel_riesgo_integral
+PUNTAJE_RIESGO_CARDIOVASCULAR = {"BAJO": 0, "MODERADO": 1, "ALTO": 2, "MUY_ALTO": 3}
+PUNTAJE_DESARROLLO_PSICOSOCIAL = {
+    "APROPIADO": 0, "RIESGO_LEVE": 1, "RIESGO_MODERADO": 2, "RIESGO_ALTO": 3, "REQUIERE_INTERVENCION": 4
+}
+PUNTAJE_SALUD_MENTAL = {
+    "NORMAL": 0, "SINTOMAS_LEVES": 1, "SINTOMAS_MODERADOS": 2, "SINTOMAS_SEVEROS": 3,
+    "REQUIERE_ATENCION_ESPECIALIZADA": 4
+}
+PUNTAJE_CONSUMO_SUSTANCIAS = {
+    "SIN_CONSUMO": 0, "CONSUMO_EXPERIMENTAL": 0, "CONSUMO_OCASIONAL": 1,
+    "CONSUMO_HABITUAL": 3, "CONSUMO_PROBLEMATICO": 4
+}
+PUNTAJE_TRASTORNO_ALIMENTARIO = {
+    "SIN_RIESGO": 0, "RIESGO_BAJO": 0, "RIESGO_MODERADO": 1, "RIESGO_ALTO": 2, "DIAGNOSTICO_CONFIRMADO": 3
+}
+
+# =============================================================================
+# UTILIDADES COLUMNARES
+# =============================================================================
+
+def _marco(filas: Sequence[Dict[str, Any]], columnas: List[str]) -> pd.DataFrame:
+    """DataFrame con exactamente las columnas pedidas (las ausentes quedan en None)"""
+    return pd.DataFrame.from_records(filas, columns=columnas)
+
+
+def _numero(marco: pd.DataFrame, columna: str) -> np.ndarray:
+    return pd.to_numeric(marco[columna]).to_numpy(dtype=float)
+
+
+def _verdadero(marco: pd.DataFrame, columna: str) -> np.ndarray:
+    """Veracidad de una columna booleana que puede traer nulos (None cuenta como False)"""
+    return marco[columna].eq(True).to_numpy()
+
+
+def _texto(marco: pd.DataFrame, columna: str) -> np.ndarray:
+    return marco[columna].to_numpy(dtype=object)
+
+
+def _conteos(valores: np.ndarray) -> Dict[Any, int]:
+    """Conteo por valor en orden de primera aparición (como los dict incrementales)"""
+    if len(valores) == 0:
+        return {}
+    codigos, unicos = pd.factorize(valores, use_na_sentinel=False)
+    return dict(zip(unicos.tolist(), np.bincount(codigos).tolist()))
+
+
+def _clasificar(valores: np.ndarray, cortes: Sequence[float], etiquetas: Sequence[str]) -> np.ndarray:
+    """Etiqueta i si cortes[i-1] <= valor < cortes[i]; NaN cae en la última (como la rama else)"""
+    indices = np.searchsorted(np.asarray(cortes, dtype=float), valores, side="right")
+    indices[np.isnan(valores)] = len(cortes)
+    return np.asarray(etiquetas, dtype=object)[indices]
+
+
+def _promedio(valores: np.ndarray) -> float:
+    """Promedio con la misma suma secuencial que sum() de Python"""
+    return sum(valores.tolist()) / len(valores)
+
+
+def _porcentaje(casos: int, total: int) -> float:
+    return round((casos / total) * 100, 1) if total > 0 else 0
+
+# =============================================================================
+# INFANCIA (6-11 AÑOS)
+# =============================================================================
+
+def estado_nutricional_infancia(peso_kg: np.ndarray, talla_cm: np.ndarray) -> np.ndarray:
+    """Vectorización de calcular_estado_nutricional (talla 0 se reporta NORMAL)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        imc = peso_kg / ((talla_cm / 100) ** 2)
+    estados = _clasificar(imc, [14.5, 18.5, 21.0], ["DELGADEZ", "NORMAL", "SOBREPESO", "OBESIDAD"])
+    estados[talla_cm == 0] = "NORMAL"
+    return estados
+
+
+def estadisticas_infancia(filas: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Estadísticas básicas de infancia (sin fecha_calculo)
+
+    Equivale a recorrer las atenciones con calcular_campos_automaticos y sumar
+    desarrollo apropiado, seguimiento especializado y las distribuciones.
+    """
+    if not filas:
+        return {
+            "resumen_general": {
+                "total_atenciones": 0,
+                "promedio_edad": 0,
+                "porcentaje_desarrollo_apropiado": 0,
+                "porcentaje_seguimiento_especializado": 0
+            },
+            "por_desempeno_escolar": {},
+            "estado_nutricional": {},
+            "factores_riesgo": {}
+        }
+
+    marco = _marco(filas, COLUMNAS_ESTADISTICAS_INFANCIA)
+    total = len(marco)
+
+    desempeno = _texto(marco, "desempeno_escolar")
+    visual = _texto(marco, "tamizaje_visual")
+    auditivo = _texto(marco, "tamizaje_auditivo")
+    bucal = _texto(marco, "tamizaje_salud_bucal")
+    dificultades = _verdadero(marco, "dificultades_aprendizaje")
+    caries = _numero(marco, "numero_caries")
+
+    # calcular_desarrollo_apropiado
+    desarrollo_apropiado = (
+        np.isin(desempeno, ["SUPERIOR", "ALTO", "BASICO"])
+        & (visual == "NORMAL") & (auditivo == "NORMAL") & ~dificultades
+    )
+    # determinar_seguimiento_especializado
+    with np.errstate(invalid="ignore"):
+        caries_multiples = caries > 3
+    seguimiento = (
+        (visual == "ALTERADO") | (auditivo == "ALTERADO") | (bucal == "ALTERADO")
+        | dificultades | caries_multiples
+    )
+
+    estado_nutricional = estado_nutricional_infancia(_numero(marco, "peso_kg"), _numero(marco, "talla_cm"))
+
+    factores = marco["factores_riesgo_identificados"].explode().dropna().to_numpy(dtype=object)
+
+    return {
+        "resumen_general": {
+            "total_atenciones": total,
+            "promedio_edad": 8.0,  # Simplificado para infancia
+            "porcentaje_desarrollo_apropiado": round((int(desarrollo_apropiado.sum()) / total) * 100, 1),
+            "porcentaje_seguimiento_especializado": round((int(seguimiento.sum()) / total) * 100, 1)
+        },
+        "por_desempeno_escolar": _conteos(desempeno),
+        "estado_nutricional": _conteos(estado_nutricional),
+        "factores_riesgo": _conteos(factores)
+    }
+
+# =============================================================================
+# ADOLESCENCIA Y JUVENTUD (12-29 AÑOS)
+# =============================================================================
+
+class CamposAdolescencia:
+    """Campos calculados de AtencionAdolescenciaResponse sobre columnas completas"""
+
+    def __init__(self, filas: Sequence[Dict[str, Any]]):
+        marco = _marco(filas, COLUMNAS_ESTADISTICAS_ADOLESCENCIA)
+        self.total = len(marco)
+
+        self.edad_anos = _numero(marco, "edad_anos")
+        self.autoestima = _numero(marco, "autoestima")
+        self.habilidades_sociales = _numero(marco, "habilidades_sociales")
+        self.proyecto_vida = _texto(marco, "proyecto_vida")
+        self.consumo_sustancias = _texto(marco, "consumo_sustancias")
+        self.salud_mental = _texto(marco, "salud_mental")
+        self.sedentarismo = _verdadero(marco, "sedentarismo")
+        self.problemas_conductuales = _verdadero(marco, "problemas_conductuales")
+
+        # IMC y estado nutricional (calcular_imc_edad: mismos cortes para <18 y >=18)
+        peso, talla = _numero(marco, "peso_kg"), _numero(marco, "talla_cm")
+        imc = peso / ((talla / 100) ** 2)
+        self.imc = np.round(imc, 2)
+        self.estado_nutricional = _clasificar(
+            imc, [18.5, 25, 30, 35, 40],
+            ["DELGADEZ", "NORMAL", "SOBREPESO", "OBESIDAD_GRADO_I", "OBESIDAD_GRADO_II", "OBESIDAD_GRADO_III"]
+        )
+
+        # calcular_riesgo_cardiovascular_temprano
+        sistolica, diastolica = _numero(marco, "presion_sistolica"), _numero(marco, "presion_diastolica")
+        puntos_cv = np.select(
+            [(sistolica >= 140) | (diastolica >= 90), (sistolica >= 130) | (diastolica >= 85)], [2, 1], 0
+        )
+        puntos_cv = puntos_cv + np.select([imc >= 30, imc >= 25], [2, 1], 0)
+        puntos_cv = puntos_cv + _verdadero(marco, "antecedentes_familiares_cardiovasculares") \
+            + 2 * _verdadero(marco, "fumador") + self.sedentarismo
+        self.riesgo_cardiovascular = np.select(
+            [puntos_cv >= 6, puntos_cv >= 4, puntos_cv >= 2], ["MUY_ALTO", "ALTO", "MODERADO"], "BAJO"
+        ).astype(object)
+
+        # evaluar_desarrollo_psicosocial
+        puntuacion = (self.autoestima + self.habilidades_sociales) / 2
+        puntuacion = puntuacion + np.select(
+            [self.proyecto_vida == "DEFINIDO", self.proyecto_vida == "AUSENTE"], [1, -2], 0
+        )
+        puntuacion = puntuacion - 2 * self.problemas_conductuales
+        puntuacion = puntuacion - np.select(
+            [np.isin(self.consumo_sustancias, ["CONSUMO_HABITUAL", "CONSUMO_PROBLEMATICO"]),
+             self.consumo_sustancias == "CONSUMO_OCASIONAL"], [3, 1], 0
+        )
+        self.desarrollo_psicosocial = np.select(
+            [puntuacion >= 8, puntuacion >= 6, puntuacion >= 4, puntuacion >= 2],
+            ["APROPIADO", "RIESGO_LEVE", "RIESGO_MODERADO", "RIESGO_ALTO"], "REQUIERE_INTERVENCION"
+        ).astype(object)
+
+        # identificar_factores_protectores: una columna booleana por factor, en su orden
+        self.factores_protectores = np.column_stack([
+            _verdadero(marco, "familia_funcional"),
+            np.isin(_texto(marco, "rendimiento_academico"), ["SUPERIOR", "ALTO"]),
+            _verdadero(marco, "actividad_fisica_regular"),
+            self.habilidades_sociales >= 7,
+            self.proyecto_vida == "DEFINIDO",
+            _verdadero(marco, "red_apoyo_social"),
+            self.autoestima >= 7
+        ]) if self.total else np.zeros((0, len(FACTORES_PROTECTORES)), dtype=bool)
+        numero_factores = self.factores_protectores.sum(axis=1)
+
+        # calcular_nivel_riesgo_integral
+        trastorno = _texto(marco, "trastorno_alimentario")
+        puntos = (
+            pd.Series(self.riesgo_cardiovascular).map(PUNTAJE_RIESGO_CARDIOVASCULAR).to_numpy()
+            + pd.Series(self.desarrollo_psicosocial).map(PUNTAJE_DESARROLLO_PSICOSOCIAL).to_numpy()
+            + pd.Series(self.salud_mental).map(PUNTAJE_SALUD_MENTAL).to_numpy()
+            + pd.Series(self.consumo_sustancias).map(PUNTAJE_CONSUMO_SUSTANCIAS).to_numpy()
+            + pd.Series(trastorno).map(PUNTAJE_TRASTORNO_ALIMENTARIO).to_numpy()
+        )
+        puntos = np.maximum(0, puntos - np.select([numero_factores >= 5, numero_factores >= 3], [2, 1], 0))
+        self.nivel_riesgo_integral = np.select(
+            [puntos >= 12, puntos >= 9, puntos >= 6, puntos >= 3],
+            ["CRITICO", "MUY_ALTO", "ALTO", "MODERADO"], "BAJO"
+        ).astype(object)
+
+    def factores_protectores_prevalentes(self) -> List[Dict[str, Any]]:
+        """
+        Conteo de factores protectores ordenado como Counter.most_common() sobre
+        la lista aplanada: por casos descendente y, en empate, por primera aparición.
+        """
+        casos = self.factores_protectores.sum(axis=0)
+        primera_fila = np.argmax(self.factores_protectores, axis=0)
+        orden = sorted(
+            (i for i in range(len(FACTORES_PROTECTORES)) if casos[i] > 0),
+            key=lambda i: (-casos[i], primera_fila[i], i)
+        )
+        return [
+            {"factor": FACTORES_PROTECTORES[i], "casos": int(casos[i]),
+             "porcentaje": round((int(casos[i]) / self.total) * 100, 1)}
+            for i in orden
+        ]
+
+
+def estadisticas_adolescencia(filas: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Campos de EstadisticasAdolescenciaResponse calculados sobre columnas"""
+    if not filas:
+        return {"total_atenciones": 0, "distribuciones": {}, "promedios": {}, "alertas": {}}
+
+    campos = CamposAdolescencia(filas)
+    total = campos.total
+
+    grupo_edad = np.select(
+        [campos.edad_anos <= 15, campos.edad_anos <= 19, campos.edad_anos <= 24],
+        ["12-15", "16-19", "20-24"], "25-29"
+    ).astype(object)
+
+    riesgo_alto = int(np.isin(campos.nivel_riesgo_integral, ["ALTO", "MUY_ALTO", "CRITICO"]).sum())
+    problemas_salud_mental = int(np.isin(
+        campos.salud_mental, ["SINTOMAS_MODERADOS", "SINTOMAS_SEVEROS", "REQUIERE_ATENCION_ESPECIALIZADA"]
+    ).sum())
+    obesidad = int(np.isin(
+        campos.estado_nutricional, ["OBESIDAD_GRADO_I", "OBESIDAD_GRADO_II", "OBESIDAD_GRADO_III"]
+    ).sum())
+
+    return {
+        "total_atenciones": total,
+        "distribuciones": {
+            "por_edad": _conteos(grupo_edad),
+            "por_estado_nutricional": _conteos(campos.estado_nutricional),
+            "por_nivel_riesgo": _conteos(campos.nivel_riesgo_integral),
+            "por_desarrollo_psicosocial": _conteos(campos.desarrollo_psicosocial),
+            "por_salud_mental": _conteos(campos.salud_mental)
+        },
+        "promedios": {
+            "edad_anos": round(_promedio(campos.edad_anos), 1),
+            "imc": round(_promedio(campos.imc), 2),
+            "autoestima": round(_promedio(campos.autoestima), 1),
+            "factores_protectores_promedio": round(int(campos.factores_protectores.sum()) / total, 1)
+        },
+        "alertas": {
+            "adolescentes_riesgo_alto": riesgo_alto,
+            "porcentaje_riesgo_alto": _porcentaje(riesgo_alto, total),
+            "problemas_salud_mental": problemas_salud_mental,
+            "porcentaje_problemas_mental": _porcentaje(problemas_salud_mental, total),
+            "casos_obesidad": obesidad,
+            "porcentaje_obesidad": _porcentaje(obesidad, total)
+        }
+    }
+
+
+def reporte_desarrollo_psicosocial(filas: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Campos de ReporteDesarrolloAdolescenciaResponse calculados sobre columnas"""
+    if not filas:
+        return {
+            "adolescentes_evaluados": 0,
+            "desarrollo_apropiado": 0,
+            "factores_riesgo_prevalentes": [],
+            "factores_protectores_prevalentes": [],
+            "recomendaciones": []
+        }
+
+    campos = CamposAdolescencia(filas)
+    total = campos.total
+    desarrollo_apropiado = int((campos.desarrollo_psicosocial == "APROPIADO").sum())
+
+    factores_riesgo = {
+        "consumo_sustancias": int((campos.consumo_sustancias != "SIN_CONSUMO").sum()),
+        "problemas_salud_mental": int((campos.salud_mental != "NORMAL").sum()),
+        "sedentarismo": int(campos.sedentarismo.sum()),
+        "problemas_conductuales": int(campos.problemas_conductuales.sum()),
+        "proyecto_vida_ausente": int(np.isin(campos.proyecto_vida, ["POCO_CLARO", "AUSENTE"]).sum())
+    }
+    factores_riesgo_prevalentes = [
+        {"factor": k, "casos": v, "porcentaje": round((v / total) * 100, 1)}
+        for k, v in sorted(factores_riesgo.items(), key=lambda x: x[1], reverse=True)
+    ]
+
+    # Recomendaciones basadas en datos
+    recomendaciones = []
+    if factores_riesgo["sedentarismo"] > total * 0.6:
+        recomendaciones.append("Implementar programas de actividad física dirigidos a adolescentes")
+    if factores_riesgo["problemas_salud_mental"] > total * 0.3:
+        recomendaciones.append("Fortalecer programas de salud mental y apoyo psicológico")
+    if factores_riesgo["proyecto_vida_ausente"] > total * 0.4:
+        recomendaciones.append("Desarrollar talleres de orientación vocacional y proyecto de vida")
+    if desarrollo_apropiado < total * 0.7:
+        recomendaciones.append("Intensificar intervenciones de desarrollo psicosocial")
+    if factores_riesgo["consumo_sustancias"] > total * 0.2:
+        recomendaciones.append("Implementar programas de prevención de consumo de sustancias")
+
+    return {
+        "adolescentes_evaluados": total,
+        "desarrollo_apropiado": desarrollo_apropiado,
+        "factores_riesgo_prevalentes": factores_riesgo_prevalentes[:5],  # Top 5
+        "factores_protectores_prevalentes": campos.factores_protectores_prevalentes()[:5],  # Top 5
+        "recomendaciones": recomendaciones
+    }
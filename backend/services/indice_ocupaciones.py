@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+ÍNDICE EN MEMORIA DEL CATÁLOGO DE OCUPACIONES DANE
+==================================================
+
+El autocompletado del formulario de pacientes consulta en cada tecla. El
+catálogo DANE es pequeño (~10k filas) y cambia solo con las importaciones, así
+que se carga una vez en el proceso y se responde sin ir a la BD.
+
+Estructura compacta (arreglos ordenados + bisect en lugar de un trie de
+diccionarios por carácter, que ocuparía decenas de miles de nodos):
+- tokens: palabras normalizadas (minúsculas, sin tildes) ordenadas; cada una
+  apunta a las posiciones de las ocupaciones que la contienen. Un prefijo se
+  resuelve con dos bisect sobre el rango de tokens que lo comparten.
+- códigos: códigos DANE ordenados; un prefijo de código es otro rango.
+
+Cada proceso (worker de uvicorn/gunicorn) tiene su propio índice. Para que una
+importación llegue a todos, cada uno compara cada INTERVALO_VERIFICACION_INDICE
+segundos el calculado_en de catalogo_ocupaciones_resumen (lo actualiza el
+trigger del catálogo) con el del índice cargado y se recarga si cambió. POST
+/ocupaciones/indice/recargar recarga de inmediato solo el worker que lo
+atiende; el TTL queda como respaldo.
+
+Cuando el índice no está disponible (o se necesitan filtros que no indexa), la
+búsqueda va a Postgres en una sola llamada a la RPC buscar_ocupaciones_trgm
+(GIN pg_trgm sobre el nombre normalizado con la misma regla de normalización).
+
+Las estadísticas del catálogo se leen de catalogo_ocupaciones_resumen, una fila
+que un trigger por sentencia recalcula cada vez que se modifica el catálogo.
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+TTL_INDICE_OCUPACIONES = float(os.environ.get('OCUPACIONES_INDICE_TTL_SEGUNDOS', '3600'))
+INTERVALO_VERIFICACION_INDICE = float(os.environ.get('OCUPACIONES_INDICE_VERIFICACION_SEGUNDOS', '30'))
+TAMANO_PAGINA_CARGA = 1000  # Máximo de filas por respuesta de PostgREST
+COLUMNAS_INDICE = 'id, codigo_ocupacion_dane, nombre_ocupacion_normalizado, categoria_ocupacional_nivel_1'
+
+# Relevancias, en la misma escala que la búsqueda por BD
+RELEVANCIA_INICIO_NOMBRE = 1.0
+RELEVANCIA_CODIGO = 0.9
+RELEVANCIA_PALABRA = 0.8
+
+_FIN_PREFIJO = '\uffff'
+RPC_BUSQUEDA_OCUPACIONES = 'buscar_ocupaciones_trgm'
+
+
+def normalizar_termino(texto: str) -> str:
+    """Minúsculas, sin tildes y palabras separadas por un solo espacio"""
+    sin_tildes = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in sin_tildes.lower()).split())
+
+
+def _rango_prefijo(ordenados: List[str], prefijo: str) -> Tuple[int, int]:
+    return bisect_left(ordenados, prefijo), bisect_left(ordenados, prefijo + _FIN_PREFIJO)
+
+
+class IndiceOcupaciones:
+    """
+    Índice de solo lectura sobre las ocupaciones activas
+
+    Se construye completo y se reemplaza atómicamente al recargar, así que las
+    búsquedas concurrentes no necesitan lock.
+    """
+
+    def __init__(self, filas: List[Dict[str, Any]], version: Optional[str] = None):
+        self.cargado_en = time.monotonic()
+        # calculado_en del resumen al cargar y última vez que se comparó con la BD
+        self.version = version
+        self.verificado_en = self.cargado_en
+        self.ocupaciones: List[Dict[str, Any]] = sorted(
+            filas, key=lambda fila: fila['nombre_ocupacion_normalizado']
+        )
+        self._nombres = [normalizar_termino(f['nombre_ocupacion_normalizado']) for f in self.ocupaciones]
+
+        posiciones_por_token: Dict[str, List[int]] = {}
+        for posicion, nombre in enumerate(self._nombres):
+            for token in set(nombre.split()):
+                posiciones_por_token.setdefault(token, []).append(posicion)
+        self._tokens = sorted(posiciones_por_token)
+        self._posiciones_token = [tuple(posiciones_por_token[t]) for t in self._tokens]
+
+        por_codigo = sorted(
+            (str(f['codigo_ocupacion_dane']), posicion) for posicion, f in enumerate(self.ocupaciones)
+        )
+        self._codigos = [codigo for codigo, _ in por_codigo]
+        self._posiciones_codigo = [posicion for _, posicion in por_codigo]
+
+    def __len__(self) -> int:
+        return len(self.ocupaciones)
+
+    @property
+    def total_tokens(self) -> int:
+        return len(self._tokens)
+
+    def _posiciones_con_prefijo(self, prefijo: str) -> set:
+        inicio, fin = _rango_prefijo(self._tokens, prefijo)
+        posiciones = set()
+        for indice in range(inicio, fin):
+            posiciones.update(self._posiciones_token[indice])
+        return posiciones
+
+    def buscar(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Ocupaciones cuyo nombre contiene palabras que empiezan por cada término
+        de `q` (en cualquier orden), más las de código que empieza por `q`
+
+        Returns:
+            Filas del catálogo con 'relevancia', ordenadas por relevancia y nombre
+        """
+        termino = normalizar_termino(q)
+        if not termino:
+            return []
+
+        relevancias: Dict[int, float] = {}
+
+        inicio, fin = _rango_prefijo(self._codigos, q.strip())
+        for indice in range(inicio, min(fin, inicio + limit)):
+            relevancias[self._posiciones_codigo[indice]] = RELEVANCIA_CODIGO
+
+        # Intersección empezando por el término más selectivo
+        candidatos = None
+        for token in sorted(termino.split(), key=len, reverse=True):
+            posiciones = self._posiciones_con_prefijo(token)
+            candidatos = posiciones if candidatos is None else candidatos & posiciones
+            if not candidatos:
+                break
+        for posicion in candidatos or ():
+            relevancia = (
+                RELEVANCIA_INICIO_NOMBRE if self._nombres[posicion].startswith(termino)
+                else RELEVANCIA_PALABRA
+            )
+            relevancias[posicion] = max(relevancia, relevancias.get(posicion, 0.0))
+
+        # Las posiciones siguen el orden por nombre: desempate alfabético gratis
+        mejores = sorted(relevancias.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{**self.ocupaciones[posicion], 'relevancia': relevancia} for posicion, relevancia in mejores]
+
+
+def cargar_filas_ocupaciones(supabase) -> List[Dict[str, Any]]:
+    """Ocupaciones activas del catálogo, paginadas por el límite de PostgREST"""
+    filas: List[Dict[str, Any]] = []
+    while True:
+        respuesta = supabase.table('catalogo_ocupaciones_dane') \
+            .select(COLUMNAS_INDICE) \
+            .eq('activo', True) \
+            .order('codigo_ocupacion_dane') \
+            .range(len(filas), len(filas) + TAMANO_PAGINA_CARGA - 1) \
+            .execute()
+        pagina = respuesta.data or []
+        filas.extend(pagina)
+        if len(pagina) < TAMANO_PAGINA_CARGA:
+            return filas
+
+
+def buscar_ocupaciones_bd(supabase, q: str, limit: int = 10, categoria: Optional[str] = None,
+                          solo_activas: bool = True) -> List[Dict[str, Any]]:
+    """
+    Búsqueda rankeada por nombre y código en Postgres, en una sola llamada
+
+    Returns:
+        Filas con las columnas de COLUMNAS_INDICE y 'relevancia', ya ordenadas
+    """
+    respuesta = supabase.rpc(RPC_BUSQUEDA_OCUPACIONES, {
+        'p_termino': q,
+        'p_limite': limit,
+        'p_categoria': categoria,
+        'p_solo_activas': solo_activas
+    }).execute()
+    return respuesta.data or []
+
+
+def obtener_resumen_catalogo(supabase) -> Dict[str, Any]:
+    """Fila de catalogo_ocupaciones_resumen (mantenida por trigger); {} si no existe"""
+    respuesta = supabase.table('catalogo_ocupaciones_resumen') \
+        .select('total_ocupaciones, ocupaciones_activas, categorias_nivel_1, categorias_nivel_2, '
+                'ultima_actualizacion, version_catalogo') \
+        .limit(1) \
+        .execute()
+    return respuesta.data[0] if respuesta.data else {}
+
+
+def obtener_version_catalogo(supabase) -> Optional[str]:
+    """calculado_en del resumen: cambia con cada modificación del catálogo; None si no existe"""
+    respuesta = supabase.table('catalogo_ocupaciones_resumen') \
+        .select('calculado_en') \
+        .limit(1) \
+        .execute()
+    return respuesta.data[0]['calculado_en'] if respuesta.data else None
+
+
+_indice_compartido: Optional[IndiceOcupaciones] = None
+_indice_lock = threading.Lock()
+
+
+def _version_o_none(supabase) -> Optional[str]:
+    try:
+        return obtener_version_catalogo(supabase)
+    except Exception as e:
+        logger.warning(f"No se pudo leer la versión del catálogo de ocupaciones: {e}")
+        return None
+
+
+def _construir_indice(supabase) -> IndiceOcupaciones:
+    global _indice_compartido
+    inicio = time.perf_counter()
+    # La versión se lee antes que las filas: una importación concurrente deja
+    # una versión distinta y provoca otra recarga en la próxima verificación
+    version = _version_o_none(supabase)
+    indice = IndiceOcupaciones(cargar_filas_ocupaciones(supabase), version)
+    _indice_compartido = indice
+    logger.info(
+        f"Índice de ocupaciones cargado: {len(indice)} ocupaciones, {indice.total_tokens} tokens "
+        f"en {(time.perf_counter() - inicio) * 1000:.0f}ms"
+    )
+    return indice
+
+
+def recargar_indice_ocupaciones(supabase) -> IndiceOcupaciones:
+    """Reconstruye el índice desde la BD y lo publica para este proceso (no para los demás workers)"""
+    with _indice_lock:
+        return _construir_indice(supabase)
+
+
+def _dentro_del_ttl(indice: Optional[IndiceOcupaciones], ttl_segundos: Optional[float]) -> bool:
+    ttl = TTL_INDICE_OCUPACIONES if ttl_segundos is None else ttl_segundos
+    return indice is not None and time.monotonic() - indice.cargado_en < ttl
+
+
+def indice_ocupaciones_vigente(ttl_segundos: Optional[float] = None) -> Optional[IndiceOcupaciones]:
+    """
+    Índice cargado si no ha vencido su TTL ni le toca verificar la versión del
+    catálogo; None si hay que pasar por obtener_indice_ocupaciones (con BD)
+    """
+    indice = _indice_compartido
+    if _dentro_del_ttl(indice, ttl_segundos) and \
+            time.monotonic() - indice.verificado_en < INTERVALO_VERIFICACION_INDICE:
+        return indice
+    return None
+
+
+def obtener_indice_ocupaciones(supabase, ttl_segundos: Optional[float] = None) -> IndiceOcupaciones:
+    """
+    Índice vigente del proceso. Lo (re)carga si no existe, venció su TTL o el
+    catálogo cambió desde la carga (p. ej. importado a través de otro worker)
+    """
+    indice = indice_ocupaciones_vigente(ttl_segundos)
+    if indice is not None:
+        return indice
+    with _indice_lock:
+        # Otro hilo pudo recargarlo o verificarlo mientras se esperaba el lock
+        indice = indice_ocupaciones_vigente(ttl_segundos)
+        if indice is not None:
+            return indice
+
+        indice = _indice_compartido
+        if _dentro_del_ttl(indice, ttl_segundos):
+            version = _version_o_none(supabase)
+            # Sin versión legible se sigue sirviendo el índice hasta su TTL
+            if version is None or version == indice.version:
+                indice.verificado_en = time.monotonic()
+                return indice
+            logger.info(f"Catálogo de ocupaciones modificado ({indice.version} -> {version}), recargando índice")
+        return _construir_indice(supabase)
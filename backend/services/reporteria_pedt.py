@@ -15,17 +15,136 @@ Fecha: 13 septiembre 2025
 Estado: Implementación Fase 3C - Base Funcional
 """
 
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
 from uuid import UUID
 from datetime import date, datetime
+from dataclasses import dataclass, field
+from itertools import islice
+import calendar
+import hashlib
+import json
 import logging
+import os
+import shutil
+import tempfile
 from supabase import Client
 
 from database import get_supabase_client
+from services.validador_resolucion_202 import obtener_motor_validacion_202
 
 # Configuración logging
 logger = logging.getLogger(__name__)
 
+# Parámetros del modo por lotes (generar_variables_119_lote)
+TAMANO_LOTE_PEDT = 500  # Pacientes cuyos datos fuente se precargan juntos
+TAMANO_FILTRO_IN = 150  # Valores por filtro IN (límite de longitud de URL en PostgREST)
+TAMANO_PAGINA_CONSULTA = 1000  # Máximo de filas que Supabase retorna por request
+
+# Archivo plano SISPRO
+CODIGO_ENTIDAD_DESCONOCIDO = '999'  # Valor indicado por el Anexo técnico cuando no se conoce el código
+TIPO_REGISTRO_DETALLE = '2'  # El registro de control es el tipo 1
+TAMANO_BLOQUE_ESCRITURA = 1024 * 1024  # Bytes copiados por iteración al ensamblar el archivo
+
+# Cache incremental (services/cache_variables_pedt.py)
+VERSION_CALCULO_PEDT = 3  # Incrementar al cambiar la lógica de cálculo: invalida toda la cache
+COLUMNAS_VERSION_FILA = 'id, creado_en, updated_at'
+
+# Columnas de atencion_primera_infancia usadas por las variables 29-32, 43-46 y 52
+COLUMNAS_PRIMERA_INFANCIA_PEDT = "peso_kg, talla_cm, ead_resultado_global, fecha_atencion"
+
+# Variables del anexo técnico RPED: número -> sufijo de la clave var_<N>_<sufijo>.
+# El número de cada clave es siempre el de la variable en Controles RPED.
+NOMBRES_VARIABLES_RPED = {
+    0: 'tipo_registro', 1: 'consecutivo', 2: 'codigo_habilitacion_ips',
+    3: 'tipo_identificacion', 4: 'numero_identificacion', 5: 'primer_apellido',
+    6: 'segundo_apellido', 7: 'primer_nombre', 8: 'segundo_nombre',
+    9: 'fecha_nacimiento', 10: 'sexo', 11: 'pertenencia_etnica', 12: 'ocupacion',
+    13: 'nivel_educativo', 14: 'gestante', 15: 'sifilis_gestacional_congenita',
+    16: 'minimental', 17: 'hipotiroidismo_congenito', 18: 'sintomatico_respiratorio',
+    19: 'consumo_tabaco', 20: 'lepra', 21: 'obesidad_desnutricion',
+    22: 'resultado_tacto_rectal', 23: 'acido_folico_preconcepcional',
+    24: 'resultado_sangre_oculta', 25: 'enfermedad_mental', 26: 'cancer_cervix',
+    27: 'agudeza_visual_ojo_izquierdo', 28: 'agudeza_visual_ojo_derecho',
+    29: 'fecha_peso', 30: 'peso', 31: 'fecha_talla', 32: 'talla',
+    33: 'fecha_probable_parto', 34: 'codigo_pais', 35: 'riesgo_gestacional',
+    36: 'resultado_colonoscopia', 37: 'resultado_tamizaje_auditivo',
+    38: 'resultado_tamizaje_visual', 39: 'dpt_menores_5', 40: 'resultado_vale',
+    41: 'neumococo', 42: 'resultado_hepatitis_c', 43: 'ead_motricidad_gruesa',
+    44: 'ead_motricidad_finoadaptativa', 45: 'ead_personal_social',
+    46: 'ead_audicion_lenguaje', 47: 'tratamiento_ablativo', 48: 'resultado_oximetria',
+    49: 'fecha_atencion_parto', 50: 'fecha_salida_parto', 51: 'fecha_lactancia_materna',
+    52: 'fecha_valoracion_integral', 53: 'fecha_asesoria_anticoncepcion',
+    54: 'metodo_anticonceptivo', 55: 'fecha_metodo_anticonceptivo',
+    56: 'fecha_primera_consulta_prenatal', 57: 'resultado_glicemia',
+    58: 'fecha_ultimo_control_prenatal', 59: 'acido_folico_prenatal',
+    60: 'sulfato_ferroso_prenatal', 61: 'carbonato_calcio_prenatal',
+    62: 'fecha_agudeza_visual', 63: 'fecha_vale', 64: 'fecha_tacto_rectal',
+    65: 'fecha_oximetria', 66: 'fecha_colonoscopia', 67: 'fecha_sangre_oculta',
+    68: 'consulta_psicologia', 69: 'fecha_tamizaje_auditivo', 70: 'fortificacion_casera',
+    71: 'vitamina_a', 72: 'fecha_ldl', 73: 'fecha_psa', 74: 'preservativos_its',
+    75: 'fecha_tamizaje_visual', 76: 'fecha_salud_bucal', 77: 'hierro_primera_infancia',
+    78: 'fecha_hepatitis_b', 79: 'resultado_hepatitis_b', 80: 'fecha_sifilis',
+    81: 'resultado_sifilis', 82: 'fecha_vih', 83: 'resultado_vih',
+    84: 'fecha_tsh_neonatal', 85: 'resultado_tsh_neonatal', 86: 'tamizaje_cuello_uterino',
+    87: 'fecha_cuello_uterino', 88: 'resultado_cuello_uterino', 89: 'calidad_citologia',
+    90: 'ips_cuello_uterino', 91: 'fecha_colposcopia', 92: 'resultado_ldl',
+    93: 'fecha_biopsia_cervix', 94: 'resultado_biopsia_cervix', 95: 'resultado_hdl',
+    96: 'fecha_mamografia', 97: 'resultado_mamografia', 98: 'resultado_trigliceridos',
+    99: 'fecha_toma_biopsia_mama', 100: 'fecha_resultado_biopsia_mama',
+    101: 'resultado_biopsia_mama', 102: 'cop_persona', 103: 'fecha_hemoglobina',
+    104: 'resultado_hemoglobina', 105: 'fecha_glicemia', 106: 'fecha_creatinina',
+    107: 'resultado_creatinina', 108: 'fecha_hemoglobina_glicosilada', 109: 'resultado_psa',
+    110: 'fecha_hepatitis_c', 111: 'fecha_hdl', 112: 'fecha_baciloscopia',
+    113: 'resultado_baciloscopia', 114: 'riesgo_cardiovascular',
+    115: 'tratamiento_sifilis_gestacional', 116: 'tratamiento_sifilis_congenita',
+    117: 'riesgo_metabolico', 118: 'fecha_trigliceridos',
+}
+
+# Comodines de fecha del anexo técnico
+COMODIN_SIN_DATO = '1800-01-01'
+COMODIN_NO_APLICA = '1845-01-01'
+
+# Códigos "sin dato" distintos de 21: peso y talla no tomados, resultados sin toma
+VALORES_SIN_DATO_RPED = {30: 999, 32: 999, 57: 998, 92: 998, 95: 998, 98: 998, 104: 998, 107: 998}
+# Fecha de toma -> variable con su resultado
+RESULTADOS_POR_FECHA_RPED = {72: 92, 103: 104, 105: 57, 106: 107, 111: 95, 118: 98}
+
+
+@dataclass
+class FuentesLotePEDT:
+    """
+    Datos fuente precargados para un lote de pacientes.
+
+    Las filas quedan agrupadas por paciente_id. Si la consulta de una fuente
+    falla, el error se guarda y se relanza al leer esa fuente, de modo que los
+    cálculos aplican el mismo valor por defecto que en el modo individual.
+    """
+    pacientes: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    atenciones_materno_perinatal: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    controles_prenatales: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    primera_infancia: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    errores: Dict[str, Exception] = field(default_factory=dict)
+
+    def _verificar(self, fuente: str) -> None:
+        if fuente in self.errores:
+            raise self.errores[fuente]
+
+    def atenciones_mp(self, paciente_id: UUID) -> List[Dict[str, Any]]:
+        """Atenciones materno perinatales del paciente, más reciente primero"""
+        self._verificar('atencion_materno_perinatal')
+        return self.atenciones_materno_perinatal.get(str(paciente_id), [])
+
+    def control_prenatal_reciente(self, paciente_id: UUID) -> Optional[Dict[str, Any]]:
+        """Control prenatal más reciente de las atenciones activas del paciente"""
+        self._verificar('detalle_control_prenatal')
+        return self.controles_prenatales.get(str(paciente_id))
+
+    def primera_infancia_reciente(self, paciente_id: UUID) -> Optional[Dict[str, Any]]:
+        """Atención de primera infancia más reciente del paciente"""
+        self._verificar('atencion_primera_infancia')
+        return self.primera_infancia.get(str(paciente_id))
+
+
 class GeneradorReportePEDT:
     """
     Generador de reportes PEDT según Resolución 202 de 2021
@@ -68,54 +187,273 @@ class GeneradorReportePEDT:
             if not datos_paciente:
                 raise ValueError(f"Paciente {paciente_id} no encontrado")
             
-            # Inicializar diccionario de variables PEDT
-            variables_pedt = {}
+            variables_pedt = self._ensamblar_variables_119(paciente_id, datos_paciente)
             
-            # GRUPO 1: IDENTIFICACIÓN (Variables 0-13)
-            variables_pedt.update(self._calcular_variables_identificacion(datos_paciente))
-            
-            # GRUPO 2: GESTACIÓN (Variables 14-15) 
-            variables_pedt.update(self._calcular_variables_gestacion(paciente_id, datos_paciente))
-            
-            # GRUPO 3: TEST VEJEZ (Variables 16-17)
-            variables_pedt.update(self._calcular_variables_test_vejez(paciente_id, datos_paciente))
-            
-            # GRUPO 4: TUBERCULOSIS (Variable 18)
-            variables_pedt.update(self._calcular_variables_tuberculosis(paciente_id, datos_paciente))
-            
-            # GRUPO 5: RIESGO CARDIOVASCULAR (Variables 19-21)
-            variables_pedt.update(self._calcular_variables_riesgo_cardiovascular(paciente_id, datos_paciente))
-            
-            # GRUPO 6: SALUD MENTAL (Variables 22-25)
-            variables_pedt.update(self._calcular_variables_salud_mental(paciente_id, datos_paciente))
-            
-            # GRUPO 7: CONTROL PRENATAL (Variables 26-45)
-            variables_pedt.update(self._calcular_variables_control_prenatal(paciente_id, datos_paciente))
-            
-            # GRUPO 8: CRECIMIENTO Y DESARROLLO (Variables 46-55)
-            variables_pedt.update(self._calcular_variables_crecimiento_desarrollo(paciente_id, datos_paciente))
-            
-            # GRUPO 9: CONSULTAS CURSO VIDA (Variables 56-63)
-            variables_pedt.update(self._calcular_variables_consultas_curso_vida(paciente_id, datos_paciente))
+            logger.info(f"Variables PEDT generadas exitosamente para paciente {paciente_id}")
+            return variables_pedt
             
-            # GRUPO 10: VACUNACIÓN (Variables 64-95)
-            variables_pedt.update(self._calcular_variables_vacunacion(paciente_id, datos_paciente))
+        except Exception as e:
+            logger.error(f"Error generando variables PEDT para paciente {paciente_id}: {str(e)}")
+            raise
+    
+    def generar_variables_119_lote(self, paciente_ids: Iterable[UUID],
+                                   tamano_lote: int = TAMANO_LOTE_PEDT,
+                                   cache=None) -> Dict[str, Dict[str, Any]]:
+        """
+        Genera las 119 variables PEDT para muchos pacientes precargando datos por lote
+        
+        En lugar de consultar cada tabla fuente por paciente (N+1), cada tabla se
+        consulta una vez por lote con filtros IN y las variables se calculan en
+        memoria con la misma lógica del modo individual.
+        
+        Args:
+            paciente_ids: UUIDs de los pacientes a reportar
+            tamano_lote: Pacientes cuyos datos fuente se precargan juntos
+            cache: CacheVariablesPEDT opcional. Si se indica, solo se recalculan los
+                pacientes cuyos datos fuente cambiaron desde la última corrida.
             
-            # GRUPO 11: SALUD ORAL (Variables 96-99)
-            variables_pedt.update(self._calcular_variables_salud_oral(paciente_id, datos_paciente))
+        Returns:
+            Dict paciente_id (str) -> variables PEDT, idénticas a generar_variables_119.
+            Los pacientes inexistentes se omiten y se registran en el log.
+        """
+        return dict(self.iterar_variables_119_lote(paciente_ids, tamano_lote, cache))
+    
+    def iterar_variables_119_lote(self, paciente_ids: Iterable[UUID],
+                                  tamano_lote: int = TAMANO_LOTE_PEDT,
+                                  cache=None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Versión incremental de generar_variables_119_lote
+        
+        Produce (paciente_id, variables_pedt) a medida que se procesa cada lote,
+        de modo que solo los datos fuente del lote actual permanecen en memoria.
+        paciente_ids se consume de forma perezosa, por lo que puede ser un generador.
+        """
+        ids = (str(paciente_id) for paciente_id in paciente_ids)
+        procesados = 0
+        
+        while True:
+            lote = list(dict.fromkeys(islice(ids, tamano_lote)))
+            if not lote:
+                break
             
-            # GRUPO 12: ATENCIÓN PARTO (Variables 100-107)
-            variables_pedt.update(self._calcular_variables_atencion_parto(paciente_id, datos_paciente))
+            huellas, vigentes = self._consultar_cache_lote(lote, cache)
+            pendientes = [paciente_id for paciente_id in lote if paciente_id not in vigentes]
+            fuentes = self._precargar_fuentes_lote(pendientes) if pendientes else FuentesLotePEDT()
             
-            # GRUPO 13: TAMIZAJES DIAGNÓSTICOS (Variables 108-119)
-            variables_pedt.update(self._calcular_variables_tamizajes(paciente_id, datos_paciente))
+            resultados = []
+            nuevos = []
+            for paciente_id in lote:
+                if paciente_id in vigentes:
+                    resultados.append((paciente_id, vigentes[paciente_id]))
+                    continue
+                datos_paciente = fuentes.pacientes.get(paciente_id)
+                if not datos_paciente:
+                    logger.warning(f"Paciente {paciente_id} no encontrado, se omite del lote PEDT")
+                    continue
+                variables_pedt = self._ensamblar_variables_119(UUID(paciente_id), datos_paciente, fuentes)
+                resultados.append((paciente_id, variables_pedt))
+                if paciente_id in huellas:
+                    nuevos.append((paciente_id, huellas[paciente_id], variables_pedt))
             
-            logger.info(f"Variables PEDT generadas exitosamente para paciente {paciente_id}")
-            return variables_pedt
+            if cache is not None and nuevos:
+                cache.guardar(nuevos)
             
+            procesados += len(lote)
+            logger.info(f"Lote PEDT procesado: {procesados} pacientes "
+                        f"({len(vigentes)} desde cache, {len(pendientes)} recalculados)")
+            yield from resultados
+    
+    def _ensamblar_variables_119(self, paciente_id: UUID, datos_paciente: Dict[str, Any],
+                                 fuentes: Optional[FuentesLotePEDT] = None) -> Dict[str, Any]:
+        """
+        Calcula las 119 variables a partir de los datos base del paciente
+        
+        Args:
+            fuentes: Datos precargados del lote. Si None, cada grupo consulta la BD.
+        """
+        # Inicializar diccionario de variables PEDT
+        variables_pedt = {}
+        
+        # GRUPO 1: IDENTIFICACIÓN (Variables 0-13)
+        variables_pedt.update(self._calcular_variables_identificacion(datos_paciente))
+        
+        # GRUPO 2: VARIABLES SIN REGISTRO EN BD (Variables 14-118, "no aplica" o "sin dato")
+        variables_pedt.update(self._calcular_variables_sin_registro(datos_paciente))
+        
+        # GRUPO 3: GESTACIÓN (Variables 14-15, 80-81)
+        variables_pedt.update(self._calcular_variables_gestacion(paciente_id, datos_paciente, fuentes))
+        
+        # GRUPO 4: CONTROL PRENATAL (Variables 23, 33, 35, 56, 58-61)
+        variables_pedt.update(self._calcular_variables_control_prenatal(paciente_id, datos_paciente, fuentes))
+        
+        # GRUPO 5: CRECIMIENTO Y DESARROLLO (Variables 29-32, 43-46, 52)
+        variables_pedt.update(self._calcular_variables_crecimiento_desarrollo(paciente_id, datos_paciente, fuentes))
+        
+        return variables_pedt
+    
+    def _consultar_cache_lote(self, paciente_ids: List[str],
+                              cache=None) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
+        """
+        Huellas actuales del lote y variables vigentes en cache
+        
+        Returns:
+            (huellas, vigentes). Ambos vacíos si no hay cache o si falla la
+            consulta de versiones, en cuyo caso se recalcula todo el lote.
+        """
+        if cache is None:
+            return {}, {}
+        try:
+            huellas = self._calcular_huellas_lote(paciente_ids)
+            return huellas, cache.obtener_vigentes(huellas)
         except Exception as e:
-            logger.error(f"Error generando variables PEDT para paciente {paciente_id}: {str(e)}")
-            raise
+            logger.warning(f"No se pudo consultar la cache PEDT, se recalcula el lote: {str(e)}")
+            return {}, {}
+    
+    def _calcular_huellas_lote(self, paciente_ids: List[str]) -> Dict[str, str]:
+        """
+        Huella de los datos fuente de cada paciente existente del lote
+        
+        Solo se consultan las columnas de versión de las tablas que lee el cálculo.
+        La huella cambia si se crea, modifica o elimina una fila fuente del
+        paciente, si cambia su edad en años o si cambia VERSION_CALCULO_PEDT.
+        
+        Las huellas se calculan antes de precargar los datos: si una fila cambia
+        entre ambas consultas, la huella guardada queda desactualizada y el
+        paciente se recalcula en la siguiente corrida.
+        """
+        versiones: Dict[str, List[Any]] = {}
+        
+        pacientes = self._consultar_por_valores(
+            'pacientes', 'fecha_nacimiento, ' + COLUMNAS_VERSION_FILA, 'id', paciente_ids
+        )
+        for paciente in pacientes:
+            versiones[str(paciente['id'])] = [
+                ['edad', self._calcular_edad(paciente.get('fecha_nacimiento'))],
+                ['pacientes', paciente['id'], paciente.get('creado_en'), paciente.get('updated_at')]
+            ]
+        
+        def agregar_version(paciente_id: str, tabla: str, fila: Dict[str, Any]) -> None:
+            if paciente_id in versiones:
+                versiones[paciente_id].append([tabla, fila['id'], fila.get('creado_en'), fila.get('updated_at')])
+        
+        for tabla in ('atencion_materno_perinatal', 'atencion_primera_infancia'):
+            for fila in self._consultar_por_valores(tabla, 'paciente_id, ' + COLUMNAS_VERSION_FILA,
+                                                    'paciente_id', paciente_ids):
+                agregar_version(str(fila['paciente_id']), tabla, fila)
+        
+        # Los controles prenatales se relacionan con el paciente a través de su atención
+        atenciones_mp = {
+            str(fila[1]): paciente_id
+            for paciente_id, filas in versiones.items()
+            for fila in filas if fila[0] == 'atencion_materno_perinatal'
+        }
+        for fila in self._consultar_por_valores('detalle_control_prenatal',
+                                                'atencion_materno_perinatal_id, ' + COLUMNAS_VERSION_FILA,
+                                                'atencion_materno_perinatal_id', list(atenciones_mp)):
+            agregar_version(atenciones_mp[str(fila['atencion_materno_perinatal_id'])], 'detalle_control_prenatal', fila)
+        
+        return {
+            paciente_id: hashlib.sha256(
+                json.dumps([VERSION_CALCULO_PEDT] + sorted(filas, key=str), default=str).encode('utf-8')
+            ).hexdigest()
+            for paciente_id, filas in versiones.items()
+        }
+    
+    def iterar_ids_pacientes(self) -> Iterator[str]:
+        """Recorre los ids de todos los pacientes, una página a la vez"""
+        desplazamiento = 0
+        while True:
+            response = self.db.table('pacientes').select('id').order('id')\
+                .range(desplazamiento, desplazamiento + TAMANO_PAGINA_CONSULTA - 1).execute()
+            pagina = response.data or []
+            for paciente in pagina:
+                yield str(paciente['id'])
+            if len(pagina) < TAMANO_PAGINA_CONSULTA:
+                break
+            desplazamiento += TAMANO_PAGINA_CONSULTA
+    
+    def _precargar_fuentes_lote(self, paciente_ids: List[str]) -> FuentesLotePEDT:
+        """
+        Consulta una vez cada tabla fuente para todo el lote de pacientes
+        
+        Raises:
+            Exception: Si falla la consulta de pacientes (sin ella no hay reporte)
+        """
+        fuentes = FuentesLotePEDT()
+        
+        pacientes = self._consultar_por_valores('pacientes', '*', 'id', paciente_ids)
+        fuentes.pacientes = {str(p['id']): p for p in pacientes}
+        
+        # Atenciones materno perinatales: gestante (var 14), sífilis (var 15) y control prenatal
+        atenciones_activas: Dict[str, str] = {}
+        try:
+            atenciones = self._consultar_por_valores(
+                'atencion_materno_perinatal',
+                'id, paciente_id, estado, resultado_tamizaje_sifilis, fecha_atencion',
+                'paciente_id', paciente_ids,
+                orden=[('fecha_atencion', True), ('id', False)]
+            )
+            for atencion in atenciones:
+                fuentes.atenciones_materno_perinatal.setdefault(str(atencion['paciente_id']), []).append(atencion)
+                if atencion.get('estado') == 'activa':
+                    atenciones_activas[str(atencion['id'])] = str(atencion['paciente_id'])
+        except Exception as e:
+            logger.error(f"Error precargando atenciones materno perinatales: {str(e)}")
+            fuentes.errores['atencion_materno_perinatal'] = e
+        
+        try:
+            controles = self._consultar_por_valores(
+                'detalle_control_prenatal', '*',
+                'atencion_materno_perinatal_id', list(atenciones_activas)
+            )
+            # Los ids de un paciente pueden caer en distintos filtros IN: se elige el más reciente aquí
+            for control in controles:
+                paciente_id = atenciones_activas[str(control['atencion_materno_perinatal_id'])]
+                actual = fuentes.controles_prenatales.get(paciente_id)
+                if actual is None or (control.get('creado_en') or '') > (actual.get('creado_en') or ''):
+                    fuentes.controles_prenatales[paciente_id] = control
+        except Exception as e:
+            logger.error(f"Error precargando controles prenatales: {str(e)}")
+            fuentes.errores['detalle_control_prenatal'] = e
+        
+        try:
+            atenciones_pi = self._consultar_por_valores(
+                'atencion_primera_infancia',
+                'paciente_id, ' + COLUMNAS_PRIMERA_INFANCIA_PEDT,
+                'paciente_id', paciente_ids,
+                orden=[('fecha_atencion', True), ('id', False)]
+            )
+            for atencion in atenciones_pi:
+                fuentes.primera_infancia.setdefault(str(atencion['paciente_id']), atencion)
+        except Exception as e:
+            logger.error(f"Error precargando atenciones primera infancia: {str(e)}")
+            fuentes.errores['atencion_primera_infancia'] = e
+        
+        return fuentes
+    
+    def _consultar_por_valores(self, tabla: str, columnas: str, campo: str, valores: List[str],
+                               orden: Optional[List[Tuple[str, bool]]] = None) -> List[Dict[str, Any]]:
+        """
+        Consulta filas cuyo campo esté en valores, dividiendo el filtro IN y paginando
+        
+        Args:
+            orden: Lista de (columna, descendente) aplicada en el servidor
+        """
+        filas = []
+        for inicio in range(0, len(valores), TAMANO_FILTRO_IN):
+            bloque = valores[inicio:inicio + TAMANO_FILTRO_IN]
+            desplazamiento = 0
+            while True:
+                consulta = self.db.table(tabla).select(columnas).in_(campo, bloque)
+                for columna, descendente in orden or []:
+                    consulta = consulta.order(columna, desc=descendente)
+                response = consulta.range(desplazamiento, desplazamiento + TAMANO_PAGINA_CONSULTA - 1).execute()
+                pagina = response.data or []
+                filas.extend(pagina)
+                if len(pagina) < TAMANO_PAGINA_CONSULTA:
+                    break
+                desplazamiento += TAMANO_PAGINA_CONSULTA
+        return filas
     
     def _obtener_datos_paciente(self, paciente_id: UUID) -> Optional[Dict[str, Any]]:
         """
@@ -139,50 +477,121 @@ class GeneradorReportePEDT:
         """
         Calcula variables de identificación (0-13)
         
-        Estas son variables derivadas directamente desde tabla pacientes
+        Estas son variables derivadas directamente desde tabla pacientes. Como en
+        todo el vector, el número de la clave var_<N>_... es el de la variable en
+        el anexo técnico (Controles RPED)
         """
         return {
-            'var_0_tipo_registro': '1',  # Siempre individual para RIAS
-            'var_1_consecutivo': datos_paciente.get('numero_documento', ''),
-            'var_2_tipo_identificacion': self._mapear_tipo_identificacion(datos_paciente.get('tipo_documento')),
-            'var_3_numero_identificacion': datos_paciente.get('numero_documento', ''),
-            'var_4_primer_apellido': datos_paciente.get('primer_apellido', ''),
-            'var_5_segundo_apellido': datos_paciente.get('segundo_apellido', ''),
-            'var_6_primer_nombre': datos_paciente.get('primer_nombre', ''),
-            'var_7_segundo_nombre': datos_paciente.get('segundo_nombre', ''),
-            'var_8_fecha_nacimiento': self._formatear_fecha(datos_paciente.get('fecha_nacimiento')),
-            'var_9_sexo': self._mapear_sexo(datos_paciente.get('genero')),
-            'var_10_pertenencia_etnica': datos_paciente.get('pertenencia_etnica', 6),  # Default: Sin pertenencia
-            'var_11_ocupacion': datos_paciente.get('ocupacion', 9999),  # Default: Sin información
-            'var_12_nivel_educativo': datos_paciente.get('nivel_educativo', 12),  # Default: Sin información
-            'var_13_codigo_ips': datos_paciente.get('codigo_ips_primaria', '')
+            'var_0_tipo_registro': TIPO_REGISTRO_DETALLE,
+            # El consecutivo real lo asigna el archivo al escribir el detalle
+            'var_1_consecutivo': 1,
+            'var_2_codigo_habilitacion_ips': datos_paciente.get('codigo_ips_primaria') or os.environ.get(
+                'CODIGO_HABILITACION_IPS', CODIGO_ENTIDAD_DESCONOCIDO
+            ),
+            'var_3_tipo_identificacion': self._mapear_tipo_identificacion(datos_paciente.get('tipo_documento')),
+            'var_4_numero_identificacion': datos_paciente.get('numero_documento', ''),
+            'var_5_primer_apellido': datos_paciente.get('primer_apellido', ''),
+            'var_6_segundo_apellido': datos_paciente.get('segundo_apellido', ''),
+            'var_7_primer_nombre': datos_paciente.get('primer_nombre', ''),
+            'var_8_segundo_nombre': datos_paciente.get('segundo_nombre', ''),
+            'var_9_fecha_nacimiento': self._formatear_fecha(datos_paciente.get('fecha_nacimiento')),
+            'var_10_sexo': self._mapear_sexo(datos_paciente.get('genero')),
+            'var_11_pertenencia_etnica': datos_paciente.get('pertenencia_etnica', 6),  # Default: Sin pertenencia
+            'var_12_ocupacion': datos_paciente.get('ocupacion', 9999),  # Default: Sin información
+            'var_13_nivel_educativo': datos_paciente.get('nivel_educativo', 12)  # Default: Sin información
         }
     
-    def _calcular_variables_gestacion(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
+    def _calcular_variables_sin_registro(self, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Calcula variables de gestación (14-15)
+        Valores de las variables 14-118 que la BD aún no registra
+        
+        El anexo técnico distingue "no aplica" (0 o 1845-01-01), válido solo fuera
+        de la población a la que va dirigida cada atención, de "sin dato" (21 o
+        1800-01-01), obligatorio dentro de ella. Las reglas de edad y sexo siguen
+        los controles RPED; los grupos siguientes reemplazan estos valores con
+        los datos que sí existen.
+        """
+        meses = self._calcular_edad_meses(datos_paciente.get('fecha_nacimiento'))
+        anios = meses // 12 if meses is not None else None
+        mujer = self._mapear_sexo(datos_paciente.get('genero')) == 'F'
+        
+        def edad_entre(desde: int, hasta: int, en_meses: bool = False) -> bool:
+            edad = meses if en_meses else anios
+            return edad is not None and desde <= edad <= hasta
+        
+        # Lepra, obesidad/desnutrición y enfermedad mental solo admiten 21;
+        # peso y talla (toda la población) solo admiten el comodín "sin dato"
+        sin_dato = {20, 21, 25, 29, 30, 31, 32, 113}
+        if edad_entre(60, 200):
+            sin_dato.add(16)  # Mini-mental
+        if edad_entre(50, 75):
+            sin_dato.update({24, 36, 66, 67})  # Tamizaje cáncer de colon
+        if edad_entre(0, 12):
+            sin_dato.update({40, 63})  # Tamizaje VALE
+        if edad_entre(0, 7):
+            sin_dato.update({43, 44, 45, 46, 52})  # Escala abreviada de desarrollo
+        if edad_entre(10, 200):
+            sin_dato.add(53)  # Asesoría en anticoncepción
+        if edad_entre(10, 59):
+            sin_dato.update({54, 55})  # Método anticonceptivo
+        if edad_entre(29, 200):
+            sin_dato.update({72, 105, 106, 111, 118})  # Perfil lipídico, glicemia y creatinina
+        if edad_entre(6, 27, en_meses=True):
+            sin_dato.add(70)  # Fortificación casera
+        if edad_entre(24, 63, en_meses=True):
+            sin_dato.update({71, 77})  # Vitamina A y hierro
+        if mujer and edad_entre(50, 200):
+            sin_dato.update({96, 97})  # Mamografía
+        if mujer and edad_entre(10, 17):
+            sin_dato.add(103)  # Hemoglobina
+        # Un resultado cuya fecha de toma es "sin dato" se reporta 998
+        sin_dato.update(RESULTADOS_POR_FECHA_RPED[fecha] for fecha in sin_dato & set(RESULTADOS_POR_FECHA_RPED))
+        
+        tipos = obtener_motor_validacion_202().variables['RPED']
+        variables = {}
+        for numero, nombre in NOMBRES_VARIABLES_RPED.items():
+            if numero < 14:
+                continue
+            if tipos[numero].tipo == 'F':
+                valor = COMODIN_SIN_DATO if numero in sin_dato else COMODIN_NO_APLICA
+            elif numero in sin_dato:
+                valor = VALORES_SIN_DATO_RPED.get(numero, 21)
+            else:
+                valor = 0
+            variables[f'var_{numero}_{nombre}'] = valor
+        
+        if not edad_entre(12, 200):
+            variables['var_19_consumo_tabaco'] = 98  # No aplica en menores de 12 años
+        return variables
+    
+    def _calcular_variables_gestacion(self, paciente_id: UUID, datos_paciente: Dict[str, Any],
+                                      fuentes: Optional[FuentesLotePEDT] = None) -> Dict[str, Any]:
+        """
+        Calcula variables de gestación (14-15, 80-81)
         
         VARIABLE DERIVADA CRÍTICA:
         - Variable 14: Se calcula verificando si existe atencion_materno_perinatal activa
-        - Variable 15: Se deriva de datos de control prenatal
+        - Variables 80-81: Tamizaje de sífilis registrado en la atención de la gestante.
+          La variable 15 está en desuso: el anexo solo admite 0
         """
         # Variable 14: Gestante
-        gestante = self._es_gestante(paciente_id, datos_paciente)
-        
-        # Variable 15: Sífilis gestacional o congénita
-        sifilis_gestacional = self._calcular_sifilis_gestacional(paciente_id) if gestante == 1 else 0
+        gestante = self._es_gestante(paciente_id, datos_paciente, fuentes)
         
-        return {
+        variables = {
             'var_14_gestante': gestante,
-            'var_15_sifilis_gestacional': sifilis_gestacional
+            'var_15_sifilis_gestacional_congenita': 0
         }
+        if gestante == 1:
+            variables.update(self._calcular_tamizaje_sifilis(paciente_id, fuentes))
+        return variables
     
-    def _es_gestante(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> int:
+    def _es_gestante(self, paciente_id: UUID, datos_paciente: Dict[str, Any],
+                     fuentes: Optional[FuentesLotePEDT] = None) -> int:
         """
         Calcula si la paciente está gestante (Variable 14)
         
         Lógica:
-        - Si es hombre: 0 (No aplica)
+        - Si es hombre o tiene menos de 10 o 60 o más años: 0 (No aplica)
         - Si es mujer y tiene atencion_materno_perinatal activa: 1 (Sí)
         - Si es mujer sin atencion_materno_perinatal: 2 (No)
         - Si no se puede evaluar: 21 (Riesgo no evaluado)
@@ -191,18 +600,18 @@ class GeneradorReportePEDT:
             int: Código según especificación Resolución 202
         """
         try:
-            # Si es hombre, no aplica
-            if datos_paciente.get('genero', '').upper() in ['M', 'MASCULINO']:
+            # Mismo sexo que se reporta en la variable 10
+            if self._mapear_sexo(datos_paciente.get('genero')) == 'M':
+                return 0
+            
+            edad = self._calcular_edad(datos_paciente.get('fecha_nacimiento'))
+            if edad is not None and not 10 <= edad < 60:
                 return 0
             
             # Verificar si tiene atención materno perinatal activa
-            response = self.db.table('atencion_materno_perinatal')\
-                .select('id, estado')\
-                .eq('paciente_id', str(paciente_id))\
-                .eq('estado', 'activa')\
-                .execute()
+            atenciones_activas = self._obtener_atenciones_mp_activas(paciente_id, fuentes)
             
-            if response.data and len(response.data) > 0:
+            if atenciones_activas:
                 return 1  # Sí es gestante
             else:
                 return 2  # No es gestante
@@ -211,245 +620,179 @@ class GeneradorReportePEDT:
             logger.error(f"Error calculando gestante para paciente {paciente_id}: {str(e)}")
             return 21  # Riesgo no evaluado
     
-    def _calcular_sifilis_gestacional(self, paciente_id: UUID) -> int:
+    def _obtener_atenciones_mp_activas(self, paciente_id: UUID,
+                                       fuentes: Optional[FuentesLotePEDT] = None) -> List[Dict[str, Any]]:
+        """Atenciones materno perinatales en estado activa del paciente"""
+        if fuentes is not None:
+            return [a for a in fuentes.atenciones_mp(paciente_id) if a.get('estado') == 'activa']
+        
+        response = self.db.table('atencion_materno_perinatal')\
+            .select('id, estado')\
+            .eq('paciente_id', str(paciente_id))\
+            .eq('estado', 'activa')\
+            .execute()
+        return response.data or []
+    
+    def _calcular_tamizaje_sifilis(self, paciente_id: UUID, fuentes: Optional[FuentesLotePEDT] = None) -> Dict[str, Any]:
         """
-        Calcula sífilis gestacional (Variable 15)
+        Calcula fecha y resultado del tamizaje de sífilis (Variables 80-81)
 
-        Implementa lógica específica basada en atención materno perinatal
+        Implementa lógica específica basada en atención materno perinatal.
+        Sin resultado registrado se conservan los valores por defecto.
         """
         try:
             # Buscar atenciones materno perinatales del paciente con resultados de sífilis
-            mp_response = self.db.table("atencion_materno_perinatal").select(
-                "resultado_tamizaje_sifilis, fecha_atencion"
-            ).eq("paciente_id", str(paciente_id)).order("fecha_atencion", desc=True).limit(1).execute()
-
-            if mp_response.data:
-                resultado = mp_response.data[0].get("resultado_tamizaje_sifilis")
-                if resultado == "POSITIVO":
-                    return 1  # Sífilis gestacional detectada
-                elif resultado == "NEGATIVO":
-                    return 2  # Descartada
-                elif resultado in ["REACTIVO", "NO_REACTIVO"]:
-                    return 1 if resultado == "REACTIVO" else 2
-
-            return 0  # No aplica / No se ha realizado
+            if fuentes is not None:
+                atenciones_mp = fuentes.atenciones_mp(paciente_id)[:1]
+            else:
+                atenciones_mp = self.db.table("atencion_materno_perinatal").select(
+                    "resultado_tamizaje_sifilis, fecha_atencion"
+                ).eq("paciente_id", str(paciente_id)).order("fecha_atencion", desc=True).limit(1).execute().data
+
+            if atenciones_mp and atenciones_mp[0].get("fecha_atencion"):
+                resultado = {
+                    "POSITIVO": 5, "REACTIVO": 5,  # Reactiva
+                    "NEGATIVO": 4, "NO_REACTIVO": 4  # No reactiva
+                }.get(atenciones_mp[0].get("resultado_tamizaje_sifilis"))
+                if resultado:
+                    return {
+                        'var_80_fecha_sifilis': self._formatear_fecha(atenciones_mp[0]["fecha_atencion"]),
+                        'var_81_resultado_sifilis': resultado
+                    }
+
+            return {}
         except Exception as e:
-            logger.warning(f"Error consultando sífilis gestacional: {e}")
-            return 0
+            logger.warning(f"Error consultando tamizaje de sífilis: {e}")
+            return {}
     
-    def _calcular_variables_test_vejez(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables para población ≥60 años (16-17)
+    def _calcular_variables_control_prenatal(self, paciente_id: UUID, datos_paciente: Dict[str, Any],
+                                             fuentes: Optional[FuentesLotePEDT] = None) -> Dict[str, Any]:
         """
-        edad = self._calcular_edad(datos_paciente.get('fecha_nacimiento'))
-        
-        if edad and edad >= 60:
-            # TODO: Implementar cuando se agreguen campos específicos
-            return {
-                'var_16_minimental': 0,  # Default: No se ha realizado
-                'var_17_hipotiroidismo': 0  # Default: No se ha realizado
-            }
-        else:
-            return {
-                'var_16_minimental': 0,  # No aplica por edad
-                'var_17_hipotiroidismo': 0  # No aplica por edad
-            }
-    
-    def _calcular_variables_tuberculosis(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variable tuberculosis (18)
-        """
-        # TODO: Implementar lógica específica sintomático respiratorio
-        return {
-            'var_18_sintomatico_respiratorio': 0  # Default: No se ha realizado
-        }
-    
-    def _calcular_variables_riesgo_cardiovascular(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables riesgo cardiovascular (19-21)
-        """
-        # TODO: Implementar cuando se agreguen campos específicos
-        return {
-            'var_19_consumo_tabaco': 0,  # Default: No se ha realizado
-            'var_20_hipertension_arterial': 0,  # Default: No se ha realizado
-            'var_21_diabetes': 0  # Default: No se ha realizado
-        }
-    
-    def _calcular_variables_salud_mental(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables salud mental (22-25)
-        """
-        # TODO: Implementar lógica específica salud mental
-        return {
-            'var_22_victima_maltrato': 0,
-            'var_23_violencia_sexual': 0,
-            'var_24_atencion_salud_mental': 0,
-            'var_25_interdisciplinaria_salud_mental': 0
-        }
-    
-    def _calcular_variables_control_prenatal(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables control prenatal (26-45)
+        Variables control prenatal (23, 33, 35, 56, 58-61)
         
         VARIABLES DERIVADAS CRÍTICAS:
-        Estas se mapean directamente desde detalle_control_prenatal existente
+        Estas se mapean directamente desde detalle_control_prenatal existente.
+        A una gestante el anexo no le admite "no aplica" en ellas: lo que no
+        está registrado se reporta "sin dato"
         """
         # Verificar si es gestante
-        if self._es_gestante(paciente_id, datos_paciente) != 1:
-            # No es gestante, todas las variables son 0 (No aplica)
-            variables_cp = {}
-            for i in range(26, 46):
-                variables_cp[f'var_{i}_control_prenatal'] = 0
-            return variables_cp
+        if self._es_gestante(paciente_id, datos_paciente, fuentes) != 1:
+            # No es gestante: quedan en "no aplica"
+            return {}
         
+        variables_cp = {
+            'var_23_acido_folico_preconcepcional': 21,
+            'var_33_fecha_probable_parto': COMODIN_SIN_DATO,
+            'var_35_riesgo_gestacional': 21,
+            'var_56_fecha_primera_consulta_prenatal': COMODIN_SIN_DATO,
+            'var_58_fecha_ultimo_control_prenatal': COMODIN_SIN_DATO,
+            'var_59_acido_folico_prenatal': 21,
+            'var_60_sulfato_ferroso_prenatal': 21,
+            'var_61_carbonato_calcio_prenatal': 21
+        }
         try:
             # Obtener datos de control prenatal más reciente
-            response = self.db.table('detalle_control_prenatal')\
-                .select('*')\
-                .eq('atencion_materno_perinatal_id', 
-                    f"(SELECT id FROM atencion_materno_perinatal WHERE paciente_id = '{paciente_id}' AND estado = 'activa')")\
-                .order('fecha_atencion', desc=True)\
-                .limit(1)\
-                .execute()
+            datos_cp = self._obtener_control_prenatal_reciente(paciente_id, fuentes)
             
-            if response.data and len(response.data) > 0:
-                datos_cp = response.data[0]
-                return self._mapear_datos_control_prenatal(datos_cp)
-            else:
-                # Gestante pero sin datos de control prenatal aún
-                variables_cp = {}
-                for i in range(26, 46):
-                    variables_cp[f'var_{i}_control_prenatal'] = 0
-                return variables_cp
+            if datos_cp:
+                variables_cp.update(self._mapear_datos_control_prenatal(datos_cp))
                 
         except Exception as e:
             logger.error(f"Error calculando variables control prenatal para {paciente_id}: {str(e)}")
-            # Error en consulta, valores por defecto
-            variables_cp = {}
-            for i in range(26, 46):
-                variables_cp[f'var_{i}_control_prenatal'] = 0
-            return variables_cp
+        return variables_cp
+    
+    def _obtener_control_prenatal_reciente(self, paciente_id: UUID,
+                                           fuentes: Optional[FuentesLotePEDT] = None) -> Optional[Dict[str, Any]]:
+        """Detalle de control prenatal más reciente de las atenciones activas del paciente"""
+        if fuentes is not None:
+            return fuentes.control_prenatal_reciente(paciente_id)
+        
+        atenciones_activas = self._obtener_atenciones_mp_activas(paciente_id)
+        if not atenciones_activas:
+            return None
+        
+        response = self.db.table('detalle_control_prenatal')\
+            .select('*')\
+            .in_('atencion_materno_perinatal_id', [str(a['id']) for a in atenciones_activas])\
+            .order('creado_en', desc=True)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
     
     def _mapear_datos_control_prenatal(self, datos_cp: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Mapea datos de detalle_control_prenatal a variables PEDT 26-45
+        Mapea datos de detalle_control_prenatal a variables PEDT
         
         MAPEO DIRECTO desde BD existente:
         - Variable 33: fecha_probable_parto (ya existe)
         - Variable 35: riesgo_biopsicosocial (ya existe como ENUM)
+        - Variable 58: fecha del control más reciente (creado_en)
+        - Variables 59-61: suplementación ácido fólico, hierro y calcio
         """
+        def suministro(campo: str) -> int:
+            return 1 if datos_cp.get(campo) else 21  # 1: Suministrado, 21: Sin dato
+        
         return {
-            'var_26_fecha_ultima_regla': self._formatear_fecha(datos_cp.get('fecha_ultima_regla')),
-            'var_27_edad_gestacional': datos_cp.get('edad_gestacional_semanas', 0),
-            'var_28_altura_uterina': datos_cp.get('altura_uterina_cm', 0),
-            'var_29_peso_actual': datos_cp.get('peso_actual_kg', 0),
-            'var_30_imc_pregestacional': datos_cp.get('imc_pregestacional', 0),
-            'var_31_tension_sistolica': datos_cp.get('tension_arterial_sistolica', 0),
-            'var_32_tension_diastolica': datos_cp.get('tension_arterial_diastolica', 0),
-            'var_33_fecha_probable_parto': self._formatear_fecha(datos_cp.get('fecha_probable_parto')),  # MAPEO DIRECTO
-            'var_34_numero_embarazos': datos_cp.get('numero_embarazos_previos', 0),
+            'var_33_fecha_probable_parto': self._formatear_fecha(datos_cp.get('fecha_probable_parto')) or COMODIN_SIN_DATO,  # MAPEO DIRECTO
             'var_35_riesgo_gestacional': self._mapear_riesgo_biopsicosocial(datos_cp.get('riesgo_biopsicosocial')),  # MAPEO DIRECTO ENUM
-            # Variables 36-45: Suministros y otros controles
-            'var_36_acido_folico': datos_cp.get('suministro_acido_folico', 0),
-            'var_37_sulfato_ferroso': datos_cp.get('suministro_sulfato_ferroso', 0),
-            'var_38_carbonato_calcio': datos_cp.get('suministro_carbonato_calcio', 0),
-            # Resto de variables por defecto hasta implementar campos específicos
-            **{f'var_{i}_control_prenatal_detalle': 0 for i in range(39, 46)}
+            'var_58_fecha_ultimo_control_prenatal': self._formatear_fecha(
+                (datos_cp.get('creado_en') or '')[:10]
+            ) or COMODIN_SIN_DATO,
+            'var_59_acido_folico_prenatal': suministro('suplementacion_acido_folico'),
+            'var_60_sulfato_ferroso_prenatal': suministro('suplementacion_hierro'),
+            'var_61_carbonato_calcio_prenatal': suministro('suplementacion_calcio')
         }
     
-    def _calcular_variables_crecimiento_desarrollo(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
+    def _calcular_variables_crecimiento_desarrollo(self, paciente_id: UUID, datos_paciente: Dict[str, Any],
+                                                   fuentes: Optional[FuentesLotePEDT] = None) -> Dict[str, Any]:
         """
-        Variables crecimiento y desarrollo primera infancia (46-55)
-        Implementa lógica específica basada en atención primera infancia y datos EAD-3/ASQ-3
+        Variables crecimiento y desarrollo primera infancia (29-32, 43-46, 52)
+        Implementa lógica específica basada en atención primera infancia y datos EAD-3
         """
         edad = self._calcular_edad(datos_paciente.get('fecha_nacimiento'))
 
-        if edad and edad <= 10:
-            # Buscar atenciones de primera infancia con datos EAD-3/ASQ-3
-            try:
+        if edad is None or edad > 10:
+            # No aplica por edad
+            return {}
+
+        # Buscar atenciones de primera infancia con datos EAD-3
+        try:
+            if fuentes is not None:
+                datos_pi = fuentes.primera_infancia_reciente(paciente_id)
+            else:
                 pi_response = self.db.table("atencion_primera_infancia").select(
-                    "peso_kg, talla_cm, estado_nutricional, desarrollo_fisico_motor_observaciones, "
-                    "desarrollo_cognitivo_observaciones, esquema_vacunacion_completo, "
-                    "ead_resultado_global, asq_resultado_global, fecha_atencion"
+                    COLUMNAS_PRIMERA_INFANCIA_PEDT
                 ).eq("paciente_id", str(paciente_id)).order("fecha_atencion", desc=True).limit(1).execute()
+                datos_pi = pi_response.data[0] if pi_response.data else None
+        except Exception as e:
+            logger.warning(f"Error consultando datos primera infancia: {e}")
+            return {}
 
-                if pi_response.data:
-                    datos_pi = pi_response.data[0]
-                    return {
-                        'var_46_peso_actual': datos_pi.get('peso_kg', 0),
-                        'var_47_talla_actual': datos_pi.get('talla_cm', 0),
-                        'var_48_estado_nutricional': self._mapear_estado_nutricional(datos_pi.get('estado_nutricional')),
-                        'var_49_desarrollo_motor': self._evaluar_desarrollo_motor(datos_pi.get('desarrollo_fisico_motor_observaciones')),
-                        'var_50_desarrollo_cognitivo': self._evaluar_desarrollo_cognitivo(datos_pi.get('desarrollo_cognitivo_observaciones')),
-                        'var_51_esquema_vacunacion': 1 if datos_pi.get('esquema_vacunacion_completo') else 0,
-                        'var_52_ead_resultado': self._mapear_ead_resultado(datos_pi.get('ead_resultado_global')),
-                        'var_53_asq_resultado': self._mapear_asq_resultado(datos_pi.get('asq_resultado_global')),
-                        'var_54_desarrollo_global': self._calcular_desarrollo_global(datos_pi),
-                        'var_55_alertas_desarrollo': self._identificar_alertas_desarrollo(datos_pi)
-                    }
-                else:
-                    # Sin datos de primera infancia
-                    return {**{f'var_{i}_crecimiento_desarrollo': 0 for i in range(46, 56)}}
+        if not datos_pi or not datos_pi.get('fecha_atencion'):
+            # Sin datos de primera infancia
+            return {}
 
-            except Exception as e:
-                logger.warning(f"Error consultando datos primera infancia: {e}")
-                return {**{f'var_{i}_crecimiento_desarrollo': 0 for i in range(46, 56)}}
-        else:
-            # No aplica por edad
-            return {**{f'var_{i}_crecimiento_desarrollo': 0 for i in range(46, 56)}}
-    
-    def _calcular_variables_consultas_curso_vida(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables consultas por curso de vida (56-63)
-        """
-        # TODO: Implementar lógica específica consultas por edad
-        return {
-            **{f'var_{i}_consulta_curso_vida': 0 for i in range(56, 64)}
-        }
-    
-    def _calcular_variables_vacunacion(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables vacunación esquema PAI (64-95)
-        """
-        edad = self._calcular_edad(datos_paciente.get('fecha_nacimiento'))
-        
-        if edad and edad <= 6:
-            # TODO: Implementar cuando se agregue tabla vacunas
-            return {
-                **{f'var_{i}_vacuna': 0 for i in range(64, 96)}
-            }
-        else:
-            # No aplica por edad
-            return {
-                **{f'var_{i}_vacuna': 0 for i in range(64, 96)}
-            }
-    
-    def _calcular_variables_salud_oral(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables salud oral (96-99)
-        """
-        # TODO: Implementar campos salud oral
-        return {
-            **{f'var_{i}_salud_oral': 0 for i in range(96, 100)}
-        }
-    
-    def _calcular_variables_atencion_parto(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables atención del parto (100-107)
-        """
-        # TODO: Implementar cuando se agreguen campos parto
-        return {
-            **{f'var_{i}_atencion_parto': 0 for i in range(100, 108)}
-        }
+        fecha_atencion = self._formatear_fecha(datos_pi['fecha_atencion'])
+        variables = {}
+        if datos_pi.get('peso_kg'):
+            variables['var_29_fecha_peso'] = fecha_atencion
+            variables['var_30_peso'] = datos_pi['peso_kg']
+        if datos_pi.get('talla_cm'):
+            variables['var_31_fecha_talla'] = fecha_atencion
+            variables['var_32_talla'] = round(datos_pi['talla_cm'])
+
+        ead = self._mapear_resultado_ead(datos_pi.get('ead_resultado_global'))
+        if ead and edad < 8:
+            # La atención registra solo el resultado global de la EAD-3: se reporta en las cuatro áreas
+            variables.update({
+                'var_43_ead_motricidad_gruesa': ead,
+                'var_44_ead_motricidad_finoadaptativa': ead,
+                'var_45_ead_personal_social': ead,
+                'var_46_ead_audicion_lenguaje': ead,
+                'var_52_fecha_valoracion_integral': fecha_atencion
+            })
+        return variables
     
-    def _calcular_variables_tamizajes(self, paciente_id: UUID, datos_paciente: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Variables tamizajes y pruebas diagnósticas (108-119)
-        """
-        # TODO: Implementar cuando se agreguen campos tamizajes
-        return {
-            **{f'var_{i}_tamizaje': 0 for i in range(108, 120)}
-        }
     
     # MÉTODOS UTILITARIOS
     
@@ -485,9 +828,10 @@ class GeneradorReportePEDT:
         Según equipo consultor externo:
         - 4: Alto riesgo
         - 5: Bajo riesgo
+        - 21: Riesgo no evaluado (sin registro, MEDIO o PENDIENTE)
         """
         if not riesgo:
-            return 0  # No aplica
+            return 21
         
         riesgo_lower = riesgo.lower()
         if 'alto' in riesgo_lower:
@@ -495,7 +839,7 @@ class GeneradorReportePEDT:
         elif 'bajo' in riesgo_lower:
             return 5
         else:
-            return 0  # No aplica
+            return 21
     
     def _formatear_fecha(self, fecha: Union[str, date, datetime, None]) -> str:
         """Formatea fecha a AAAA-MM-DD requerido por SISPRO"""
@@ -519,6 +863,11 @@ class GeneradorReportePEDT:
     
     def _calcular_edad(self, fecha_nacimiento: Union[str, date, datetime, None]) -> Optional[int]:
         """Calcula edad en años"""
+        meses = self._calcular_edad_meses(fecha_nacimiento)
+        return meses // 12 if meses is not None else None
+    
+    def _calcular_edad_meses(self, fecha_nacimiento: Union[str, date, datetime, None]) -> Optional[int]:
+        """Calcula edad en meses cumplidos"""
         if not fecha_nacimiento:
             return None
         
@@ -533,18 +882,19 @@ class GeneradorReportePEDT:
                 return None
             
             hoy = date.today()
-            edad = hoy.year - fecha_nac.year - ((hoy.month, hoy.day) < (fecha_nac.month, fecha_nac.day))
-            return edad
+            return (hoy.year - fecha_nac.year) * 12 + hoy.month - fecha_nac.month - (hoy.day < fecha_nac.day)
             
         except:
             return None
     
-    def aplicar_validaciones_202(self, variables_pedt: Dict[str, Any]) -> Dict[str, Any]:
+    def aplicar_validaciones_202(self, variables_pedt: Dict[str, Any],
+                                 periodo: Optional[str] = None) -> Dict[str, Any]:
         """
         Aplica validaciones según Controles_RPED_202.csv
         
         Args:
             variables_pedt: Dict con 119 variables calculadas
+            periodo: Período del reporte AAAA-MM (define la fecha de corte)
             
         Returns:
             Dict con validaciones aplicadas y errores identificados
@@ -555,13 +905,10 @@ class GeneradorReportePEDT:
             'warnings': []
         }
         
-        # TODO: Implementar validaciones específicas de Resolución 202
-        # Por ahora validaciones básicas
-        
         # Validación: Variables obligatorias
         variables_obligatorias = [
-            'var_1_consecutivo', 'var_2_tipo_identificacion', 
-            'var_3_numero_identificacion', 'var_8_fecha_nacimiento'
+            'var_3_tipo_identificacion', 'var_4_numero_identificacion',
+            'var_9_fecha_nacimiento'
         ]
         
         for var_obligatoria in variables_obligatorias:
@@ -569,8 +916,31 @@ class GeneradorReportePEDT:
                 validaciones['errores'].append(f"Variable {var_obligatoria} es obligatoria")
                 validaciones['es_valido'] = False
         
+        # Validaciones de cargue compiladas desde los anexos técnicos
+        resultado = self.validar_variables_202_lote([variables_pedt], periodo)
+        for codigo in resultado['histograma']:
+            mensaje = f"{codigo}: {resultado['descripciones'][codigo]}"
+            if codigo.lower().startswith('warning'):
+                validaciones['warnings'].append(mensaje)
+            else:
+                validaciones['errores'].append(mensaje)
+                validaciones['es_valido'] = False
+        
         return validaciones
     
+    def validar_variables_202_lote(self, variables_pacientes: Iterable[Dict[str, Any]],
+                                   periodo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Valida un lote de vectores PEDT contra los controles de la Resolución 202
+        
+        Todas las reglas se evalúan columna por columna sobre el lote completo.
+        
+        Returns:
+            Dict con histograma de errores por código y filas que incumplen cada uno
+        """
+        _, fecha_corte = self._rango_periodo(periodo)
+        return obtener_motor_validacion_202().validar_lote(variables_pacientes, fecha_corte).a_dict()
+    
     def generar_archivo_plano_sispro(self, datos_pacientes: List[Dict[str, Any]], 
                                    periodo: str = None) -> str:
         """
@@ -588,10 +958,9 @@ class GeneradorReportePEDT:
         
         lineas = []
         
-        for datos_paciente in datos_pacientes:
+        for consecutivo, datos_paciente in enumerate(datos_pacientes, start=1):
             # Construir línea del archivo según especificación SISPRO
-            # TODO: Implementar formato exacto según especificación
-            linea = self._construir_linea_sispro(datos_paciente)
+            linea = self._construir_linea_sispro(datos_paciente, consecutivo)
             lineas.append(linea)
         
         archivo_contenido = '\n'.join(lineas)
@@ -599,136 +968,171 @@ class GeneradorReportePEDT:
         logger.info(f"Archivo plano SISPRO generado: {len(lineas)} registros para período {periodo}")
         return archivo_contenido
     
-    def _construir_linea_sispro(self, variables_pedt: Dict[str, Any]) -> str:
+    def _construir_linea_sispro(self, variables_pedt: Dict[str, Any], consecutivo: Optional[int] = None) -> str:
         """
-        Construye una línea del archivo SISPRO con las 119 variables
+        Construye el registro de detalle (tipo 2) del archivo SISPRO con las 119 variables
+        
+        Cada valor va en la posición del número de su clave var_<N>_...; las
+        variables ausentes quedan vacías.
+        
+        Args:
+            consecutivo: Número del registro dentro del archivo (variable 1)
         
         Returns:
-            str: Línea formateada según especificación
+            str: Línea 'v0|v1|...|v118'
         """
-        # TODO: Implementar formato exacto según Anexos.csv
-        # Por ahora formato básico separado por pipes
-        campos = []
-        
-        for i in range(119):
-            var_key = f'var_{i}'
-            valor = variables_pedt.get(var_key, '0')  # Default 0 si no existe
-            campos.append(str(valor))
+        campos = [''] * len(NOMBRES_VARIABLES_RPED)
+        for clave, valor in variables_pedt.items():
+            partes = clave.split('_', 2)
+            if len(partes) < 2 or partes[0] != 'var' or not partes[1].isdigit():
+                continue
+            numero = int(partes[1])
+            if numero < len(campos) and valor is not None:
+                campos[numero] = str(valor)
         
+        campos[0] = TIPO_REGISTRO_DETALLE
+        if consecutivo is not None:
+            campos[1] = str(consecutivo)
         return '|'.join(campos)
+    
+    def construir_registro_control(self, total_registros: int, periodo: Optional[str] = None,
+                                   codigo_entidad: Optional[str] = None) -> str:
+        """
+        Construye el registro de control (tipo 1) del archivo SISPRO
+        
+        Formato: 1|código entidad|fecha inicial|fecha final|total registros de detalle
+        
+        Args:
+            total_registros: Número de registros de detalle (tipo 2) del archivo
+            periodo: Período del reporte (AAAA-MM). Si None, mes actual
+            codigo_entidad: Código de habilitación. Si None, usa CODIGO_HABILITACION_IPS
+        """
+        fecha_inicial, fecha_final = self._rango_periodo(periodo)
+        codigo_entidad = codigo_entidad or os.environ.get('CODIGO_HABILITACION_IPS', CODIGO_ENTIDAD_DESCONOCIDO)
+        return '|'.join(['1', codigo_entidad, fecha_inicial, fecha_final, str(total_registros)])
+    
+    def iterar_registros_detalle_sispro(self, paciente_ids: Iterable[UUID],
+                                        tamano_lote: int = TAMANO_LOTE_PEDT, cache=None) -> Iterator[str]:
+        """
+        Produce las líneas de detalle del archivo SISPRO (terminadas en salto de línea)
+        a medida que se calcula cada lote de pacientes
+        """
+        variables = self._iterar_solo_variables(paciente_ids, tamano_lote, cache)
+        for consecutivo, variables_pedt in enumerate(variables, start=1):
+            yield self._construir_linea_sispro(variables_pedt, consecutivo) + '\n'
+    
+    def _iterar_solo_variables(self, paciente_ids: Iterable[UUID], tamano_lote: int,
+                               cache=None) -> Iterator[Dict[str, Any]]:
+        for _, variables_pedt in self.iterar_variables_119_lote(paciente_ids, tamano_lote, cache):
+            yield variables_pedt
+    
+    def iterar_archivo_plano_sispro(self, paciente_ids: Iterable[UUID], periodo: Optional[str] = None,
+                                    codigo_entidad: Optional[str] = None,
+                                    tamano_lote: int = TAMANO_LOTE_PEDT, cache=None) -> Iterator[str]:
+        """
+        Produce el archivo SISPRO completo en bloques, con memoria constante
+        
+        El registro de control debe ir primero pero depende del total de registros,
+        por eso el detalle se escribe a un archivo temporal en disco mientras se
+        calcula y después se emite precedido por el registro de control.
+        Apto para StreamingResponse.
+        """
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as detalle:
+            total_registros = self._escribir_detalle_sispro(
+                self._iterar_solo_variables(paciente_ids, tamano_lote, cache), detalle
+            )
+            yield self.construir_registro_control(total_registros, periodo, codigo_entidad) + '\n'
+            
+            detalle.seek(0)
+            while True:
+                bloque = detalle.read(TAMANO_BLOQUE_ESCRITURA)
+                if not bloque:
+                    break
+                yield bloque
+    
+    def escribir_archivo_plano_sispro(self, paciente_ids: Iterable[UUID], ruta_destino: str,
+                                      periodo: Optional[str] = None, codigo_entidad: Optional[str] = None,
+                                      tamano_lote: int = TAMANO_LOTE_PEDT, cache=None) -> Dict[str, Any]:
+        """
+        Escribe el archivo SISPRO en disco sin mantener el reporte en memoria
+        
+        El archivo se ensambla en un temporal del mismo directorio y se renombra
+        al final, de modo que ruta_destino nunca queda con un reporte parcial.
+        
+        Returns:
+            Dict con ruta, período y total de registros de detalle
+        """
+        return self.escribir_variables_sispro(
+            self._iterar_solo_variables(paciente_ids, tamano_lote, cache), ruta_destino, periodo, codigo_entidad
+        )
+    
+    def escribir_variables_sispro(self, variables_pacientes: Iterable[Dict[str, Any]], ruta_destino: str,
+                                  periodo: Optional[str] = None,
+                                  codigo_entidad: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Escribe en disco el archivo SISPRO de variables PEDT ya calculadas
+        
+        Igual que escribir_archivo_plano_sispro, pero recibe las variables (por
+        ejemplo leídas de checkpoints) en lugar de calcularlas.
+        """
+        directorio = os.path.dirname(os.path.abspath(ruta_destino))
+        with tempfile.TemporaryFile('w+', encoding='utf-8', dir=directorio) as detalle:
+            total_registros = self._escribir_detalle_sispro(variables_pacientes, detalle)
+            detalle.seek(0)
+            
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directorio,
+                                             suffix='.tmp', delete=False) as salida:
+                try:
+                    salida.write(self.construir_registro_control(total_registros, periodo, codigo_entidad) + '\n')
+                    shutil.copyfileobj(detalle, salida, TAMANO_BLOQUE_ESCRITURA)
+                except Exception:
+                    os.remove(salida.name)
+                    raise
+        os.replace(salida.name, ruta_destino)
+        
+        logger.info(f"Archivo plano SISPRO escrito en {ruta_destino}: {total_registros} registros")
+        return {
+            'ruta': ruta_destino,
+            'periodo': periodo or datetime.now().strftime('%Y-%m'),
+            'total_registros': total_registros
+        }
+    
+    def nombre_archivo_sispro(self, periodo: Optional[str] = None) -> str:
+        """Nombre del archivo RPED con la fecha de corte (fecha final del período)"""
+        _, fecha_final = self._rango_periodo(periodo)
+        return f"SGD280RPED{fecha_final.replace('-', '')}.txt"
+    
+    def _escribir_detalle_sispro(self, variables_pacientes: Iterable[Dict[str, Any]], destino) -> int:
+        """Escribe los registros de detalle en destino y retorna cuántos se escribieron"""
+        total_registros = 0
+        for variables_pedt in variables_pacientes:
+            total_registros += 1
+            destino.write(self._construir_linea_sispro(variables_pedt, total_registros) + '\n')
+        return total_registros
+    
+    def _rango_periodo(self, periodo: Optional[str]) -> Tuple[str, str]:
+        """Fechas inicial y final (AAAA-MM-DD) de un período AAAA-MM"""
+        if not periodo:
+            periodo = datetime.now().strftime('%Y-%m')
+        
+        try:
+            anio, mes = (int(parte) for parte in periodo.split('-'))
+            ultimo_dia = calendar.monthrange(anio, mes)[1]
+        except ValueError:
+            raise ValueError(f"Período inválido '{periodo}', se espera AAAA-MM")
+        
+        return date(anio, mes, 1).isoformat(), date(anio, mes, ultimo_dia).isoformat()
 
     # =====================================================
     # MÉTODOS AUXILIARES PARA MAPEO DE DATOS ESPECÍFICOS
     # =====================================================
 
-    def _mapear_estado_nutricional(self, estado: str) -> int:
-        """Mapea estado nutricional a código PEDT"""
-        mapeo = {
-            'NORMAL': 1,
-            'DESNUTRICION_AGUDA': 2,
-            'SOBREPESO': 3,
-            'OBESIDAD': 4,
-            'RIESGO_DESNUTRICION': 5
-        }
-        return mapeo.get(estado, 0)
-
-    def _evaluar_desarrollo_motor(self, observaciones: str) -> int:
-        """Evalúa desarrollo motor basado en observaciones"""
-        if not observaciones:
-            return 0
-
-        observaciones_lower = observaciones.lower()
-        if 'normal' in observaciones_lower or 'adecuado' in observaciones_lower:
-            return 1
-        elif 'riesgo' in observaciones_lower or 'alerta' in observaciones_lower:
-            return 2
-        elif 'retraso' in observaciones_lower or 'alterado' in observaciones_lower:
-            return 3
-        return 0
-
-    def _evaluar_desarrollo_cognitivo(self, observaciones: str) -> int:
-        """Evalúa desarrollo cognitivo basado en observaciones"""
-        if not observaciones:
-            return 0
-
-        observaciones_lower = observaciones.lower()
-        if 'normal' in observaciones_lower or 'adecuado' in observaciones_lower:
-            return 1
-        elif 'riesgo' in observaciones_lower or 'alerta' in observaciones_lower:
-            return 2
-        elif 'retraso' in observaciones_lower or 'alterado' in observaciones_lower:
-            return 3
-        return 0
-
-    def _mapear_ead_resultado(self, resultado: str) -> int:
-        """Mapea resultado EAD-3 a código PEDT"""
-        if not resultado:
-            return 0
-
-        mapeo = {
-            'NORMAL': 1,
-            'ALERTA': 2,
-            'MEDIO': 2,
-            'ALTO': 3
-        }
-        return mapeo.get(resultado, 0)
-
-    def _mapear_asq_resultado(self, resultado: str) -> int:
-        """Mapea resultado ASQ-3 a código PEDT"""
-        if not resultado:
-            return 0
-
+    def _mapear_resultado_ead(self, resultado: str) -> int:
+        """Mapea resultado global EAD-3 a código PEDT (0 si no hay resultado)"""
         mapeo = {
-            'NORMAL': 1,
-            'SEGUIMIENTO': 2,
-            'REFERIR': 3
+            'NORMAL': 5,  # Desarrollo esperado para la edad
+            'ALERTA': 3,  # Riesgo de problemas en el desarrollo
+            'MEDIO': 3,
+            'ALTO': 4  # Sospecha de problemas en el desarrollo
         }
         return mapeo.get(resultado, 0)
-
-    def _calcular_desarrollo_global(self, datos_pi: Dict[str, Any]) -> int:
-        """Calcula desarrollo global basado en múltiples indicadores"""
-        ead = self._mapear_ead_resultado(datos_pi.get('ead_resultado_global'))
-        asq = self._mapear_asq_resultado(datos_pi.get('asq_resultado_global'))
-
-        # Si ambos están normales
-        if ead == 1 and asq == 1:
-            return 1  # Normal
-        # Si alguno tiene alerta
-        elif ead == 2 or asq == 2:
-            return 2  # Seguimiento
-        # Si alguno requiere referencia
-        elif ead == 3 or asq == 3:
-            return 3  # Intervención
-
-        return 0  # No evaluado
-
-    def _identificar_alertas_desarrollo(self, datos_pi: Dict[str, Any]) -> int:
-        """Identifica si hay alertas de desarrollo que requieren acción"""
-        alertas = 0
-
-        # Verificar alertas en EAD-3
-        if datos_pi.get('ead_resultado_global') in ['ALERTA', 'ALTO']:
-            alertas += 1
-
-        # Verificar alertas en ASQ-3
-        if datos_pi.get('asq_resultado_global') in ['REFERIR']:
-            alertas += 1
-
-        # Verificar estado nutricional
-        if datos_pi.get('estado_nutricional') in ['DESNUTRICION_AGUDA', 'OBESIDAD']:
-            alertas += 1
-
-        return min(alertas, 3)  # Máximo 3 alertas
-
-    def _mapear_riesgo_biopsicosocial(self, riesgo: str) -> int:
-        """Mapea riesgo biopsicosocial a código PEDT"""
-        if not riesgo:
-            return 0
-
-        mapeo = {
-            'BAJO': 1,
-            'MEDIO': 2,
-            'ALTO': 3,
-            'MUY_ALTO': 4
-        }
-        return mapeo.get(riesgo, 0)
\ No newline at end of file
@@ -0,0 +1,1006 @@
+# -*- coding: utf-8 -*-
+"""
+MOTOR DE VALIDACIÓN RESOLUCIÓN 202 DE 2021
+==========================================
+
+Compila las validaciones de cargue publicadas en los anexos técnicos
+(Controles RPED.csv y Controles NPED.csv) en una tabla de predicados que se
+evalúan columna por columna sobre lotes completos de vectores de variables.
+
+Cada texto de validación se traduce una sola vez, al cargar el motor, a un
+árbol de comparaciones sobre columnas NumPy. Validar un lote consiste en
+evaluar cada predicado sobre todas las filas a la vez; no hay un ciclo
+interpretado por fila.
+
+Las validaciones que dependen de fuentes externas (REPS, BDUA/BDEX, periodos
+anteriores) o cuyo texto no sigue la gramática reconocida quedan registradas
+como no compiladas, con su motivo, y no generan errores.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Any, Callable, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import csv
+import io
+import itertools
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_ANEXOS_202 = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'docs', '02-regulations', 'resolucion-202-data'
+)
+ARCHIVOS_CONTROLES_202 = {
+    'RPED': 'Controles RPED.csv',
+    'NPED': 'Controles NPED.csv',
+}
+CODIFICACION_ANEXOS_202 = 'mac_roman'  # Exportados desde Excel para Mac
+
+COMODINES_FECHA = (
+    '1800-01-01', '1805-01-01', '1810-01-01', '1825-01-01',
+    '1830-01-01', '1835-01-01', '1845-01-01'
+)
+FECHA_MINIMA_VALIDA = np.datetime64('1900-01-01', 'D')
+TAMANO_BLOQUE_ARCHIVO = 50000  # Registros de detalle validados por bloque al leer un archivo plano
+
+# Textos oficiales con erratas evidentes; se compila la intención documentada
+CORRECCIONES_REGLAS_202 = {
+    # Dice "variable 90" pero la regla pertenece a la fecha de la variable 91
+    'Error079': 'Validar que si la variable 91 <> 1845-01-01, la variable 10 debe registrar F',
+    # "<> 4, ó <> 5" es siempre verdadero; la intención es "no es 4 ni 5"
+    'Error237': ('Generar error si la variable 64 > 1900-01-01 Y (la variable 22 <> 4, 5 '
+                 'ó la variable 10 <> M ó la edad calculada < 40 años)'),
+    'Error635': 'Generar error si la variable 76 > 1900-01-01 Y la longitud de la variable 102 <> 12',
+    'Error678': 'Generar error si la longitud de la variable 102 <> 1, 2 ó 12',
+}
+
+MOTIVO_FUENTE_EXTERNA = 'requiere fuente externa'
+MOTIVO_NO_RECONOCIDA = 'texto no reconocido'
+PALABRAS_FUENTE_EXTERNA = ('reps', 'bdua', 'bdex', 'periodo', 'reporto', 'tabla ', 'componentes')
+
+
+@dataclass(frozen=True)
+class VariableAnexo202:
+    """Definición de una variable del anexo técnico"""
+    numero: int
+    nombre: str
+    longitud: Optional[int]
+    tipo: str  # N numérico, A alfanumérico, F fecha, D decimal
+
+
+@dataclass
+class ReglaValidacion202:
+    """Validación del anexo y su predicado compilado (None si no compila)"""
+    anexo: str
+    codigo: str
+    variable: int
+    texto: str
+    descripcion: str
+    predicado: Optional[Callable[['LoteColumnar202'], np.ndarray]] = None
+    motivo_no_compilada: Optional[str] = None
+
+    @property
+    def es_warning(self) -> bool:
+        return self.codigo.lower().startswith('warning')
+
+
+@dataclass
+class ResultadoValidacion202:
+    """Resultado de validar un lote: histograma por regla y filas que incumplen"""
+    total_filas: int
+    histograma: Dict[str, int] = field(default_factory=dict)
+    filas_con_error: Dict[str, List[int]] = field(default_factory=dict)
+    descripciones: Dict[str, str] = field(default_factory=dict)
+    filas_invalidas: int = 0
+
+    @property
+    def es_valido(self) -> bool:
+        return self.filas_invalidas == 0
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            'total_filas': self.total_filas,
+            'filas_invalidas': self.filas_invalidas,
+            'es_valido': self.es_valido,
+            'histograma': dict(sorted(self.histograma.items(), key=lambda item: -item[1])),
+            'filas_con_error': self.filas_con_error,
+            'descripciones': self.descripciones,
+        }
+
+    def acumular(self, parcial: 'ResultadoValidacion202') -> None:
+        """Suma el resultado de las filas siguientes; sus índices se desplazan tras las ya contadas"""
+        desplazamiento = self.total_filas
+        self.total_filas += parcial.total_filas
+        self.filas_invalidas += parcial.filas_invalidas
+        for codigo, total in parcial.histograma.items():
+            self.histograma[codigo] = self.histograma.get(codigo, 0) + total
+            self.descripciones[codigo] = parcial.descripciones[codigo]
+        for codigo, filas in parcial.filas_con_error.items():
+            self.filas_con_error.setdefault(codigo, []).extend(fila + desplazamiento for fila in filas)
+
+
+class ErrorCompilacionRegla(ValueError):
+    """El texto de una validación no se pudo traducir a predicado"""
+
+
+# =====================================================
+# LOTE COLUMNAR
+# =====================================================
+
+class LoteColumnar202:
+    """
+    Vista columnar de un lote de vectores de variables
+
+    Las conversiones (texto, número, fecha, edad) se calculan una vez por
+    columna con operaciones vectorizadas de NumPy y se reutilizan entre todas
+    las reglas que las consultan.
+    """
+
+    def __init__(self, columnas: Dict[int, np.ndarray], total_filas: int, fecha_corte: date,
+                 variable_fecha_nacimiento: int = 9):
+        self.columnas = columnas
+        self.total_filas = total_filas
+        self.fecha_corte = np.datetime64(fecha_corte, 'D')
+        self.variable_fecha_nacimiento = variable_fecha_nacimiento
+        self._columnas: Dict[Tuple[str, Any], np.ndarray] = {}
+
+    def _memo(self, clave: Tuple[str, Any], calcular: Callable[[], np.ndarray]) -> np.ndarray:
+        if clave not in self._columnas:
+            self._columnas[clave] = calcular()
+        return self._columnas[clave]
+
+    def texto(self, numero: int) -> np.ndarray:
+        """Columna como cadenas NumPy sin espacios ('' si falta)"""
+        def calcular():
+            columna = self.columnas.get(numero)
+            if columna is None:
+                return np.full(self.total_filas, '', dtype='U1')
+            return np.strings.strip(np.ascontiguousarray(columna))
+        return self._memo(('texto', numero), calcular)
+
+    def _codigos(self, numero: int, ancho: int) -> np.ndarray:
+        """Puntos de código de cada carácter (matriz filas x ancho, 0 como relleno)"""
+        texto = self.texto(numero)
+        if texto.dtype.itemsize // 4 < ancho:
+            texto = texto.astype(f'U{ancho}')
+        return texto.view(np.uint32).reshape(self.total_filas, -1)
+
+    def numero(self, numero: int) -> np.ndarray:
+        """Columna numérica, con punto o coma decimal (NaN donde el valor no es un número)"""
+        def calcular():
+            largo = np.strings.str_len(self.texto(numero))
+            codigos = self._codigos(numero, 2)[:, :max(int(largo.max(initial=0)), 2)].astype(np.int64)
+            digitos = codigos - 48
+            es_digito = (digitos >= 0) & (digitos <= 9)
+            es_separador = (codigos == ord('.')) | (codigos == ord(','))
+            negativo = (codigos[:, 0] == ord('-')) & es_digito[:, 1]
+            permitido = es_digito | es_separador | (codigos == 0)
+            permitido[:, 0] |= negativo
+            ultimo = digitos[np.arange(self.total_filas), np.maximum(largo - 1, 0)]
+            validos = (permitido.all(axis=1) & (es_separador.sum(axis=1) <= 1)
+                       & (largo > 0) & (ultimo >= 0) & (ultimo <= 9))
+
+            # Acumula parte entera y decimal recorriendo las posiciones, no las filas
+            entero = np.zeros(self.total_filas)
+            decimal = np.zeros(self.total_filas)
+            escala = np.ones(self.total_filas)
+            en_decimales = np.zeros(self.total_filas, dtype=bool)
+            for posicion in range(codigos.shape[1]):
+                digito = es_digito[:, posicion]
+                entero = np.where(digito & ~en_decimales, entero * 10 + digitos[:, posicion], entero)
+                decimal = np.where(digito & en_decimales, decimal * 10 + digitos[:, posicion], decimal)
+                escala = np.where(digito & en_decimales, escala * 10, escala)
+                en_decimales |= es_separador[:, posicion]
+
+            valores = np.where(negativo, -1.0, 1.0) * (entero + decimal / escala)
+            valores[~validos] = np.nan
+            return valores
+        return self._memo(('numero', numero), calcular)
+
+    def fecha(self, numero: int) -> np.ndarray:
+        """Columna de fechas AAAA-MM-DD (NaT donde el contenido no es una fecha válida)"""
+        def calcular():
+            codigos = self._codigos(numero, 11)[:, :11]
+            digitos = codigos[:, :10].astype(np.int32) - 48
+            posiciones_digito = [0, 1, 2, 3, 5, 6, 8, 9]
+            forma = (((digitos[:, posiciones_digito] >= 0) & (digitos[:, posiciones_digito] <= 9)).all(axis=1)
+                     & (codigos[:, 4] == ord('-')) & (codigos[:, 7] == ord('-')) & (codigos[:, 10] == 0))
+
+            digitos = digitos[forma]
+            anio = digitos[:, 0] * 1000 + digitos[:, 1] * 100 + digitos[:, 2] * 10 + digitos[:, 3]
+            mes = digitos[:, 5] * 10 + digitos[:, 6]
+            dia = digitos[:, 8] * 10 + digitos[:, 9]
+            inicio_mes = (anio - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (mes - 1)
+            candidatas = inicio_mes.astype('datetime64[D]') + (dia - 1)
+            # Descarta meses o días fuera de rango (2019-13-01, 2020-02-30)
+            validas = ((anio >= 1) & (mes >= 1) & (mes <= 12) & (dia >= 1)
+                       & (candidatas.astype('datetime64[M]') == inicio_mes))
+
+            fechas = np.full(self.total_filas, np.datetime64('NaT'), dtype='datetime64[D]')
+            fechas[np.flatnonzero(forma)[validas]] = candidatas[validas]
+            return fechas
+        return self._memo(('fecha', numero), calcular)
+
+    def nulo(self, numero: int) -> np.ndarray:
+        return self._memo(('nulo', numero), lambda: self.texto(numero) == '')
+
+    def longitud(self, numero: int) -> np.ndarray:
+        return self._memo(('longitud', numero), lambda: np.strings.str_len(self.texto(numero)).astype(float))
+
+    def fecha_real(self, numero: int) -> np.ndarray:
+        """Fechas válidas que no son comodines (>= 1900-01-01)"""
+        return self._memo(('fecha_real', numero), lambda: self.fecha(numero) >= FECHA_MINIMA_VALIDA)
+
+    def anio_nacimiento(self) -> np.ndarray:
+        return self._memo(('anio_nacimiento', None), lambda: pd.Series(
+            self.fecha(self.variable_fecha_nacimiento)
+        ).dt.year.to_numpy(dtype=float))
+
+    def edad(self, unidad: str) -> np.ndarray:
+        """Edad cumplida a la fecha de corte en años, meses o días"""
+        def calcular():
+            nacimiento = self.fecha(self.variable_fecha_nacimiento)
+            if unidad == 'dias':
+                return (self.fecha_corte - nacimiento) / np.timedelta64(1, 'D')
+            serie = pd.Series(nacimiento)
+            corte = self.fecha_corte.astype(object)
+            meses = ((corte.year - serie.dt.year) * 12 + (corte.month - serie.dt.month)
+                     - (corte.day < serie.dt.day)).to_numpy(dtype=float)
+            return meses if unidad == 'meses' else np.floor(meses / 12)
+        return self._memo(('edad', unidad), calcular)
+
+
+# =====================================================
+# COMPILADOR DE TEXTOS DE VALIDACIÓN
+# =====================================================
+
+_PALABRAS_RELLENO = frozenset({
+    'la', 'el', 'las', 'los', 'si', 'cuando', 'que', 'a', 'de', 'en', 'del', 'registrada',
+    'registra', 'registran', 'registrar', 'valor', 'un', 'una', 'fecha', 'debe', 'ser',
+    'se', 'encuentra', 'esta', 'rango', 'es'
+})
+_UNIDADES_EDAD = {'anos': 'anos', 'ano': 'anos', 'meses': 'meses', 'mes': 'meses', 'dias': 'dias', 'dia': 'dias'}
+
+_REESCRITURAS = (
+    (r'\(?\s*excepto comodines\s*\)?', ' '),
+    (r'fecha de corte( del reporte)?', ' CORTE '),
+    (r'ano de nacimiento', ' ANIONAC '),
+    (r'\bedad( calculada| calcuada)?\b', ' EDAD '),
+    (r'longitud de la variable', ' LONGITUD '),
+    (r'\bvariables\b', 'variable'),
+    (r'\bentre (?:los )?(\d+) (?:a|hasta|y) (\d+)\s*(anos|meses|dias)?', r'( >= \1 \3 Y <= \2 \3 )'),
+    (r'mayor o igual (?:a|que)', ' >= '),
+    (r'menor o igual (?:a|que)', ' <= '),
+    (r'\bmayor(?: a| que)?\b', ' > '),
+    (r'\bmenor(?: a| que)?\b', ' < '),
+    (r'diferente (?:de|a)', ' <> '),
+    (r'\bno es\b', ' <> '),
+)
+_PATRON_TOKEN = re.compile(
+    r'(?P<fecha>\d{4}-\d{2}-\d{2})|(?P<numero>\d+(?:\.\d+)?)|(?P<op>[<>]\s*=|<>|=|<|>)'
+    r'|(?P<simbolo>[(),+])|(?P<palabra>[A-Za-z]+)|(?P<ignorar>[\s.;:]+)|(?P<otro>.)'
+)
+
+
+def _sin_tildes(texto: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def _tokenizar(texto: str) -> List[Tuple[str, str, int, int]]:
+    """Tokens (tipo, valor, inicio, fin) sin palabras de relleno"""
+    texto = ' '.join(_sin_tildes(texto).split())
+    for patron, reemplazo in _REESCRITURAS:
+        texto = re.sub(patron, reemplazo, texto, flags=re.IGNORECASE)
+
+    tokens = []
+    for coincidencia in _PATRON_TOKEN.finditer(texto):
+        tipo = coincidencia.lastgroup
+        valor = coincidencia.group()
+        if tipo == 'ignorar':
+            continue
+        if tipo == 'otro':
+            raise ErrorCompilacionRegla(f"carácter no reconocido '{valor}'")
+        if tipo == 'palabra' and valor.lower() in _PALABRAS_RELLENO and not valor.isupper():
+            continue
+        if tipo == 'op':
+            valor = valor.replace(' ', '')
+        tokens.append((tipo, valor, coincidencia.start(), coincidencia.end()))
+    return tokens
+
+
+@dataclass
+class _Sujeto:
+    clase: str  # variable, edad, longitud, anio_nacimiento
+    numeros: Tuple[int, ...] = ()
+    todas: bool = False  # "las variables 56 y 58" exige todas; "variable 23 ó 35" cualquiera
+
+
+@dataclass
+class _Valor:
+    clase: str  # numero, fecha, texto, variable, corte
+    valor: Any
+    unidad: Optional[str] = None
+
+
+class _Comparacion:
+    def __init__(self, sujeto: _Sujeto, operador: str, valores: List[_Valor], variables: Dict[int, VariableAnexo202]):
+        self.sujeto = sujeto
+        self.operador = operador
+        self.valores = valores
+        self.dominio = self._dominio(variables)
+
+    def _dominio(self, variables: Dict[int, VariableAnexo202]) -> str:
+        if self.sujeto.clase != 'variable':
+            return 'numero'
+        clases = {valor.clase for valor in self.valores}
+        if clases & {'fecha', 'corte'}:
+            return 'fecha'
+        if 'texto' in clases:
+            return 'texto'
+        if 'variable' in clases:
+            definicion = variables.get(self.sujeto.numeros[0])
+            return 'fecha' if definicion and definicion.tipo == 'F' else 'numero'
+        return 'numero'
+
+    def variables_fecha_comparadas(self) -> List[int]:
+        """Variables de fecha comparadas entre sí (los comodines no son fechas comparables)"""
+        if self.dominio != 'fecha' or not any(valor.clase == 'variable' for valor in self.valores):
+            return []
+        return list(self.sujeto.numeros) + [valor.valor for valor in self.valores if valor.clase == 'variable']
+
+    def _columna(self, lote: LoteColumnar202, numero: int) -> np.ndarray:
+        if self.dominio == 'fecha':
+            return lote.fecha(numero)
+        if self.dominio == 'texto':
+            return lote.texto(numero)
+        return lote.numero(numero)
+
+    def _operandos(self, lote: LoteColumnar202) -> List[np.ndarray]:
+        if self.sujeto.clase == 'edad':
+            return [lote.edad(self.valores[0].unidad or 'anos')]
+        if self.sujeto.clase == 'longitud':
+            return [lote.longitud(numero) for numero in self.sujeto.numeros]
+        if self.sujeto.clase == 'anio_nacimiento':
+            return [lote.anio_nacimiento()]
+        return [self._columna(lote, numero) for numero in self.sujeto.numeros]
+
+    def _constante(self, lote: LoteColumnar202, valor: _Valor):
+        if valor.clase == 'variable':
+            return self._columna(lote, valor.valor)
+        if valor.clase == 'corte':
+            return lote.fecha_corte + np.timedelta64(valor.valor, 'D')
+        if self.dominio == 'fecha':
+            return np.datetime64(valor.valor, 'D')
+        return valor.valor
+
+    def evaluar(self, lote: LoteColumnar202) -> np.ndarray:
+        constantes = [self._constante(lote, valor) for valor in self.valores]
+        resultados = [self._comparar(operando, constantes) for operando in self._operandos(lote)]
+        combinar = np.logical_and if self.sujeto.todas else np.logical_or
+        return combinar.reduce(resultados) if len(resultados) > 1 else resultados[0]
+
+    def _comparar(self, operando: np.ndarray, constantes: List[Any]) -> np.ndarray:
+        escalares = [c for c in constantes if not isinstance(c, np.ndarray)]
+        columnas = [c for c in constantes if isinstance(c, np.ndarray)]
+
+        if self.operador in ('=', '<>'):
+            coincide = np.zeros(len(operando), dtype=bool)
+            if escalares:
+                coincide |= np.isin(operando, np.array(escalares, dtype=operando.dtype))
+            for columna in columnas:
+                coincide |= operando == columna
+            return coincide if self.operador == '=' else ~coincide
+
+        comparar = {'<': np.less, '>': np.greater, '<=': np.less_equal, '>=': np.greater_equal}[self.operador]
+        resultado = np.zeros(len(operando), dtype=bool)
+        for constante in constantes:
+            resultado |= comparar(operando, constante)
+        return resultado
+
+
+class _Logico:
+    def __init__(self, operacion: Callable, hijos: List[Any]):
+        self.operacion = operacion
+        self.hijos = hijos
+
+    def evaluar(self, lote: LoteColumnar202) -> np.ndarray:
+        return self.operacion.reduce([hijo.evaluar(lote) for hijo in self.hijos])
+
+
+class _Negacion:
+    def __init__(self, hijo):
+        self.hijo = hijo
+
+    def evaluar(self, lote: LoteColumnar202) -> np.ndarray:
+        return ~self.hijo.evaluar(lote)
+
+
+class _CompiladorCondicion:
+    """Analizador descendente de las condiciones en lenguaje natural del anexo"""
+
+    def __init__(self, texto: str, variables: Dict[int, VariableAnexo202]):
+        self.tokens = _tokenizar(texto)
+        self.variables = variables
+        self.posicion = 0
+        self.sujeto: Optional[_Sujeto] = None
+        self.primer_sujeto: Optional[_Sujeto] = None
+        self.comparaciones: List[_Comparacion] = []
+        self._valores_en_orden: List[_Valor] = []
+
+    # --- navegación ---
+
+    def _token(self, desplazamiento: int = 0) -> Optional[Tuple[str, str, int, int]]:
+        indice = self.posicion + desplazamiento
+        return self.tokens[indice] if indice < len(self.tokens) else None
+
+    def _es(self, tipo: str, valor: Optional[str] = None, desplazamiento: int = 0) -> bool:
+        token = self._token(desplazamiento)
+        if token is None or token[0] != tipo:
+            return False
+        return valor is None or token[1].lower() == valor
+
+    def _es_palabra(self, valor: str, desplazamiento: int = 0) -> bool:
+        return self._es('palabra', valor, desplazamiento)
+
+    def terminado(self) -> bool:
+        return self.posicion >= len(self.tokens)
+
+    def _cerrar_parentesis(self):
+        # Varios textos oficiales omiten el paréntesis de cierre final
+        if self._es('simbolo', ')'):
+            self.posicion += 1
+        elif not self.terminado():
+            raise ErrorCompilacionRegla('se esperaba ")"')
+
+    # --- gramática ---
+
+    def expresion(self):
+        hijos = [self.conjuncion()]
+        while True:
+            if self._es_palabra('o'):
+                self.posicion += 1
+            elif self._es('simbolo', ',') and self._es_palabra('o', 1):
+                self.posicion += 2
+            else:
+                break
+            hijos.append(self.conjuncion())
+        return hijos[0] if len(hijos) == 1 else _Logico(np.logical_or, hijos)
+
+    def conjuncion(self):
+        hijos = [self.factor()]
+        while True:
+            if self._es_palabra('y'):
+                self.posicion += 1
+            elif self._es('simbolo', ',') and self._es_palabra('y', 1):
+                self.posicion += 2
+            else:
+                break
+            hijos.append(self.factor())
+        return hijos[0] if len(hijos) == 1 else _Logico(np.logical_and, hijos)
+
+    def factor(self):
+        if self._es('simbolo', '('):
+            self.posicion += 1
+            nodo = self.expresion()
+            self._cerrar_parentesis()
+            return nodo
+        return self.comparacion()
+
+    def comparacion(self):
+        sujeto = self._sujeto()
+        if sujeto is not None:
+            self.sujeto = sujeto
+            if self._es('simbolo', '(') and self._es('op', desplazamiento=1):
+                return self.factor()  # "la edad calculada (>= 6 meses Y < 5 años)"
+        elif self.sujeto is None:
+            raise ErrorCompilacionRegla(f'comparación sin sujeto en {self._token()}')
+
+        nodo = self._comparacion_simple()
+        # "< 24 meses ó > 63 meses": el conector seguido de operador reutiliza el sujeto
+        while (self._es_palabra('o') or self._es_palabra('y')) and self._es('op', desplazamiento=1):
+            operacion = np.logical_or if self._es_palabra('o') else np.logical_and
+            self.posicion += 1
+            nodo = _Logico(operacion, [nodo, self._comparacion_simple()])
+        return nodo
+
+    def _comparacion_simple(self) -> _Comparacion:
+        if self._es('op'):
+            operador = self._token()[1]
+            self.posicion += 1
+        elif self._es_inicio_valor(primero=True):
+            operador = '='  # "la variable 10 debe registrar F"
+        else:
+            raise ErrorCompilacionRegla(f'se esperaba un operador en {self._token()}')
+        comparacion = _Comparacion(self.sujeto, operador, self._valores(), self.variables)
+        self.comparaciones.append(comparacion)
+        return comparacion
+
+    def _sujeto(self) -> Optional[_Sujeto]:
+        if self._es_palabra('variable'):
+            while self._es_palabra('variable', 1):  # "la variable la variable 57"
+                self.posicion += 1
+            if not self._es('numero', desplazamiento=1):
+                raise ErrorCompilacionRegla('variable sin número')
+            numeros = [int(self._token(1)[1])]
+            self.posicion += 2
+            todas = False
+            while ((self._es_palabra('o') or self._es_palabra('y') or self._es('simbolo', ','))
+                   and self._es('numero', desplazamiento=1)):
+                todas = todas or self._es_palabra('y')
+                numeros.append(int(self._token(1)[1]))
+                self.posicion += 2
+            sujeto = _Sujeto('variable', tuple(numeros), todas)
+            self.primer_sujeto = self.primer_sujeto or sujeto
+            return sujeto
+        if self._es_palabra('longitud') and self._es('numero', desplazamiento=1):
+            numero = int(self._token(1)[1])
+            self.posicion += 2
+            return _Sujeto('longitud', (numero,))
+        for palabra, clase in (('edad', 'edad'), ('anionac', 'anio_nacimiento')):
+            if self._es_palabra(palabra):
+                self.posicion += 1
+                return _Sujeto(clase)
+        if self._es_palabra('esa'):  # "esa fecha": el sujeto de la condición
+            self.posicion += 1
+            if self.primer_sujeto is None:
+                raise ErrorCompilacionRegla('"esa fecha" sin variable previa')
+            return self.primer_sujeto
+        return None
+
+    def _admite_codigos(self) -> bool:
+        if self.sujeto is None or self.sujeto.clase != 'variable':
+            return False
+        definicion = self.variables.get(self.sujeto.numeros[0])
+        return definicion is not None and definicion.tipo == 'A'
+
+    def _es_inicio_valor(self, primero: bool = False) -> bool:
+        token = self._token()
+        if token is None:
+            return False
+        if token[0] in ('numero', 'fecha'):
+            return True
+        if token[0] == 'palabra':
+            if primero and token[1].lower() in ('variable', 'corte'):
+                return True
+            return (self._admite_codigos() and token[1].isupper() and len(token[1]) <= 3
+                    and token[1] not in ('Y', 'O'))
+        return primero and token[0] == 'simbolo' and token[1] == '('
+
+    def _valores(self) -> List[_Valor]:
+        abierto = self._es('simbolo', '(')
+        if abierto:
+            self.posicion += 1
+        valores = [self._valor()]
+        while True:
+            guardado = self.posicion
+            separadores = 0
+            while self._es('simbolo', ',') or self._es_palabra('o'):
+                self.posicion += 1
+                separadores += 1
+            if separadores and self._es_inicio_valor():
+                valores.append(self._valor())
+            else:
+                self.posicion = guardado
+                break
+        if abierto:
+            self._cerrar_parentesis()
+        return valores
+
+    def _valor(self) -> _Valor:
+        tipo, texto, _, fin = self._token()
+        self.posicion += 1
+        if tipo == 'fecha':
+            return _Valor('fecha', texto)
+        if tipo == 'numero':
+            return self._valor_numerico(texto, fin)
+        palabra = texto.lower()
+        if palabra == 'corte':
+            dias = 0
+            if self._es('simbolo', '+') and self._es('numero', desplazamiento=1):
+                dias = int(self._token(1)[1])
+                self.posicion += 2
+                if self._es_palabra('dias'):
+                    self.posicion += 1
+            return _Valor('corte', dias)
+        if palabra == 'variable':
+            if not self._es('numero'):
+                raise ErrorCompilacionRegla('variable sin número')
+            numero = int(self._token()[1])
+            self.posicion += 1
+            return _Valor('variable', numero)
+        return _Valor('texto', texto)
+
+    def _valor_numerico(self, texto: str, fin: int) -> _Valor:
+        definicion = self.variables.get(self.sujeto.numeros[0]) if self.sujeto.clase == 'variable' else None
+        # "1,5" es decimal con coma solo en variables decimales; "16,17" es una lista
+        if (definicion and definicion.tipo == 'D' and self._es('simbolo', ',')
+                and self._token()[2] == fin and self._es('numero', desplazamiento=1)
+                and self._token(1)[2] == self._token()[3]):
+            texto = f'{texto}.{self._token(1)[1]}'
+            self.posicion += 2
+        valor = _Valor('numero', float(texto))
+        if self._es('palabra') and self._token()[1].lower() in _UNIDADES_EDAD:
+            valor.unidad = _UNIDADES_EDAD[self._token()[1].lower()]
+            self.posicion += 1
+        elif self._es_palabra('digitos'):
+            self.posicion += 1
+        self._valores_en_orden.append(valor)
+        return valor
+
+    def completar_unidades(self):
+        """Una edad sin unidad toma la siguiente unidad escrita en la regla ("entre 24 y 63 meses")"""
+        siguiente = 'anos'
+        for valor in reversed(self._valores_en_orden):
+            if valor.unidad:
+                siguiente = valor.unidad
+            else:
+                valor.unidad = siguiente
+
+
+def _compilar_condicion(texto: str, variables: Dict[int, VariableAnexo202]) -> Tuple[Any, _CompiladorCondicion]:
+    compilador = _CompiladorCondicion(texto, variables)
+    nodo = compilador.expresion()
+    if not compilador.terminado():
+        raise ErrorCompilacionRegla(f'texto sobrante desde {compilador._token()}')
+    compilador.completar_unidades()
+    return nodo, compilador
+
+
+def _con_guarda_comodines(nodo, compiladores: Iterable[_CompiladorCondicion]) -> Callable[[LoteColumnar202], np.ndarray]:
+    """Las comparaciones entre fechas de dos variables solo aplican si ninguna es comodín"""
+    variables_fecha = sorted({
+        numero
+        for compilador in compiladores
+        for comparacion in compilador.comparaciones
+        for numero in comparacion.variables_fecha_comparadas()
+    })
+
+    def predicado(lote: LoteColumnar202) -> np.ndarray:
+        resultado = nodo.evaluar(lote)
+        for numero in variables_fecha:
+            resultado = resultado & lote.fecha_real(numero)
+        return resultado
+    return predicado
+
+
+def compilar_regla(regla: ReglaValidacion202, variables: Dict[int, VariableAnexo202]) -> Callable[[LoteColumnar202], np.ndarray]:
+    """
+    Traduce el texto de una validación a un predicado columnar
+
+    El predicado retorna un arreglo booleano con True en las filas que
+    incumplen la validación.
+
+    Raises:
+        ErrorCompilacionRegla: si el texto no sigue ninguna forma reconocida
+    """
+    texto = ' '.join(_sin_tildes(CORRECCIONES_REGLAS_202.get(regla.codigo, regla.texto)).split())
+    minusculas = texto.lower()
+    numero = regla.variable
+
+    if any(palabra in minusculas for palabra in PALABRAS_FUENTE_EXTERNA):
+        raise ErrorCompilacionRegla(MOTIVO_FUENTE_EXTERNA)
+
+    if 'registro repetido' in minusculas:
+        claves = [definicion.numero for definicion in variables.values()
+                  if definicion.nombre.lower().startswith(('tipo de identificacion del usuario',
+                                                           'numero de identificacion del usuario'))]
+        return lambda lote: pd.DataFrame({c: lote.texto(c) for c in claves}).duplicated(keep=False).to_numpy()
+
+    if re.fullmatch(r'la variable \d+ no debe ser nula', minusculas):
+        return lambda lote: lote.nulo(numero)
+
+    if minusculas.startswith('validar contenido de fecha'):
+        if variables.get(numero) is None or variables[numero].tipo != 'F':
+            raise ErrorCompilacionRegla('la variable no es de tipo fecha')
+        return lambda lote: np.isnat(lote.fecha(numero))
+
+    if minusculas.startswith('validar caracteres permitidos'):
+        return lambda lote: ~pd.Series(lote.texto(numero)).str.fullmatch(r'[0-9A-Z]+').to_numpy(dtype=bool)
+
+    if minusculas.startswith('validar comodines'):
+        return _compilar_comodines(minusculas, numero)
+
+    prefijo = re.match(r'(?:generar|gerenar) (?:el )?(?:error|warning) (?:si|cuando) (.*)', texto, re.IGNORECASE)
+    if prefijo:
+        nodo, compilador = _compilar_condicion(prefijo.group(1), variables)
+        return _con_guarda_comodines(nodo, [compilador])
+
+    condicional = re.match(r'validar que si (.*)', texto, re.IGNORECASE)
+    if condicional:
+        compilador = _CompiladorCondicion(condicional.group(1), variables)
+        condicion = compilador.expresion()
+        if compilador._es('simbolo', ','):
+            compilador.posicion += 1
+        if compilador.terminado():
+            raise ErrorCompilacionRegla('falta la consecuencia de la condición')
+        consecuencia = compilador.expresion()
+        if not compilador.terminado():
+            raise ErrorCompilacionRegla(f'texto sobrante desde {compilador._token()}')
+        compilador.completar_unidades()
+        return _con_guarda_comodines(_Logico(np.logical_and, [condicion, _Negacion(consecuencia)]), [compilador])
+
+    if re.match(r'la (?:fecha registrada en la )?variable \d+ debe', minusculas):
+        nodo, compilador = _compilar_condicion(texto, variables)
+        return _con_guarda_comodines(_Negacion(nodo), [compilador])
+
+    raise ErrorCompilacionRegla(MOTIVO_NO_RECONOCIDA)
+
+
+def _compilar_comodines(texto: str, numero: int) -> Callable[[LoteColumnar202], np.ndarray]:
+    """Validaciones de comodines: fechas anteriores a 1900-01-01 fuera de los permitidos"""
+    listados = tuple(np.datetime64(fecha, 'D') for fecha in re.findall(r'\d{4}-\d{2}-\d{2}', texto)
+                     if fecha != '1900-01-01')
+
+    if re.search(r'se genera (?:error|warning) si se registro', texto):
+        if listados:
+            return lambda lote: np.isin(lote.fecha(numero), listados)
+        return lambda lote: lote.fecha(numero) < FECHA_MINIMA_VALIDA
+
+    permitidos = listados or tuple(np.datetime64(fecha, 'D') for fecha in COMODINES_FECHA)
+    return lambda lote: (lote.fecha(numero) < FECHA_MINIMA_VALIDA) & ~np.isin(lote.fecha(numero), permitidos)
+
+
+# =====================================================
+# CARGA DE ANEXOS Y MOTOR
+# =====================================================
+
+def _a_entero(texto: str) -> Optional[int]:
+    texto = (texto or '').strip()
+    return int(texto) if texto.isdigit() else None
+
+
+def cargar_controles_202(ruta: str, anexo: str) -> Tuple[Dict[int, VariableAnexo202], List[ReglaValidacion202]]:
+    """
+    Lee un archivo de controles del anexo técnico
+
+    Returns:
+        (variables por número, validaciones con código en orden del archivo)
+    """
+    with open(ruta, encoding=CODIFICACION_ANEXOS_202, newline='') as archivo:
+        filas = list(csv.reader(archivo, delimiter=';'))
+
+    encabezado_idx = next(i for i, fila in enumerate(filas) if 'GRUPO' in fila and 'VALIDACIONES' in fila)
+    encabezado = [_sin_tildes(columna).strip().lower() for columna in filas[encabezado_idx]]
+    col_grupo = encabezado.index('grupo')
+    col_longitud = encabezado.index('longitud')
+    col_tipo = encabezado.index('tipo')
+    col_validacion = encabezado.index('validaciones')
+    col_codigo = next(i for i, c in enumerate(encabezado) if c.startswith('codigo del error'))
+    col_descripcion = next(i for i, c in enumerate(encabezado) if c.startswith('descripcion del error'))
+
+    variables: Dict[int, VariableAnexo202] = {}
+    reglas: List[ReglaValidacion202] = []
+    variable_actual = None
+    for fila in filas[encabezado_idx + 1:]:
+        fila = fila + [''] * (len(encabezado) - len(fila))
+        # NPED trae la numeración anterior en la primera columna y la modificada junto al grupo
+        numero = _a_entero(fila[col_grupo - 1])
+        if numero is None:
+            numero = _a_entero(fila[0])
+        if numero is not None and fila[col_grupo + 1].strip():
+            variable_actual = numero
+            variables[numero] = VariableAnexo202(
+                numero=numero,
+                nombre=_sin_tildes(fila[col_grupo + 1]).strip(),
+                longitud=_a_entero(fila[col_longitud]),
+                tipo=fila[col_tipo].strip().upper()[:1]
+            )
+
+        codigo = fila[col_codigo].strip()
+        texto = ' '.join(fila[col_validacion].split())
+        if variable_actual is None or not codigo or not texto:
+            continue
+        reglas.append(ReglaValidacion202(
+            anexo=anexo,
+            codigo=codigo,
+            variable=variable_actual,
+            texto=texto,
+            descripcion=' '.join(fila[col_descripcion].split()) or texto
+        ))
+    return variables, reglas
+
+
+class MotorValidacion202:
+    """
+    Tabla de validaciones compiladas de la Resolución 202
+
+    Se construye una vez (ver obtener_motor_validacion_202) y valida lotes de
+    vectores de variables indexados por número de variable del anexo.
+    """
+
+    def __init__(self, directorio: Optional[str] = None, archivos: Optional[Dict[str, str]] = None):
+        self.directorio = directorio or DIRECTORIO_ANEXOS_202
+        self.variables: Dict[str, Dict[int, VariableAnexo202]] = {}
+        self.reglas: Dict[str, List[ReglaValidacion202]] = {}
+
+        for anexo, nombre_archivo in (archivos or ARCHIVOS_CONTROLES_202).items():
+            variables, reglas = cargar_controles_202(os.path.join(self.directorio, nombre_archivo), anexo)
+            for regla in reglas:
+                try:
+                    regla.predicado = compilar_regla(regla, variables)
+                except ErrorCompilacionRegla as e:
+                    regla.motivo_no_compilada = str(e)
+            self.variables[anexo] = variables
+            self.reglas[anexo] = reglas
+
+        resumen = self.resumen()
+        logger.info(f"Motor de validación Resolución 202 cargado: {resumen['compiladas']} de "
+                    f"{resumen['total_reglas']} validaciones compiladas")
+
+    def resumen(self) -> Dict[str, Any]:
+        """Cobertura de la tabla: reglas compiladas y motivos de las que no compilan"""
+        todas = [regla for reglas in self.reglas.values() for regla in reglas]
+        no_compiladas = [regla for regla in todas if regla.predicado is None]
+        return {
+            'total_reglas': len(todas),
+            'compiladas': len(todas) - len(no_compiladas),
+            'no_compiladas': {
+                regla.codigo: f'{regla.motivo_no_compilada}: {regla.texto}' for regla in no_compiladas
+            },
+        }
+
+    def validar_lote(self, filas: Iterable[Union[Sequence[Any], Mapping[Any, Any]]],
+                     fecha_corte: Optional[Union[date, str]] = None, anexo: str = 'RPED',
+                     incluir_filas: bool = True) -> ResultadoValidacion202:
+        """
+        Valida un lote de vectores de variables en una sola pasada columnar
+
+        Args:
+            filas: vectores indexados por número de variable (listas, tuplas o
+                dicts con claves enteras o 'var_<N>_...')
+            fecha_corte: fecha de corte del reporte (default: hoy)
+            anexo: 'RPED' o 'NPED'
+            incluir_filas: si False solo se calcula el histograma
+
+        Returns:
+            ResultadoValidacion202 con histograma por código y filas que incumplen
+        """
+        lineas = self._lineas(filas, self._ancho(anexo))
+        return self.validar_lineas(lineas, fecha_corte, anexo, incluir_filas)
+
+    def validar_archivo_plano(self, ruta: str, anexo: str = 'RPED', incluir_filas: bool = True) -> ResultadoValidacion202:
+        """
+        Valida un archivo plano SISPRO ya generado
+
+        La fecha de corte se toma del registro de control (tipo 1) y los índices
+        de fila del resultado cuentan solo los registros de detalle. El archivo
+        se lee y valida por bloques de TAMANO_BLOQUE_ARCHIVO registros: la
+        memoria usada depende del bloque, no del tamaño del archivo.
+        """
+        resultado = ResultadoValidacion202(total_filas=0)
+        with open(ruta, encoding='utf-8') as archivo:
+            primera = archivo.readline()
+            fecha_corte = None
+            if primera.startswith('1|'):
+                control = primera.rstrip('\r\n').split('|')
+                fecha_corte = control[3] if len(control) > 3 else None
+                primera = ''
+            lineas = (linea.rstrip('\r\n') for linea in itertools.chain([primera] if primera else [], archivo))
+            while True:
+                bloque = list(itertools.islice(lineas, TAMANO_BLOQUE_ARCHIVO))
+                if not bloque:
+                    return resultado
+                resultado.acumular(self.validar_lineas(bloque, fecha_corte, anexo, incluir_filas))
+
+    def validar_lineas(self, lineas: List[str], fecha_corte: Optional[Union[date, str]] = None,
+                       anexo: str = 'RPED', incluir_filas: bool = True) -> ResultadoValidacion202:
+        """Valida registros de detalle ya serializados ('v0|v1|...|v118')"""
+        if isinstance(fecha_corte, str):
+            fecha_corte = datetime.strptime(fecha_corte, '%Y-%m-%d').date()
+        columnas, total_filas = self._columnas_lote(lineas, anexo)
+        lote = LoteColumnar202(columnas, total_filas, fecha_corte or date.today(), self._variable_nacimiento(anexo))
+        resultado = ResultadoValidacion202(total_filas=lote.total_filas)
+        if not lote.total_filas:
+            return resultado
+
+        por_codigo: Dict[str, np.ndarray] = {}
+        errores_fila = np.zeros(lote.total_filas, dtype=bool)
+        for regla in self.reglas[anexo]:
+            if regla.predicado is None:
+                continue
+            incumple = regla.predicado(lote)
+            por_codigo[regla.codigo] = por_codigo[regla.codigo] | incumple if regla.codigo in por_codigo else incumple
+            resultado.descripciones.setdefault(regla.codigo, regla.descripcion)
+            if not regla.es_warning:
+                errores_fila |= incumple
+
+        for codigo, incumple in por_codigo.items():
+            total = int(incumple.sum())
+            if total:
+                resultado.histograma[codigo] = total
+                if incluir_filas:
+                    resultado.filas_con_error[codigo] = np.flatnonzero(incumple).tolist()
+        resultado.descripciones = {codigo: resultado.descripciones[codigo] for codigo in resultado.histograma}
+        resultado.filas_invalidas = int(errores_fila.sum())
+        return resultado
+
+    def _variable_nacimiento(self, anexo: str) -> int:
+        for definicion in self.variables[anexo].values():
+            if definicion.nombre.lower().startswith('fecha de nacimiento'):
+                return definicion.numero
+        return 9
+
+    def _ancho(self, anexo: str) -> int:
+        return max(self.variables[anexo]) + 1
+
+    def _columnas_lote(self, lineas: List[str], anexo: str) -> Tuple[Dict[int, np.ndarray], int]:
+        """
+        Columnas (número de variable -> cadenas NumPy) de un lote de registros
+
+        Los registros se leen con el lector de NumPy en un arreglo de campos de
+        ancho fijo, de modo que ninguna conversión posterior recorre objetos
+        Python fila por fila.
+        """
+        if not lineas:
+            return {}, 0
+        variables = self.variables[anexo]
+        ancho = self._ancho(anexo)
+        separadores = ancho - 1
+        lineas = [
+            linea if linea.count('|') == separadores else self._ajustar_campos(linea, ancho)
+            for linea in lineas
+        ]
+
+        # Un carácter más que la longitud del anexo para que los excesos sigan siendo detectables
+        tipo_registro = np.dtype([
+            (f'v{numero}', f'U{max(variables[numero].longitud or 1, 10) + 1 if numero in variables else 1}')
+            for numero in range(ancho)
+        ])
+        registros = np.loadtxt(io.StringIO('\n'.join(lineas)), delimiter='|', dtype=tipo_registro,
+                               comments=None, ndmin=1)
+        return {numero: registros[f'v{numero}'] for numero in range(ancho)}, len(registros)
+
+    @staticmethod
+    def _ajustar_campos(linea: str, ancho: int) -> str:
+        campos = linea.split('|')[:ancho]
+        return '|'.join(campos + [''] * (ancho - len(campos)))
+
+    @staticmethod
+    def _lineas(filas: Iterable[Union[Sequence[Any], Mapping[Any, Any]]], ancho: int) -> List[str]:
+        """Registros 'v0|v1|...' a partir de listas o dicts de variables"""
+        lineas = []
+        numeros: Dict[Any, Optional[int]] = {}
+        for fila in filas:
+            if isinstance(fila, Mapping):
+                valores = [''] * ancho
+                for clave, valor in fila.items():
+                    if clave not in numeros:
+                        numeros[clave] = clave if isinstance(clave, int) else _numero_variable(str(clave))
+                    numero = numeros[clave]
+                    if numero is not None and numero < ancho and valor is not None:
+                        valores[numero] = str(valor)
+            else:
+                valores = fila
+                try:
+                    lineas.append('|'.join(valores))
+                    continue
+                except TypeError:
+                    valores = ['' if valor is None else str(valor) for valor in valores]
+            lineas.append('|'.join(valores))
+        return lineas
+
+
+def _numero_variable(clave: str) -> Optional[int]:
+    coincidencia = re.match(r'var_(\d+)(?:_|$)', clave)
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+_motor_compartido: Optional[MotorValidacion202] = None
+_motor_lock = threading.Lock()
+
+
+def obtener_motor_validacion_202() -> MotorValidacion202:
+    """Motor compartido por el proceso; los anexos se leen y compilan una sola vez"""
+    global _motor_compartido
+    with _motor_lock:
+        if _motor_compartido is None:
+            _motor_compartido = MotorValidacion202()
+        return _motor_compartido
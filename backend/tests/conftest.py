@@ -6,13 +6,14 @@ para que todos los tests puedan bypass RLS sin configuración manual.
 
 import pytest
 import os
+import re
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from supabase import create_client, Client
 
 # Importar la app principal y el dependency que queremos overridear
 from main import app
-from database import get_supabase_client
+from database import get_supabase_client, get_supabase_async_client, PoolSupabaseAsync
 
 # --- Global Test Setup: Override Supabase client with service_role key ---
 
@@ -35,6 +36,15 @@ def get_supabase_client_override():
     return supabase_service_client
 
 
+# Pool asíncrono con service_role para las rutas migradas a get_supabase_async_client
+pool_supabase_service_async = PoolSupabaseAsync(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+
+async def get_supabase_async_client_override():
+    """Override asíncrono equivalente: cliente service_role sobre el pool HTTP/2"""
+    return await pool_supabase_service_async.cliente()
+
+
 # Configurar el override global al inicializar los tests
 def pytest_configure(config):
     """
@@ -42,6 +52,7 @@ def pytest_configure(config):
     Configura el override del service_role para todos los tests.
     """
     app.dependency_overrides[get_supabase_client] = get_supabase_client_override
+    app.dependency_overrides[get_supabase_async_client] = get_supabase_async_client_override
     print("✅ Global service_role override configured for all tests")
 
 
@@ -52,6 +63,7 @@ def pytest_unconfigure(config):
     """
     if get_supabase_client in app.dependency_overrides:
         del app.dependency_overrides[get_supabase_client]
+    app.dependency_overrides.pop(get_supabase_async_client, None)
     print("🧹 Global service_role override removed")
 
 
@@ -74,6 +86,203 @@ def service_db_client():
     yield supabase_service_client
 
 
+# --- Cliente Supabase en memoria para los tests que no requieren BD ---
+
+class RespuestaEnMemoria:
+    def __init__(self, data):
+        self.data = data
+
+
+def _comparables(a, b):
+    # PostgREST recibe los filtros como texto: se comparan como texto salvo mismo tipo
+    return (a, b) if type(a) is type(b) else (str(a), str(b))
+
+
+def _menor(a, b):
+    a, b = _comparables(a, b)
+    return a < b
+
+
+def _menor_o_igual(a, b):
+    a, b = _comparables(a, b)
+    return a <= b
+
+
+def _igual(a, b):
+    a, b = _comparables(a, b)
+    return a == b
+
+
+# Operadores PostgREST; toda comparación con NULL es falsa, como en SQL
+OPERADORES_EN_MEMORIA = {
+    "eq": lambda v, x: v is not None and _igual(v, x),
+    "lt": lambda v, x: v is not None and _menor(v, x),
+    "lte": lambda v, x: v is not None and _menor_o_igual(v, x),
+    "gt": lambda v, x: v is not None and not _menor_o_igual(v, x),
+    "gte": lambda v, x: v is not None and not _menor(v, x),
+    "is": lambda v, x: v is None if x == "null" else v is (x == "true"),
+}
+
+# Término de un or_ de PostgREST: columna.operador.valor, con valor opcionalmente entre comillas
+TERMINO_OR = re.compile(r'(\w+)\.(\w+)\.("[^"]*"|[^,]*)(?:,|$)')
+
+
+class ConsultaEnMemoria:
+    """
+    Query builder en memoria con la semántica de PostgREST para lo que usan los
+    servicios: select con proyección, eq/in_/is_/lt/lte/gt/gte, el or_ del
+    predicado keyset de paginar(), order con NULLS FIRST/LAST, range/limit y
+    upsert/insert. Cada execute() queda registrado en cliente.consultas.
+    """
+
+    def __init__(self, cliente, tabla):
+        self.cliente = cliente
+        self.tabla = tabla
+        self.operacion = "select"
+        self.columnas = "*"
+        self.filtros = []
+        self.ordenes = []
+        self.rango = None
+        self.desde = 0
+        self.cantidad = None
+        self.registros = None
+        self.opciones = {}
+
+    def select(self, columnas="*", **kwargs):
+        self.columnas = columnas
+        return self
+
+    def upsert(self, registros, **opciones):
+        self.operacion, self.registros, self.opciones = "upsert", registros, opciones
+        return self
+
+    def insert(self, registros, **opciones):
+        self.operacion, self.registros, self.opciones = "insert", registros, opciones
+        return self
+
+    def _filtro(self, columna, operador, valor):
+        self.filtros.append(lambda f: OPERADORES_EN_MEMORIA[operador](f.get(columna), valor))
+        return self
+
+    def eq(self, columna, valor):
+        return self._filtro(columna, "eq", valor)
+
+    def lt(self, columna, valor):
+        return self._filtro(columna, "lt", valor)
+
+    def lte(self, columna, valor):
+        return self._filtro(columna, "lte", valor)
+
+    def gt(self, columna, valor):
+        return self._filtro(columna, "gt", valor)
+
+    def gte(self, columna, valor):
+        return self._filtro(columna, "gte", valor)
+
+    def is_(self, columna, valor):
+        return self._filtro(columna, "is", str(valor).lower())
+
+    def in_(self, columna, valores):
+        valores = {str(v) for v in valores}
+        self.filtros.append(lambda f: f.get(columna) is not None and str(f.get(columna)) in valores)
+        return self
+
+    def or_(self, filtros):
+        terminos = TERMINO_OR.findall(filtros)
+        assert ",".join(".".join(t) for t in terminos) == filtros, f"or_ no soportado: {filtros}"
+        condiciones = [
+            (columna, OPERADORES_EN_MEMORIA[operador], valor.strip('"'))
+            for columna, operador, valor in terminos
+        ]
+        self.filtros.append(lambda f: any(op(f.get(c), v) for c, op, v in condiciones))
+        return self
+
+    def order(self, columna, desc=False, nullsfirst=None):
+        # Sin nullsfirst explícito rige el default de Postgres: NULLS FIRST en DESC
+        self.ordenes.append((columna, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def range(self, inicio, fin):
+        self.rango = (inicio, fin)
+        self.desde, self.cantidad = inicio, fin - inicio + 1
+        return self
+
+    def limit(self, cantidad):
+        self.cantidad = cantidad
+        return self
+
+    def execute(self):
+        if self.cliente.antes_de_ejecutar:
+            self.cliente.antes_de_ejecutar(self)
+        self.cliente.consultas.append(self)
+        if self.tabla in self.cliente.tablas_con_error:
+            raise ConnectionError(f"Error simulado consultando {self.tabla}")
+
+        filas = self.cliente.tablas.setdefault(self.tabla, [])
+        if self.operacion != "select":
+            registros = self.registros if isinstance(self.registros, list) else [self.registros]
+            filas.extend(dict(r) for r in registros)
+            return RespuestaEnMemoria([dict(r) for r in registros])
+
+        filas = [f for f in filas if all(filtro(f) for filtro in self.filtros)]
+        # Orden estable aplicado del último criterio al primero
+        for columna, desc, nulos_primero in reversed(self.ordenes):
+            nulas = [f for f in filas if f.get(columna) is None]
+            filas = sorted((f for f in filas if f.get(columna) is not None),
+                           key=lambda f: f[columna], reverse=desc)
+            filas = nulas + filas if nulos_primero else filas + nulas
+        fin = len(filas) if self.cantidad is None else self.desde + self.cantidad
+        filas = filas[self.desde:fin]
+
+        if self.columnas.strip() != "*":
+            columnas = [c.strip() for c in self.columnas.split(",")]
+            filas = [{c: f.get(c) for c in columnas} for f in filas]
+        return RespuestaEnMemoria([dict(f) for f in filas])
+
+
+class LlamadaRPCEnMemoria:
+    def __init__(self, cliente, nombre, params):
+        self.cliente, self.nombre, self.params = cliente, nombre, params
+
+    def execute(self):
+        self.cliente.llamadas_rpc.append((self.nombre, self.params))
+        return RespuestaEnMemoria(self.cliente.respuestas_rpc[self.nombre])
+
+
+class ClienteEnMemoria:
+    """
+    Cliente Supabase falso: tablas en memoria, respuestas fijas por RPC y
+    registro de lo ejecutado (consultas y llamadas_rpc). Las tablas de
+    tablas_con_error fallan al ejecutar, como una BD caída.
+    """
+
+    def __init__(self, tablas=None, rpc=None):
+        self.tablas = tablas if tablas is not None else {}
+        self.respuestas_rpc = rpc if rpc is not None else {}
+        self.tablas_con_error = set()
+        self.consultas = []
+        self.llamadas_rpc = []
+        self.antes_de_ejecutar = None
+
+    def table(self, nombre):
+        return ConsultaEnMemoria(self, nombre)
+
+    def rpc(self, nombre, params=None):
+        return LlamadaRPCEnMemoria(self, nombre, params)
+
+    def tablas_consultadas(self):
+        return [c.tabla for c in self.consultas]
+
+
+@pytest.fixture
+def cliente_en_memoria():
+    """
+    Fábrica de clientes Supabase en memoria (ClienteEnMemoria) para tests sin
+    BD: cliente_en_memoria({"pacientes": [...]}, rpc={"funcion": datos}).
+    """
+    return ClienteEnMemoria
+
+
 # Fixture para limpiar datos de test (opcional)
 @pytest.fixture(autouse=True)
 def cleanup_test_data():
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS POOL ASÍNCRONO SUPABASE
+==============================
+
+Tests de PoolSupabaseAsync contra un PostgREST simulado con httpx.MockTransport.
+No requieren BD.
+
+Enfoque: las consultas concurrentes no se serializan en el event loop, el pool
+respeta su límite de conexiones y cada petición tiene timeout.
+"""
+
+import asyncio
+import time
+import httpx
+import pytest
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import PoolSupabaseAsync
+
+URL_PRUEBA = "http://supabase.local"
+KEY_PRUEBA = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9.firma"
+LATENCIA_BD = 0.05
+
+
+def _pool(latencia: float = LATENCIA_BD, **kwargs) -> PoolSupabaseAsync:
+    """Pool cuyo transporte responde como PostgREST tras `latencia` segundos"""
+    pool = PoolSupabaseAsync(URL_PRUEBA, KEY_PRUEBA, **kwargs)
+    pool.peticiones = []
+
+    async def postgrest(request: httpx.Request) -> httpx.Response:
+        pool.peticiones.append(request)
+        await asyncio.sleep(latencia)
+        return httpx.Response(200, json=[{"id": "1"}])
+
+    def crear_http():
+        return httpx.AsyncClient(transport=httpx.MockTransport(postgrest), timeout=pool.timeout, limits=pool.limites)
+
+    pool._crear_http = crear_http
+    return pool
+
+
+def _percentil_99(latencias):
+    ordenadas = sorted(latencias)
+    return ordenadas[int(len(ordenadas) * 0.99) - 1]
+
+
+class TestPoolSupabaseAsync:
+
+    def test_cliente_reutilizado_en_el_mismo_loop(self):
+        pool = _pool()
+
+        async def escenario():
+            primero, segundo = await asyncio.gather(pool.cliente(), pool.cliente())
+            respuesta = await primero.table("pacientes").select("*").execute()
+            await pool.cerrar()
+            return primero, segundo, respuesta
+
+        primero, segundo, respuesta = asyncio.run(escenario())
+        assert primero is segundo
+        assert respuesta.data == [{"id": "1"}]
+        assert pool.peticiones[0].url.path == "/rest/v1/pacientes"
+        assert pool.peticiones[0].headers["apikey"] == KEY_PRUEBA
+
+    def test_cliente_nuevo_en_otro_loop(self):
+        pool = _pool()
+        primero = asyncio.run(pool.cliente())
+        segundo = asyncio.run(pool.cliente())
+        assert primero is not segundo
+
+    def test_consultas_concurrentes_no_bloquean_el_loop(self):
+        pool = _pool(max_conexiones=50)
+
+        async def escenario():
+            db = await pool.cliente()
+            inicio = time.perf_counter()
+            await asyncio.gather(*(db.table("pacientes").select("*").execute() for _ in range(50)))
+            return time.perf_counter() - inicio
+
+        # En serie serían 50 * 50 ms = 2.5 s
+        assert asyncio.run(escenario()) < 1.0
+
+    def test_p99_estable_al_crecer_la_concurrencia(self):
+        pool = _pool(max_conexiones=100)
+
+        async def carga(concurrencia: int):
+            db = await pool.cliente()
+
+            async def consulta():
+                inicio = time.perf_counter()
+                await db.table("pacientes").select("*").execute()
+                return time.perf_counter() - inicio
+
+            return await asyncio.gather(*(consulta() for _ in range(concurrencia)))
+
+        async def escenario():
+            return [_percentil_99(await carga(n)) for n in (1, 10, 50, 100)]
+
+        p99 = asyncio.run(escenario())
+        assert max(p99) < LATENCIA_BD * 4
+
+    def test_timeout_por_peticion(self):
+        async def escenario():
+            # Servidor que acepta la conexión y nunca responde
+            servidor = await asyncio.start_server(lambda lector, escritor: None, "127.0.0.1", 0)
+            puerto = servidor.sockets[0].getsockname()[1]
+            pool = PoolSupabaseAsync(f"http://127.0.0.1:{puerto}", KEY_PRUEBA, timeout=0.2, timeout_conexion=0.2)
+            try:
+                db = await pool.cliente()
+                inicio = time.perf_counter()
+                with pytest.raises(httpx.TimeoutException):
+                    await db.table("pacientes").select("*").execute()
+                return time.perf_counter() - inicio
+            finally:
+                await pool.cerrar()
+                servidor.close()
+
+        assert asyncio.run(escenario()) < 1.0
+
+
+class TestInyeccionClienteAsync:
+
+    def test_rutas_vejez_usan_el_cliente_inyectado(self):
+        from uuid import uuid4
+        from fastapi.testclient import TestClient
+        from main import app
+        from database import get_supabase_async_client
+
+        pool = _pool(latencia=0)
+
+        async def sin_filas(request: httpx.Request) -> httpx.Response:
+            pool.peticiones.append(request)
+            return httpx.Response(200, json=[])
+
+        pool._crear_http = lambda: httpx.AsyncClient(transport=httpx.MockTransport(sin_filas))
+
+        async def cliente_prueba():
+            return await pool.cliente()
+
+        override_previo = app.dependency_overrides.get(get_supabase_async_client)
+        app.dependency_overrides[get_supabase_async_client] = cliente_prueba
+        try:
+            respuesta = TestClient(app).get(f"/atencion-vejez/{uuid4()}")
+        finally:
+            if override_previo is None:
+                app.dependency_overrides.pop(get_supabase_async_client, None)
+            else:
+                app.dependency_overrides[get_supabase_async_client] = override_previo
+
+        # El service consulta con el cliente del override (en tests: service_role), no con el pool global
+        assert respuesta.status_code == 404
+        assert [p.url.path for p in pool.peticiones] == ["/rest/v1/atencion_vejez"]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS ESTADÍSTICAS AGREGADAS CON CACHE TTL
+==========================================
+
+Tests de los endpoints de estadísticas que se resuelven con un único agregado
+en BD (RPC) detrás de CacheTTL. Usan un cliente Supabase falso que cuenta las
+llamadas. No requieren BD.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from database import get_supabase_client
+from core.cache import CacheTTL
+from routes import control_cronicidad
+from models.tamizaje_oncologico_model import INTERVALOS_TAMIZAJE_DIAS
+
+
+def _consulta_inesperada(consulta):
+    raise AssertionError(f"Consulta inesperada a la tabla {consulta.tabla}")
+
+
+@pytest.fixture
+def cliente_rpc(cliente_en_memoria):
+    """Reemplaza temporalmente la dependencia de BD por un cliente que solo admite rpc()"""
+    anterior = app.dependency_overrides.get(get_supabase_client)
+    cliente = cliente_en_memoria(rpc={
+        "estadisticas_control_cronicidad": {
+            "total": 10,
+            "controlados": 6,
+            "no_controlados": 3,
+            "buena_adherencia": 5,
+            "por_tipo": {"Hipertension": 7, "Diabetes": 3},
+        },
+        "estadisticas_tamizaje_oncologico": {
+            "total": 8,
+            "positivos": 2,
+            "negativos": 5,
+            "seguimiento_especializado": 1,
+            "por_tipo": {"Mama": 5, "Cuello Uterino": 3},
+        },
+        "adherencia_tamizaje_oncologico": {
+            "total": 4,
+            "por_adherencia": {"Buena": 2, "Regular": 1, "Mala": 1},
+        },
+    })
+    cliente.antes_de_ejecutar = _consulta_inesperada
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    control_cronicidad.cache_estadisticas.invalidar()
+    yield cliente
+    control_cronicidad.cache_estadisticas.invalidar()
+    if anterior is not None:
+        app.dependency_overrides[get_supabase_client] = anterior
+
+
+class TestCacheTTL:
+
+    def test_sirve_desde_memoria_mientras_esta_vigente(self):
+        cache = CacheTTL(60)
+        calculos = []
+        for _ in range(3):
+            cache.obtener("clave", lambda: calculos.append(1) or len(calculos))
+        assert calculos == [1]
+
+    def test_recalcula_al_vencer_o_invalidar(self):
+        cache = CacheTTL(0)
+        assert cache.obtener("clave", lambda: 1) == 1
+        assert cache.obtener("clave", lambda: 2) == 2
+
+        cache = CacheTTL(60)
+        cache.obtener("clave", lambda: 1)
+        cache.invalidar("clave")
+        assert cache.obtener("clave", lambda: 2) == 2
+
+
+class TestEstadisticasControlCronicidad:
+
+    def test_una_sola_consulta_por_polling(self, cliente_rpc):
+        client = TestClient(app)
+        respuestas = [client.get("/control-cronicidad/estadisticas/basicas") for _ in range(5)]
+
+        assert all(r.status_code == 200 for r in respuestas)
+        assert cliente_rpc.llamadas_rpc == [("estadisticas_control_cronicidad", {})]
+
+        datos = respuestas[0].json()
+        assert datos["resumen_general"] == {
+            "total_controles": 10,
+            "porcentaje_controlados": 60.0,
+            "porcentaje_buena_adherencia": 50.0,
+        }
+        assert datos["por_tipo_cronicidad"] == {"Hipertension": 7, "Diabetes": 3, "ERC": 0, "Dislipidemia": 0}
+        assert datos["control_metabolico"] == {"controlados": 6, "no_controlados": 3, "en_proceso": 1}
+
+    def test_tabla_vacia(self, cliente_rpc):
+        cliente_rpc.respuestas_rpc["estadisticas_control_cronicidad"] = {"total": 0, "por_tipo": {}}
+        datos = TestClient(app).get("/control-cronicidad/estadisticas/basicas").json()
+        assert datos["resumen_general"]["porcentaje_controlados"] == 0
+        assert datos["control_metabolico"]["en_proceso"] == 0
+
+
+class TestAgregadosTamizajeOncologico:
+
+    def test_estadisticas_en_una_consulta(self, cliente_rpc):
+        datos = TestClient(app).get("/tamizaje-oncologico/estadisticas/basicas").json()
+
+        assert [nombre for nombre, _ in cliente_rpc.llamadas_rpc] == ["estadisticas_tamizaje_oncologico"]
+        assert datos["resumen_general"]["total_tamizajes"] == 8
+        assert datos["resumen_general"]["porcentaje_positivos"] == 25.0
+        assert datos["por_tipo_tamizaje"] == {"Cuello Uterino": 3, "Mama": 5, "Prostata": 0, "Colon y Recto": 0}
+        assert datos["resultados"] == {"positivos_anormales": 2, "negativos": 5, "pendientes": 1}
+        assert datos["seguimiento"] == {"requiere_especializado": 1, "seguimiento_normal": 7}
+
+    def test_adherencia_filtra_en_bd(self, cliente_rpc):
+        datos = TestClient(app).get(
+            "/tamizaje-oncologico/reportes/adherencia",
+            params={"tipo_tamizaje": "Mama", "fecha_desde": "2025-01-01", "fecha_hasta": "2025-06-30"}
+        ).json()
+
+        (nombre, params), = cliente_rpc.llamadas_rpc
+        assert nombre == "adherencia_tamizaje_oncologico"
+        assert params["p_tipo_tamizaje"] == "Mama"
+        assert (params["p_fecha_desde"], params["p_fecha_hasta"]) == ("2025-01-01", "2025-06-30")
+        assert params["p_intervalos"] == INTERVALOS_TAMIZAJE_DIAS
+
+        assert datos["parametros_reporte"]["total_tamizajes_analizados"] == 4
+        assert datos["adherencia_absolutos"] == {"Buena": 2, "Regular": 1, "Mala": 1, "No evaluada": 0}
+        assert datos["adherencia_porcentajes"]["Buena"] == 50.0
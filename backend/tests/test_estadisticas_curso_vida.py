@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS MOTOR DE ESTADÍSTICAS POR CURSO DE VIDA
+==============================================
+
+Compara el motor columnar (services/estadisticas_curso_vida.py) contra el
+cálculo original fila a fila con calcular_campos_automaticos. No requieren BD.
+
+Enfoque: para los mismos datos, el JSON de ambos caminos debe ser idéntico,
+incluido el orden de las claves de cada distribución.
+"""
+
+import json
+import random
+from collections import Counter
+from fastapi.encoders import jsonable_encoder
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.atencion_infancia_model import EstadoNutricionalInfancia
+from models.atencion_adolescencia_model import (
+    AtencionAdolescenciaResponse,
+    EstadisticasAdolescenciaResponse,
+    ReporteDesarrolloAdolescenciaResponse
+)
+from routes.atencion_infancia import calcular_campos_automaticos as campos_infancia
+from services.estadisticas_curso_vida import (
+    COLUMNAS_ESTADISTICAS_INFANCIA,
+    COLUMNAS_ESTADISTICAS_ADOLESCENCIA,
+    estadisticas_infancia,
+    estadisticas_adolescencia,
+    reporte_desarrollo_psicosocial
+)
+
+
+# =============================================================================
+# DATOS SINTÉTICOS
+# =============================================================================
+
+TAMIZAJES = ["NORMAL", "ALTERADO", "REQUIERE_EVALUACION", "NO_REALIZADO"]
+
+
+def generar_atenciones_infancia(n: int, semilla: int = 6) -> list:
+    azar = random.Random(semilla)
+    factores = ["SEDENTARISMO", "MALA_ALIMENTACION", "BULLYING", "USO_EXCESIVO_PANTALLAS"]
+    return [{
+        "peso_kg": round(azar.uniform(15, 60), 2),
+        "talla_cm": round(azar.uniform(105, 160), 2),
+        "desempeno_escolar": azar.choice(["SUPERIOR", "ALTO", "BASICO", "BAJO", "NO_ESCOLARIZADO"]),
+        "tamizaje_visual": azar.choice(TAMIZAJES),
+        "tamizaje_auditivo": azar.choice(TAMIZAJES),
+        "tamizaje_salud_bucal": azar.choice(TAMIZAJES + [None]),
+        "dificultades_aprendizaje": azar.random() < 0.2,
+        "numero_caries": azar.choice([None, 0, 1, 3, 4, 7]),
+        "factores_riesgo_identificados": azar.sample(factores, azar.randint(0, 3)),
+    } for _ in range(n)]
+
+
+def generar_atenciones_adolescencia(n: int, semilla: int = 12) -> list:
+    azar = random.Random(semilla)
+    return [{
+        "edad_anos": azar.randint(12, 29),
+        "peso_kg": round(azar.uniform(35, 130), 2),
+        "talla_cm": round(azar.uniform(140, 195), 2),
+        "presion_sistolica": azar.randint(95, 160),
+        "presion_diastolica": azar.randint(55, 100),
+        "antecedentes_familiares_cardiovasculares": azar.random() < 0.3,
+        "fumador": azar.random() < 0.15,
+        "sedentarismo": azar.random() < 0.5,
+        "autoestima": azar.randint(1, 10),
+        "habilidades_sociales": azar.randint(1, 10),
+        "proyecto_vida": azar.choice(["DEFINIDO", "EN_CONSTRUCCION", "POCO_CLARO", "AUSENTE", "REQUIERE_ORIENTACION"]),
+        "problemas_conductuales": azar.random() < 0.2,
+        "consumo_sustancias": azar.choice([
+            "SIN_CONSUMO", "CONSUMO_EXPERIMENTAL", "CONSUMO_OCASIONAL", "CONSUMO_HABITUAL", "CONSUMO_PROBLEMATICO"
+        ]),
+        "familia_funcional": azar.random() < 0.7,
+        "rendimiento_academico": azar.choice(["SUPERIOR", "ALTO", "BASICO", "BAJO"]),
+        "actividad_fisica_regular": azar.random() < 0.4,
+        "red_apoyo_social": azar.random() < 0.7,
+        "salud_mental": azar.choice([
+            "NORMAL", "SINTOMAS_LEVES", "SINTOMAS_MODERADOS", "SINTOMAS_SEVEROS", "REQUIERE_ATENCION_ESPECIALIZADA"
+        ]),
+        "trastorno_alimentario": azar.choice([
+            "SIN_RIESGO", "RIESGO_BAJO", "RIESGO_MODERADO", "RIESGO_ALTO", "DIAGNOSTICO_CONFIRMADO"
+        ]),
+    } for _ in range(n)]
+
+
+# =============================================================================
+# CÁLCULO ORIGINAL FILA A FILA (REFERENCIA)
+# =============================================================================
+
+def referencia_estadisticas_infancia(atenciones: list) -> dict:
+    total_atenciones = len(atenciones)
+    desarrollo_apropiado_count = 0
+    seguimiento_especializado_count = 0
+    desempeno_stats, nutricional_stats, factores_riesgo_stats = {}, {}, {}
+
+    for atencion in atenciones:
+        campos_calculados = campos_infancia(atencion, 8)
+        if campos_calculados['desarrollo_apropiado_edad']:
+            desarrollo_apropiado_count += 1
+        if campos_calculados['requiere_seguimiento_especializado']:
+            seguimiento_especializado_count += 1
+        desempeno = atencion.get('desempeno_escolar', 'NO_ESPECIFICADO')
+        desempeno_stats[desempeno] = desempeno_stats.get(desempeno, 0) + 1
+        estado_nut = campos_calculados['estado_nutricional']
+        nutricional_stats[estado_nut] = nutricional_stats.get(estado_nut, 0) + 1
+        for factor in atencion.get('factores_riesgo_identificados', []):
+            factores_riesgo_stats[factor] = factores_riesgo_stats.get(factor, 0) + 1
+
+    return {
+        "resumen_general": {
+            "total_atenciones": total_atenciones,
+            "promedio_edad": 8.0,
+            "porcentaje_desarrollo_apropiado": round((desarrollo_apropiado_count / total_atenciones) * 100, 1),
+            "porcentaje_seguimiento_especializado": round((seguimiento_especializado_count / total_atenciones) * 100, 1)
+        },
+        "por_desempeno_escolar": desempeno_stats,
+        "estado_nutricional": nutricional_stats,
+        "factores_riesgo": factores_riesgo_stats,
+    }
+
+
+def _calcular_adolescencia(atenciones: list) -> list:
+    return [AtencionAdolescenciaResponse.calcular_campos_automaticos(dict(a)) for a in atenciones]
+
+
+def referencia_estadisticas_adolescencia(atenciones: list) -> EstadisticasAdolescenciaResponse:
+    calculadas = _calcular_adolescencia(atenciones)
+    total = len(calculadas)
+    distribuciones = {
+        "por_edad": {}, "por_estado_nutricional": {}, "por_nivel_riesgo": {},
+        "por_desarrollo_psicosocial": {}, "por_salud_mental": {}
+    }
+    edades = [a["edad_anos"] for a in calculadas]
+    imcs = [a["imc"] for a in calculadas]
+    autoestimas = [a["autoestima"] for a in calculadas]
+    promedios = {
+        "edad_anos": round(sum(edades) / len(edades), 1),
+        "imc": round(sum(imcs) / len(imcs), 2),
+        "autoestima": round(sum(autoestimas) / len(autoestimas), 1),
+        "factores_protectores_promedio": round(sum(len(a["factores_protectores_identificados"]) for a in calculadas) / total, 1)
+    }
+    for a in calculadas:
+        grupo_edad = "12-15" if a["edad_anos"] <= 15 else "16-19" if a["edad_anos"] <= 19 else "20-24" if a["edad_anos"] <= 24 else "25-29"
+        for clave, valor in (("por_edad", grupo_edad), ("por_estado_nutricional", a["estado_nutricional"]),
+                             ("por_nivel_riesgo", a["nivel_riesgo_integral"]),
+                             ("por_desarrollo_psicosocial", a["desarrollo_psicosocial_apropiado"]),
+                             ("por_salud_mental", a["salud_mental"])):
+            distribuciones[clave][valor] = distribuciones[clave].get(valor, 0) + 1
+
+    riesgo_alto = sum(1 for a in calculadas if a["nivel_riesgo_integral"] in ["ALTO", "MUY_ALTO", "CRITICO"])
+    mental = sum(1 for a in calculadas if a["salud_mental"] in ["SINTOMAS_MODERADOS", "SINTOMAS_SEVEROS", "REQUIERE_ATENCION_ESPECIALIZADA"])
+    obesidad = sum(1 for a in calculadas if "OBESIDAD" in a["estado_nutricional"])
+    alertas = {
+        "adolescentes_riesgo_alto": riesgo_alto,
+        "porcentaje_riesgo_alto": round((riesgo_alto / total) * 100, 1),
+        "problemas_salud_mental": mental,
+        "porcentaje_problemas_mental": round((mental / total) * 100, 1),
+        "casos_obesidad": obesidad,
+        "porcentaje_obesidad": round((obesidad / total) * 100, 1)
+    }
+    return EstadisticasAdolescenciaResponse(
+        total_atenciones=total, distribuciones=distribuciones, promedios=promedios, alertas=alertas
+    )
+
+
+def referencia_reporte_desarrollo_psicosocial(atenciones: list) -> ReporteDesarrolloAdolescenciaResponse:
+    calculadas = _calcular_adolescencia(atenciones)
+    total = len(calculadas)
+    desarrollo_apropiado = sum(1 for a in calculadas if a["desarrollo_psicosocial_apropiado"] == "APROPIADO")
+    factores_riesgo = {
+        "consumo_sustancias": sum(1 for a in calculadas if a["consumo_sustancias"] != "SIN_CONSUMO"),
+        "problemas_salud_mental": sum(1 for a in calculadas if a["salud_mental"] != "NORMAL"),
+        "sedentarismo": sum(1 for a in calculadas if a["sedentarismo"]),
+        "problemas_conductuales": sum(1 for a in calculadas if a["problemas_conductuales"]),
+        "proyecto_vida_ausente": sum(1 for a in calculadas if a["proyecto_vida"] in ["POCO_CLARO", "AUSENTE"])
+    }
+    riesgo = [{"factor": k, "casos": v, "porcentaje": round((v / total) * 100, 1)}
+              for k, v in sorted(factores_riesgo.items(), key=lambda x: x[1], reverse=True)]
+    protectores = Counter(f for a in calculadas for f in a["factores_protectores_identificados"])
+    protectores = [{"factor": k, "casos": v, "porcentaje": round((v / total) * 100, 1)}
+                   for k, v in protectores.most_common()]
+    recomendaciones = []
+    if factores_riesgo["sedentarismo"] > total * 0.6:
+        recomendaciones.append("Implementar programas de actividad física dirigidos a adolescentes")
+    if factores_riesgo["problemas_salud_mental"] > total * 0.3:
+        recomendaciones.append("Fortalecer programas de salud mental y apoyo psicológico")
+    if factores_riesgo["proyecto_vida_ausente"] > total * 0.4:
+        recomendaciones.append("Desarrollar talleres de orientación vocacional y proyecto de vida")
+    if desarrollo_apropiado < total * 0.7:
+        recomendaciones.append("Intensificar intervenciones de desarrollo psicosocial")
+    if factores_riesgo["consumo_sustancias"] > total * 0.2:
+        recomendaciones.append("Implementar programas de prevención de consumo de sustancias")
+    return ReporteDesarrolloAdolescenciaResponse(
+        adolescentes_evaluados=total, desarrollo_apropiado=desarrollo_apropiado,
+        factores_riesgo_prevalentes=riesgo[:5], factores_protectores_prevalentes=protectores[:5],
+        recomendaciones=recomendaciones
+    )
+
+
+def _json(valor) -> str:
+    """Serialización como la haría FastAPI, preservando el orden de claves"""
+    if hasattr(valor, "model_dump_json"):
+        return valor.model_dump_json()
+    return json.dumps(jsonable_encoder(valor))
+
+
+# =============================================================================
+# TESTS
+# =============================================================================
+
+class TestMotorEstadisticasCursoVida:
+
+    def test_estadisticas_infancia_identicas(self):
+        for n in (1, 7, 2000):
+            atenciones = generar_atenciones_infancia(n, semilla=n)
+            assert _json(estadisticas_infancia(atenciones)) == _json(referencia_estadisticas_infancia(atenciones))
+
+    def test_estado_nutricional_infancia_en_los_cortes(self):
+        # IMC exactamente en 14.5, 18.5 y 21.0 con talla de 100 cm, y talla 0
+        atenciones = generar_atenciones_infancia(5)
+        for atencion, peso in zip(atenciones, [14.5, 18.5, 21.0, 10.0]):
+            atencion.update(peso_kg=peso, talla_cm=100)
+        atenciones[4].update(peso_kg=20, talla_cm=0)
+
+        resultado = estadisticas_infancia(atenciones)["estado_nutricional"]
+        assert resultado == {k.value if isinstance(k, EstadoNutricionalInfancia) else k: v
+                             for k, v in referencia_estadisticas_infancia(atenciones)["estado_nutricional"].items()}
+
+    def test_estadisticas_adolescencia_identicas(self):
+        for n in (1, 9, 2000):
+            atenciones = generar_atenciones_adolescencia(n, semilla=n)
+            motor = EstadisticasAdolescenciaResponse(**estadisticas_adolescencia(atenciones))
+            assert _json(motor) == _json(referencia_estadisticas_adolescencia(atenciones))
+
+    def test_reporte_desarrollo_psicosocial_identico(self):
+        for n in (1, 9, 2000):
+            atenciones = generar_atenciones_adolescencia(n, semilla=n + 1)
+            motor = ReporteDesarrolloAdolescenciaResponse(**reporte_desarrollo_psicosocial(atenciones))
+            assert _json(motor) == _json(referencia_reporte_desarrollo_psicosocial(atenciones))
+
+    def test_sin_atenciones(self):
+        assert estadisticas_infancia([])["resumen_general"]["total_atenciones"] == 0
+        assert estadisticas_adolescencia([])["total_atenciones"] == 0
+        assert reporte_desarrollo_psicosocial([])["adolescentes_evaluados"] == 0
+
+    def test_columnas_consultadas_cubren_los_calculos(self):
+        # Con solo las columnas que consulta el endpoint, el cálculo de referencia no falla
+        infancia = [{c: a[c] for c in COLUMNAS_ESTADISTICAS_INFANCIA} for a in generar_atenciones_infancia(3)]
+        adolescencia = [{c: a[c] for c in COLUMNAS_ESTADISTICAS_ADOLESCENCIA} for a in generar_atenciones_adolescencia(3)]
+        referencia_estadisticas_infancia(infancia)
+        referencia_estadisticas_adolescencia(adolescencia)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS ÍNDICE EN MEMORIA - CATÁLOGO OCUPACIONES DANE
+===================================================
+
+Verifica la búsqueda del índice de autocompletado (prefijos de palabra sin
+tildes, prefijo de código, relevancia y límite), la carga paginada desde
+Supabase, el TTL de recarga, la recarga cuando otro worker importa el catálogo
+y las estadísticas servidas desde el resumen precalculado. No requieren BD.
+"""
+
+import os
+import sys
+import time
+import uuid
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from services import indice_ocupaciones
+from services.indice_ocupaciones import (
+    IndiceOcupaciones,
+    cargar_filas_ocupaciones,
+    normalizar_termino,
+    obtener_indice_ocupaciones
+)
+
+
+def _ocupacion(codigo, nombre, activo=True):
+    return {
+        "id": str(uuid.uuid4()),
+        "codigo_ocupacion_dane": codigo,
+        "nombre_ocupacion_normalizado": nombre,
+        "categoria_ocupacional_nivel_1": "2 - Profesionales Científicos e Intelectuales",
+        "activo": activo
+    }
+
+
+CATALOGO = [
+    _ocupacion("2211", "Médicos Generales"),
+    _ocupacion("2212", "Médicos Especialistas"),
+    _ocupacion("2221", "Enfermeras Profesionales"),
+    _ocupacion("3221", "Auxiliares de Enfermería"),
+    _ocupacion("2261", "Odontólogos"),
+    _ocupacion("9999", "Técnico en Electromedicina"),
+    _ocupacion("2213", "Médicos Veterinarios", activo=False),
+]
+
+
+RESUMEN = {
+    "total_ocupaciones": 10919,
+    "ocupaciones_activas": 10900,
+    "categorias_nivel_1": 10,
+    "categorias_nivel_2": 43,
+    "ultima_actualizacion": "2026-10-18T10:00:00+00:00",
+    "version_catalogo": "CIUO-08 AC 2025",
+    "calculado_en": "2026-10-18T10:00:00.123+00:00"
+}
+
+
+def _cliente_ocupaciones(cliente_en_memoria):
+    fila = {k: v for k, v in CATALOGO[0].items() if k != "activo"}
+    return cliente_en_memoria(
+        {"catalogo_ocupaciones_dane": list(CATALOGO), "catalogo_ocupaciones_resumen": [dict(RESUMEN)]},
+        rpc={"buscar_ocupaciones_trgm": [{**fila, "relevancia": 1.0}]}
+    )
+
+
+def _resumen(cliente):
+    return cliente.tablas["catalogo_ocupaciones_resumen"][0]
+
+
+def _indice():
+    return IndiceOcupaciones([f for f in CATALOGO if f["activo"]])
+
+
+def test_normalizar_termino_quita_tildes_y_separadores():
+    assert normalizar_termino("  Auxiliares de ENFERMERÍA/Técnicos ") == "auxiliares de enfermeria tecnicos"
+
+
+def test_prefijo_de_palabra_sin_tildes_en_cualquier_posicion():
+    nombres = [r["nombre_ocupacion_normalizado"] for r in _indice().buscar("enfer")]
+
+    assert nombres == ["Enfermeras Profesionales", "Auxiliares de Enfermería"]
+
+
+def test_relevancia_inicio_de_nombre_sobre_palabra_interna():
+    resultados = _indice().buscar("medic")
+
+    assert [(r["nombre_ocupacion_normalizado"], r["relevancia"]) for r in resultados] == [
+        ("Médicos Especialistas", 1.0),
+        ("Médicos Generales", 1.0),
+    ]
+    # "Electromedicina" no empieza por "medic": no es un prefijo de palabra
+    assert all("Electro" not in r["nombre_ocupacion_normalizado"] for r in resultados)
+
+
+def test_varios_terminos_se_intersectan():
+    resultados = _indice().buscar("aux enferm")
+
+    assert [r["codigo_ocupacion_dane"] for r in resultados] == ["3221"]
+    assert resultados[0]["relevancia"] == 0.8
+
+
+def test_prefijo_de_codigo():
+    resultados = _indice().buscar("221")
+
+    assert [r["codigo_ocupacion_dane"] for r in resultados] == ["2212", "2211"]
+    assert {r["relevancia"] for r in resultados} == {0.9}
+
+
+def test_limite_de_resultados_y_sin_coincidencias():
+    assert len(_indice().buscar("medic", limit=1)) == 1
+    assert _indice().buscar("xyz") == []
+    assert _indice().buscar("---") == []
+
+
+def test_carga_paginada_solo_activas(monkeypatch, cliente_en_memoria):
+    monkeypatch.setattr(indice_ocupaciones, "TAMANO_PAGINA_CARGA", 2)
+    cliente = _cliente_ocupaciones(cliente_en_memoria)
+
+    filas = cargar_filas_ocupaciones(cliente)
+
+    assert len(filas) == 6
+    assert len(cliente.consultas) == 4  # 2 + 2 + 2 + página vacía
+    assert "2213" not in {f["codigo_ocupacion_dane"] for f in filas}
+
+
+def test_ttl_reutiliza_y_recarga(monkeypatch, cliente_en_memoria):
+    monkeypatch.setattr(indice_ocupaciones, "_indice_compartido", None)
+    cliente = _cliente_ocupaciones(cliente_en_memoria)
+
+    primero = obtener_indice_ocupaciones(cliente, ttl_segundos=60)
+    consultas = len(cliente.consultas)
+    assert obtener_indice_ocupaciones(cliente, ttl_segundos=60) is primero
+    assert len(cliente.consultas) == consultas
+
+    primero.cargado_en = time.monotonic() - 120
+    assert obtener_indice_ocupaciones(cliente, ttl_segundos=60) is not primero
+    assert len(cliente.consultas) > consultas
+
+
+def test_catalogo_modificado_en_otro_worker_recarga_el_indice(monkeypatch, cliente_en_memoria):
+    monkeypatch.setattr(indice_ocupaciones, "_indice_compartido", None)
+    cliente = _cliente_ocupaciones(cliente_en_memoria)
+    primero = obtener_indice_ocupaciones(cliente)
+    assert primero.version == _resumen(cliente)["calculado_en"]
+
+    # Toca verificar y el catálogo no cambió: una sola consulta liviana al resumen
+    primero.verificado_en -= indice_ocupaciones.INTERVALO_VERIFICACION_INDICE
+    consultas = len(cliente.consultas)
+    assert obtener_indice_ocupaciones(cliente) is primero
+    assert cliente.tablas_consultadas()[consultas:] == ["catalogo_ocupaciones_resumen"]
+    assert indice_ocupaciones.indice_ocupaciones_vigente() is primero
+
+    # Otro worker importó: el trigger cambió calculado_en
+    cliente.tablas["catalogo_ocupaciones_dane"].append(_ocupacion("2262", "Odontólogos Especialistas"))
+    _resumen(cliente)["calculado_en"] = "2026-10-18T11:30:00.456+00:00"
+    assert obtener_indice_ocupaciones(cliente) is primero  # Aún dentro del intervalo
+
+    primero.verificado_en -= indice_ocupaciones.INTERVALO_VERIFICACION_INDICE
+    recargado = obtener_indice_ocupaciones(cliente)
+    assert recargado is not primero
+    assert len(recargado) == 7
+    assert recargado.version == "2026-10-18T11:30:00.456+00:00"
+
+
+def test_endpoints_buscar_y_recargar_sin_bd(monkeypatch, cliente_en_memoria):
+    from main import app
+    from database import get_supabase_client
+
+    monkeypatch.setattr(indice_ocupaciones, "_indice_compartido", None)
+    cliente = _cliente_ocupaciones(cliente_en_memoria)
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    try:
+        client = TestClient(app)
+        respuesta = client.get("/ocupaciones/buscar", params={"q": "odonto"})
+        assert respuesta.status_code == 200
+        assert [r["codigo_ocupacion_dane"] for r in respuesta.json()] == ["2261"]
+
+        cliente.tablas["catalogo_ocupaciones_dane"].append(_ocupacion("2262", "Odontólogos Especialistas"))
+        assert len(client.get("/ocupaciones/buscar", params={"q": "odonto"}).json()) == 1
+
+        recarga = client.post("/ocupaciones/indice/recargar")
+        assert recarga.status_code == 200
+        assert recarga.json()["ocupaciones_indexadas"] == 7
+        assert len(client.get("/ocupaciones/buscar", params={"q": "odonto"}).json()) == 2
+    finally:
+        app.dependency_overrides.pop(get_supabase_client, None)
+
+
+def test_sin_indice_busca_en_bd_con_una_sola_rpc(monkeypatch, cliente_en_memoria):
+    from main import app
+    from database import get_supabase_client
+
+    monkeypatch.setattr(indice_ocupaciones, "_indice_compartido", None)
+    cliente = _cliente_ocupaciones(cliente_en_memoria)
+    cliente.tablas_con_error = {"catalogo_ocupaciones_dane", "catalogo_ocupaciones_resumen"}
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    try:
+        respuesta = TestClient(app).get("/ocupaciones/buscar", params={"q": "médic", "limit": 5})
+    finally:
+        app.dependency_overrides.pop(get_supabase_client, None)
+
+    assert respuesta.status_code == 200
+    assert [r["codigo_ocupacion_dane"] for r in respuesta.json()] == ["2211"]
+    assert cliente.llamadas_rpc == [("buscar_ocupaciones_trgm", {
+        "p_termino": "médic", "p_limite": 5, "p_categoria": None, "p_solo_activas": True
+    })]
+
+
+def test_estadisticas_leen_una_fila_del_resumen(cliente_en_memoria):
+    from main import app
+    from database import get_supabase_client
+
+    cliente = _cliente_ocupaciones(cliente_en_memoria)
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    try:
+        respuesta = TestClient(app).get("/ocupaciones/estadisticas")
+    finally:
+        app.dependency_overrides.pop(get_supabase_client, None)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["categorias_nivel_2"] == 43
+    assert respuesta.json()["total_ocupaciones"] == 10919
+    assert respuesta.json()["version_catalogo"] == "CIUO-08 AC 2025"
+    assert cliente.tablas_consultadas() == ["catalogo_ocupaciones_resumen"]
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS LOGGING ESTRUCTURADO
+==========================
+
+Verifica el modo asíncrono de StructuredLogger (QueueHandler/QueueListener),
+la salida JSON, la serialización diferida de campos en el hilo del listener
+y el corte temprano cuando el nivel está deshabilitado.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import threading
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.error_handling import FormatterJSON, FormatterTexto, StructuredLogger
+
+
+class _CampoObservado:
+    """Valor de campo que registra en qué hilo y cuántas veces se serializa"""
+
+    def __init__(self):
+        self.hilos = []
+
+    def __str__(self):
+        self.hilos.append(threading.current_thread())
+        return "observado"
+
+
+def _logger_capturado(nombre, formatter, **kwargs):
+    """StructuredLogger asíncrono cuyo listener escribe en un buffer"""
+    structured = StructuredLogger(nombre, asincrono=True, **kwargs)
+    structured.logger.propagate = False
+    buffer = io.StringIO()
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(formatter)
+    structured.listener.handlers = (handler,)
+    return structured, buffer
+
+
+def test_json_con_campos_al_primer_nivel_y_linea_del_llamador():
+    structured, buffer = _logger_capturado("test_log_json", FormatterJSON())
+
+    structured.info("Request completado", status_code=200, path="/pacientes/")
+    structured.detener()
+
+    registro = json.loads(buffer.getvalue().strip())
+    assert registro["message"] == "Request completado"
+    assert registro["level"] == "INFO"
+    assert registro["status_code"] == 200
+    assert registro["path"] == "/pacientes/"
+    assert registro["function"] == "test_json_con_campos_al_primer_nivel_y_linea_del_llamador"
+
+
+def test_campos_no_pisan_claves_base():
+    structured, buffer = _logger_capturado("test_log_json_claves", FormatterJSON())
+
+    structured.warning("original", level="campo", logger="campo")
+    structured.detener()
+
+    registro = json.loads(buffer.getvalue().strip())
+    assert registro["message"] == "original"
+    assert registro["level"] == "WARNING"
+    assert registro["logger"] == "test_log_json_claves"
+
+
+def test_campos_se_serializan_en_el_hilo_del_listener():
+    structured, buffer = _logger_capturado("test_log_diferido", FormatterJSON())
+    campo = _CampoObservado()
+
+    structured.info("diferido", valor=campo)
+    structured.detener()
+
+    assert json.loads(buffer.getvalue().strip())["valor"] == "observado"
+    assert len(campo.hilos) == 1
+    assert campo.hilos[0] is not threading.current_thread()
+
+
+def test_nivel_deshabilitado_no_serializa_ni_encola():
+    structured, buffer = _logger_capturado("test_log_nivel", FormatterJSON(), nivel="WARNING")
+    campo = _CampoObservado()
+
+    structured.info("descartado", valor=campo)
+    structured.debug("descartado", valor=campo)
+    structured.detener()
+
+    assert buffer.getvalue() == ""
+    assert campo.hilos == []
+
+
+def test_formato_texto_conserva_pares_clave_valor():
+    structured, buffer = _logger_capturado("test_log_texto", FormatterTexto())
+
+    structured.error("Request falló", method="GET", error="timeout")
+    structured.detener()
+
+    linea = buffer.getvalue().strip()
+    assert "| ERROR | test_log_texto |" in linea
+    assert linea.endswith("Request falló | method=GET | error=timeout")
+
+
+def test_modo_sincrono_sin_listener():
+    structured = StructuredLogger("test_log_sincrono", asincrono=False)
+
+    assert structured.listener is None
+    assert isinstance(structured.logger.handlers[0], logging.StreamHandler)
+    structured.detener()  # No-op sin listener
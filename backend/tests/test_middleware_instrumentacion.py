@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS MIDDLEWARE DE INSTRUMENTACIÓN
+===================================
+
+Verifica el middleware ASGI único: un correlation ID por request (headers,
+request.state y respuestas de error), métricas APM por plantilla de ruta,
+streaming de respuestas grandes sin acumular el cuerpo, denegación de acceso
+con 403 y registro de excepciones. No requieren BD.
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from core import monitoring
+from core.error_handling import setup_error_handling
+from core.middleware import InstrumentacionMiddleware
+from core.security import RiskLevel
+
+
+def _app_instrumentada(auditoria=None):
+    app = FastAPI()
+    setup_error_handling(app)
+
+    @app.get("/instrumentado/{item_id}")
+    async def leer(item_id: str, request: Request):
+        return {"item_id": item_id, "correlation_id": request.state.correlation_id}
+
+    @app.get("/instrumentado-error/{item_id}")
+    async def fallar(item_id: str):
+        raise HTTPException(status_code=404, detail="No existe")
+
+    app.add_middleware(InstrumentacionMiddleware, auditoria=auditoria)
+    return app
+
+
+def test_un_correlation_id_por_request_en_header_y_state():
+    client = TestClient(_app_instrumentada())
+
+    respuesta = client.get("/instrumentado/abc")
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["X-Correlation-ID"] == respuesta.json()["correlation_id"]
+    assert respuesta.headers["X-Response-Time"].endswith("ms")
+    assert "X-Security-Event-ID" not in respuesta.headers
+
+
+def test_error_handler_reutiliza_el_correlation_id():
+    client = TestClient(_app_instrumentada())
+
+    respuesta = client.get("/instrumentado-error/1")
+
+    assert respuesta.status_code == 404
+    assert respuesta.json()["error"]["correlation_id"] == respuesta.headers["X-Correlation-ID"]
+
+
+def test_metricas_por_plantilla_de_ruta():
+    client = TestClient(_app_instrumentada())
+    previos = monitoring.metrics.request_count
+
+    client.get("/instrumentado/uno")
+    client.get("/instrumentado/dos")
+    client.get("/instrumentado-error/tres")
+
+    assert monitoring.metrics.request_count == previos + 3
+    metrica = monitoring.apm_collector.endpoints_metrics["GET:/instrumentado/{item_id}"]
+    assert metrica["success_count"] >= 2
+    assert monitoring.apm_collector.endpoints_metrics["GET:/instrumentado-error/{item_id}"]["error_count"] >= 1
+
+
+def _scope(path="/streaming/archivo"):
+    return {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+
+
+def test_streaming_grande_pasa_mensaje_por_mensaje():
+    trozo = b"x" * 65536
+    total_trozos = 256  # 16 MiB
+    eventos = []
+
+    async def app_streaming(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        for i in range(total_trozos):
+            eventos.append(("producido", i))
+            await send({"type": "http.response.body", "body": trozo, "more_body": i < total_trozos - 1})
+
+    enviados = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            eventos.append(("enviado", len(enviados) - 1))
+        enviados.append(message)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    asyncio.run(InstrumentacionMiddleware(app_streaming)(_scope(), receive, send))
+
+    inicio, cuerpos = enviados[0], enviados[1:]
+    assert inicio["status"] == 200
+    nombres = [nombre for nombre, _ in inicio["headers"]]
+    assert b"content-type" in nombres and b"x-correlation-id" in nombres
+    assert len(cuerpos) == total_trozos
+    assert all(mensaje["body"] is trozo for mensaje in cuerpos)
+    assert cuerpos[-1]["more_body"] is False
+    # Cada trozo sale antes de producir el siguiente: no hay buffering
+    assert eventos[:4] == [("producido", 0), ("enviado", 0), ("producido", 1), ("enviado", 1)]
+
+
+def test_acceso_denegado_responde_403_sin_llamar_la_app():
+    llamadas = []
+
+    class AuditoriaDenegando:
+        async def log_access_attempt(self, user_context, access_request):
+            llamadas.append((user_context.user_id, access_request.resource_type))
+            return SimpleNamespace(
+                event_id="evt-1", result="DENIED", risk_level=RiskLevel.HIGH,
+                additional_metadata={"reason": "Sin permisos"}
+            )
+
+    client = TestClient(_app_instrumentada(AuditoriaDenegando()))
+
+    respuesta = client.get("/instrumentado/abc", headers={"X-User-ID": "u1"})
+
+    assert respuesta.status_code == 403
+    assert respuesta.json()["error"]["message"] == "Acceso denegado: Sin permisos"
+    assert respuesta.json()["error"]["correlation_id"] == respuesta.headers["X-Correlation-ID"]
+    assert respuesta.headers["X-Security-Event-ID"] == "evt-1"
+    assert respuesta.headers["X-Risk-Level"] == "HIGH"
+    assert llamadas[0][0] == "u1"
+
+
+def test_excepcion_de_la_app_se_registra_como_500_y_se_propaga():
+    async def app_fallando(scope, receive, send):
+        raise RuntimeError("fallo")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    previos = monitoring.metrics.error_count
+    try:
+        asyncio.run(InstrumentacionMiddleware(app_fallando)(_scope("/fallando"), receive, send))
+        assert False, "La excepción debe propagarse"
+    except RuntimeError:
+        pass
+
+    assert monitoring.metrics.error_count == previos + 1
+    assert monitoring.apm_collector.endpoints_metrics["GET:/fallando"]["error_count"] >= 1
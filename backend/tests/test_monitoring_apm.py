@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS APM COLLECTOR
+===================
+
+Tests del collector APM con estado de tamaño fijo por endpoint: histogramas
+logarítmicos de latencia y ventana de 24 horas por minuto. No requieren BD.
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from main import app
+from core.monitoring import (
+    APMMetricsCollector,
+    HistogramaLatencia,
+    HistogramaReciente,
+    VentanaTemporal,
+    apm_collector
+)
+
+
+def _percentil_exacto(valores, q):
+    ordenados = sorted(valores)
+    return ordenados[max(1, math.ceil(q * len(ordenados))) - 1]
+
+
+class TestHistogramaLatencia:
+
+    def test_percentiles_con_error_relativo_acotado(self):
+        rng = random.Random(7)
+        valores = [rng.lognormvariate(-3, 1) for _ in range(20_000)]
+        histograma = HistogramaLatencia()
+        for valor in valores:
+            histograma.registrar(valor)
+
+        for q in (0.5, 0.9, 0.99, 0.999):
+            exacto = _percentil_exacto(valores, q)
+            assert abs(histograma.percentil(q) - exacto) / exacto < 0.05
+
+    def test_valor_unico_y_vacio(self):
+        histograma = HistogramaLatencia()
+        assert histograma.percentil(0.5) is None
+        histograma.registrar(0.25)
+        assert histograma.percentil(0.99) == 0.25
+
+    def test_fusionar_equivale_a_registrar_todo(self):
+        rng = random.Random(3)
+        valores = [rng.uniform(0.001, 3.0) for _ in range(2000)]
+        todo, worker_1, worker_2 = HistogramaLatencia(), HistogramaLatencia(), HistogramaLatencia()
+        for i, valor in enumerate(valores):
+            todo.registrar(valor)
+            (worker_1 if i % 2 else worker_2).registrar(valor)
+
+        fusionado = HistogramaLatencia().fusionar(worker_1).fusionar(worker_2)
+        assert fusionado.conteos == todo.conteos
+        assert fusionado.percentiles() == todo.percentiles()
+
+    def test_serializacion_para_otros_workers(self):
+        histograma = HistogramaLatencia()
+        for valor in (0.00001, 0.01, 0.2, 5000.0):
+            histograma.registrar(valor)
+        copia = HistogramaLatencia.desde_dict(histograma.a_dict())
+        assert copia.conteos == histograma.conteos
+        assert (copia.total, copia.minimo, copia.maximo) == (4, 0.00001, 5000.0)
+
+    def test_histograma_reciente_descarta_periodos_viejos(self):
+        reciente = HistogramaReciente(periodo_segundos=300)
+        ahora = 1_000_000.0
+        reciente.registrar(3.0, ahora)
+        reciente.registrar(0.1, ahora + 300)
+        assert reciente.combinado(ahora + 300).total == 2
+        assert reciente.combinado(ahora + 600).total == 1
+        assert reciente.combinado(ahora + 1200).total == 0
+
+
+class TestVentanaTemporal:
+
+    def test_cuenta_requests_y_errores_de_la_ventana(self):
+        ventana = VentanaTemporal(minutos=60)
+        ahora = 1_000_000.0
+        for i in range(10):
+            ventana.registrar(es_error=i % 5 == 0, ahora=ahora + i)
+        assert ventana.total_requests(ahora) == 10
+        assert ventana.total_errores(ahora) == 2
+
+    def test_descarta_minutos_fuera_de_la_ventana(self):
+        ventana = VentanaTemporal(minutos=60)
+        ahora = 1_000_000.0
+        ventana.registrar(ahora=ahora)
+        ventana.registrar(ahora=ahora + 30 * 60)
+        assert ventana.total_requests(ahora + 30 * 60) == 2
+        assert ventana.total_requests(ahora + 61 * 60) == 1
+
+    def test_reutiliza_la_posicion_del_minuto_vencido(self):
+        ventana = VentanaTemporal(minutos=60)
+        ahora = 1_000_000.0
+        ventana.registrar(ahora=ahora)
+        ventana.registrar(ahora=ahora + 60 * 60)
+        assert ventana.total_requests(ahora + 60 * 60) == 1
+        assert len(ventana._requests) == 60
+
+
+class TestAPMMetricsCollector:
+
+    def test_estado_acotado_por_endpoint(self):
+        collector = APMMetricsCollector()
+        for i in range(1000):
+            collector.track_endpoint_performance("/pacientes/", "GET", 200, i / 1000)
+
+        metric = collector.endpoints_metrics["GET:/pacientes/"]
+        assert metric["total_requests"] == 1000
+        assert metric["latency_histogram"].total == 1000
+        assert len(metric["latency_histogram"].conteos) == HistogramaLatencia.TOTAL_BUCKETS
+        assert metric["last_24h_requests"].total_requests() == 1000
+
+    def test_alerta_por_response_time_lento(self):
+        collector = APMMetricsCollector()
+        collector._send_alert = lambda alert: None
+        for _ in range(20):
+            collector.track_endpoint_performance("/lento", "GET", 200, 3.0)
+        alerts = collector.check_alerts_and_notify()
+        assert [a["type"] for a in alerts] == ["SLOW_RESPONSE_TIME"]
+
+    def test_slow_queries_y_valores_recientes_acotados(self):
+        collector = APMMetricsCollector()
+        for _ in range(80):
+            collector.track_database_operation("pacientes", "SELECT", 1.5)
+        for i in range(300):
+            collector.track_business_metric("patient_created", float(i))
+        assert len(collector.database_metrics["pacientes:SELECT"]["slow_queries"]) == 50
+        assert len(collector.business_metrics["patient_created"]["recent_values"]) == 200
+
+    def test_costo_por_request_constante(self):
+        collector = APMMetricsCollector()
+        for _ in range(20_000):
+            collector.track_endpoint_performance("/x", "GET", 200, 0.01)
+
+        inicio = time.perf_counter()
+        for _ in range(1000):
+            collector.track_endpoint_performance("/x", "GET", 200, 0.01)
+        # 1k requests deben costar muy por debajo de 1s de CPU (objetivo: 1k req/s)
+        assert time.perf_counter() - inicio < 0.1
+
+
+class TestEndpointsAPM:
+
+    def test_detalle_por_endpoint_serializable(self):
+        client = TestClient(app)
+        for _ in range(7):
+            client.get("/health/quick")
+        apm_collector.track_database_operation("pacientes", "SELECT", 1.2)
+
+        detalle = client.get(
+            "/health/apm/endpoints", params={"incluir_histogramas": True}
+        ).json()["endpoints"]["GET:/health/quick"]
+        assert detalle["requests_last_24h"] >= 7
+        assert detalle["p95_response_time"] is not None
+        assert set(detalle["latency_percentiles"]) == {"p50", "p90", "p95", "p99", "p999"}
+        assert HistogramaLatencia.desde_dict(detalle["latency_histogram"]).total >= 7
+
+        respuesta = client.get("/health/apm/database")
+        assert respuesta.status_code == 200
+        operacion = respuesta.json()["database_operations"]["pacientes:SELECT"]
+        assert operacion["slow_queries"]
+        assert operacion["latency_percentiles"]["p50"] is not None
+
+
+class TestOpenMetrics:
+
+    def _exposicion(self, collector):
+        from core.monitoring import PerformanceMetrics
+        from core.openmetrics import renderizar_openmetrics
+        return "".join(renderizar_openmetrics(PerformanceMetrics(), collector))
+
+    def test_histograma_con_buckets_acumulados(self):
+        collector = APMMetricsCollector()
+        for tiempo in (0.0005, 0.01, 0.01, 0.3, 60.0):
+            collector.track_endpoint_performance("/pacientes/{paciente_id}", "GET", 200, tiempo)
+
+        texto = self._exposicion(collector)
+        etiquetas = 'method="GET",endpoint="/pacientes/{paciente_id}"'
+        assert f'ips_http_request_duration_seconds_bucket{{{etiquetas},le="0.0009765625"}} 1' in texto
+        assert f'ips_http_request_duration_seconds_bucket{{{etiquetas},le="0.015625"}} 3' in texto
+        assert f'ips_http_request_duration_seconds_bucket{{{etiquetas},le="32.0"}} 4' in texto
+        assert f'ips_http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} 5' in texto
+        assert f'ips_http_request_duration_seconds_count{{{etiquetas}}} 5' in texto
+        assert f'ips_http_requests_total{{{etiquetas},outcome="success"}} 5' in texto
+        assert texto.endswith("# EOF\n")
+
+    def test_operaciones_bd_y_negocio(self):
+        collector = APMMetricsCollector()
+        collector.track_database_operation("pacientes", "SELECT", 0.05, record_count=20)
+        collector.track_business_metric("patients_created", 1, {"gender": 'F"x'})
+
+        texto = self._exposicion(collector)
+        assert 'ips_db_records_processed_total{table="pacientes",operation="SELECT"} 20' in texto
+        assert 'ips_db_operation_duration_seconds_count{table="pacientes",operation="SELECT"} 1' in texto
+        assert 'ips_business_events_total{metric="patients_created"} 1' in texto
+        assert 'ips_business_events_by_tag_total{metric="patients_created",tag="gender",value="F\\"x"} 1' in texto
+
+    def test_endpoint_metrics(self):
+        client = TestClient(app)
+        client.get("/health/quick")
+        respuesta = client.get("/metrics")
+
+        assert respuesta.status_code == 200
+        assert respuesta.headers["content-type"].startswith("application/openmetrics-text")
+        assert 'endpoint="/health/quick"' in respuesta.text
+        assert "ips_requests_total" in respuesta.text
+
+
+class TestAgregacionWorkers:
+
+    def _worker(self, n_requests, tiempo):
+        collector = APMMetricsCollector()
+        for i in range(n_requests):
+            collector.track_endpoint_performance("/pacientes/", "GET", 500 if i % 4 == 0 else 200, tiempo)
+        collector.track_database_operation("pacientes", "SELECT", 1.5, record_count=10)
+        collector.track_business_metric("patients_created", 1, {"gender": "F"})
+        return collector
+
+    def test_fusion_equivale_a_un_solo_proceso(self):
+        worker_1, worker_2 = self._worker(8, 0.01), self._worker(4, 0.5)
+        nodo = APMMetricsCollector()
+        nodo.fusionar_exportado(worker_1.exportar())
+        nodo.fusionar_exportado(worker_2.exportar())
+
+        metric = nodo.endpoints_metrics["GET:/pacientes/"]
+        assert (metric["total_requests"], metric["error_count"]) == (12, 3)
+        assert metric["latency_histogram"].total == 12
+        assert metric["recent_latency"].combinado().total == 12
+        assert metric["last_24h_requests"].total_requests() == 12
+        assert len(nodo.database_metrics["pacientes:SELECT"]["slow_queries"]) == 2
+        negocio = nodo.business_metrics["patients_created"]
+        assert negocio["total_events"] == 2
+        assert negocio["tags_breakdown"]["gender:F"]["count"] == 2
+
+    def test_vista_de_nodo_lee_snapshots_de_otros_workers(self, tmp_path, monkeypatch):
+        from core import monitoring
+        from core.metrics_store import AlmacenMetricasWorkers
+
+        almacen = AlmacenMetricasWorkers(str(tmp_path), vigencia_segundos=60)
+        otro = {"performance": {"request_count": 5, "total_response_time": 1.0, "error_count": 1},
+                "apm": self._worker(5, 0.02).exportar()}
+        (tmp_path / "worker-999999.json").write_text(json.dumps(otro))
+        viejo = tmp_path / "worker-999998.json"
+        viejo.write_text(json.dumps(otro))
+        os.utime(viejo, (time.time() - 3600, time.time() - 3600))
+
+        local = self._worker(3, 0.01)
+        monkeypatch.setattr(monitoring, "almacen_workers", almacen)
+        monkeypatch.setattr(monitoring, "apm_collector", local)
+
+        _, vista = monitoring.vista_metricas()
+        assert vista.endpoints_metrics["GET:/pacientes/"]["total_requests"] == 8
+
+        detalle = TestClient(app).get("/health/apm/endpoints").json()["endpoints"]
+        assert detalle["GET:/pacientes/"]["total_requests"] == 8
+
+    def test_volcado_atomico_del_propio_worker(self, tmp_path):
+        from core.metrics_store import AlmacenMetricasWorkers
+
+        almacen = AlmacenMetricasWorkers(str(tmp_path))
+        almacen.volcar({"apm": {}})
+        assert [p.name for p in tmp_path.iterdir()] == [almacen.archivo_propio.name]
+        assert almacen.leer_otros() == []
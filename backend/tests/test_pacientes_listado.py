@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS LISTADO PAGINADO DE PACIENTES
+===================================
+
+Verifica GET /pacientes/: páginas acotadas con cursor en X-Next-Cursor,
+proyección de columnas con fields= y exportación NDJSON por páginas (nunca
+toda la tabla en una consulta). No requieren BD.
+"""
+
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from core.paginacion import CABECERA_SIGUIENTE_CURSOR
+from routes import pacientes as rutas_pacientes
+
+
+def _pacientes(total):
+    inicio = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "tipo_documento": "CC",
+            "numero_documento": f"10{i:06d}",
+            "primer_nombre": "Ana",
+            "segundo_nombre": None,
+            "primer_apellido": f"Paciente{i}",
+            "segundo_apellido": None,
+            "fecha_nacimiento": "1990-05-01",
+            "genero": "F",
+            "ocupacion_id": None,
+            "ocupacion_otra_descripcion": None,
+            # Pares con el mismo creado_en: las páginas cortan en medio de empates
+            "creado_en": (inicio + timedelta(minutes=i // 2)).isoformat(),
+            "updated_at": None,
+        }
+        for i in range(total)
+    ]
+
+
+def _limites(cliente):
+    # Filas pedidas en cada consulta ejecutada contra pacientes
+    assert set(cliente.tablas_consultadas()) <= {"pacientes"}
+    return [c.cantidad for c in cliente.consultas]
+
+
+def _cliente_http(cliente):
+    from main import app
+    from database import get_supabase_client
+
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    return app, TestClient(app)
+
+
+def _liberar(app):
+    from database import get_supabase_client
+    app.dependency_overrides.pop(get_supabase_client, None)
+
+
+def test_paginas_por_cursor_recorren_todos_los_pacientes(cliente_en_memoria):
+    cliente = cliente_en_memoria({"pacientes": _pacientes(25)})
+    app, client = _cliente_http(cliente)
+    try:
+        primera = client.get("/pacientes/")
+        assert len(primera.json()["data"]) == 25
+        assert _limites(cliente) == [50]  # límite por defecto, nunca la tabla entera
+
+        ids, cursor = [], None
+        while True:
+            params = {"limite": 10, **({"cursor": cursor} if cursor else {})}
+            respuesta = client.get("/pacientes/", params=params)
+            assert respuesta.status_code == 200
+            ids += [p["id"] for p in respuesta.json()["data"]]
+            cursor = respuesta.headers.get(CABECERA_SIGUIENTE_CURSOR)
+            if not cursor:
+                break
+
+        fuera_de_rango = client.get("/pacientes/", params={"limite": 100000})
+    finally:
+        _liberar(app)
+
+    assert ids == [p["id"] for p in primera.json()["data"]]
+    assert fuera_de_rango.status_code == 422
+
+
+def test_fields_proyecta_columnas_y_valida_nombres(cliente_en_memoria):
+    cliente = cliente_en_memoria({"pacientes": _pacientes(3)})
+    app, client = _cliente_http(cliente)
+    try:
+        respuesta = client.get("/pacientes/", params={"fields": "primer_nombre, primer_apellido", "limite": 2})
+        invalido = client.get("/pacientes/", params={"fields": "primer_nombre,contrasena"})
+    finally:
+        _liberar(app)
+
+    assert respuesta.status_code == 200
+    assert all(set(p) == {"primer_nombre", "primer_apellido"} for p in respuesta.json()["data"])
+    # (creado_en, id) se consultan igual para poder emitir el cursor
+    assert cliente.consultas[0].columnas == "primer_nombre,primer_apellido,id,creado_en"
+    assert CABECERA_SIGUIENTE_CURSOR.lower() in respuesta.headers
+    assert invalido.status_code == 400
+    assert _limites(cliente) == [2]
+
+
+def test_ndjson_exporta_todo_por_paginas(monkeypatch, cliente_en_memoria):
+    monkeypatch.setattr(rutas_pacientes, "TAMANO_PAGINA_NDJSON", 4)
+    filas = _pacientes(10)
+    cliente = cliente_en_memoria({"pacientes": filas})
+    app, client = _cliente_http(cliente)
+    try:
+        respuesta = client.get("/pacientes/", params={"formato": "ndjson", "fields": "id,numero_documento"})
+    finally:
+        _liberar(app)
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("application/x-ndjson")
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert len(lineas) == 10
+    assert {p["id"] for p in lineas} == {p["id"] for p in filas}
+    assert all(set(p) == {"id", "numero_documento"} for p in lineas)
+    # Páginas de 4: memoria acotada por respuesta, sin una consulta por la tabla entera
+    assert _limites(cliente) == [4, 4, 4]
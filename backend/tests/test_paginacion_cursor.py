@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS PAGINACIÓN POR CURSOR (KEYSET)
+====================================
+
+Verifica el cursor opaco (ida y vuelta, rechazo de cursores manipulados), los
+parámetros PostgREST que genera paginar() y el recorrido completo de un listado
+por cursor: mismas filas y mismo orden que el listado completo, con empates de
+fecha y fechas nulas. No requieren BD.
+"""
+
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from postgrest import SyncPostgrestClient
+
+from core.paginacion import (
+    CABECERA_SIGUIENTE_CURSOR,
+    INICIO_FECHAS_NULAS,
+    codificar_cursor,
+    decodificar_cursor,
+    paginar,
+    siguiente_cursor
+)
+
+
+def _consulta(tabla="tamizaje_oncologico"):
+    # Solo construye parámetros: no hace peticiones
+    return SyncPostgrestClient("http://localhost:54321/rest/v1").from_(tabla).select("*")
+
+
+def test_cursor_ida_y_vuelta():
+    id = str(uuid.uuid4())
+
+    assert decodificar_cursor(codificar_cursor("2026-10-18T10:00:00.123+00:00", id)) == (
+        "2026-10-18T10:00:00.123+00:00", id
+    )
+    assert decodificar_cursor(codificar_cursor(None, id)) == (None, id)
+    assert decodificar_cursor(codificar_cursor(*INICIO_FECHAS_NULAS)) == INICIO_FECHAS_NULAS
+    assert decodificar_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    codificar_cursor("2026-10-18", "no-es-uuid"),
+    codificar_cursor('2026-10-18",id.gt.0', str(uuid.uuid4())),
+    codificar_cursor("ayer", str(uuid.uuid4())),
+    codificar_cursor("2026-10-18", None),
+])
+def test_cursor_manipulado_responde_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decodificar_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_sin_cursor_pagina_con_offset_y_desempata_por_id():
+    params = paginar(_consulta(), "fecha_tamizaje", 50, 100).params
+
+    assert params["order"] == "fecha_tamizaje.desc.nullslast,id.desc"
+    assert params["offset"] == "100"
+    assert params["limit"] == "50"
+
+
+def test_con_cursor_usa_predicado_de_busqueda_sin_offset():
+    id = str(uuid.uuid4())
+
+    params = paginar(_consulta(), "fecha_tamizaje", 50, 100, ("2026-10-18", id)).params
+
+    assert "offset" not in params
+    assert params["limit"] == "50"
+    # Cota AND que el índice usa como inicio del recorrido; el OR solo desempata
+    assert params["fecha_tamizaje"] == "lte.2026-10-18"
+    assert params["or"] == f'(fecha_tamizaje.lt."2026-10-18",id.lt.{id})'
+
+
+def test_cursor_en_fechas_nulas_solo_desempata_por_id():
+    id = str(uuid.uuid4())
+
+    params = paginar(_consulta(), "creado_en", 10, posicion=(None, id)).params
+    inicio = paginar(_consulta(), "creado_en", 10, posicion=INICIO_FECHAS_NULAS).params
+
+    assert params["creado_en"] == "is.null"
+    assert params["id"] == f"lt.{id}"
+    assert inicio["creado_en"] == "is.null"
+    assert "id" not in inicio and "or" not in inicio
+
+
+def test_siguiente_cursor_solo_con_pagina_llena():
+    filas = [{"id": str(uuid.uuid4()), "fecha": "2026-10-18"} for _ in range(3)]
+
+    assert siguiente_cursor(filas, "fecha", 4) is None
+    assert decodificar_cursor(siguiente_cursor(filas, "fecha", 3)) == ("2026-10-18", filas[-1]["id"])
+
+
+def test_fin_de_fechas_no_nulas_pasa_a_la_cola_de_nulas():
+    filas = [{"id": str(uuid.uuid4()), "fecha": "2026-10-18"}]
+    en_fechas = ("2026-10-19", str(uuid.uuid4()))
+
+    assert decodificar_cursor(siguiente_cursor(filas, "fecha", 4, en_fechas)) == INICIO_FECHAS_NULAS
+    assert decodificar_cursor(siguiente_cursor([], "fecha", 4, en_fechas)) == INICIO_FECHAS_NULAS
+    # Columna NOT NULL, cola de nulas ya recorrida o primera página por offset: fin
+    assert siguiente_cursor(filas, "fecha", 4, en_fechas, admite_nulos=False) is None
+    assert siguiente_cursor(filas, "fecha", 4, INICIO_FECHAS_NULAS) is None
+    assert siguiente_cursor(filas, "fecha", 4) is None
+
+
+# =============================================================================
+# RECORRIDO COMPLETO DE UN LISTADO
+# =============================================================================
+
+def _tamizajes():
+    inicio = date(2026, 1, 1)
+    filas = []
+    for i in range(23):
+        # Cada fecha se repite tres veces: la página corta en medio de empates
+        filas.append({
+            "id": str(uuid.uuid4()),
+            "paciente_id": str(uuid.uuid4()),
+            "fecha_tamizaje": (inicio + timedelta(days=i // 3)).isoformat(),
+            "tipo_tamizaje": "Mama",
+        })
+    return filas
+
+
+def test_recorrido_por_cursor_igual_al_listado_completo(cliente_en_memoria):
+    from main import app
+    from database import get_supabase_client
+
+    cliente = cliente_en_memoria({"tamizaje_oncologico": _tamizajes()})
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    try:
+        client = TestClient(app)
+        completo = client.get("/tamizaje-oncologico/", params={"limite": 100})
+        assert completo.status_code == 200
+        assert CABECERA_SIGUIENTE_CURSOR.lower() not in completo.headers
+
+        paginas, cursor = [], None
+        while True:
+            params = {"limite": 5, **({"cursor": cursor} if cursor else {})}
+            respuesta = client.get("/tamizaje-oncologico/", params=params)
+            assert respuesta.status_code == 200
+            paginas.append(respuesta.json())
+            cursor = respuesta.headers.get(CABECERA_SIGUIENTE_CURSOR)
+            if not cursor:
+                break
+
+        manipulado = client.get("/tamizaje-oncologico/", params={"cursor": "xyz"})
+    finally:
+        app.dependency_overrides.pop(get_supabase_client, None)
+
+    recorrido = [t["id"] for pagina in paginas for t in pagina]
+    assert recorrido == [t["id"] for t in completo.json()]
+    assert [len(p) for p in paginas] == [5, 5, 5, 5, 3]
+    # Solo la primera página usó offset; las demás, el predicado de búsqueda.
+    # fecha_tamizaje es NOT NULL: no se consulta una cola de fechas nulas
+    assert [c.rango is not None for c in cliente.consultas[1:]] == [True] + [False] * 4
+    assert cliente.tablas_consultadas() == ["tamizaje_oncologico"] * (1 + 5)
+    assert manipulado.status_code == 400
+
+
+def test_recorrido_con_fechas_nulas_en_dos_fases(cliente_en_memoria):
+    filas = _tamizajes()
+    # Las siete últimas sin fecha: la fase de fechas acaba en medio de una página
+    for fila in filas[16:]:
+        fila["fecha_tamizaje"] = None
+    cliente = cliente_en_memoria({"tamizaje_oncologico": filas})
+
+    def listar(limite, offset=0, posicion=None):
+        return paginar(cliente.table("tamizaje_oncologico").select("*"), "fecha_tamizaje",
+                       limite, offset, posicion).execute().data
+
+    completo = listar(100)
+    paginas, posicion = [listar(5)], None
+    while True:
+        cursor = siguiente_cursor(paginas[-1], "fecha_tamizaje", 5, posicion)
+        if not cursor:
+            break
+        posicion = decodificar_cursor(cursor)
+        paginas.append(listar(5, posicion=posicion))
+
+    assert [t["id"] for pagina in paginas for t in pagina] == [t["id"] for t in completo]
+    # 16 con fecha (la cuarta página cierra esa fase) y luego la cola de 7 nulas
+    assert [len(p) for p in paginas] == [5, 5, 5, 1, 5, 2]
+
+
+def test_atenciones_sin_fecha_aparecen_tambien_por_cursor(cliente_en_memoria):
+    from main import app
+    from database import get_supabase_client
+
+    # fecha_atencion se agregó nullable: hay atenciones antiguas sin fecha
+    filas = [
+        {"id": str(uuid.uuid4()), "paciente_id": str(uuid.uuid4()),
+         "fecha_atencion": (date(2026, 1, 1) + timedelta(days=i // 2)).isoformat() if i < 7 else None}
+        for i in range(10)
+    ]
+    cliente = cliente_en_memoria({"atencion_primera_infancia": filas})
+    app.dependency_overrides[get_supabase_client] = lambda: cliente
+    try:
+        client = TestClient(app)
+        completo = client.get("/atenciones-primera-infancia/", params={"limite": 100})
+        assert completo.status_code == 200
+
+        recorrido, cursor = [], None
+        while True:
+            params = {"limite": 3, **({"cursor": cursor} if cursor else {})}
+            respuesta = client.get("/atenciones-primera-infancia/", params=params)
+            assert respuesta.status_code == 200
+            recorrido += [a["id"] for a in respuesta.json()]
+            cursor = respuesta.headers.get(CABECERA_SIGUIENTE_CURSOR)
+            if not cursor:
+                break
+    finally:
+        app.dependency_overrides.pop(get_supabase_client, None)
+
+    assert len(completo.json()) == 10
+    assert recorrido == [a["id"] for a in completo.json()]
+    assert set(cliente.tablas_consultadas()) == {"atencion_primera_infancia"}
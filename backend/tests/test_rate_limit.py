@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS RATE LIMITING
+===================
+
+Tests del token bucket por (usuario, IP, recurso) y de su integración en
+GranularAccessController.check_access. No requieren BD ni Redis.
+"""
+
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rate_limit import InMemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend
+from core.security import (
+    AccessLevel,
+    AccessRequest,
+    GranularAccessController,
+    OperationType,
+    ResourceType,
+    UserContext
+)
+
+
+class TestInMemoryRateLimitBackend:
+
+    def test_rafaga_y_recarga(self):
+        backend = InMemoryRateLimitBackend()
+        resultados = [backend.consumir(("u",), 3, 1.0, ahora=100.0) for _ in range(4)]
+        assert resultados == [True, True, True, False]
+        assert backend.consumir(("u",), 3, 1.0, ahora=100.5) is False
+        assert backend.consumir(("u",), 3, 1.0, ahora=101.0) is True
+
+    def test_recarga_no_supera_la_capacidad(self):
+        backend = InMemoryRateLimitBackend()
+        backend.consumir(("u",), 2, 1.0, ahora=0.0)
+        resultados = [backend.consumir(("u",), 2, 1.0, ahora=1000.0) for _ in range(3)]
+        assert resultados == [True, True, False]
+
+    def test_estado_acotado_lru(self):
+        backend = InMemoryRateLimitBackend(max_claves=100)
+        for i in range(1000):
+            backend.consumir((f"ip-{i}",), 5, 1.0, ahora=0.0)
+        assert len(backend) == 100
+        # La clave más reciente conserva su bucket consumido
+        assert backend._buckets[("ip-999",)][0] == 4
+
+
+class TestRateLimiter:
+
+    def test_claves_por_usuario_ip_y_recurso(self):
+        limiter = RateLimiter({"PACIENTE": (2, 60)})
+        assert limiter.permitir("u1", "10.0.0.1", "PACIENTE", ahora=0.0)
+        assert limiter.permitir("u1", "10.0.0.1", "PACIENTE", ahora=0.0)
+        assert not limiter.permitir("u1", "10.0.0.1", "PACIENTE", ahora=0.0)
+        # Otro usuario, otra IP u otro recurso tienen su propio bucket
+        assert limiter.permitir("u2", "10.0.0.1", "PACIENTE", ahora=0.0)
+        assert limiter.permitir("u1", "10.0.0.2", "PACIENTE", ahora=0.0)
+        assert limiter.permitir("u1", "10.0.0.1", "ESTADÍSTICAS", ahora=0.0)
+
+    def test_redis_clave_compartida_y_fail_open(self):
+        llamadas = []
+
+        class _Redis:
+            caido = False
+
+            def register_script(self, script):
+                def ejecutar(keys, args):
+                    if self.caido:
+                        raise ConnectionError("Redis no disponible")
+                    llamadas.append(keys)
+                    return 0
+                return ejecutar
+
+        redis = _Redis()
+        limiter = RateLimiter({}, backend=RedisRateLimitBackend(redis))
+        assert not limiter.permitir("u1", "10.0.0.1", ResourceType.PACIENTE)
+        assert llamadas == [["ips:rate:u1|10.0.0.1|PACIENTE"]]
+
+        redis.caido = True
+        assert limiter.permitir("u1", "10.0.0.1", ResourceType.PACIENTE)
+
+
+class TestCheckAccessRateLimit:
+
+    def test_check_access_deniega_al_agotar_el_bucket(self):
+        controller = GranularAccessController()
+        controller.rate_limiter = RateLimiter({ResourceType.PACIENTE: (5, 60)})
+        usuario = UserContext(user_id="medico-1", access_level=AccessLevel.MÉDICO_CONSULTA,
+                              ip_address="10.0.0.1", session_id="s1")
+        acceso = AccessRequest(resource_type=ResourceType.PACIENTE, operation=OperationType.READ)
+
+        resultados = [controller.check_access(usuario, acceso) for _ in range(6)]
+        assert [permitido for permitido, _, _ in resultados] == [True] * 5 + [False]
+        assert resultados[-1][2] == "Rate limit excedido"
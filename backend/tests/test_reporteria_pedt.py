@@ -95,10 +95,10 @@ class TestGeneradorReportePEDT:
         
         # Validaciones básicas
         assert 'var_0_tipo_registro' in variables_id
-        assert variables_id['var_0_tipo_registro'] == '1'  # Siempre individual
+        assert variables_id['var_0_tipo_registro'] == '2'  # Registro de detalle
         
-        assert 'var_3_numero_identificacion' in variables_id
-        assert variables_id['var_3_numero_identificacion'] == datos_paciente['numero_documento']
+        assert 'var_4_numero_identificacion' in variables_id
+        assert variables_id['var_4_numero_identificacion'] == datos_paciente['numero_documento']
         
         print(f"\n=== VARIABLES IDENTIFICACIÓN ===")
         for key, value in variables_id.items():
@@ -227,7 +227,7 @@ class TestGeneradorReportePEDT:
         
         # Validaciones críticas
         assert 'var_0_tipo_registro' in variables_pedt
-        assert variables_pedt['var_0_tipo_registro'] == '1'
+        assert variables_pedt['var_0_tipo_registro'] == '2'
         
         assert 'var_14_gestante' in variables_pedt
         assert variables_pedt['var_14_gestante'] in [0, 1, 2, 21]  # Valores válidos
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS MODO POR LOTES - REPORTERÍA PEDT RESOLUCIÓN 202
+======================================================
+
+Tests del modo por lotes del GeneradorReportePEDT usando un cliente en memoria
+que emula el query builder de Supabase/PostgREST. No requieren BD.
+
+Enfoque: el modo por lotes debe producir exactamente las mismas variables que
+el modo individual, con un número de consultas independiente del número de
+pacientes.
+"""
+
+import pytest
+from datetime import date
+from uuid import UUID, uuid4
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.reporteria_pedt import GeneradorReportePEDT
+
+
+# =============================================================================
+# DATOS DE PRUEBA
+# =============================================================================
+
+def _paciente(genero, fecha_nacimiento, **extra):
+    return {
+        'id': str(uuid4()),
+        'tipo_documento': 'CC',
+        'numero_documento': str(uuid4().int)[:10],
+        'primer_nombre': 'Test',
+        'primer_apellido': 'Lote',
+        'fecha_nacimiento': fecha_nacimiento,
+        'genero': genero,
+        **extra
+    }
+
+
+@pytest.fixture
+def datos_lote():
+    gestante = _paciente('F', '1995-03-10')
+    hombre = _paciente('M', '1980-07-22')
+    nino = _paciente('M', f'{date.today().year - 3}-01-15')
+    mujer_no_gestante = _paciente('FEMENINO', '1970-11-02')
+    sin_genero = _paciente(None, '2000-01-01')
+    pacientes = [gestante, hombre, nino, mujer_no_gestante, sin_genero]
+
+    mp_activa = {'id': str(uuid4()), 'paciente_id': gestante['id'], 'estado': 'activa',
+                 'resultado_tamizaje_sifilis': 'REACTIVO', 'fecha_atencion': '2025-08-01'}
+    mp_cerrada = {'id': str(uuid4()), 'paciente_id': mujer_no_gestante['id'], 'estado': 'cerrada',
+                  'resultado_tamizaje_sifilis': 'NEGATIVO', 'fecha_atencion': '2020-02-01'}
+
+    tablas = {
+        'pacientes': pacientes,
+        'atencion_materno_perinatal': [mp_activa, mp_cerrada],
+        'detalle_control_prenatal': [
+            {'id': str(uuid4()), 'atencion_materno_perinatal_id': mp_activa['id'],
+             'creado_en': '2025-08-01T10:00:00', 'fecha_probable_parto': '2026-01-10',
+             'riesgo_biopsicosocial': 'BAJO'},
+            {'id': str(uuid4()), 'atencion_materno_perinatal_id': mp_activa['id'],
+             'creado_en': '2025-09-01T10:00:00', 'fecha_probable_parto': '2026-01-12',
+             'riesgo_biopsicosocial': 'ALTO'},
+        ],
+        'atencion_primera_infancia': [
+            {'id': str(uuid4()), 'paciente_id': nino['id'], 'fecha_atencion': '2025-01-10',
+             'peso_kg': 12.0, 'talla_cm': 88.0, 'estado_nutricional': 'NORMAL',
+             'ead_resultado_global': 'NORMAL', 'asq_resultado_global': 'NORMAL'},
+            {'id': str(uuid4()), 'paciente_id': nino['id'], 'fecha_atencion': '2025-06-10',
+             'peso_kg': 13.5, 'talla_cm': 92.0, 'estado_nutricional': 'OBESIDAD',
+             'ead_resultado_global': 'ALERTA', 'asq_resultado_global': 'REFERIR'},
+        ],
+    }
+    return tablas, [UUID(p['id']) for p in pacientes]
+
+
+# =============================================================================
+# TESTS
+# =============================================================================
+
+class TestGenerarVariables119Lote:
+    """Equivalencia y costo en consultas del modo por lotes"""
+
+    def test_lote_identico_a_modo_individual(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        generador = GeneradorReportePEDT(cliente_en_memoria(tablas))
+
+        individuales = {str(pid): generador.generar_variables_119(pid) for pid in ids}
+        lote = generador.generar_variables_119_lote(ids, tamano_lote=2)
+
+        assert list(lote) == [str(pid) for pid in ids]
+        assert lote == individuales
+
+    def test_lote_calcula_variables_derivadas(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        gestante, hombre, nino, mujer_no_gestante, sin_genero = [str(pid) for pid in ids]
+        lote = GeneradorReportePEDT(cliente_en_memoria(tablas)).generar_variables_119_lote(ids)
+
+        assert lote[gestante]['var_14_gestante'] == 1
+        assert lote[gestante]['var_80_fecha_sifilis'] == '2025-08-01'
+        assert lote[gestante]['var_81_resultado_sifilis'] == 5  # Reactiva
+        assert lote[gestante]['var_33_fecha_probable_parto'] == '2026-01-12'
+        assert lote[gestante]['var_35_riesgo_gestacional'] == 4  # Alto
+        assert lote[gestante]['var_58_fecha_ultimo_control_prenatal'] == '2025-09-01'
+        assert lote[hombre]['var_14_gestante'] == 0
+        assert lote[mujer_no_gestante]['var_14_gestante'] == 2
+        # Sin género se reporta sexo M: gestante "no aplica", igual que la variable 10
+        assert lote[sin_genero]['var_14_gestante'] == 0
+        assert lote[nino]['var_29_fecha_peso'] == '2025-06-10'
+        assert lote[nino]['var_30_peso'] == 13.5
+        assert lote[nino]['var_43_ead_motricidad_gruesa'] == 3  # ALERTA: riesgo
+
+    def test_consultas_independientes_del_numero_de_pacientes(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        cliente = cliente_en_memoria(tablas)
+        GeneradorReportePEDT(cliente).generar_variables_119_lote(ids)
+
+        # pacientes, materno perinatal, control prenatal y primera infancia: una vez cada una
+        assert sorted(cliente.tablas_consultadas()) == sorted([
+            'pacientes', 'atencion_materno_perinatal',
+            'detalle_control_prenatal', 'atencion_primera_infancia'
+        ])
+
+    def test_paciente_inexistente_se_omite(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        inexistente = uuid4()
+        lote = GeneradorReportePEDT(cliente_en_memoria(tablas)).generar_variables_119_lote(ids + [inexistente])
+
+        assert str(inexistente) not in lote
+        assert len(lote) == len(ids)
+
+    def test_error_en_fuente_aplica_mismos_defaults(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        cliente = cliente_en_memoria(tablas)
+        cliente.tablas_con_error = {'atencion_materno_perinatal', 'atencion_primera_infancia'}
+        generador = GeneradorReportePEDT(cliente)
+
+        individuales = {str(pid): generador.generar_variables_119(pid) for pid in ids}
+        lote = generador.generar_variables_119_lote(ids)
+
+        assert lote == individuales
+        assert lote[str(ids[0])]['var_14_gestante'] == 21
+
+
+def _nacido_hace(meses):
+    """Primer día del mes de hace `meses` meses: la edad no cambia antes de la fecha de corte"""
+    hoy = date.today()
+    anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - meses, 12)
+    return date(anio, mes + 1, 1).isoformat()
+
+
+class TestVariablesSegunAnexo202:
+    """El vector del generador sigue la numeración y los valores del anexo técnico"""
+
+    def test_claves_numeradas_como_el_anexo(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        variables = GeneradorReportePEDT(cliente_en_memoria(tablas)).generar_variables_119(ids[0])
+
+        assert sorted(int(clave.split('_')[1]) for clave in variables) == list(range(119))
+        assert variables['var_3_tipo_identificacion'] == 'CC'
+        assert variables['var_4_numero_identificacion'] == tablas['pacientes'][0]['numero_documento']
+        assert variables['var_9_fecha_nacimiento'] == '1995-03-10'
+        assert variables['var_10_sexo'] == 'F'
+
+    @pytest.mark.parametrize('genero', ['F', 'M'])
+    @pytest.mark.parametrize('meses', [3, 15, 42, 84, 110, 150, 186, 300, 426, 606, 666, 786, 966])
+    def test_vector_generado_pasa_validaciones_202(self, genero, meses, cliente_en_memoria):
+        paciente = _paciente(genero, _nacido_hace(meses))
+        generador = GeneradorReportePEDT(cliente_en_memoria({'pacientes': [paciente]}))
+
+        variables = generador.generar_variables_119(UUID(paciente['id']))
+        validacion = generador.aplicar_validaciones_202(variables, date.today().strftime('%Y-%m'))
+
+        assert validacion['es_valido'], validacion['errores']
+
+    def test_datos_derivados_pasan_validaciones_202(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        generador = GeneradorReportePEDT(cliente_en_memoria(tablas))
+        gestante, hombre, _, mujer_no_gestante, sin_genero = ids
+
+        for paciente_id in (gestante, hombre, mujer_no_gestante, sin_genero):
+            validacion = generador.aplicar_validaciones_202(generador.generar_variables_119(paciente_id), '2025-09')
+            assert validacion['es_valido'], validacion['errores']
+
+
+def _verificar_detalle(lineas, pacientes):
+    """Cada registro de detalle lleva en su posición del anexo los datos de un paciente"""
+    por_documento = {p['numero_documento']: p for p in pacientes}
+    assert len(lineas) == len(pacientes)
+    for consecutivo, linea in enumerate(lineas, start=1):
+        campos = linea.split('|')
+        paciente = por_documento.pop(campos[4])
+        assert len(campos) == 119
+        assert campos[0] == '2'
+        assert campos[1] == str(consecutivo)
+        assert campos[3] == 'CC'
+        assert campos[5] == paciente['primer_apellido']
+        assert campos[7] == paciente['primer_nombre']
+        assert campos[9] == paciente['fecha_nacimiento']
+        assert campos[10] == ('F' if (paciente['genero'] or '').startswith('F') else 'M')
+
+
+class TestArchivoPlanoSISPROStreaming:
+    """Escritura incremental del archivo plano SISPRO"""
+
+    def test_registro_control_precede_al_detalle(self, datos_lote, cliente_en_memoria):
+        tablas, ids = datos_lote
+        generador = GeneradorReportePEDT(cliente_en_memoria(tablas))
+
+        contenido = ''.join(generador.iterar_archivo_plano_sispro(
+            (pid for pid in ids), periodo='2025-09', codigo_entidad='761110000101', tamano_lote=2
+        ))
+        lineas = contenido.splitlines()
+
+        assert lineas[0] == f'1|761110000101|2025-09-01|2025-09-30|{len(ids)}'
+        _verificar_detalle(lineas[1:], tablas['pacientes'])
+
+    def test_escribir_archivo_en_disco(self, datos_lote, tmp_path, cliente_en_memoria):
+        tablas, ids = datos_lote
+        generador = GeneradorReportePEDT(cliente_en_memoria(tablas))
+        ruta = tmp_path / generador.nombre_archivo_sispro('2025-02')
+
+        resumen = generador.escribir_archivo_plano_sispro(ids + [uuid4()], str(ruta), periodo='2025-02')
+
+        assert ruta.name == 'SGD280RPED20250228.txt'
+        assert resumen['total_registros'] == len(ids)
+        lineas = ruta.read_text(encoding='utf-8').splitlines()
+        assert lineas[0].endswith(f'|2025-02-01|2025-02-28|{len(ids)}')
+        _verificar_detalle(lineas[1:], tablas['pacientes'])
+        assert [p.name for p in tmp_path.iterdir()] == [ruta.name]
+
+    def test_periodo_invalido(self, datos_lote, cliente_en_memoria):
+        tablas, _ = datos_lote
+        with pytest.raises(ValueError):
+            GeneradorReportePEDT(cliente_en_memoria(tablas)).construir_registro_control(0, '2025-13')
+
+    def test_endpoint_descarga_streaming(self, datos_lote, cliente_en_memoria):
+        from fastapi.testclient import TestClient
+        from main import app
+        from database import get_supabase_client
+
+        tablas, ids = datos_lote
+        override_previo = app.dependency_overrides.get(get_supabase_client)
+        app.dependency_overrides[get_supabase_client] = lambda: cliente_en_memoria(tablas)
+        try:
+            response = TestClient(app).get('/reporteria-pedt/archivo-sispro',
+                                           params={'periodo': '2025-09', 'usar_cache': 'false'})
+            assert response.status_code == 200
+            assert 'SGD280RPED20250930.txt' in response.headers['content-disposition']
+            lineas = response.text.splitlines()
+            assert lineas[0].endswith(f'|{len(ids)}')
+            _verificar_detalle(lineas[1:], tablas['pacientes'])
+
+            assert TestClient(app).get('/reporteria-pedt/archivo-sispro',
+                                       params={'periodo': 'sept'}).status_code == 400
+        finally:
+            if override_previo is None:
+                app.dependency_overrides.pop(get_supabase_client, None)
+            else:
+                app.dependency_overrides[get_supabase_client] = override_previo
+
+
+class TestEjecutorReportePEDT:
+    """Trabajo paralelo con checkpoints reanudables"""
+
+    def test_trabajo_completo_equivale_a_archivo_directo(self, datos_lote, tmp_path, cliente_en_memoria):
+        from services.ejecutor_reporte_pedt import EjecutorReportePEDT
+
+        tablas, ids = datos_lote
+        ejecutor = EjecutorReportePEDT(cliente_en_memoria(tablas), periodo='2025-09',
+                                       directorio_base=str(tmp_path), max_workers=2, tamano_fragmento=2)
+        progreso = ejecutor.ejecutar(ids)
+
+        assert progreso['estado'] == 'completado'
+        assert progreso['pacientes_procesados'] == len(ids)
+        assert progreso['fragmentos_completados'] == 3
+
+        directo = tmp_path / 'directo.txt'
+        GeneradorReportePEDT(cliente_en_memoria(tablas)).escribir_archivo_plano_sispro(ids, str(directo), '2025-09')
+        with open(progreso['archivo'], encoding='utf-8') as archivo:
+            contenido = archivo.read()
+        assert contenido == directo.read_text(encoding='utf-8')
+        _verificar_detalle(contenido.splitlines()[1:], tablas['pacientes'])
+
+    def test_trabajo_interrumpido_se_reanuda(self, datos_lote, tmp_path, cliente_en_memoria):
+        from services.ejecutor_reporte_pedt import EjecutorReportePEDT
+
+        tablas, ids = datos_lote
+        opciones = dict(periodo='2025-09', directorio_base=str(tmp_path), max_workers=1, tamano_fragmento=2)
+
+        que_falla = cliente_en_memoria(tablas)
+
+        def fallar_en_segundo_fragmento(consulta):
+            if consulta.tabla == 'pacientes' and que_falla.tablas_consultadas().count('pacientes') == 1:
+                que_falla.tablas_con_error.add('pacientes')
+
+        que_falla.antes_de_ejecutar = fallar_en_segundo_fragmento
+        interrumpido = EjecutorReportePEDT(que_falla, **opciones)
+        with pytest.raises(Exception):
+            interrumpido.ejecutar(ids)
+        assert interrumpido.progreso()['fragmentos_completados'] == 1
+
+        cliente = cliente_en_memoria(tablas)
+        reanudado = EjecutorReportePEDT(cliente, **opciones)
+        assert reanudado.progreso()['estado'] == 'interrumpido'
+        progreso = reanudado.ejecutar()
+
+        assert progreso['estado'] == 'completado'
+        assert progreso['pacientes_procesados'] == len(ids)
+        # Solo se precargaron los dos fragmentos pendientes
+        assert cliente.tablas_consultadas().count('pacientes') == 2
+
+    def test_opciones_distintas_no_reutilizan_el_trabajo(self, datos_lote, tmp_path, cliente_en_memoria):
+        from services.ejecutor_reporte_pedt import ConflictoTrabajoPEDT, EjecutorReportePEDT
+
+        tablas, ids = datos_lote
+        opciones = dict(periodo='2025-09', directorio_base=str(tmp_path), max_workers=1, tamano_fragmento=2)
+        EjecutorReportePEDT(cliente_en_memoria(tablas), codigo_entidad='761110000101', **opciones).ejecutar(ids)
+
+        otra_entidad = EjecutorReportePEDT(cliente_en_memoria(tablas), codigo_entidad='761110000999', **opciones)
+        with pytest.raises(ConflictoTrabajoPEDT):
+            otra_entidad.ejecutar(ids)
+
+        progreso = otra_entidad.ejecutar(ids, reiniciar=True)
+        assert progreso['opciones'] == {'codigo_entidad': '761110000999', 'usar_cache': False}
+        with open(progreso['archivo'], encoding='utf-8') as archivo:
+            assert archivo.readline().startswith('1|761110000999|')
+
+    def test_endpoints_trabajo_entregan_detalle_del_anexo(self, datos_lote, tmp_path, monkeypatch,
+                                                          cliente_en_memoria):
+        import time
+        from fastapi.testclient import TestClient
+        from main import app
+        from database import get_supabase_client
+        from services import ejecutor_reporte_pedt
+
+        monkeypatch.setattr(ejecutor_reporte_pedt, 'DIRECTORIO_TRABAJOS', str(tmp_path))
+        tablas, ids = datos_lote
+        override_previo = app.dependency_overrides.get(get_supabase_client)
+        app.dependency_overrides[get_supabase_client] = lambda: cliente_en_memoria(tablas)
+        try:
+            cliente = TestClient(app)
+            params = {'periodo': '2025-09', 'codigo_entidad': '761110000101', 'usar_cache': 'false'}
+            iniciado = cliente.post('/reporteria-pedt/trabajos', params=params)
+            assert iniciado.status_code == 202
+            trabajo_id = iniciado.json()['trabajo_id']
+
+            limite = time.monotonic() + 120
+            while cliente.get(f'/reporteria-pedt/trabajos/{trabajo_id}').json()['estado'] == 'ejecutando':
+                assert time.monotonic() < limite
+                time.sleep(0.2)
+
+            archivo = cliente.get(f'/reporteria-pedt/trabajos/{trabajo_id}/archivo')
+            conflicto = cliente.post('/reporteria-pedt/trabajos',
+                                     params={**params, 'codigo_entidad': '761110000999'})
+        finally:
+            if override_previo is None:
+                app.dependency_overrides.pop(get_supabase_client, None)
+            else:
+                app.dependency_overrides[get_supabase_client] = override_previo
+
+        assert archivo.status_code == 200
+        lineas = archivo.text.splitlines()
+        assert lineas[0] == f'1|761110000101|2025-09-01|2025-09-30|{len(ids)}'
+        _verificar_detalle(lineas[1:], tablas['pacientes'])
+        assert conflicto.status_code == 409
+
+    def test_progreso_trabajo_inexistente(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        cliente = TestClient(app)
+        assert cliente.get('/reporteria-pedt/trabajos/rped-1900-01').status_code == 404
+        assert cliente.get('/reporteria-pedt/trabajos/no-valido').status_code == 404
+        for mes_invalido in ('rped-2025-13', 'rped-2025-00'):
+            assert cliente.get(f'/reporteria-pedt/trabajos/{mes_invalido}').status_code == 404
+            assert cliente.get(f'/reporteria-pedt/trabajos/{mes_invalido}/archivo').status_code == 404
+            assert cliente.get(f'/reporteria-pedt/trabajos/{mes_invalido}/validacion').status_code == 404
+        assert cliente.post('/reporteria-pedt/trabajos', params={'periodo': '2025-13'}).status_code == 400
+
+
+class TestCacheVariablesPEDT:
+    """Recalculo incremental por huella de datos fuente"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        from services.cache_variables_pedt import CacheVariablesPEDT
+        cache = CacheVariablesPEDT(str(tmp_path / 'cache.sqlite3'))
+        yield cache
+        cache.cerrar()
+
+    def test_segunda_corrida_solo_consulta_versiones(self, datos_lote, cache, cliente_en_memoria):
+        tablas, ids = datos_lote
+        primera = GeneradorReportePEDT(cliente_en_memoria(tablas)).generar_variables_119_lote(ids, cache=cache)
+        assert cache.total_entradas() == len(ids)
+
+        cliente = cliente_en_memoria(tablas)
+        segunda = GeneradorReportePEDT(cliente).generar_variables_119_lote(ids, cache=cache)
+
+        assert segunda == primera
+        # Una consulta liviana de versiones por tabla fuente y ninguna precarga completa
+        assert sorted(cliente.tablas_consultadas()) == sorted([
+            'pacientes', 'atencion_materno_perinatal',
+            'atencion_primera_infancia', 'detalle_control_prenatal'
+        ])
+
+    def test_cambio_en_fuente_recalcula_solo_ese_paciente(self, datos_lote, cache, cliente_en_memoria):
+        tablas, ids = datos_lote
+        nino = str(ids[2])
+        GeneradorReportePEDT(cliente_en_memoria(tablas)).generar_variables_119_lote(ids, cache=cache)
+
+        atencion_reciente = tablas['atencion_primera_infancia'][1]
+        atencion_reciente['peso_kg'] = 14.2
+        atencion_reciente['updated_at'] = '2025-10-01T08:00:00'
+
+        generador = GeneradorReportePEDT(cliente_en_memoria(tablas))
+        resultado = generador.generar_variables_119_lote(ids, cache=cache)
+
+        assert resultado[nino]['var_30_peso'] == 14.2
+        assert resultado == generador.generar_variables_119_lote(ids)
+
+    def test_nueva_fila_fuente_invalida_la_entrada(self, datos_lote, cache, cliente_en_memoria):
+        tablas, ids = datos_lote
+        hombre = str(ids[1])
+        generador = GeneradorReportePEDT(cliente_en_memoria(tablas))
+        huellas_antes = generador._calcular_huellas_lote([str(pid) for pid in ids])
+
+        tablas['atencion_materno_perinatal'].append({
+            'id': str(uuid4()), 'paciente_id': hombre, 'estado': 'cerrada', 'fecha_atencion': '2024-01-01'
+        })
+        huellas_despues = generador._calcular_huellas_lote([str(pid) for pid in ids])
+
+        assert [pid for pid in huellas_antes if huellas_antes[pid] != huellas_despues[pid]] == [hombre]
+
+    def test_ejecutor_reutiliza_cache(self, datos_lote, cache, tmp_path, cliente_en_memoria):
+        from services.ejecutor_reporte_pedt import EjecutorReportePEDT
+
+        tablas, ids = datos_lote
+        opciones = dict(periodo='2025-09', directorio_base=str(tmp_path), max_workers=1,
+                        tamano_fragmento=2, cache=cache)
+        primero = EjecutorReportePEDT(cliente_en_memoria(tablas), **opciones).ejecutar(ids)
+        with open(primero['archivo'], encoding='utf-8') as archivo:
+            contenido_inicial = archivo.read()
+
+        cliente = cliente_en_memoria(tablas)
+        segundo = EjecutorReportePEDT(cliente, **opciones).ejecutar(ids, reiniciar=True)
+
+        assert segundo['pacientes_procesados'] == len(ids)
+        with open(segundo['archivo'], encoding='utf-8') as archivo:
+            assert archivo.read() == contenido_inicial
+        # Tres fragmentos: solo la consulta de versiones de pacientes en cada uno
+        assert cliente.tablas_consultadas().count('pacientes') == 3
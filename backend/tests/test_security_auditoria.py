@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS AUDITORÍA DE SEGURIDAD POR LOTES
+======================================
+
+Tests de AuditBatchWriter y AccessAuditLogger con un cliente Supabase falso:
+inserción por lotes fuera del request, vaciado al apagar y respaldo en
+archivo cuando la BD no está disponible. No requieren BD.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.security import (
+    AccessAuditLogger,
+    AccessLevel,
+    AccessRequest,
+    AuditBatchWriter,
+    OperationType,
+    ResourceType,
+    UserContext
+)
+
+
+def _solo_upsert_por_lotes(consulta):
+    assert consulta.tabla == "security_audit_log"
+    if consulta.operacion == "insert":
+        raise AssertionError("Se esperaba upsert por lotes, no insert por evento")
+
+
+def _cliente_auditoria(cliente_en_memoria, caido=False):
+    cliente = cliente_en_memoria({"security_audit_log": []})
+    cliente.antes_de_ejecutar = _solo_upsert_por_lotes
+    if caido:
+        cliente.tablas_con_error.add("security_audit_log")
+    return cliente
+
+
+def _lotes(cliente):
+    """Lotes que la BD aceptó (un cliente caído no acepta ninguno)"""
+    return [list(c.registros) for c in cliente.consultas
+            if c.operacion == "upsert" and c.tabla not in cliente.tablas_con_error]
+
+
+def _registro(i):
+    return {"event_id": f"evt-{i}", "user_id": "u1", "result": "GRANTED"}
+
+
+class TestAuditBatchWriter:
+
+    def test_inserta_por_tamano_de_lote_y_vacia_al_detener(self, tmp_path, cliente_en_memoria):
+        cliente = _cliente_auditoria(cliente_en_memoria)
+        writer = AuditBatchWriter(cliente, tamano_lote=10, intervalo_segundos=60,
+                                  archivo_respaldo=str(tmp_path / "respaldo.jsonl"))
+
+        async def escenario():
+            for i in range(25):
+                writer.encolar(_registro(i))
+            assert _lotes(cliente) == []
+            await asyncio.sleep(0.05)  # El lote lleno dispara el vaciado sin esperar el intervalo
+            assert len(_lotes(cliente)) == 3
+            await writer.detener()
+
+        asyncio.run(escenario())
+        assert [len(lote) for lote in _lotes(cliente)] == [10, 10, 5]
+        assert cliente.consultas[-1].opciones == {"on_conflict": "event_id", "ignore_duplicates": True}
+
+    def test_vaciado_por_tiempo(self, tmp_path, cliente_en_memoria):
+        cliente = _cliente_auditoria(cliente_en_memoria)
+        writer = AuditBatchWriter(cliente, tamano_lote=100, intervalo_segundos=0.02,
+                                  archivo_respaldo=str(tmp_path / "respaldo.jsonl"))
+
+        async def escenario():
+            writer.encolar(_registro(1))
+            await asyncio.sleep(0.1)
+            assert _lotes(cliente) == [[_registro(1)]]
+            await writer.detener()
+
+        asyncio.run(escenario())
+
+    def test_bd_caida_respalda_y_reenvia_al_iniciar(self, tmp_path, cliente_en_memoria):
+        respaldo = tmp_path / "respaldo.jsonl"
+        caido = _cliente_auditoria(cliente_en_memoria, caido=True)
+        writer = AuditBatchWriter(caido, tamano_lote=5, intervalo_segundos=60,
+                                  archivo_respaldo=str(respaldo))
+
+        async def sin_bd():
+            for i in range(7):
+                writer.encolar(_registro(i))
+            await writer.detener()
+
+        asyncio.run(sin_bd())
+        assert [json.loads(l)["event_id"] for l in respaldo.read_text().splitlines()] == \
+            [f"evt-{i}" for i in range(7)]
+
+        disponible = _cliente_auditoria(cliente_en_memoria)
+        writer = AuditBatchWriter(disponible, tamano_lote=5, intervalo_segundos=60,
+                                  archivo_respaldo=str(respaldo))
+
+        async def con_bd():
+            await writer.iniciar()
+            await writer.detener()
+
+        asyncio.run(con_bd())
+        assert sum(len(lote) for lote in _lotes(disponible)) == 7
+        assert not respaldo.exists()
+
+    def test_reenvio_interrumpido_no_pierde_registros(self, tmp_path, cliente_en_memoria):
+        respaldo = tmp_path / "respaldo.jsonl"
+        reenviando = tmp_path / "respaldo.jsonl.reenviando"
+        respaldo.write_text("".join(json.dumps(_registro(i)) + "\n" for i in range(7)))
+
+        class _DiscoLleno(AuditBatchWriter):
+            def _respaldar(self, registros):
+                raise OSError("Sin espacio en disco")
+
+        # BD caída y el respaldo no se puede reescribir: el reenvío se corta
+        writer = _DiscoLleno(_cliente_auditoria(cliente_en_memoria, caido=True), tamano_lote=5, archivo_respaldo=str(respaldo))
+        try:
+            asyncio.run(writer.reenviar_respaldo())
+        except OSError:
+            pass
+        assert not respaldo.exists()
+        assert len(reenviando.read_text().splitlines()) == 7
+
+        # Mientras tanto llegan registros nuevos al respaldo
+        respaldo.write_text(json.dumps(_registro(7)) + "\n")
+
+        disponible = _cliente_auditoria(cliente_en_memoria)
+        writer = AuditBatchWriter(disponible, tamano_lote=5, archivo_respaldo=str(respaldo))
+        assert asyncio.run(writer.reenviar_respaldo()) == 8
+        assert sorted(r["event_id"] for lote in _lotes(disponible) for r in lote) == \
+            sorted(f"evt-{i}" for i in range(8))
+        assert not respaldo.exists() and not reenviando.exists()
+
+    def test_reenvio_con_bd_caida_vuelve_al_respaldo(self, tmp_path, cliente_en_memoria):
+        respaldo = tmp_path / "respaldo.jsonl"
+        respaldo.write_text("".join(json.dumps(_registro(i)) + "\n" for i in range(3)))
+
+        writer = AuditBatchWriter(_cliente_auditoria(cliente_en_memoria, caido=True), tamano_lote=2, archivo_respaldo=str(respaldo))
+        asyncio.run(writer.reenviar_respaldo())
+
+        assert [json.loads(l)["event_id"] for l in respaldo.read_text().splitlines()] == \
+            [f"evt-{i}" for i in range(3)]
+        assert not (tmp_path / "respaldo.jsonl.reenviando").exists()
+
+    def test_cola_llena_va_directo_al_respaldo(self, tmp_path, cliente_en_memoria):
+        respaldo = tmp_path / "respaldo.jsonl"
+        writer = AuditBatchWriter(_cliente_auditoria(cliente_en_memoria), capacidad=3, archivo_respaldo=str(respaldo))
+        for i in range(5):
+            writer.encolar(_registro(i))
+        assert len(writer._pendientes) == 3
+        assert len(respaldo.read_text().splitlines()) == 2
+
+
+class TestAccessAuditLogger:
+
+    def test_request_no_espera_a_la_bd(self, tmp_path, cliente_en_memoria):
+        cliente = _cliente_auditoria(cliente_en_memoria)
+        writer = AuditBatchWriter(cliente, intervalo_segundos=60,
+                                  archivo_respaldo=str(tmp_path / "respaldo.jsonl"))
+        audit_logger = AccessAuditLogger(cliente, writer=writer)
+        usuario = UserContext(user_id="medico-1", access_level=AccessLevel.MÉDICO_CONSULTA)
+        acceso = AccessRequest(resource_type=ResourceType.HISTORIA_CLÍNICA, operation=OperationType.READ)
+
+        async def escenario():
+            evento = await audit_logger.log_access_attempt(usuario, acceso)
+            assert _lotes(cliente) == []  # Nada se insertó dentro del request
+            await writer.detener()
+            return evento
+
+        evento = asyncio.run(escenario())
+        (registro,), = _lotes(cliente)
+        assert registro["event_id"] == evento.event_id
+        assert registro["resource_type"] == ResourceType.HISTORIA_CLÍNICA
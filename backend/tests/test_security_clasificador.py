@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS CLASIFICADOR DE RUTAS
+===========================
+
+Verifica que el tipo de recurso auditado sale de RECURSO_SEGURIDAD del módulo
+de rutas que atiende cada prefijo (tabla de rutas de la app) y no de buscar
+subcadenas en el path. No requieren BD.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from core import security
+from core.security import ClasificadorRutas, OperationType, ResourceType
+
+
+def _request(method, path):
+    return SimpleNamespace(method=method, url=SimpleNamespace(path=path))
+
+
+def test_rutas_de_la_app_clasificadas_por_su_modulo():
+    clasificador = ClasificadorRutas().construir(app.routes)
+
+    casos = {
+        "/pacientes/": ResourceType.PACIENTE,
+        "/pacientes/4b3c7c1e-0000-0000-0000-000000000000": ResourceType.PACIENTE,
+        # Antes caían en el default por no contener "/atenciones"
+        "/atencion-vejez/": ResourceType.ATENCIÓN_MÉDICA,
+        "/control-cronicidad/estadisticas/basicas": ResourceType.ATENCIÓN_MÉDICA,
+        "/tamizaje-oncologico/": ResourceType.ATENCIÓN_MÉDICA,
+        "/atenciones-primera-infancia/": ResourceType.ATENCIÓN_MÉDICA,
+        "/reporteria-pedt/estadisticas": ResourceType.ESTADÍSTICAS,
+        "/health/apm": ResourceType.ESTADÍSTICAS,
+    }
+    for path, esperado in casos.items():
+        recurso, _ = clasificador.clasificar(path, "GET")
+        assert recurso == esperado, path
+
+
+def test_subcadena_en_parametros_no_cambia_el_recurso():
+    clasificador = ClasificadorRutas().construir(app.routes)
+
+    recurso, _ = clasificador.clasificar("/reporteria-pedt/pacientes/lote", "GET")
+
+    assert recurso == ResourceType.ESTADÍSTICAS
+
+
+def test_prefijo_desconocido_usa_recurso_por_defecto():
+    clasificador = ClasificadorRutas(recurso_defecto=ResourceType.USUARIOS).construir(app.routes)
+
+    assert clasificador.clasificar("/no-existe/x", "GET")[0] == ResourceType.USUARIOS
+    assert clasificador.clasificar("/", "GET")[0] == ResourceType.USUARIOS
+
+
+def test_operacion_por_metodo():
+    clasificador = ClasificadorRutas().construir(app.routes)
+
+    assert clasificador.clasificar("/pacientes/", "POST")[1] == OperationType.CREATE
+    assert clasificador.clasificar("/pacientes/x", "PATCH")[1] == OperationType.UPDATE
+    assert clasificador.clasificar("/pacientes/x", "DELETE")[1] == OperationType.DELETE
+    assert clasificador.clasificar("/pacientes/", "OPTIONS")[1] == OperationType.READ
+
+
+def test_infer_usa_el_clasificador_global_construido_en_setup():
+    # setup_security(app, ...) ya corrió al importar main
+    recurso, operacion = security._infer_resource_and_operation(_request("put", "/atencion-adultez/x"))
+
+    assert recurso == ResourceType.ATENCIÓN_MÉDICA
+    assert operacion == OperationType.UPDATE
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS PERMISOS COMPILADOS
+=========================
+
+Verifica que check_access con la matriz compilada a máscaras de bits y
+puntajes de riesgo precalculados decide igual que la evaluación original
+sobre permissions_matrix, para todas las combinaciones. No requieren BD.
+"""
+
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import security
+from core.security import (
+    AccessLevel,
+    AccessRequest,
+    GranularAccessController,
+    OperationType,
+    ResourceType,
+    RiskLevel,
+    UserContext
+)
+
+
+def _permiso_referencia(controller, access_level, access_request):
+    """Evaluación original: recorrer la matriz y buscar en la lista"""
+    permitted_resources = controller.permissions_matrix.get(access_level, {})
+    return access_request.operation in permitted_resources.get(access_request.resource_type, [])
+
+
+def _riesgo_referencia(controller, user_context, access_request, hora):
+    risk_score = 0
+    if access_request.resource_type in controller.sensitive_resources:
+        risk_score += 2
+    if access_request.operation in [OperationType.DELETE, OperationType.BULK_OPERATION]:
+        risk_score += 3
+    elif access_request.operation in [OperationType.EXPORT, OperationType.UPDATE]:
+        risk_score += 1
+    if user_context.ip_address and user_context.ip_address in controller.suspicious_ips:
+        risk_score += 2
+    if hora < 6 or hora > 22:
+        risk_score += 1
+    if (user_context.access_level == AccessLevel.BÁSICO_USUARIO and
+            access_request.operation in [OperationType.CREATE, OperationType.UPDATE, OperationType.DELETE]):
+        risk_score += 2
+    if risk_score <= 1:
+        return RiskLevel.LOW
+    elif risk_score <= 3:
+        return RiskLevel.MEDIUM
+    elif risk_score <= 5:
+        return RiskLevel.HIGH
+    return RiskLevel.CRITICAL
+
+
+def _combinaciones(ip_address="10.0.0.1"):
+    for access_level in AccessLevel:
+        usuario = UserContext(user_id="u1", access_level=access_level, ip_address=ip_address)
+        for resource_type in ResourceType:
+            for operation in OperationType:
+                yield usuario, AccessRequest(resource_type=resource_type, operation=operation)
+
+
+class TestPermisosCompilados:
+
+    def test_permisos_iguales_a_la_matriz(self):
+        controller = GranularAccessController()
+        for usuario, acceso in _combinaciones():
+            assert controller._check_basic_permissions(usuario.access_level, acceso) == \
+                _permiso_referencia(controller, usuario.access_level, acceso)
+
+    def test_riesgo_igual_en_horario_y_fuera_de_horario(self):
+        controller = GranularAccessController()
+        controller.suspicious_ips.add("10.0.0.9")
+        for hora in (3, 12, 23):
+            controller._horario_vigente_hasta = 0.0
+            instante = datetime(2026, 10, 18, hora, 30)
+            with patch.object(security, "datetime") as reloj:
+                reloj.now.return_value = instante
+                for ip_address in ("10.0.0.1", "10.0.0.9"):
+                    for usuario, acceso in _combinaciones(ip_address):
+                        assert controller._assess_risk_level(usuario, acceso) == \
+                            _riesgo_referencia(controller, usuario, acceso, hora)
+
+    def test_check_access_deniega_sin_permiso_con_el_mismo_motivo(self):
+        controller = GranularAccessController()
+        usuario = UserContext(user_id="u1", access_level=AccessLevel.PÚBLICO_LECTURA, ip_address="10.0.0.1")
+        acceso = AccessRequest(resource_type=ResourceType.PACIENTE, operation=OperationType.READ)
+        assert controller.check_access(usuario, acceso) == (
+            False, RiskLevel.MEDIUM,
+            f"Sin permisos para {OperationType.READ} en {ResourceType.PACIENTE}"
+        )
+
+    def test_ip_invalida_o_bloqueada(self):
+        controller = GranularAccessController()
+        controller.blocked_ips.add("10.0.0.66")
+        acceso = AccessRequest(resource_type=ResourceType.ESTADÍSTICAS, operation=OperationType.READ)
+        for ip_address in ("no-es-ip", "10.0.0.66"):
+            usuario = UserContext(user_id="u1", access_level=AccessLevel.SUPERUSUARIO, ip_address=ip_address)
+            permitido, nivel, _ = controller.check_access(usuario, acceso)
+            assert (permitido, nivel) == (False, RiskLevel.CRITICAL)
+
+    def test_recompilar_tras_cambiar_la_matriz(self):
+        controller = GranularAccessController()
+        acceso = AccessRequest(resource_type=ResourceType.USUARIOS, operation=OperationType.READ)
+        assert not controller._check_basic_permissions(AccessLevel.MÉDICO_CONSULTA, acceso)
+        controller.permissions_matrix[AccessLevel.MÉDICO_CONSULTA][ResourceType.USUARIOS] = [OperationType.READ]
+        controller.compilar_permisos()
+        assert controller._check_basic_permissions(AccessLevel.MÉDICO_CONSULTA, acceso)
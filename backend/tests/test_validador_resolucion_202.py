@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+TESTS MOTOR DE VALIDACIÓN - RESOLUCIÓN 202 DE 2021
+===================================================
+
+Tests del motor columnar que compila las validaciones de los anexos técnicos
+(Controles RPED/NPED) y las evalúa sobre lotes de registros. No requieren BD.
+
+Enfoque: cada regla se verifica comparando un registro que la cumple contra
+uno que la incumple; la validación por lotes debe coincidir con la validación
+registro a registro.
+"""
+
+import pytest
+import time
+import random
+from datetime import date
+import os
+import sys
+
+# Agregar path del backend para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.validador_resolucion_202 import MotorValidacion202, obtener_motor_validacion_202
+
+ANCHO_RPED = 119
+FECHA_CORTE = date(2025, 9, 30)
+
+
+@pytest.fixture(scope="module")
+def motor():
+    return obtener_motor_validacion_202()
+
+
+def _registro(**valores):
+    """Registro RPED vacío con los valores dados como var_<N>=valor"""
+    fila = [''] * ANCHO_RPED
+    fila[0] = '2'
+    fila[1] = '1'
+    fila[3] = 'CC'
+    fila[4] = '1234567890'
+    fila[9] = '1990-05-10'
+    fila[10] = 'F'
+    for clave, valor in valores.items():
+        fila[int(clave.split('_')[1])] = valor
+    return fila
+
+
+def _codigos(motor, *filas):
+    """Códigos de error/warning que dispara cada fila por separado"""
+    resultado = motor.validar_lote(filas, FECHA_CORTE)
+    codigos = [set() for _ in filas]
+    for codigo, indices in resultado.filas_con_error.items():
+        for indice in indices:
+            codigos[indice].add(codigo)
+    return codigos
+
+
+class TestCompilacionControles:
+    """La tabla de controles se compila una sola vez y con alta cobertura"""
+
+    def test_cobertura_reglas(self, motor):
+        resumen = motor.resumen()
+        assert resumen['total_reglas'] > 400
+        assert resumen['compiladas'] > 350
+
+    def test_reglas_fuente_externa_se_reportan(self, motor):
+        no_compiladas = motor.resumen()['no_compiladas']
+        assert 'Error211' in no_compiladas
+        assert all(motivo for motivo in no_compiladas.values())
+
+    def test_motor_es_singleton(self, motor):
+        assert obtener_motor_validacion_202() is motor
+
+
+class TestReglasRPED:
+    """Reglas representativas de cada forma de redacción del anexo"""
+
+    def test_variable_obligatoria(self, motor):
+        valido, invalido = _codigos(motor, _registro(), _registro(var_9=''))
+        assert 'Error020' not in valido
+        assert 'Error020' in invalido
+
+    def test_contenido_de_fecha(self, motor):
+        valido, invalido = _codigos(motor, _registro(var_9='2020-02-29'), _registro(var_9='2021-02-29'))
+        assert 'Error421' not in valido
+        assert 'Error421' in invalido
+
+    def test_validar_que_si_consecuencia(self, motor):
+        # Gestante (variable 14 = 1) debe ser de sexo femenino
+        valido, invalido = _codigos(motor, _registro(var_14='1', var_10='F'), _registro(var_14='1', var_10='M'))
+        assert 'Error030' not in valido
+        assert 'Error030' in invalido
+
+    def test_longitud_identificacion_por_tipo(self, motor):
+        valido, invalido = _codigos(
+            motor, _registro(var_3='CC', var_4='1234567890'), _registro(var_3='CC', var_4='123456789012')
+        )
+        assert 'Error676' not in valido
+        assert 'Error676' in invalido
+
+    def test_edad_calculada_con_o_estrecho(self, motor):
+        # "< 24 meses ó > 63 meses" se liga a la edad, no a toda la condición
+        nino, adulto = _codigos(
+            motor, _registro(var_9='2022-01-01', var_71='1'), _registro(var_9='1990-01-01', var_71='1')
+        )
+        assert 'Error064' not in nino
+        assert 'Error064' in adulto
+
+    def test_parentesis_sin_cerrar(self, motor):
+        valido, invalido = _codigos(
+            motor,
+            _registro(var_18='2', var_113='4', var_112='1845-01-01'),
+            _registro(var_18='2', var_113='1', var_112='1845-01-01')
+        )
+        assert 'Error506' not in valido
+        assert 'Error506' in invalido
+
+    def test_coma_decimal_en_warning(self, motor):
+        normal, bajo = _codigos(motor, _registro(var_104='3'), _registro(var_104='0,5'))
+        assert 'Warning098' not in normal
+        assert 'Warning098' in bajo
+
+    def test_warnings_no_invalidan_registro(self, motor):
+        resultado = motor.validar_lote([_registro(var_104='0,5')], FECHA_CORTE)
+        assert resultado.histograma.get('Warning098') == 1
+        invalidantes = [codigo for codigo in resultado.histograma if not codigo.lower().startswith('warning')]
+        assert resultado.filas_invalidas == (1 if invalidantes else 0)
+
+
+class TestValidacionPorLotes:
+    """El lote debe dar el mismo resultado que registro a registro"""
+
+    def test_filas_dict_con_claves_del_generador(self, motor):
+        fila = _registro(var_14='1', var_10='M')
+        variables = {f'var_{numero}_campo': valor for numero, valor in enumerate(fila)}
+        assert motor.validar_lote([variables], FECHA_CORTE).histograma == \
+            motor.validar_lote([fila], FECHA_CORTE).histograma
+
+    def test_lote_igual_a_registro_a_registro(self, motor):
+        random.seed(202)
+        filas = [
+            _registro(
+                var_9=random.choice(['1990-05-10', '2022-01-01', '2020-02-30', '']),
+                var_10=random.choice(['F', 'M']),
+                var_14=random.choice(['1', '2', '0', '21']),
+                var_71=random.choice(['1', '0', '21']),
+                var_104=random.choice(['0,5', '3', '30', '999']),
+            )
+            for _ in range(60)
+        ]
+        lote = motor.validar_lote(filas, FECHA_CORTE)
+        for indice, fila in enumerate(filas):
+            individual = set(motor.validar_lote([fila], FECHA_CORTE).histograma)
+            del_lote = {codigo for codigo, filas_error in lote.filas_con_error.items() if indice in filas_error}
+            assert individual == del_lote
+
+    def test_archivo_plano_usa_registro_de_control(self, motor, tmp_path):
+        ruta = tmp_path / "RPED.txt"
+        detalle = ['|'.join(_registro()), '|'.join(_registro(var_14='1', var_10='M'))]
+        ruta.write_text('\n'.join(['1|123456789012|2025-07-01|2025-09-30|2'] + detalle) + '\n', encoding='utf-8')
+
+        resultado = motor.validar_archivo_plano(str(ruta))
+        assert resultado.total_filas == 2
+        assert resultado.filas_con_error['Error030'] == [1]
+
+    def test_archivo_plano_por_bloques_igual_a_lote(self, motor, tmp_path, monkeypatch):
+        import services.validador_resolucion_202 as validador
+        monkeypatch.setattr(validador, 'TAMANO_BLOQUE_ARCHIVO', 7)
+        random.seed(7)
+        filas = [
+            _registro(var_9=random.choice(['1990-05-10', '2022-01-01', '2020-02-30']),
+                      var_10=random.choice(['F', 'M']), var_14=random.choice(['1', '2', '0']))
+            for _ in range(30)
+        ]
+        ruta = tmp_path / "RPED.txt"
+        ruta.write_text('\n'.join(['1|123456789012|2025-07-01|2025-09-30|30'] + ['|'.join(f) for f in filas]) + '\n',
+                        encoding='utf-8')
+
+        por_bloques = motor.validar_archivo_plano(str(ruta))
+        completo = motor.validar_lote(filas, FECHA_CORTE)
+
+        assert por_bloques.a_dict() == completo.a_dict()
+
+    def test_rendimiento_lote_grande(self, motor):
+        filas = [_registro(var_9=f'{1930 + i % 90}-0{1 + i % 9}-1{i % 9}', var_14=str(i % 3)) for i in range(100000)]
+        inicio = time.perf_counter()
+        resultado = motor.validar_lote(filas, FECHA_CORTE, incluir_filas=False)
+        assert resultado.total_filas == 100000
+        # ~4 s por 100.000 registros en un equipo de desarrollo; el margen cubre CI más lento
+        assert time.perf_counter() - inicio < 15
@@ -27,11 +27,23 @@ const apiClient = axios.create({
   },
 });
 
-// Función para obtener todos los pacientes
-export const getPacientes = async (): Promise<Paciente[]> => {
+// Columnas que muestra la tabla de pacientes
+const CAMPOS_LISTADO = ['id', 'numero_documento', 'primer_nombre', 'primer_apellido', 'fecha_nacimiento', 'genero'] as const;
+
+export type PacienteListado = Pick<Paciente, (typeof CAMPOS_LISTADO)[number]>;
+
+export interface PaginaPacientes {
+  pacientes: PacienteListado[];
+  hayMas: boolean; // El backend envía X-Next-Cursor solo si existe una página siguiente
+}
+
+// Función para obtener una página de pacientes (solo las columnas del listado)
+export const getPacientes = async (page: number, pageSize: number): Promise<PaginaPacientes> => {
   try {
-    const response = await apiClient.get<{ data: Paciente[] }>('/pacientes/');
-    return response.data.data; // Se accede a la propiedad anidada "data"
+    const response = await apiClient.get<{ data: PacienteListado[] }>('/pacientes/', {
+      params: { limite: pageSize, offset: page * pageSize, fields: CAMPOS_LISTADO.join(',') },
+    });
+    return { pacientes: response.data.data, hayMas: Boolean(response.headers['x-next-cursor']) };
   } catch (error) {
     console.error('Error fetching pacientes:', error);
     throw error;
@@ -1,6 +1,6 @@
-import React from 'react';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { DataGrid, GridColDef, GridRenderCellParams } from '@mui/x-data-grid';
+import React, { useState } from 'react';
+import { useQuery, useMutation, useQueryClient, keepPreviousData } from '@tanstack/react-query';
+import { DataGrid, GridColDef, GridPaginationModel, GridRenderCellParams } from '@mui/x-data-grid';
 import { Box, Button, CircularProgress, Typography, IconButton } from '@mui/material';
 import { Link as RouterLink } from 'react-router-dom';
 import { Edit, Delete } from '@mui/icons-material';
@@ -8,11 +8,13 @@ import { getPacientes, deletePaciente } from '../api/pacientesApi';
 
 export default function PacientesPage() {
   const queryClient = useQueryClient();
+  const [paginationModel, setPaginationModel] = useState<GridPaginationModel>({ page: 0, pageSize: 10 });
 
-  // Query para obtener los datos de los pacientes
-  const { data: pacientes, isLoading, isError, error } = useQuery({
-    queryKey: ['pacientes'],
-    queryFn: getPacientes,
+  // Query para obtener la página visible de pacientes (paginación en el servidor)
+  const { data: pagina, isLoading, isFetching, isError, error } = useQuery({
+    queryKey: ['pacientes', paginationModel.page, paginationModel.pageSize],
+    queryFn: () => getPacientes(paginationModel.page, paginationModel.pageSize),
+    placeholderData: keepPreviousData,
   });
 
   // Mutación para eliminar un paciente
@@ -110,14 +112,15 @@ export default function PacientesPage() {
         </Typography>
       )}
       <DataGrid
-        rows={pacientes || []}
+        rows={pagina?.pacientes || []}
         columns={columns}
-        loading={deleteMutation.isPending}
-        initialState={{
-          pagination: {
-            paginationModel: { page: 0, pageSize: 10 },
-          },
-        }}
+        loading={deleteMutation.isPending || isFetching}
+        paginationMode="server"
+        paginationModel={paginationModel}
+        onPaginationModelChange={setPaginationModel}
+        // Total desconocido: contar 100k+ pacientes en cada página no vale la pena
+        rowCount={-1}
+        paginationMeta={{ hasNextPage: pagina?.hayMas ?? false }}
         pageSizeOptions={[5, 10, 20]}
       />
     </Box>
@@ -0,0 +1,43 @@
+-- Migration: RPC de estadísticas agregadas para control cronicidad
+-- Fecha: 18 octubre 2026
+-- Objetivo: Reemplazar las 8 consultas count="exact" de /control-cronicidad/estadisticas/basicas
+--           por un único recorrido de la tabla con conteos agrupados
+-- Base: routes/control_cronicidad.py::obtener_estadisticas_basicas
+
+-- =============================================================================
+-- RPC: ESTADÍSTICAS BÁSICAS CONTROL CRONICIDAD
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION public.estadisticas_control_cronicidad()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH por_tipo AS (
+        SELECT tipo_cronicidad, count(*) AS total
+        FROM public.control_cronicidad
+        GROUP BY tipo_cronicidad
+    )
+    SELECT jsonb_build_object(
+        'total', count(*),
+        'controlados', count(*) FILTER (WHERE estado_control = 'Controlado'),
+        'no_controlados', count(*) FILTER (WHERE estado_control = 'No controlado'),
+        'buena_adherencia', count(*) FILTER (WHERE adherencia_tratamiento = 'Buena'),
+        'por_tipo', COALESCE(
+            (SELECT jsonb_object_agg(tipo_cronicidad, total) FROM por_tipo),
+            '{}'::jsonb
+        )
+    )
+    FROM public.control_cronicidad;
+$$;
+
+-- Permisos: mismo esquema que las RPC transaccionales
+GRANT EXECUTE ON FUNCTION public.estadisticas_control_cronicidad() TO service_role;
+GRANT EXECUTE ON FUNCTION public.estadisticas_control_cronicidad() TO authenticated;
+
+COMMENT ON FUNCTION public.estadisticas_control_cronicidad IS
+'Conteos agregados de control_cronicidad en una sola llamada: total, por tipo de
+cronicidad, estado de control y adherencia. Consumida por
+/control-cronicidad/estadisticas/basicas detrás de un cache de TTL corto.';
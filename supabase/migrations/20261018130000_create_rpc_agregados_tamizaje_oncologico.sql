@@ -0,0 +1,108 @@
+-- Migration: RPC de agregados para tamizaje oncológico
+-- Fecha: 18 octubre 2026
+-- Objetivo: Resolver estadísticas y reporte de adherencia con conteos agrupados en BD,
+--           sin descargar filas; el rango de fechas se filtra en la consulta
+-- Base: routes/tamizaje_oncologico.py (obtener_estadisticas_basicas, reporte_adherencia_tamizaje)
+
+-- =============================================================================
+-- ÍNDICE PARA FILTROS POR TIPO Y RANGO DE FECHAS
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_tamizaje_oncologico_tipo_fecha
+    ON public.tamizaje_oncologico (tipo_tamizaje, fecha_tamizaje);
+
+CREATE INDEX IF NOT EXISTS idx_tamizaje_oncologico_fecha
+    ON public.tamizaje_oncologico (fecha_tamizaje);
+
+-- =============================================================================
+-- RPC: ESTADÍSTICAS BÁSICAS
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION public.estadisticas_tamizaje_oncologico()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH por_tipo AS (
+        SELECT tipo_tamizaje, count(*) AS total
+        FROM public.tamizaje_oncologico
+        GROUP BY tipo_tamizaje
+    )
+    SELECT jsonb_build_object(
+        'total', count(*),
+        'positivos', count(*) FILTER (WHERE resultado_tamizaje IN ('Positivo', 'Anormal')),
+        'negativos', count(*) FILTER (WHERE resultado_tamizaje = 'Negativo'),
+        'seguimiento_especializado', count(*) FILTER (WHERE requiere_seguimiento_especializado),
+        'por_tipo', COALESCE(
+            (SELECT jsonb_object_agg(tipo_tamizaje, total) FROM por_tipo),
+            '{}'::jsonb
+        )
+    )
+    FROM public.tamizaje_oncologico;
+$$;
+
+-- =============================================================================
+-- RPC: ADHERENCIA POR RANGO DE FECHAS
+-- =============================================================================
+
+-- La clasificación replica calcular_adherencia_tamizaje: Buena si han pasado como
+-- máximo el intervalo recomendado del tipo, Regular hasta 1.5 veces, Mala después.
+-- Los intervalos llegan desde la aplicación (INTERVALOS_TAMIZAJE_DIAS) para no duplicarlos.
+CREATE OR REPLACE FUNCTION public.adherencia_tamizaje_oncologico(
+    p_intervalos jsonb,
+    p_intervalo_defecto integer DEFAULT 365,
+    p_fecha_referencia date DEFAULT current_date,
+    p_tipo_tamizaje text DEFAULT NULL,
+    p_fecha_desde date DEFAULT NULL,
+    p_fecha_hasta date DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH clasificados AS (
+        SELECT
+            CASE
+                WHEN p_fecha_referencia - t.fecha_tamizaje <= i.dias THEN 'Buena'
+                WHEN p_fecha_referencia - t.fecha_tamizaje <= i.dias * 1.5 THEN 'Regular'
+                ELSE 'Mala'
+            END AS adherencia
+        FROM public.tamizaje_oncologico t
+        CROSS JOIN LATERAL (
+            SELECT COALESCE((p_intervalos ->> t.tipo_tamizaje)::integer, p_intervalo_defecto) AS dias
+        ) i
+        WHERE (p_tipo_tamizaje IS NULL OR t.tipo_tamizaje = p_tipo_tamizaje)
+          AND (p_fecha_desde IS NULL OR t.fecha_tamizaje >= p_fecha_desde)
+          AND (p_fecha_hasta IS NULL OR t.fecha_tamizaje <= p_fecha_hasta)
+    ),
+    por_adherencia AS (
+        SELECT adherencia, count(*) AS total
+        FROM clasificados
+        GROUP BY adherencia
+    )
+    SELECT jsonb_build_object(
+        'total', COALESCE((SELECT sum(total) FROM por_adherencia), 0),
+        'por_adherencia', COALESCE(
+            (SELECT jsonb_object_agg(adherencia, total) FROM por_adherencia),
+            '{}'::jsonb
+        )
+    );
+$$;
+
+-- Permisos: mismo esquema que las RPC transaccionales
+GRANT EXECUTE ON FUNCTION public.estadisticas_tamizaje_oncologico() TO service_role;
+GRANT EXECUTE ON FUNCTION public.estadisticas_tamizaje_oncologico() TO authenticated;
+GRANT EXECUTE ON FUNCTION public.adherencia_tamizaje_oncologico(jsonb, integer, date, text, date, date) TO service_role;
+GRANT EXECUTE ON FUNCTION public.adherencia_tamizaje_oncologico(jsonb, integer, date, text, date, date) TO authenticated;
+
+COMMENT ON FUNCTION public.estadisticas_tamizaje_oncologico IS
+'Conteos agregados de tamizaje_oncologico en una sola llamada: total, por tipo,
+por resultado y con seguimiento especializado.';
+
+COMMENT ON FUNCTION public.adherencia_tamizaje_oncologico IS
+'Conteo de tamizajes por adherencia (Buena/Regular/Mala) con filtros de tipo y
+rango de fechas aplicados en la consulta. Solo retorna conteos.';
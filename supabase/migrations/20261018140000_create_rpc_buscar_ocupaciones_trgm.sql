@@ -0,0 +1,120 @@
+-- Migration: Búsqueda de ocupaciones DANE por trigramas en una sola llamada
+-- Fecha: 18 octubre 2026
+-- Objetivo: Reemplazar los dos ilike secuenciales (nombre '%q%' y luego código 'q%')
+--           por una RPC que usa índices (GIN pg_trgm sobre el nombre normalizado y
+--           text_pattern_ops sobre el código) y ordena por similitud
+-- Base: routes/catalogo_ocupaciones_simple.py y routes/catalogo_ocupaciones.py
+--       (buscar_ocupaciones_autocompletado)
+
+create extension if not exists "pg_trgm" with schema "extensions";
+create extension if not exists "unaccent" with schema "extensions";
+
+-- =============================================================================
+-- NORMALIZACIÓN DE TEXTO PARA BÚSQUEDA
+-- =============================================================================
+
+-- Misma normalización que services/indice_ocupaciones.py::normalizar_termino:
+-- minúsculas, sin tildes y cualquier carácter no alfanumérico como espacio.
+-- unaccent con diccionario explícito es determinista, por eso se declara IMMUTABLE
+-- (requisito para la columna generada y el índice).
+CREATE OR REPLACE FUNCTION public.normalizar_texto_busqueda(texto text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+SET search_path = public, extensions
+AS $$
+    SELECT btrim(regexp_replace(
+        lower(extensions.unaccent('extensions.unaccent'::regdictionary, texto)),
+        '[^a-z0-9]+', ' ', 'g'
+    ));
+$$;
+
+ALTER TABLE public.catalogo_ocupaciones_dane
+    ADD COLUMN IF NOT EXISTS nombre_busqueda text
+    GENERATED ALWAYS AS (public.normalizar_texto_busqueda(nombre_ocupacion_normalizado)) STORED;
+
+COMMENT ON COLUMN public.catalogo_ocupaciones_dane.nombre_busqueda IS
+'Nombre en minúsculas, sin tildes ni signos; se mantiene solo (columna generada) para búsqueda por trigramas';
+
+-- =============================================================================
+-- ÍNDICES
+-- =============================================================================
+
+-- LIKE '%q%', similitud de palabra (<%) y ranking sobre el nombre normalizado
+CREATE INDEX IF NOT EXISTS idx_catalogo_ocupaciones_nombre_trgm
+    ON public.catalogo_ocupaciones_dane
+    USING gin (nombre_busqueda extensions.gin_trgm_ops);
+
+-- LIKE 'q%' sobre el código (el índice btree existente no sirve para prefijos
+-- con collation distinta de C)
+CREATE INDEX IF NOT EXISTS idx_catalogo_ocupaciones_codigo_prefix
+    ON public.catalogo_ocupaciones_dane (codigo_ocupacion_dane text_pattern_ops);
+
+-- =============================================================================
+-- RPC: BÚSQUEDA RANKEADA
+-- =============================================================================
+
+-- Relevancia en la escala de la API (0.0 - 1.0):
+--   1.0  el nombre empieza por el término
+--   0.9  el código empieza por el término
+--   ≤0.8 similitud de palabra por trigramas (cubre coincidencias internas y errores
+--        de digitación), escalada para quedar debajo de los casos anteriores
+CREATE OR REPLACE FUNCTION public.buscar_ocupaciones_trgm(
+    p_termino text,
+    p_limite integer DEFAULT 10,
+    p_categoria text DEFAULT NULL,
+    p_solo_activas boolean DEFAULT true
+)
+RETURNS TABLE (
+    id uuid,
+    codigo_ocupacion_dane text,
+    nombre_ocupacion_normalizado text,
+    categoria_ocupacional_nivel_1 text,
+    relevancia real
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+DECLARE
+    -- Como variable llega a las consultas como parámetro: los índices GIN/btree
+    -- se usan con el valor del request
+    v_termino text := public.normalizar_texto_busqueda(p_termino);
+BEGIN
+    IF v_termino IS NULL OR v_termino = '' THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        co.id,
+        co.codigo_ocupacion_dane,
+        co.nombre_ocupacion_normalizado,
+        co.categoria_ocupacional_nivel_1,
+        (CASE
+            WHEN co.nombre_busqueda LIKE v_termino || '%' THEN 1.0
+            WHEN co.codigo_ocupacion_dane LIKE v_termino || '%' THEN 0.9
+            ELSE 0.8 * word_similarity(v_termino, co.nombre_busqueda)
+        END)::real AS relevancia
+    FROM public.catalogo_ocupaciones_dane co
+    WHERE (NOT p_solo_activas OR co.activo)
+      AND (p_categoria IS NULL OR co.categoria_ocupacional_nivel_1 = p_categoria)
+      AND (
+          co.nombre_busqueda LIKE '%' || v_termino || '%'
+          OR v_termino <% co.nombre_busqueda
+          OR co.codigo_ocupacion_dane LIKE v_termino || '%'
+      )
+    -- 5 = relevancia: por nombre chocaría con la columna OUT de RETURNS TABLE
+    ORDER BY 5 DESC, co.nombre_ocupacion_normalizado ASC
+    LIMIT least(greatest(p_limite, 1), 50);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.buscar_ocupaciones_trgm(text, integer, text, boolean) TO service_role;
+GRANT EXECUTE ON FUNCTION public.buscar_ocupaciones_trgm(text, integer, text, boolean) TO authenticated;
+
+COMMENT ON FUNCTION public.buscar_ocupaciones_trgm IS
+'Autocompletado de ocupaciones DANE por nombre (trigramas, sin tildes) y prefijo de código, rankeado por similitud en una sola llamada.';
@@ -0,0 +1,104 @@
+-- Migration: Resumen precalculado del catálogo de ocupaciones DANE
+-- Fecha: 18 octubre 2026
+-- Objetivo: Servir /ocupaciones/estadisticas con la lectura de una fila en lugar de
+--           dos conteos exactos y la descarga de todas las categorías nivel 1
+-- Base: routes/catalogo_ocupaciones_simple.py (obtener_estadisticas_catalogo)
+
+-- =============================================================================
+-- TABLA DE RESUMEN (UNA FILA)
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS public.catalogo_ocupaciones_resumen (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    total_ocupaciones integer NOT NULL DEFAULT 0,
+    ocupaciones_activas integer NOT NULL DEFAULT 0,
+    categorias_nivel_1 integer NOT NULL DEFAULT 0,
+    categorias_nivel_2 integer NOT NULL DEFAULT 0,
+    ultima_actualizacion timestamptz,
+    version_catalogo text,
+    calculado_en timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.catalogo_ocupaciones_resumen ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "service_role_full_access"
+ON public.catalogo_ocupaciones_resumen
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+CREATE POLICY "authenticated_users_read_resumen_ocupaciones"
+ON public.catalogo_ocupaciones_resumen
+FOR SELECT
+TO authenticated
+USING (true);
+
+-- =============================================================================
+-- RECÁLCULO
+-- =============================================================================
+
+-- Una pasada sobre el catálogo (~10k filas). La llaman el trigger por sentencia y
+-- los scripts de importación que quieran forzarlo.
+CREATE OR REPLACE FUNCTION public.refrescar_resumen_catalogo_ocupaciones()
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO public.catalogo_ocupaciones_resumen AS r (
+        id, total_ocupaciones, ocupaciones_activas, categorias_nivel_1,
+        categorias_nivel_2, ultima_actualizacion, version_catalogo, calculado_en
+    )
+    SELECT
+        true,
+        count(*),
+        count(*) FILTER (WHERE activo),
+        count(DISTINCT categoria_ocupacional_nivel_1),
+        count(DISTINCT categoria_ocupacional_nivel_2),
+        max(actualizado_en),
+        max(version_catalogo),
+        now()
+    FROM public.catalogo_ocupaciones_dane
+    ON CONFLICT (id) DO UPDATE SET
+        total_ocupaciones = EXCLUDED.total_ocupaciones,
+        ocupaciones_activas = EXCLUDED.ocupaciones_activas,
+        categorias_nivel_1 = EXCLUDED.categorias_nivel_1,
+        categorias_nivel_2 = EXCLUDED.categorias_nivel_2,
+        ultima_actualizacion = EXCLUDED.ultima_actualizacion,
+        version_catalogo = EXCLUDED.version_catalogo,
+        calculado_en = EXCLUDED.calculado_en;
+$$;
+
+CREATE OR REPLACE FUNCTION public.trigger_resumen_catalogo_ocupaciones()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM public.refrescar_resumen_catalogo_ocupaciones();
+    RETURN NULL;
+END;
+$$;
+
+-- Por sentencia, no por fila: una importación por lotes o un COPY recalcula una
+-- vez por sentencia
+DROP TRIGGER IF EXISTS trigger_resumen_catalogo_ocupaciones
+ON public.catalogo_ocupaciones_dane;
+
+CREATE TRIGGER trigger_resumen_catalogo_ocupaciones
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.catalogo_ocupaciones_dane
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.trigger_resumen_catalogo_ocupaciones();
+
+-- Estado inicial con los datos ya importados
+SELECT public.refrescar_resumen_catalogo_ocupaciones();
+
+GRANT EXECUTE ON FUNCTION public.refrescar_resumen_catalogo_ocupaciones() TO service_role;
+
+COMMENT ON TABLE public.catalogo_ocupaciones_resumen IS
+'Resumen de una fila del catálogo de ocupaciones DANE; se recalcula por trigger al modificar el catálogo.';
+
+COMMENT ON FUNCTION public.refrescar_resumen_catalogo_ocupaciones IS
+'Recalcula catalogo_ocupaciones_resumen a partir de catalogo_ocupaciones_dane.';
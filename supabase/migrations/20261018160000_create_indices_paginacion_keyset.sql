@@ -0,0 +1,38 @@
+-- Migration: Índices para paginación por cursor (keyset) de los listados
+-- Fecha: 18 octubre 2026
+-- Objetivo: Servir cada página de los listados con un recorrido de índice que
+--           arranca en la posición del cursor (fecha, id), en lugar de leer y
+--           descartar OFFSET filas
+-- Base: core/paginacion.py (paginar) y los listar_* de atencion_primera_infancia,
+--       control_cronicidad, tamizaje_oncologico, atencion_integral_transversal_salud
+--       y familia_integral_salud_publica
+
+-- Mismo orden que paginar(): fecha DESC NULLS LAST, id DESC. Con él, ORDER BY +
+-- LIMIT y el predicado "(fecha, id) después del cursor" se resuelven con un
+-- Index Scan sin Sort, sea la página 1 o la 1.000.
+
+CREATE INDEX IF NOT EXISTS idx_atencion_primera_infancia_fecha_id
+    ON public.atencion_primera_infancia (fecha_atencion DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_control_cronicidad_fecha_id
+    ON public.control_cronicidad (fecha_control DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_tamizaje_oncologico_fecha_id
+    ON public.tamizaje_oncologico (fecha_tamizaje DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_atencion_integral_fecha_inicio_id
+    ON public.atencion_integral_transversal_salud (fecha_inicio_atencion_integral DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_familia_integral_creado_en_id
+    ON public.familia_integral_salud_publica (creado_en DESC NULLS LAST, id DESC);
+
+COMMENT ON INDEX public.idx_atencion_primera_infancia_fecha_id IS
+'Orden y búsqueda por cursor de GET /atenciones-primera-infancia/';
+COMMENT ON INDEX public.idx_control_cronicidad_fecha_id IS
+'Orden y búsqueda por cursor de GET /control-cronicidad/';
+COMMENT ON INDEX public.idx_tamizaje_oncologico_fecha_id IS
+'Orden y búsqueda por cursor de GET /tamizaje-oncologico/';
+COMMENT ON INDEX public.idx_atencion_integral_fecha_inicio_id IS
+'Orden y búsqueda por cursor de GET /atencion-integral-transversal-salud/';
+COMMENT ON INDEX public.idx_familia_integral_creado_en_id IS
+'Orden y búsqueda por cursor de GET /familia-integral-salud-publica/';
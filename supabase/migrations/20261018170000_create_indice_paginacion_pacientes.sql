@@ -0,0 +1,13 @@
+-- Migration: Índice para el listado paginado de pacientes
+-- Fecha: 18 octubre 2026
+-- Objetivo: Servir GET /pacientes/ (páginas JSON por cursor y exportación NDJSON)
+--           con un recorrido de índice desde la posición (creado_en, id), sin
+--           ordenar ni descartar filas de toda la tabla
+-- Base: routes/pacientes.py (get_pacientes) y core/paginacion.py (paginar)
+
+-- Mismo orden que paginar(): creado_en DESC NULLS LAST, id DESC
+CREATE INDEX IF NOT EXISTS idx_pacientes_creado_en_id
+    ON public.pacientes (creado_en DESC NULLS LAST, id DESC);
+
+COMMENT ON INDEX public.idx_pacientes_creado_en_id IS
+'Orden y búsqueda por cursor de GET /pacientes/';